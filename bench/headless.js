@@ -0,0 +1,471 @@
+// EternalBliss - Headless client benchmarks
+// Loads script.js and mapmaker/mapmaker-script.js into node with a minimal
+// DOM (elements, a no-op canvas context, fetch from the repository) and
+// times the client hot paths on seeded synthetic maps: renderWorld (first
+// frame and camera moves), canMoveTo, findPath, the mapmaker's fillArea,
+// plus loading maps/bliss.json and the packed maps/bliss/. Timings are the
+// best of --repeat runs after a warm-up. Each page runs in a process of its
+// own. `python -m eternalbliss.bench` runs this with --json and checks the
+// results against the stored baseline.
+//
+//   node bench/headless.js [--json] [--repeat 5] [--sizes 64,256,1024] [--seed 1]
+
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+const { execFileSync } = require('child_process');
+const { performance } = require('perf_hooks');
+
+const ROOT = path.resolve(__dirname, '..');
+const TERRAINS = ['grass', 'water', 'mountain', 'forest', 'road', 'sand'];
+
+// ---------------------------------------------------------------------------
+// Minimal DOM
+// ---------------------------------------------------------------------------
+
+// A 2D context whose every method does nothing and returns another such
+// object (gradients, patterns, text metrics), and whose properties accept
+// any value
+function fakeContext() {
+    const state = {};
+    return new Proxy(state, {
+        get: (target, key) => (key in target ? target[key] : () => fakeContext()),
+        set: (target, key, value) => { target[key] = value; return true; }
+    });
+}
+
+class FakeClassList {
+    constructor() { this.names = new Set(); }
+    add(...names) { names.forEach(n => this.names.add(n)); }
+    remove(...names) { names.forEach(n => this.names.delete(n)); }
+    toggle(name, force) {
+        const on = force === undefined ? !this.names.has(name) : force;
+        if (on) this.names.add(name); else this.names.delete(name);
+        return on;
+    }
+    contains(name) { return this.names.has(name); }
+}
+
+class FakeElement {
+    constructor(tagName, document) {
+        this.tagName = tagName.toUpperCase();
+        this.ownerDocument = document;
+        this.children = [];
+        this.parentNode = null;
+        this.style = { setProperty() {}, removeProperty() {} };
+        this.dataset = {};
+        this.classList = new FakeClassList();
+        this.attributes = {};
+        this.textContent = '';
+        this.value = '';
+        this.width = 0;
+        this.height = 0;
+        this.offsetWidth = 0;
+        this.offsetHeight = 0;
+        this.scrollTop = 0;
+        this.scrollLeft = 0;
+        this._context = null;
+    }
+    get className() { return [...this.classList.names].join(' '); }
+    set className(value) { this.classList.names = new Set(String(value).split(/\s+/).filter(Boolean)); }
+    get innerHTML() { return ''; }
+    set innerHTML(value) { this.children.forEach(c => { c.parentNode = null; }); this.children = []; }
+    get firstChild() { return this.children[0] || null; }
+    get childElementCount() { return this.children.length; }
+    get isConnected() {
+        let node = this;
+        while (node.parentNode) node = node.parentNode;
+        return node === this.ownerDocument.body || node === this.ownerDocument.documentElement;
+    }
+    appendChild(child) {
+        if (child.parentNode) child.remove();
+        child.parentNode = this;
+        this.children.push(child);
+        return child;
+    }
+    prepend(child) {
+        if (child.parentNode) child.remove();
+        child.parentNode = this;
+        this.children.unshift(child);
+    }
+    insertBefore(child, ref) {
+        if (child.parentNode) child.remove();
+        const i = ref ? this.children.indexOf(ref) : -1;
+        child.parentNode = this;
+        if (i < 0) this.children.push(child); else this.children.splice(i, 0, child);
+        return child;
+    }
+    removeChild(child) { child.remove(); return child; }
+    remove() {
+        if (!this.parentNode) return;
+        const siblings = this.parentNode.children;
+        siblings.splice(siblings.indexOf(this), 1);
+        this.parentNode = null;
+    }
+    setAttribute(name, value) { this.attributes[name] = String(value); }
+    getAttribute(name) { return this.attributes[name] ?? null; }
+    addEventListener() {}
+    removeEventListener() {}
+    getContext() { return this._context || (this._context = fakeContext()); }
+    getBoundingClientRect() { return { left: 0, top: 0, width: this.offsetWidth, height: this.offsetHeight }; }
+    querySelector(selector) { return this.querySelectorAll(selector)[0] || null; }
+    querySelectorAll(selector) {
+        const match = selector.startsWith('.') ? el => el.classList.contains(selector.slice(1)) : () => false;
+        return this.getElementsByTagName('*').filter(match);
+    }
+    getElementsByTagName(tag) {
+        const out = [];
+        const walk = el => el.children.forEach(c => {
+            if (tag === '*' || c.tagName === tag.toUpperCase()) out.push(c);
+            walk(c);
+        });
+        walk(this);
+        return out;
+    }
+}
+
+class FakeDocument {
+    constructor() {
+        this.hidden = false;
+        this.documentElement = new FakeElement('html', this);
+        this.body = new FakeElement('body', this);
+        this.documentElement.appendChild(this.body);
+        this.activeElement = this.body;
+        this.byId = new Map();
+    }
+    createElement(tag) { return new FakeElement(tag, this); }
+    // Any id exists: the page's static markup, created on first use
+    getElementById(id) {
+        let el = this.byId.get(id);
+        if (!el) {
+            el = this.createElement('div');
+            el.id = id;
+            this.byId.set(id, el);
+            this.body.appendChild(el);
+        }
+        return el;
+    }
+    // Likewise for the first element of a class
+    querySelector(selector) {
+        const found = this.body.querySelector(selector);
+        if (found || !selector.startsWith('.')) return found;
+        const el = this.createElement('div');
+        el.className = selector.slice(1);
+        return this.body.appendChild(el);
+    }
+    querySelectorAll(selector) { return this.body.querySelectorAll(selector); }
+    getElementsByTagName(tag) { return this.documentElement.getElementsByTagName(tag); }
+    addEventListener() {}
+    execCommand() { return false; }
+}
+
+// fetch() of a repository file, for the packed map
+async function fetchFile(url) {
+    const file = path.join(ROOT, new URL(url, 'http://bench/').pathname);
+    if (!fs.existsSync(file)) return { ok: false, status: 404 };
+    const data = fs.readFileSync(file);
+    return {
+        ok: true,
+        status: 200,
+        json: async () => JSON.parse(data.toString()),
+        text: async () => data.toString(),
+        arrayBuffer: async () => data.buffer.slice(data.byteOffset, data.byteOffset + data.length)
+    };
+}
+
+// This process as a page with the DOM stand-ins installed and `files`
+// (relative to the repo) loaded as classic scripts. The page shares node's
+// own global object, since globals of a vm context go through interceptors
+// that make every call into the game several times slower than in a
+// browser; so each page runs in a process of its own (see main).
+function page(files, { viewWidth = 960, viewHeight = 640 } = {}) {
+    const document = new FakeDocument();
+    const frames = [];
+    const storage = new Map();
+    Object.assign(globalThis, {
+        document,
+        window: globalThis,
+        location: { href: 'http://bench/index.html', search: '' },
+        localStorage: {
+            getItem: key => (storage.has(key) ? storage.get(key) : null),
+            setItem: (key, value) => storage.set(key, String(value)),
+            removeItem: key => storage.delete(key)
+        },
+        requestAnimationFrame: fn => frames.push(fn),
+        cancelAnimationFrame: () => {},
+        // Timers only drive animations, floating text and battles started by
+        // a move; none of them may run in the middle of a measurement
+        setTimeout: () => 0, clearTimeout: () => {}, setInterval: () => 0, clearInterval: () => {},
+        fetch: fetchFile,
+        addEventListener: () => {},
+        alert() {}, confirm: () => true, prompt: () => null,
+        Image: class { set src(value) {} }
+    });
+    Object.defineProperty(globalThis, 'navigator', { value: { userAgent: 'headless' }, configurable: true });
+    // The page's console is silent; results go to process.stdout
+    for (const level of ['log', 'warn', 'error', 'info']) console[level] = () => {};
+    for (const file of files) {
+        vm.runInThisContext(fs.readFileSync(path.join(ROOT, file), 'utf8'), { filename: file });
+    }
+    const view = document.getElementById('worldView');
+    view.offsetWidth = viewWidth;
+    view.offsetHeight = viewHeight;
+    const canvasView = document.getElementById('canvasView');
+    canvasView.offsetWidth = viewWidth;
+    canvasView.offsetHeight = viewHeight;
+    return {
+        document,
+        run: code => vm.runInThisContext(code),
+        // `code` as a function of the page, compiled once so that timing it
+        // measures the game and not the parser
+        fn: code => vm.runInThisContext(`(function () {\n${code}\n})`),
+        // Run the animation frames requested so far
+        flush: () => { while (frames.length) frames.shift()(performance.now()); }
+    };
+}
+
+// ---------------------------------------------------------------------------
+// Synthetic workloads
+// ---------------------------------------------------------------------------
+
+function mulberry32(seed) {
+    return () => {
+        seed = (seed + 0x6D2B79F5) | 0;
+        let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+        t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+
+// Grass with blobs of water, mountain and forest, and a road grid: about
+// a fifth of the tiles block movement, as on the hand-made maps
+function syntheticTerrain(size, seed) {
+    const rand = mulberry32(seed * 7919 + size);
+    const terrain = Array.from({ length: size }, () => new Array(size).fill('grass'));
+    const blobs = Math.max(4, Math.floor((size * size) / 180));
+    for (let b = 0; b < blobs; b++) {
+        const kind = TERRAINS[1 + Math.floor(rand() * 3)];
+        const cx = Math.floor(rand() * size);
+        const cy = Math.floor(rand() * size);
+        const r = 1 + Math.floor(rand() * 4);
+        for (let y = Math.max(0, cy - r); y < Math.min(size, cy + r + 1); y++) {
+            for (let x = Math.max(0, cx - r); x < Math.min(size, cx + r + 1); x++) {
+                if ((x - cx) ** 2 + (y - cy) ** 2 <= r * r) terrain[y][x] = kind;
+            }
+        }
+    }
+    for (let i = 8; i < size; i += 16) {
+        for (let j = 0; j < size; j++) {
+            terrain[i][j] = 'road';
+            terrain[j][i] = 'road';
+        }
+    }
+    return terrain;
+}
+
+function syntheticEntities(size, seed) {
+    const rand = mulberry32(seed * 104729 + size);
+    const at = () => ({ x: Math.floor(rand() * size), y: Math.floor(rand() * size) });
+    const per = Math.max(4, Math.floor((size * size) / 400));
+    return {
+        enemies: Array.from({ length: per }, (_, i) => ({ ...at(), id: i, name: 'Goblin', level: 1 + (i % 20), hp: 30, maxHp: 30, attack: 5, defense: 2, class: 'enemy-spawn enemy-goblin' })),
+        items: Array.from({ length: per }, (_, i) => ({ ...at(), id: i, type: 'gold', value: 10 })),
+        npcs: Array.from({ length: Math.ceil(per / 4) }, (_, i) => ({ ...at(), name: `NPC ${i}`, class: 'npc npc-villager', dialogue: 'Hello' })),
+        buildings: []
+    };
+}
+
+// Fastest of the runs of `measure`, which returns its own time in ms: one
+// warm-up run, then `repeat` runs and more until MIN_SAMPLE_MS have passed,
+// since the JIT keeps optimizing for the first dozen runs of a short call
+const MIN_SAMPLE_MS = 250;
+const MAX_RUNS = 200;
+
+async function sample(repeat, measure) {
+    await measure();
+    let min = Infinity;
+    const start = performance.now();
+    for (let i = 0; i < MAX_RUNS && (i < repeat || performance.now() - start < MIN_SAMPLE_MS); i++) {
+        min = Math.min(min, await measure());
+    }
+    return min;
+}
+
+// Fastest run of fn (sync or async), in ms
+function best(repeat, fn) {
+    return sample(repeat, async () => {
+        const start = performance.now();
+        const result = fn();
+        if (result && typeof result.then === 'function') await result;
+        return performance.now() - start;
+    });
+}
+
+// ---------------------------------------------------------------------------
+// Benchmarks
+// ---------------------------------------------------------------------------
+
+async function benchGame(size, seed, repeat) {
+    const metrics = {};
+    const game = page(['note-codec.js', 'txn-service.js', 'client-worker.js', 'script.js']);
+    globalThis.__map = { width: size, height: size, terrain: syntheticTerrain(size, seed), areas: [], ...syntheticEntities(size, seed) };
+    globalThis.__rand = mulberry32(seed);
+    game.run(`
+        worldMap = __map.terrain;
+        gameState.world.width = __map.width;
+        gameState.world.height = __map.height;
+        buildings = __map.buildings; npcs = __map.npcs; enemies = __map.enemies; items = __map.items;
+        rebuildSpatialIndex();
+    `);
+    metrics[`client.compileWalkability.${size}`] = { value: await best(repeat, game.fn('compileWalkability()')), unit: 'ms' };
+    metrics[`client.renderWorld.first.${size}`] = {
+        value: await best(repeat, game.fn('worldRenderer.map = null; gameState.player.x = 0; gameState.player.y = 0; renderWorld()')),
+        unit: 'ms'
+    };
+    // A camera move of a few tiles, as walking does: the common frame
+    const moves = 200;
+    metrics[`client.renderWorld.move.${size}`] = {
+        value: await best(repeat, game.fn(`
+            for (let i = 0; i < ${moves}; i++) {
+                gameState.player.x = (i * 3) % gameState.world.width;
+                gameState.player.y = (i * 2) % gameState.world.height;
+                renderWorld();
+            }
+        `)) / moves,
+        unit: 'ms'
+    };
+    const probes = 100000;
+    metrics[`client.canMoveTo.${size}`] = {
+        value: await best(repeat, game.fn(`
+            for (let i = 0; i < ${probes}; i++) canMoveTo(Math.floor(__rand() * ${size}), Math.floor(__rand() * ${size}));
+        `)) * 1e6 / probes,
+        unit: 'ns'
+    };
+    // The same routes every run, between random points of the road grid
+    // (which is connected) and with the route cache emptied: full searches
+    const routes = 20;
+    globalThis.__mulberry32 = mulberry32;
+    metrics[`client.findPath.${size}`] = {
+        value: await best(repeat, game.fn(`
+            const rand = __mulberry32(${seed});
+            routeCache.clear();
+            const road = () => {
+                const along = Math.floor(rand() * ${size});
+                const across = 8 + 16 * Math.floor(rand() * ${Math.ceil((size - 8) / 16)});
+                return rand() < 0.5 ? across * ${size} + along : along * ${size} + across;
+            };
+            for (let i = 0; i < ${routes}; i++) findPath(road(), road());
+        `)) / routes,
+        unit: 'ms'
+    };
+    return metrics;
+}
+
+async function benchMapmaker(size, seed, repeat) {
+    const editor = page(['mapmaker/mapmaker-script.js']);
+    globalThis.__terrain = syntheticTerrain(size, seed);
+    // Paint the whole road grid, the largest connected region
+    const fill = editor.fn(`
+        mapData.width = ${size};
+        mapData.height = ${size};
+        mapData.terrain = __terrain.map(row => row.slice());
+        loadTerrainGrid();
+        editHistory.undo = []; editHistory.redo = []; editHistory.current = null;
+        editorState.selectedTerrain = 'sand';
+        const t0 = performance.now();
+        fillArea(8, 8);
+        return performance.now() - t0;
+    `);
+    const value = await sample(repeat, () => {
+        const ms = fill();
+        editor.flush();
+        return ms;
+    });
+    return { [`mapmaker.fillArea.${size}`]: { value, unit: 'ms' } };
+}
+
+// The game's own map: evaluating the code export, loading it into the
+// world, and the packed version through fetch
+async function benchBliss(repeat) {
+    const metrics = {};
+    const text = fs.readFileSync(path.join(ROOT, 'maps', 'bliss.json'), 'utf8');
+    const parse = () => vm.runInNewContext(`${text};
+        ({ terrain: customTerrain, areas: typeof customAreas !== 'undefined' ? customAreas : [],
+           buildings: typeof customBuildings !== 'undefined' ? customBuildings : [],
+           npcs: typeof customNPCs !== 'undefined' ? customNPCs : [],
+           enemies: typeof customEnemies !== 'undefined' ? customEnemies : [],
+           items: typeof customItems !== 'undefined' ? customItems : [] })`, { gameState: { world: {} } });
+    metrics['client.bliss.parse'] = { value: await best(repeat, parse), unit: 'ms' };
+
+    const map = parse();
+    map.width = map.terrain[0].length;
+    map.height = map.terrain.length;
+    map.name = 'Bliss';
+    const game = page(['note-codec.js', 'txn-service.js', 'client-worker.js', 'script.js']);
+    globalThis.__map = map;
+    metrics['client.bliss.load'] = {
+        value: await best(repeat, game.fn(`
+            loadCustomMap(JSON.parse(JSON.stringify(__map)));
+            rebuildSpatialIndex();
+            compileWalkability();
+            worldRenderer.map = null;
+            renderWorld();
+        `)),
+        unit: 'ms'
+    };
+    if (fs.existsSync(path.join(ROOT, 'maps', 'bliss', 'manifest.json'))) {
+        metrics['client.bliss.packed'] = {
+            value: await best(repeat, game.fn(`packedMap = null; return loadPackedMap('maps/bliss/manifest.json');`)),
+            unit: 'ms'
+        };
+    }
+    return metrics;
+}
+
+// One page per process: `--job game:256` runs a single benchmark here and
+// prints its metrics as JSON
+async function job(name, seed, repeat) {
+    const [kind, size] = name.split(':');
+    if (kind === 'bliss') return benchBliss(repeat);
+    if (kind === 'game') return benchGame(Number(size), seed, repeat);
+    if (kind === 'mapmaker') return benchMapmaker(Number(size), seed, repeat);
+    throw new Error(`unknown job ${name}`);
+}
+
+async function main(argv) {
+    const option = (name, fallback) => {
+        const i = argv.indexOf(name);
+        return i >= 0 ? argv[i + 1] : fallback;
+    };
+    const repeat = Number(option('--repeat', 5));
+    const seed = Number(option('--seed', 1));
+    const sizes = option('--sizes', '64,256,1024').split(',').map(Number);
+
+    if (option('--job')) {
+        process.stdout.write(JSON.stringify(await job(option('--job'), seed, repeat)) + '\n');
+        return;
+    }
+    const jobs = ['bliss', ...sizes.flatMap(size => [`game:${size}`, `mapmaker:${size}`])];
+    const metrics = {};
+    for (const name of jobs) {
+        const out = execFileSync(process.execPath, [__filename, '--job', name, '--seed', seed, '--repeat', repeat].map(String));
+        Object.assign(metrics, JSON.parse(out));
+    }
+
+    if (argv.includes('--json')) {
+        process.stdout.write(JSON.stringify(metrics) + '\n');
+    } else {
+        for (const [name, { value, unit }] of Object.entries(metrics)) {
+            process.stdout.write(`${name.padEnd(34)}${value.toFixed(3).padStart(12)} ${unit}\n`);
+        }
+    }
+}
+
+if (require.main === module) {
+    main(process.argv.slice(2)).catch(error => {
+        process.stderr.write(`${error.stack || error}\n`);
+        process.exit(1);
+    });
+}
+
+module.exports = { page, syntheticTerrain, syntheticEntities };
@@ -0,0 +1,332 @@
+// EternalBliss - Client worker
+// Takes the DOM-free work off the thread that drives movement and rendering:
+// packed map chunks (fetch, hash check, inflate, run-length terrain into a
+// buffer of palette indices, entity tables), indexer pages of CHRPG notes
+// (fetch, JSON, note decoding) and transactions (build, sign, encode).
+// Tile buffers and signed transactions come back as transferables; the page
+// only applies the results. This file is both the worker and, loaded by the
+// page, the proxy to it (window.clientWorker). Where workers are unavailable
+// every job runs on the page instead, with the same results.
+// `node client-worker.js` times the jobs, i.e. the page time each one saves.
+
+class ClientWorker {
+    static URL = 'client-worker.js';
+    // Imported by the worker, resolved against the page (or its bundle)
+    static SCRIPTS = ['https://cdn.jsdelivr.net/npm/algosdk@2.7.0/dist/browser/algosdk.min.js', 'note-codec.js'];
+    static CHUNK_VERSION = 1;
+
+    // State of the side that runs the jobs
+    static state = { key: null };
+
+    constructor(url = ClientWorker.URL) {
+        this.worker = null;
+        this.pending = new Map();     // id -> {resolve, reject, job, args}
+        this.nextId = 1;
+        try {
+            if (typeof Worker !== 'undefined') this.worker = new Worker(ClientWorker.resolve(url));
+        } catch (error) {
+            console.log('Client worker unavailable, decoding and signing on the page:', error);
+        }
+        if (this.worker) {
+            this.worker.onmessage = event => this.receive(event.data);
+            this.worker.onerror = event => this.fallBack(event.message || 'worker error');
+            this.worker.postMessage({ id: 0, job: 'init', args: { scripts: ClientWorker.SCRIPTS.map(ClientWorker.resolve) } });
+        }
+    }
+
+    // Absolute URL of a page-relative path; inside a bundle (loader.html)
+    // the files are blob URLs
+    static resolve(path) {
+        const urls = typeof window !== 'undefined' && window.bundleUrls;
+        if (urls && urls[path]) return urls[path];
+        return new URL(path, location.href).href;
+    }
+
+    call(job, args) {
+        if (!this.worker) return ClientWorker.run(job, args).then(out => out.result);
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            this.pending.set(id, { resolve, reject, job, args });
+            this.worker.postMessage({ id, job, args });
+        });
+    }
+
+    receive({ id, result, error }) {
+        if (id === 0) {
+            if (error) this.fallBack(error);
+            return;
+        }
+        const entry = this.pending.get(id);
+        if (!entry) return;
+        this.pending.delete(id);
+        if (error) entry.reject(new Error(error)); else entry.resolve(result);
+    }
+
+    // The worker failed to start or crashed: run everything here from now on
+    fallBack(reason) {
+        if (!this.worker) return;
+        console.log('Client worker failed, decoding and signing on the page:', reason);
+        this.worker.terminate();
+        this.worker = null;
+        const pending = [...this.pending.values()];
+        this.pending.clear();
+        for (const { resolve, reject, job, args } of pending) this.call(job, args).then(resolve, reject);
+    }
+
+    // ---- Page API ----
+
+    // The account's secret key, for signing; null on disconnect
+    setKey(key) {
+        ClientWorker.state.key = key;
+        if (this.worker) this.worker.postMessage({ id: -1, job: 'setKey', args: { key } });
+    }
+
+    // {tiles, entities} of a packed map chunk: palette indices, row-major,
+    // and {kind: [entity]}
+    mapChunk(path, sha256, total, paletteSize) {
+        return this.call('mapChunk', { url: ClientWorker.resolve(path), sha256, total, paletteSize });
+    }
+
+    // An indexer /v2/transactions page with each note decoded as `stream`:
+    // {round, nextToken, transactions: [{id, sender, round, roundTime, note,
+    // baseRound, data}]}; data is null for unreadable notes and for deltas
+    notes(url, stream) {
+        return this.call('notes', { url, stream });
+    }
+
+    // Decoded notes (base64 or bytes), against `base` for deltas
+    decode(notes, stream, base = null) {
+        return this.call('decode', { notes, stream, base });
+    }
+
+    // {txId, blob} of a signed payment
+    signPayment(from, to, amount, note, params) {
+        return this.call('payment', { from, to, amount, note, params });
+    }
+
+    // {txId, blob} of a signed algosdk transaction
+    signTxn(txn) {
+        return this.call('sign', { unsigned: algosdk.encodeUnsignedTransaction(txn) });
+    }
+
+    // ---- Jobs: run in the worker, or here when there is none ----
+
+    static async run(job, args) {
+        const fn = ClientWorker.jobs[job];
+        if (!fn) throw new Error(`Unknown client worker job ${job}`);
+        return (await fn(args)) || {};
+    }
+
+    static jobs = {
+        init({ scripts }) {
+            importScripts(...scripts);
+        },
+
+        setKey({ key }) {
+            ClientWorker.state.key = key;
+        },
+
+        async mapChunk({ url, sha256, total, paletteSize }) {
+            const response = await fetch(url);
+            if (!response.ok) throw new Error(`Map chunk returned ${response.status}`);
+            const bytes = new Uint8Array(await response.arrayBuffer());
+            if (await ClientWorker.sha256(bytes) !== sha256) throw new Error('Map chunk hash mismatch');
+            if (bytes[0] !== ClientWorker.CHUNK_VERSION) throw new Error(`Unsupported map chunk version ${bytes[0]}`);
+            const chunk = ClientWorker.decodeChunk(await ClientWorker.inflate(bytes.subarray(1)), total, paletteSize);
+            return { result: chunk, transfer: [chunk.tiles.buffer] };
+        },
+
+        async notes({ url, stream }) {
+            const response = await fetch(url);
+            if (!response.ok) throw new Error(`Indexer returned ${response.status}`);
+            const page = await response.json();
+            return {
+                result: {
+                    round: page['current-round'],
+                    nextToken: page['next-token'] || null,
+                    transactions: (page.transactions || []).map(txn => ClientWorker.decodeTxn(txn, stream))
+                }
+            };
+        },
+
+        decode({ notes, stream, base }) {
+            return { result: notes.map(note => ClientWorker.decodeNote(note, stream, base)) };
+        },
+
+        payment({ from, to, amount, note, params }) {
+            return ClientWorker.signed(algosdk.makePaymentTxnWithSuggestedParams(from, to, amount, undefined, note, params));
+        },
+
+        sign({ unsigned }) {
+            return ClientWorker.signed(algosdk.decodeUnsignedTransaction(unsigned));
+        }
+    };
+
+    static signed(txn) {
+        if (!ClientWorker.state.key) throw new Error('No account to sign with');
+        const blob = txn.signTxn(ClientWorker.state.key);
+        return { result: { txId: txn.txID(), blob }, transfer: [blob.buffer] };
+    }
+
+    static async sha256(bytes) {
+        const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', bytes));
+        return Array.from(digest, b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    static async inflate(bytes) {
+        const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+        return new Uint8Array(await new Response(stream).arrayBuffer());
+    }
+
+    // A chunk body: (run, palette index) varint pairs until `total` tiles,
+    // then the entity tables as JSON (see eternalbliss/mappack.py)
+    static decodeChunk(body, total, paletteSize) {
+        const tiles = paletteSize > 256 ? new Uint16Array(total) : new Uint8Array(total);
+        let pos = 0;
+        const varint = () => {
+            let n = 0;
+            let scale = 1;
+            let b;
+            do {
+                b = body[pos++];
+                n += (b & 0x7F) * scale;
+                scale *= 0x80;
+            } while (b >= 0x80);
+            return n;
+        };
+        for (let tile = 0; tile < total;) {
+            const run = varint();
+            const type = varint();
+            const end = Math.min(total, tile + run);
+            tiles.fill(type, tile, end);
+            tile = end;
+        }
+
+        const entities = {};
+        if (pos < body.length) {
+            const tables = JSON.parse(new TextDecoder().decode(body.subarray(pos)));
+            for (const [kind, table] of Object.entries(tables)) {
+                entities[kind] = table.rows.map(row => {
+                    const entity = {};
+                    table.keys.forEach((key, i) => {
+                        if (row[i] !== null) entity[key] = row[i];
+                    });
+                    return entity;
+                });
+            }
+        }
+        return { tiles, entities };
+    }
+
+    static decodeNote(note, stream, base = null) {
+        try {
+            return NoteCodec.decode(note, stream, base);
+        } catch (error) {
+            return null;
+        }
+    }
+
+    static decodeTxn(txn, stream) {
+        const note = txn.note || '';
+        const baseRound = NoteCodec.baseRound(note, stream);
+        return {
+            id: txn.id,
+            sender: txn.sender,
+            round: txn['confirmed-round'],
+            roundTime: txn['round-time'],
+            note,
+            baseRound,
+            data: baseRound === null ? ClientWorker.decodeNote(note, stream) : null
+        };
+    }
+
+    // Page time per job that the worker takes over, and what handing a
+    // 1024x1024 tile buffer back costs copied vs transferred (in ms)
+    static async benchmark(rounds = 200) {
+        const time = fn => {
+            fn();
+            const start = performance.now();
+            for (let i = 0; i < rounds; i++) fn();
+            return (performance.now() - start) / rounds;
+        };
+        let seed = 1;
+        const rand = () => ((seed = (seed * 1103515245 + 12345) >>> 0) / 4294967296);
+
+        // A 32x32 chunk of short runs over 6 terrains, and some entities
+        const body = [];
+        const put = n => {
+            while (n >= 0x80) {
+                body.push((n & 0x7F) | 0x80);
+                n = Math.floor(n / 0x80);
+            }
+            body.push(n);
+        };
+        for (let tile = 0; tile < 1024;) {
+            const run = 1 + Math.floor(rand() * 12);
+            put(run);
+            put(Math.floor(rand() * 6));
+            tile += run;
+        }
+        const tables = { enemies: { keys: ['x', 'y', 'name', 'level'], rows: Array.from({ length: 8 }, (_, i) => [i, i, 'Goblin', i + 1]) } };
+        const chunk = Uint8Array.from([...body, ...new TextEncoder().encode(JSON.stringify(tables))]);
+
+        // An indexer page of 100 position notes
+        const toBase64 = bytes => btoa(String.fromCharCode(...bytes));
+        const page = JSON.stringify({
+            'current-round': 1000,
+            transactions: Array.from({ length: 100 }, (_, i) => ({
+                id: `TX${i}`, sender: `ADDR${i}`, 'confirmed-round': 990, 'round-time': 1700000000 + i,
+                note: toBase64(NoteCodec.encode('pos', { name: `Hero_${i}`, level: 1 + (i % 20), x: i, y: 2 * i, timestamp: 1700000000000 + i }))
+            }))
+        });
+
+        const tiles = new Uint8Array(1024 * 1024);
+        const channel = new MessageChannel();
+        const handOff = async transfer => {
+            const received = new Promise(resolve => { channel.port2.onmessage = resolve; });
+            const start = performance.now();
+            const buffer = tiles.slice();
+            channel.port1.postMessage(buffer, transfer ? [buffer.buffer] : []);
+            await received;
+            return performance.now() - start;
+        };
+        const copied = Math.min(await handOff(false), await handOff(false), await handOff(false));
+        const transferred = Math.min(await handOff(true), await handOff(true), await handOff(true));
+        channel.port1.close();
+        return {
+            rounds,
+            chunk: time(() => ClientWorker.decodeChunk(chunk, 1024, 6)),
+            notes: time(() => JSON.parse(page).transactions.map(txn => ClientWorker.decodeTxn(txn, 'pos'))),
+            copied,
+            transferred
+        };
+    }
+}
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = ClientWorker;
+    if (require.main === module) {
+        global.NoteCodec = require('./note-codec.js');
+        ClientWorker.benchmark(Number(process.argv[2]) || 200).then(r => {
+            console.log(`page time per job, over ${r.rounds} runs`);
+            console.log(`  32x32 map chunk:             ${(r.chunk * 1000).toFixed(1)} us`);
+            console.log(`  indexer page of 100 notes:   ${(r.notes * 1000).toFixed(1)} us`);
+            console.log('1024x1024 tile buffer back to the page');
+            console.log(`  copied:      ${r.copied.toFixed(2)} ms`);
+            console.log(`  transferred: ${r.transferred.toFixed(2)} ms`);
+        });
+    }
+} else if (typeof WorkerGlobalScope !== 'undefined' && self instanceof WorkerGlobalScope) {
+    self.onmessage = async event => {
+        const { id, job, args } = event.data;
+        try {
+            const { result, transfer = [] } = await ClientWorker.run(job, args);
+            if (id >= 0) self.postMessage({ id, result }, transfer);
+        } catch (error) {
+            if (id >= 0) self.postMessage({ id, error: error.message || String(error) });
+        }
+    };
+} else {
+    window.ClientWorker = ClientWorker;
+    window.clientWorker = new ClientWorker();
+}
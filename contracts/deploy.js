@@ -0,0 +1,112 @@
+// EternalBliss Algorand - Smart Contract Deployment Script
+// Run `python -m eternalbliss.build` first; this reads the cached build
+// artifact and only falls back to algod compilation if it was built offline.
+//
+// Usage: ALGOD_SERVER=https://testnet-api.algonode.cloud MNEMONIC="..." node contracts/deploy.js
+
+const fs = require('fs');
+const path = require('path');
+const algosdk = require('algosdk');
+
+const ARTIFACT_PATH = process.env.ARTIFACT || path.join(__dirname, 'build', 'eternalbliss.json');
+
+// Use the cached bytecode when the build assembled it, otherwise compile once
+async function loadProgram(algodClient, program) {
+    if (program.bytecode) {
+        return new Uint8Array(Buffer.from(program.bytecode, 'base64'));
+    }
+    const compiled = await algodClient.compile(program.teal).do();
+    return new Uint8Array(Buffer.from(compiled.result, 'base64'));
+}
+
+// Programs beyond one 2048-byte page need extra pages (up to 3)
+function extraPages(approvalProgram, clearProgram) {
+    return Math.ceil((approvalProgram.length + clearProgram.length) / 2048) - 1;
+}
+
+// Leaderboard boxes, mirroring eternalbliss/leaderboard.py: the app account
+// needs its own 0.1 ALGO plus the boxes' minimum balance before the admin
+// creates them
+const LEADERBOARDS = ['top:level', 'top:battles_won', 'top:gold'];
+// 24 entries of 40 bytes plus the watermark
+const LEADERBOARD_BOX_SIZE = 25 * 40;
+const APP_MIN_BALANCE = 100000 + LEADERBOARDS.reduce(
+    (total, name) => total + 2500 + 400 * (name.length + LEADERBOARD_BOX_SIZE), 0);
+
+async function createLeaderboards(algodClient, account, appId) {
+    const params = await algodClient.getTransactionParams().do();
+    const txns = [
+        algosdk.makePaymentTxnWithSuggestedParamsFromObject({
+            from: account.addr,
+            to: algosdk.getApplicationAddress(appId),
+            amount: APP_MIN_BALANCE,
+            suggestedParams: params,
+        }),
+        algosdk.makeApplicationNoOpTxnFromObject({
+            from: account.addr,
+            appIndex: appId,
+            appArgs: [algosdk.ABIMethod.fromSignature('create_leaderboards()void').getSelector()],
+            boxes: LEADERBOARDS.map(name => ({ appIndex: 0, name: new TextEncoder().encode(name) })),
+            suggestedParams: params,
+        }),
+    ];
+    algosdk.assignGroupID(txns);
+    const { txId } = await algodClient.sendRawTransaction(txns.map(t => t.signTxn(account.sk))).do();
+    await algosdk.waitForConfirmation(algodClient, txId, 4);
+    return txId;
+}
+
+async function deployEternalBlissContract() {
+    // Initialize Algorand client
+    const algodClient = new algosdk.Algodv2(
+        process.env.ALGOD_TOKEN || '',
+        process.env.ALGOD_SERVER || 'https://testnet-api.algonode.cloud',
+        process.env.ALGOD_PORT || ''
+    );
+
+    // Load your account (replace with your mnemonic)
+    const mnemonic = process.env.MNEMONIC || "YOUR_25_WORD_MNEMONIC_HERE";
+    const account = algosdk.mnemonicToSecretKey(mnemonic);
+
+    // Read the build artifact
+    const artifact = JSON.parse(fs.readFileSync(ARTIFACT_PATH, 'utf8'));
+    console.log(`Deploying build ${artifact.key.slice(0, 12)} (TEAL v${artifact.teal_version})`);
+
+    const approvalProgram = await loadProgram(algodClient, artifact.approval);
+    const clearProgram = await loadProgram(algodClient, artifact.clear);
+
+    // Create application
+    const params = await algodClient.getTransactionParams().do();
+
+    const txn = algosdk.makeApplicationCreateTxnFromObject({
+        from: account.addr,
+        suggestedParams: params,
+        onComplete: algosdk.OnApplicationComplete.NoOpOC,
+        approvalProgram,
+        clearProgram,
+        numLocalInts: artifact.local_schema.num_uints,
+        numLocalByteSlices: artifact.local_schema.num_byte_slices,
+        numGlobalInts: artifact.global_schema.num_uints,
+        numGlobalByteSlices: artifact.global_schema.num_byte_slices,
+        extraPages: extraPages(approvalProgram, clearProgram),
+    });
+
+    // Sign and send transaction
+    const signedTxn = txn.signTxn(account.sk);
+    const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
+
+    // Wait for confirmation
+    const confirmedTxn = await algosdk.waitForConfirmation(algodClient, txId, 4);
+
+    console.log('Contract deployed successfully!');
+    console.log('Application ID:', confirmedTxn['application-index']);
+    console.log('Transaction ID:', txId);
+
+    const appId = confirmedTxn['application-index'];
+    console.log('Leaderboards created:', await createLeaderboards(algodClient, account, appId));
+
+    return appId;
+}
+
+// Deploy the contract
+deployEternalBlissContract().catch(console.error);
@@ -0,0 +1,485 @@
+// EternalBliss Algorand - Smart Contract Client
+// Browser interface to the deployed EternalBliss RPG application.
+// Needs txn-service.js; pass the game's TxnService to share its params
+// cache and block watcher with the other senders.
+
+class EternalBlissContract {
+    constructor(algodClient, appId, txnService = new TxnService(algodClient)) {
+        this.algodClient = algodClient;
+        this.appId = appId;
+        this.txnService = txnService;
+    }
+
+    // ARC-4 method table, mirroring eternalbliss/abi.py.
+    // Every call starts with the 4-byte selector of one of these signatures;
+    // the contract dispatches on it with a single match.
+    static METHODS = {
+        create_player: ['string'],
+        battle: ['uint64'],
+        move: ['uint64', 'uint64'],
+        save_progress: Array(12).fill('uint64'),
+        update_stats: ['uint64', 'uint64', 'uint64'],
+        buy_item: ['uint64'],
+        trade: ['uint64', 'uint64'],
+        claim_rewards: [],
+        mint_nft: ['uint64'],
+        admin_pause: ['uint64'],
+        update_fee: ['address'],
+        create_leaderboards: [],
+        apply_batch: ['byte[]'],
+    };
+
+    // Leaderboard boxes, mirroring eternalbliss/leaderboard.py: 24 entries
+    // per stat of which the top 16 are shown, 40 bytes each (uint64 score,
+    // 32-byte public key), best first, then the watermark. Calls must
+    // reference the boards they update.
+    static LEADERBOARD = {
+        SIZE: 16,
+        CAPACITY: 24,
+        ENTRY_SIZE: 40,
+        FIELDS: ['level', 'battles_won', 'gold'],
+        RANKED: {
+            battle: ['battles_won', 'gold'],
+            update_stats: ['level', 'gold'],
+            save_progress: ['level', 'gold'],
+            buy_item: ['gold'],
+            claim_rewards: ['gold'],
+            apply_batch: ['battles_won', 'gold'],
+            create_player: ['level', 'battles_won', 'gold'],
+            create_leaderboards: ['level', 'battles_won', 'gold'],
+        },
+    };
+
+    static boxName(field) {
+        return new TextEncoder().encode(`top:${field}`);
+    }
+
+    // Box references for a call to a method
+    static boxes(name) {
+        return (EternalBlissContract.LEADERBOARD.RANKED[name] || [])
+            .map(field => ({ appIndex: 0, name: EternalBlissContract.boxName(field) }));
+    }
+
+    static signature(name) {
+        return `${name}(${EternalBlissContract.METHODS[name].join(',')})void`;
+    }
+
+    // 4-byte selector of a method, computed once per name
+    static selector(name) {
+        const cache = EternalBlissContract._selectors || (EternalBlissContract._selectors = {});
+        if (!cache[name]) {
+            cache[name] = algosdk.ABIMethod.fromSignature(EternalBlissContract.signature(name)).getSelector();
+        }
+        return cache[name];
+    }
+
+    // Application args for a method call: selector, then each value ABI-encoded
+    static encodeArgs(name, values = []) {
+        const types = EternalBlissContract.METHODS[name];
+        if (!types) {
+            throw new Error(`Unknown contract method: ${name}`);
+        }
+        if (values.length !== types.length) {
+            throw new Error(`${EternalBlissContract.signature(name)} takes ${types.length} arguments, got ${values.length}`);
+        }
+        return [
+            EternalBlissContract.selector(name),
+            ...types.map((type, i) => algosdk.ABIType.from(type).encode(values[i]))
+        ];
+    }
+
+    // Build, sign and send one method call, optionally grouped with extra
+    // transactions (e.g. the payment of a trade) that the caller also signs
+    async _callMethod(account, name, values = [], options = {}) {
+        const params = await this.txnService.params();
+
+        const txn = algosdk.makeApplicationCallTxnFromObject({
+            from: account.addr,
+            appIndex: this.appId,
+            onComplete: options.onComplete ?? algosdk.OnApplicationComplete.NoOpOC,
+            appArgs: EternalBlissContract.encodeArgs(name, values),
+            accounts: options.accounts,
+            boxes: EternalBlissContract.boxes(name),
+            suggestedParams: params,
+        });
+
+        const extra = options.with ? options.with(params) : [];
+        const txns = [txn, ...extra];
+        if (txns.length > 1) {
+            algosdk.assignGroupID(txns);
+        }
+
+        const signed = txns.map(t => t.signTxn(account.sk));
+        const { txId } = await this.txnService.submit(signed);
+
+        return txId;
+    }
+
+    // Opt-in to the application (create player)
+    async optIn(account, playerName) {
+        return this._callMethod(account, 'create_player', [playerName], {
+            onComplete: algosdk.OnApplicationComplete.OptInOC,
+        });
+    }
+
+    // Update player stats
+    async updateStats(account, level, xp, gold) {
+        return this._callMethod(account, 'update_stats', [level, xp, gold]);
+    }
+
+    // Move player
+    async movePlayer(account, x, y) {
+        return this._callMethod(account, 'move', [x, y]);
+    }
+
+    // Battle enemy
+    async battleEnemy(account, enemyLevel) {
+        return this._callMethod(account, 'battle', [enemyLevel]);
+    }
+
+    // Save full progress
+    async saveProgress(account, playerData) {
+        return this._callMethod(account, 'save_progress', [
+            playerData.level,
+            playerData.xp,
+            playerData.gold,
+            playerData.hp,
+            playerData.maxHp,
+            playerData.mp,
+            playerData.maxMp,
+            playerData.attack,
+            playerData.defense,
+            playerData.magic,
+            playerData.x,
+            playerData.y
+        ]);
+    }
+
+    // Buy an item from the shop
+    async buyItem(account, price) {
+        return this._callMethod(account, 'buy_item', [price]);
+    }
+
+    // Buy an item from another player, paid for in the same group
+    async trade(account, seller, itemId, price) {
+        return this._callMethod(account, 'trade', [itemId, price], {
+            accounts: [seller],
+            with: params => [algosdk.makePaymentTxnWithSuggestedParamsFromObject({
+                from: account.addr,
+                to: seller,
+                amount: price,
+                suggestedParams: params,
+            })],
+        });
+    }
+
+    // Claim level rewards
+    async claimRewards(account) {
+        return this._callMethod(account, 'claim_rewards');
+    }
+
+    // Record a minted NFT against the player
+    async mintNft(account, nftId) {
+        return this._callMethod(account, 'mint_nft', [nftId]);
+    }
+
+    // Offline action log, mirroring eternalbliss/sync.py. Events are 7 bytes:
+    // kind u8, a u16, b u32 (battle/buy: a = count, b = level/price;
+    // move: a = x, b = y).
+    static EVENT = { BATTLE: 1, MOVE: 2, BUY: 3, SIZE: 7, MAX_COUNT: 0xFFFF, MAX_VALUE: 0xFFFFFFFF };
+    static EVENTS_PER_CALL = 8;
+    static MAX_GROUP_SIZE = 16;
+
+    // A group's calls share one opcode budget of 700 each, which has to
+    // cover every call, every event and one move on the leaderboards
+    // (worst-case costs as in sync.py)
+    static BATCH_COST = { BUDGET: 700, CALL: 190, EVENT: 70, RANK: 460 };
+
+    // Events a group of `calls` apply_batch calls can settle
+    static groupCapacity(calls) {
+        const { BUDGET, CALL, EVENT, RANK } = EternalBlissContract.BATCH_COST;
+        const budget = calls * (BUDGET - CALL) - RANK;
+        return Math.max(0, Math.min(calls * EternalBlissContract.EVENTS_PER_CALL, Math.floor(budget / EVENT)));
+    }
+
+    // Split events into groups of per-call logs, as sync.chunk() does: as
+    // few calls per group as fit, events spread evenly over them
+    static chunkEvents(events) {
+        const groups = [];
+        let start = 0;
+        while (start < events.length) {
+            const left = events.length - start;
+            let calls = 1;
+            while (calls < EternalBlissContract.MAX_GROUP_SIZE && EternalBlissContract.groupCapacity(calls) < left) {
+                calls++;
+            }
+            const take = Math.min(left, EternalBlissContract.groupCapacity(calls));
+            const size = Math.floor(take / calls);
+            const extra = take % calls;
+            const logs = [];
+            for (let n = 0; n < calls; n++) {
+                const end = start + size + (n < extra ? 1 : 0);
+                logs.push(EternalBlissContract.encodeEvents(events.slice(start, end)));
+                start = end;
+            }
+            groups.push(logs);
+        }
+        return groups;
+    }
+
+    // Compress queued actions ({type: 'battle', level} | {type: 'move', x, y}
+    // | {type: 'buy', price}) into events with the same on-chain result:
+    // battles between purchases are grouped by level, repeated purchases
+    // merged, and only the last move is kept.
+    // Levels, prices, x and y out of range throw, as in sync.py, rather
+    // than wrap into a different event.
+    static compressActions(actions) {
+        const { BATTLE, MOVE, BUY, MAX_COUNT, MAX_VALUE } = EternalBlissContract.EVENT;
+        const value = v => {
+            if (!Number.isInteger(v) || v < 0 || v > MAX_VALUE) throw new Error(`value out of range: ${v}`);
+            return v;
+        };
+        const events = [];
+        let battles = new Map();
+        let lastMove = null;
+
+        const flushBattles = () => {
+            [...battles.keys()].sort((a, b) => a - b).forEach(level => {
+                let count = battles.get(level);
+                while (count > 0) {
+                    const n = Math.min(count, MAX_COUNT);
+                    events.push([BATTLE, n, level]);
+                    count -= n;
+                }
+            });
+            battles = new Map();
+        };
+
+        for (const action of actions) {
+            if (action.type === 'battle') {
+                const level = value(action.level);
+                battles.set(level, (battles.get(level) || 0) + 1);
+            } else if (action.type === 'buy') {
+                flushBattles();
+                const price = value(action.price);
+                const last = events[events.length - 1];
+                if (last && last[0] === BUY && last[2] === price && last[1] < MAX_COUNT) {
+                    last[1]++;
+                } else {
+                    events.push([BUY, 1, price]);
+                }
+            } else if (action.type === 'move') {
+                if (!Number.isInteger(action.x) || action.x < 0 || action.x > MAX_COUNT) {
+                    throw new Error(`x out of range: ${action.x}`);
+                }
+                lastMove = [MOVE, action.x, value(action.y)];
+            } else {
+                throw new Error(`Unknown offline action: ${action.type}`);
+            }
+        }
+        flushBattles();
+        if (lastMove) {
+            events.push(lastMove);
+        }
+        return events;
+    }
+
+    static encodeEvents(events) {
+        const { SIZE: size, MAX_COUNT, MAX_VALUE } = EternalBlissContract.EVENT;
+        const bytes = new Uint8Array(events.length * size);
+        const view = new DataView(bytes.buffer);
+        const check = (v, max) => Number.isInteger(v) && v >= 0 && v <= max;
+        events.forEach(([kind, a, b], i) => {
+            // DataView would silently wrap these
+            if (!check(kind, 0xFF) || !check(a, MAX_COUNT) || !check(b, MAX_VALUE)) {
+                throw new Error(`event out of range: ${JSON.stringify([kind, a, b])}`);
+            }
+            view.setUint8(i * size, kind);
+            view.setUint16(i * size + 1, a);
+            view.setUint32(i * size + 3, b);
+        });
+        return bytes;
+    }
+
+    // Settle an offline session: atomic groups of up to 16 apply_batch
+    // calls, each sized to its opcode budget, submitted in order. Returns
+    // the group txIds.
+    async syncActions(account, actions) {
+        const events = EternalBlissContract.compressActions(actions);
+        const txIds = [];
+        for (const logs of EternalBlissContract.chunkEvents(events)) {
+            const params = await this.txnService.params();
+            const txns = logs.map(log => algosdk.makeApplicationNoOpTxnFromObject({
+                from: account.addr,
+                appIndex: this.appId,
+                appArgs: EternalBlissContract.encodeArgs('apply_batch', [log]),
+                boxes: EternalBlissContract.boxes('apply_batch'),
+                suggestedParams: params,
+            }));
+            if (txns.length > 1) {
+                algosdk.assignGroupID(txns);
+            }
+            const signed = txns.map(t => t.signTxn(account.sk));
+            const { txId } = await this.txnService.submit(signed);
+            txIds.push(txId);
+        }
+        return txIds;
+    }
+
+    // Player stats as stored on-chain, mirroring eternalbliss/record.py.
+    // With one key per stat each name below is a local-state key; with the
+    // packed layout they are big-endian uint64 fields of the record under
+    // key "p", in this order.
+    static RECORD_FIELDS = [
+        'level', 'xp', 'gold', 'hp', 'max_hp', 'mp', 'max_mp',
+        'attack', 'defense', 'magic', 'x', 'y',
+        'battles_won', 'treasures', 'nft_id',
+    ];
+
+    static RECORD_KEY = 'p';
+
+    // On-chain field name -> playerData property
+    static PLAYER_PROPS = {
+        level: 'level',
+        xp: 'xp',
+        gold: 'gold',
+        hp: 'hp',
+        max_hp: 'maxHp',
+        mp: 'mp',
+        max_mp: 'maxMp',
+        attack: 'attack',
+        defense: 'defense',
+        magic: 'magic',
+        x: 'x',
+        y: 'y',
+        battles_won: 'battlesWon',
+        treasures: 'treasures',
+        nft_id: 'nftId',
+    };
+
+    // Decode a packed record (Uint8Array) into a playerData object
+    static decodeRecord(bytes, into = {}) {
+        const fields = EternalBlissContract.RECORD_FIELDS;
+        const props = EternalBlissContract.PLAYER_PROPS;
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        for (let i = 0; i < fields.length; i++) {
+            into[props[fields[i]]] = Number(view.getBigUint64(i * 8));
+        }
+        return into;
+    }
+
+    // Encode a playerData object as a packed record; missing fields are 0
+    static encodeRecord(playerData) {
+        const fields = EternalBlissContract.RECORD_FIELDS;
+        const props = EternalBlissContract.PLAYER_PROPS;
+        const bytes = new Uint8Array(fields.length * 8);
+        const view = new DataView(bytes.buffer);
+        for (let i = 0; i < fields.length; i++) {
+            view.setBigUint64(i * 8, BigInt(playerData[props[fields[i]]] || 0));
+        }
+        return bytes;
+    }
+
+    // Decode the 'key-value' list of an account's local state, in either layout
+    static decodeLocalState(localState) {
+        const props = EternalBlissContract.PLAYER_PROPS;
+        const playerData = {};
+
+        localState.forEach(kv => {
+            const key = Buffer.from(kv.key, 'base64').toString();
+
+            if (key === 'name') {
+                playerData.name = Buffer.from(kv.value.bytes, 'base64').toString();
+            } else if (key === EternalBlissContract.RECORD_KEY) {
+                EternalBlissContract.decodeRecord(Buffer.from(kv.value.bytes, 'base64'), playerData);
+            } else if (props[key]) {
+                playerData[props[key]] = kv.value.uint;
+            }
+        });
+
+        return playerData;
+    }
+
+    // Read player state
+    async getPlayerState(address) {
+        const accountInfo = await this.algodClient.accountApplicationInformation(address, this.appId).do();
+
+        if (!accountInfo['app-local-state']) {
+            return null;
+        }
+
+        return EternalBlissContract.decodeLocalState(accountInfo['app-local-state']['key-value']);
+    }
+
+    // One leaderboard, best first: [{rank, address, score, exact}]. Empty
+    // slots are skipped; an empty list if the boards were never created.
+    // `exact` entries are not below the watermark: a full scan of every
+    // account ranks them the same.
+    async getLeaderboard(field) {
+        let box;
+        try {
+            box = await this.algodClient.getApplicationBoxByName(this.appId, EternalBlissContract.boxName(field)).do();
+        } catch (error) {
+            if (error.status === 404 || error.response?.status === 404) {
+                return [];
+            }
+            throw error;
+        }
+        const value = box.value;
+        const { SIZE, CAPACITY, ENTRY_SIZE } = EternalBlissContract.LEADERBOARD;
+        const view = new DataView(value.buffer, value.byteOffset, value.byteLength);
+        const watermark = value.subarray(CAPACITY * ENTRY_SIZE, (CAPACITY + 1) * ENTRY_SIZE);
+        const notBelow = (a, b) => {
+            const i = a.findIndex((byte, n) => byte !== b[n]);
+            return i < 0 || a[i] > b[i];
+        };
+        const entries = [];
+        for (let offset = 0; offset < SIZE * ENTRY_SIZE; offset += ENTRY_SIZE) {
+            const entry = value.subarray(offset, offset + ENTRY_SIZE);
+            if (entry.some(byte => byte !== 0)) {
+                entries.push({
+                    rank: entries.length + 1,
+                    address: algosdk.encodeAddress(entry.slice(8)),
+                    score: Number(view.getBigUint64(offset)),
+                    exact: notBelow(entry, watermark),
+                });
+            }
+        }
+        return entries;
+    }
+
+    // Get global state
+    async getGlobalState() {
+        const appInfo = await this.algodClient.getApplicationByID(this.appId).do();
+        const globalState = appInfo.params['global-state'];
+        const state = {};
+
+        globalState.forEach(kv => {
+            const key = Buffer.from(kv.key, 'base64').toString();
+            const value = kv.value.type === 1 ? kv.value.bytes : kv.value.uint;
+
+            switch(key) {
+                case 'player_count':
+                    state.playerCount = value;
+                    break;
+                case 'total_gold':
+                    state.totalGold = value;
+                    break;
+                case 'total_battles':
+                    state.totalBattles = value;
+                    break;
+                case 'highest_level':
+                    state.highestLevel = value;
+                    break;
+                case 'game_paused':
+                    state.gamePaused = value;
+                    break;
+            }
+        });
+
+        return state;
+    }
+}
+
+// Export for use in the game
+window.EternalBlissContract = EternalBlissContract;
@@ -0,0 +1,8 @@
+"""EternalBliss RPG: PyTeal contract and Python tooling.
+
+The approval and clear-state programs live in :mod:`eternalbliss.contract`;
+:mod:`eternalbliss.build` compiles them and keeps a content-addressed cache
+of the TEAL, assembled bytecode and program hashes.
+"""
+
+__version__ = "0.1.0"
@@ -0,0 +1,73 @@
+"""ARC-4 method table of the EternalBliss application.
+
+The contract routes every call by the 4-byte selector of one of these
+methods, and decodes its arguments by the declared types. This module is
+plain Python so that clients, the offline engine and tools can encode calls
+without PyTeal. ``contracts/eternalbliss-contract.js`` carries the same table
+for the browser.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, List, Tuple, Union
+
+# name -> argument types, in call order. Every method returns void.
+# create_player is called with OnCompletion=OptIn; all others are NoOp.
+METHODS: Dict[str, Tuple[str, ...]] = {
+    "create_player": ("string",),
+    "battle": ("uint64",),
+    "move": ("uint64", "uint64"),
+    "save_progress": ("uint64",) * 12,
+    "update_stats": ("uint64", "uint64", "uint64"),
+    "buy_item": ("uint64",),
+    "trade": ("uint64", "uint64"),
+    "claim_rewards": (),
+    "mint_nft": ("uint64",),
+    "admin_pause": ("uint64",),
+    "update_fee": ("address",),
+    "create_leaderboards": (),
+    "apply_batch": ("byte[]",),
+}
+
+# Methods routed on NoOp calls, hottest first
+NOOP_METHODS = tuple(name for name in METHODS if name != "create_player")
+
+
+def signature(name: str) -> str:
+    return f"{name}({','.join(METHODS[name])})void"
+
+
+def selector(sig: str) -> bytes:
+    """ARC-4 selector: the first four bytes of SHA-512/256 of the signature."""
+    return hashlib.new("sha512_256", sig.encode()).digest()[:4]
+
+
+def method_selector(name: str) -> bytes:
+    return selector(signature(name))
+
+
+def encode(kind: str, value: Union[int, str, bytes]) -> bytes:
+    """ARC-4 encoding of one argument."""
+    if kind == "uint64":
+        return int(value).to_bytes(8, "big")
+    if kind in ("string", "byte[]"):
+        data = value.encode() if isinstance(value, str) else bytes(value)
+        return len(data).to_bytes(2, "big") + data
+    if kind == "address":
+        if isinstance(value, str):
+            from .avm import decode_address
+
+            value = decode_address(value)
+        if len(value) != 32:
+            raise ValueError("address must be 32 bytes")
+        return bytes(value)
+    raise ValueError(f"unsupported ABI type {kind!r}")
+
+
+def call_args(name: str, *values: Union[int, str, bytes]) -> List[bytes]:
+    """Application args for a call to ``name``: selector, then encoded values."""
+    kinds = METHODS[name]
+    if len(values) != len(kinds):
+        raise TypeError(f"{signature(name)} takes {len(kinds)} arguments, got {len(values)}")
+    return [method_selector(name)] + [encode(kind, value) for kind, value in zip(kinds, values)]
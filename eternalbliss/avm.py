@@ -0,0 +1,2028 @@
+"""Offline execution engine for the EternalBliss approval program.
+
+A pure-Python interpreter for the subset of AVM v8 that ``approval_program()``
+emits, backed by an in-memory :class:`Ledger` of global and per-account local
+state. It exists so that ``battle``, ``save_progress``, ``buy_item`` and the
+rest can be load-tested at production volume without touching TestNet.
+
+TEAL is not interpreted instruction by instruction. :func:`compile_program`
+splits the program into basic blocks and translates each block into a Python
+function, keeping the operand stack in local variables wherever the block's
+own instructions produce and consume it. Only values that cross a block
+boundary touch the runtime stack. This is what makes hundreds of thousands
+of simulated calls per second possible.
+
+Typical use::
+
+    avm = AVM.from_build()
+    avm.call(app_call(ADMIN, application_id=0))                                    # create
+    avm.call(method_call(alice, "create_player", "Alice", on_completion=OPT_IN))  # register
+    result = avm.call(method_call(alice, "battle", 3))
+    result.accepted, result.local_delta
+
+Run ``python -m eternalbliss.avm`` to replay a synthetic day of traffic.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import gc
+import hashlib
+import itertools
+import math
+import random
+import re
+import sys
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .abi import call_args, selector
+from .leaderboard import box_names
+
+MAX_UINT64 = (1 << 64) - 1
+ZERO_ADDRESS = bytes(32)
+
+# Per-app-call opcode budget; pooled across the app calls of a group
+APP_CALL_BUDGET = 700
+
+MAX_KEY_LEN = 64
+MAX_KEY_VALUE_LEN = 128
+MAX_BOX_SIZE = 32768
+# Byte-math operands are at most this long
+MAX_BIGINT_LEN = 64
+
+# OnCompletion values
+NO_OP = 0
+OPT_IN = 1
+CLOSE_OUT = 2
+CLEAR_STATE = 3
+UPDATE_APPLICATION = 4
+DELETE_APPLICATION = 5
+
+ON_COMPLETION = {
+    "NoOp": NO_OP,
+    "OptIn": OPT_IN,
+    "CloseOut": CLOSE_OUT,
+    "ClearState": CLEAR_STATE,
+    "UpdateApplication": UPDATE_APPLICATION,
+    "DeleteApplication": DELETE_APPLICATION,
+}
+
+TYPE_ENUM = {"unknown": 0, "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6}
+
+# Named integer constants accepted by ``int``/``pushint``
+NAMED_INTS = {**ON_COMPLETION, **TYPE_ENUM}
+
+# Opcode costs that differ from the default of 1
+OPCODE_COST = {
+    "sha256": 35,
+    "keccak256": 130,
+    "sha512_256": 45,
+    "ed25519verify": 1900,
+    "sqrt": 4,
+    "bsqrt": 40,
+    "divmodw": 20,
+    "b+": 10,
+    "b-": 10,
+    "b*": 20,
+    "b/": 20,
+    "b%": 20,
+}
+
+
+class AVMError(Exception):
+    """The program failed: ``err``, a failed ``assert``, a type error, etc."""
+
+
+class Transaction:
+    """The fields of one transaction that the approval program can read."""
+
+    __slots__ = (
+        "sender", "type", "type_enum", "fee", "first_valid", "last_valid", "note", "lease",
+        "receiver", "amount", "close_remainder_to", "application_id", "on_completion",
+        "application_args", "accounts", "assets", "applications", "rekey_to", "group_index",
+        "txid", "xfer_asset", "asset_amount", "asset_sender", "asset_receiver", "asset_close_to", "boxes",
+    )
+
+    def __init__(
+        self,
+        sender: bytes,
+        type: str = "appl",
+        fee: int = 1000,
+        first_valid: int = 0,
+        last_valid: int = 1000,
+        note: bytes = b"",
+        lease: bytes = ZERO_ADDRESS,
+        receiver: bytes = ZERO_ADDRESS,
+        amount: int = 0,
+        close_remainder_to: bytes = ZERO_ADDRESS,
+        application_id: Optional[int] = None,
+        on_completion: int = NO_OP,
+        application_args: Sequence[bytes] = (),
+        accounts: Sequence[bytes] = (),
+        assets: Sequence[int] = (),
+        applications: Sequence[int] = (),
+        rekey_to: bytes = ZERO_ADDRESS,
+        txid: bytes = ZERO_ADDRESS,
+        xfer_asset: int = 0,
+        asset_amount: int = 0,
+        asset_sender: bytes = ZERO_ADDRESS,
+        asset_receiver: bytes = ZERO_ADDRESS,
+        asset_close_to: bytes = ZERO_ADDRESS,
+        boxes: Sequence[bytes] = (),
+    ):
+        self.sender = sender
+        self.type = type.encode()
+        self.type_enum = TYPE_ENUM[type]
+        self.fee = fee
+        self.first_valid = first_valid
+        self.last_valid = last_valid
+        self.note = note
+        self.lease = lease
+        self.receiver = receiver
+        self.amount = amount
+        self.close_remainder_to = close_remainder_to
+        self.application_id = application_id
+        self.on_completion = on_completion
+        self.application_args = tuple(application_args)
+        self.accounts = tuple(accounts)
+        self.assets = tuple(assets)
+        self.applications = tuple(applications)
+        self.rekey_to = rekey_to
+        self.group_index = 0
+        self.txid = txid
+        self.xfer_asset = xfer_asset
+        self.asset_amount = asset_amount
+        self.asset_sender = asset_sender
+        self.asset_receiver = asset_receiver
+        self.asset_close_to = asset_close_to
+        # Names of the application's boxes this call references
+        self.boxes = tuple(boxes)
+
+    def __repr__(self) -> str:
+        args = [a.decode(errors="replace") if i == 0 else a.hex() for i, a in enumerate(self.application_args)]
+        return f"Transaction({self.type.decode()}, sender={self.sender.hex()[:8]}, args={args})"
+
+
+def encode_arg(value: Union[bytes, str, int]) -> bytes:
+    """Encode an application argument the way the JS client does."""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    return value.to_bytes(8, "big")
+
+
+def app_call(sender: bytes, *args: Union[bytes, str, int], **fields: Any) -> Transaction:
+    """Build an application call; ``args`` are encoded with :func:`encode_arg`."""
+    return Transaction(sender, "appl", application_args=[encode_arg(a) for a in args], **fields)
+
+
+def method_call(sender: bytes, method: str, *values: Union[bytes, str, int], **fields: Any) -> Transaction:
+    """An application call to one of the contract's ABI methods (see :mod:`eternalbliss.abi`).
+
+    Unless ``boxes`` is given, the call references the leaderboard boxes
+    the method updates, as the clients do.
+    """
+    fields.setdefault("boxes", box_names(method))
+    return Transaction(sender, "appl", application_args=call_args(method, *values), **fields)
+
+
+def payment(sender: bytes, receiver: bytes, amount: int, **fields: Any) -> Transaction:
+    return Transaction(sender, "pay", receiver=receiver, amount=amount, **fields)
+
+
+def decode_address(address: str) -> bytes:
+    """Public key bytes of a base32 Algorand address (checksum not verified)."""
+    return base64.b32decode(address + "=" * (-len(address) % 8))[:32]
+
+
+def method_selector(signature: str) -> bytes:
+    """ARC-4 method selector: first four bytes of SHA-512/256 of the signature."""
+    return selector(signature)
+
+
+# ---------------------------------------------------------------------------
+# Ledger
+# ---------------------------------------------------------------------------
+
+class Ledger:
+    """Global, per-account local and box state of one application."""
+
+    def __init__(
+        self,
+        app_id: int = 1,
+        creator: bytes = ZERO_ADDRESS,
+        global_schema: Tuple[int, int] = (8, 8),
+        local_schema: Tuple[int, int] = (15, 1),
+        round: int = 1,
+        timestamp: int = 0,
+    ):
+        self.app_id = app_id
+        self.creator = creator
+        self.global_schema = global_schema
+        self.local_schema = local_schema
+        self.round = round
+        self.timestamp = timestamp
+        self.globals: Dict[bytes, Union[int, bytes]] = {}
+        self.locals: Dict[bytes, Dict[bytes, Union[int, bytes]]] = {}
+        self.boxes: Dict[bytes, bytes] = {}
+
+    @property
+    def app_address(self) -> bytes:
+        return hashlib.new("sha512_256", b"appID" + self.app_id.to_bytes(8, "big")).digest()
+
+    def opted_in(self, address: bytes) -> bool:
+        return address in self.locals
+
+    def local(self, address: bytes) -> Dict[bytes, Union[int, bytes]]:
+        return self.locals[address]
+
+
+class _NotOptedIn:
+    """Stands in for the sender's local state when it is not opted in."""
+
+    def get(self, key: bytes, default: Any = None) -> Any:
+        raise AVMError("account not opted in")
+
+
+_NOT_OPTED_IN = _NotOptedIn()
+_MISSING = object()
+# Write-log address of box writes
+_BOXES = b"boxes"
+
+
+class CallResult:
+    """Outcome of one application call.
+
+    ``global_delta`` maps keys to their new value (``None`` when deleted);
+    ``local_delta`` maps addresses to such a dict, or to ``None`` when the
+    account's local state was cleared; ``box_delta`` maps box names to their
+    new contents. All are built from the call's write log on first access,
+    so batches that only count accepts stay cheap.
+    """
+
+    __slots__ = ("accepted", "error", "cost", "logs", "_writes", "_cleared", "_deltas")
+
+    def __init__(
+        self,
+        accepted: bool,
+        error: Optional[str],
+        cost: int,
+        logs: Tuple[bytes, ...] = (),
+        writes: Sequence[tuple] = (),
+        cleared: Optional[bytes] = None,
+    ):
+        self.accepted = accepted
+        self.error = error
+        self.cost = cost
+        self.logs = logs
+        self._writes = writes
+        self._cleared = cleared
+        self._deltas: Optional[Tuple[dict, dict, dict]] = None
+
+    def _build_deltas(self) -> Tuple[dict, dict, dict]:
+        if self._deltas is None:
+            global_delta: Dict[bytes, Any] = {}
+            local_delta: Dict[bytes, Any] = {}
+            box_delta: Dict[bytes, Any] = {}
+            for addr, _d, key, _old, new in self._writes:
+                if addr is None:
+                    global_delta[key] = new
+                elif addr is _BOXES:
+                    box_delta[key] = new
+                else:
+                    local_delta.setdefault(addr, {})[key] = new
+            if self._cleared is not None:
+                local_delta[self._cleared] = None
+            self._deltas = global_delta, local_delta, box_delta
+        return self._deltas
+
+    @property
+    def global_delta(self) -> Dict[bytes, Any]:
+        return self._build_deltas()[0]
+
+    @property
+    def local_delta(self) -> Dict[bytes, Optional[Dict[bytes, Any]]]:
+        return self._build_deltas()[1]
+
+    @property
+    def box_delta(self) -> Dict[bytes, Optional[bytes]]:
+        return self._build_deltas()[2]
+
+    def __repr__(self) -> str:
+        if not self.accepted:
+            return f"CallResult(rejected, {self.error!r}, cost={self.cost})"
+        return f"CallResult(accepted, cost={self.cost}, global={self.global_delta}, local={self.local_delta})"
+
+
+class _Context:
+    __slots__ = (
+        "txn", "group", "ledger", "g", "sl", "writes", "frames", "scratch",
+        "scratches", "cost", "budget", "result", "logs",
+    )
+
+
+# ---------------------------------------------------------------------------
+# TEAL parsing
+# ---------------------------------------------------------------------------
+
+class Instruction(NamedTuple):
+    op: str
+    args: Tuple[Any, ...]
+    line: int
+
+
+class Program(NamedTuple):
+    """A parsed and compiled TEAL program."""
+
+    version: int
+    instructions: Tuple[Instruction, ...]
+    labels: Dict[str, int]
+    blocks: Tuple[Callable[[Any, list], int], ...]
+    block_starts: Tuple[int, ...]
+    uses_scratch: bool
+    uses_frames: bool
+    source: str
+
+
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|\S+')
+
+
+def _strip_comment(line: str) -> str:
+    in_str = False
+    i = 0
+    while i < len(line):
+        ch = line[i]
+        if in_str:
+            if ch == "\\":
+                i += 1
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif line.startswith("//", i):
+            return line[:i]
+        i += 1
+    return line
+
+
+def _parse_string(token: str) -> bytes:
+    body = token[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if ch != "\\":
+            out += ch.encode()
+            i += 1
+            continue
+        nxt = body[i + 1]
+        if nxt == "x":
+            out.append(int(body[i + 2:i + 4], 16))
+            i += 4
+            continue
+        out += {"n": b"\n", "r": b"\r", "t": b"\t", "\\": b"\\", '"': b'"'}[nxt]
+        i += 2
+    return bytes(out)
+
+
+def _parse_bytes(tokens: List[str]) -> Tuple[bytes, int]:
+    """Parse a byte constant; returns the value and the tokens consumed."""
+    tok = tokens[0]
+    if tok.startswith('"'):
+        return _parse_string(tok), 1
+    if tok.startswith("0x"):
+        return bytes.fromhex(tok[2:]), 1
+    for prefix in ("base64(", "b64("):
+        if tok.startswith(prefix):
+            return base64.b64decode(tok[len(prefix):-1]), 1
+    for prefix in ("base32(", "b32("):
+        if tok.startswith(prefix):
+            data = tok[len(prefix):-1]
+            return base64.b32decode(data + "=" * (-len(data) % 8)), 1
+    if tok in ("base64", "b64"):
+        return base64.b64decode(tokens[1]), 2
+    if tok in ("base32", "b32"):
+        return base64.b32decode(tokens[1] + "=" * (-len(tokens[1]) % 8)), 2
+    raise ValueError(f"bad byte constant {tok!r}")
+
+
+def _parse_int(tok: str) -> int:
+    if tok in NAMED_INTS:
+        return NAMED_INTS[tok]
+    if tok.startswith("0x"):
+        return int(tok, 16)
+    if tok.startswith("0") and len(tok) > 1:
+        return int(tok, 8)
+    return int(tok)
+
+
+def parse_teal(teal: str) -> Tuple[int, List[Instruction], Dict[str, int]]:
+    """Parse TEAL text into ``(version, instructions, labels)``."""
+    version = 1
+    instructions: List[Instruction] = []
+    labels: Dict[str, int] = {}
+    for lineno, raw in enumerate(teal.splitlines(), 1):
+        line = _strip_comment(raw).strip()
+        if not line:
+            continue
+        if line.startswith("#pragma"):
+            parts = line.split()
+            if parts[1] == "version":
+                version = int(parts[2])
+            continue
+        tokens = _TOKEN.findall(line)
+        while tokens and tokens[0].endswith(":") and not tokens[0].startswith('"'):
+            labels[tokens[0][:-1]] = len(instructions)
+            tokens = tokens[1:]
+        if not tokens:
+            continue
+        op, rest = tokens[0], tokens[1:]
+        if op in ("int", "pushint"):
+            args: Tuple[Any, ...] = (_parse_int(rest[0]),)
+        elif op in ("intcblock", "pushints"):
+            args = tuple(_parse_int(t) for t in rest)
+        elif op in ("byte", "pushbytes"):
+            args = (_parse_bytes(rest)[0],)
+        elif op == "addr":
+            op, args = "byte", (decode_address(rest[0]),)
+        elif op == "method":
+            op, args = "byte", (method_selector(_parse_string(rest[0]).decode()),)
+        elif op in ("bytecblock", "pushbytess"):
+            values = []
+            while rest:
+                value, used = _parse_bytes(rest)
+                values.append(value)
+                rest = rest[used:]
+            args = tuple(values)
+        else:
+            args = tuple(int(t) if re.fullmatch(r"-?\d+", t) else t for t in rest)
+        instructions.append(Instruction(op, args, lineno))
+    return version, instructions, labels
+
+
+# ---------------------------------------------------------------------------
+# Runtime helpers (referenced by generated code)
+# ---------------------------------------------------------------------------
+
+def _uint(v: Any) -> int:
+    if type(v) is not int:
+        raise AVMError("expected uint64, got bytes")
+    return v
+
+
+def _bytes(v: Any) -> bytes:
+    if type(v) is not bytes:
+        raise AVMError("expected bytes, got uint64")
+    return v
+
+
+def _eq(a: Any, b: Any) -> int:
+    if type(a) is not type(b):
+        raise AVMError("cannot compare uint64 to bytes")
+    return 1 if a == b else 0
+
+
+def _btoi(v: bytes) -> int:
+    if len(v) > 8:
+        raise AVMError(f"btoi arg too long, got [{len(v)}]bytes")
+    return int.from_bytes(v, "big")
+
+
+def _overflow(op: str) -> None:
+    raise AVMError(f"{op} overflowed")
+
+
+def _fail(msg: str) -> None:
+    raise AVMError(msg)
+
+
+def _over_budget(c: _Context) -> None:
+    raise AVMError(f"dynamic cost budget exceeded, executing at cost {c.cost} > {c.budget}")
+
+
+def _check_schema(d: dict, key: bytes, value: Any, schema: Tuple[int, int]) -> None:
+    uints = sum(1 for k, v in d.items() if k != key and type(v) is int)
+    byte_slices = sum(1 for k, v in d.items() if k != key and type(v) is bytes)
+    if type(value) is int:
+        uints += 1
+    else:
+        byte_slices += 1
+    if uints > schema[0] or byte_slices > schema[1]:
+        raise AVMError(f"store would exceed schema {schema[0]} uints / {schema[1]} bytes")
+
+
+def _put(c: _Context, addr: Optional[bytes], d: Any, key: Any, value: Any, schema: Tuple[int, int]) -> None:
+    if d is _NOT_OPTED_IN:
+        raise AVMError("account not opted in")
+    if type(key) is not bytes:
+        raise AVMError("state key must be bytes")
+    if len(key) > MAX_KEY_LEN:
+        raise AVMError("key too long")
+    if type(value) is bytes and len(key) + len(value) > MAX_KEY_VALUE_LEN:
+        raise AVMError("key/value total too long")
+    old = d.get(key, _MISSING)
+    if old is _MISSING or type(old) is not type(value):
+        _check_schema(d, key, value, schema)
+    c.writes.append((addr, d, key, old, value))
+    d[key] = value
+
+
+def _del(c: _Context, addr: Optional[bytes], d: Any, key: bytes) -> None:
+    old = d.get(key, _MISSING)
+    if old is not _MISSING:
+        c.writes.append((addr, d, key, old, None))
+        del d[key]
+
+
+def _gput(c: _Context, key: Any, value: Any) -> None:
+    _put(c, None, c.g, key, value, c.ledger.global_schema)
+
+
+def _sender_put(c: _Context, key: Any, value: Any) -> None:
+    _put(c, c.txn.sender, c.sl, key, value, c.ledger.local_schema)
+
+
+def _account(c: _Context, ref: Any) -> bytes:
+    """Resolve an account reference (address or Accounts index) to an address."""
+    txn = c.txn
+    if type(ref) is int:
+        if ref == 0:
+            return txn.sender
+        return txn.accounts[ref - 1]
+    if ref == txn.sender or ref in txn.accounts:
+        return ref
+    if any(ref == t.sender for t in c.group):
+        return ref
+    raise AVMError("unavailable Account")
+
+
+def _local(c: _Context, ref: Any) -> Tuple[bytes, dict]:
+    addr = _account(c, ref)
+    d = c.ledger.locals.get(addr)
+    if d is None:
+        raise AVMError("account not opted in")
+    return addr, d
+
+
+def _lget(c: _Context, ref: Any, key: Any) -> Any:
+    return _local(c, ref)[1].get(key, 0)
+
+
+def _lget_ex(c: _Context, ref: Any, app: Any, key: Any) -> Tuple[Any, int]:
+    addr = _account(c, ref)
+    d = c.ledger.locals.get(addr)
+    if d is None or key not in d:
+        return 0, 0
+    return d[key], 1
+
+
+def _lput(c: _Context, ref: Any, key: Any, value: Any) -> None:
+    addr, d = _local(c, ref)
+    _put(c, addr, d, key, value, c.ledger.local_schema)
+
+
+def _ldel(c: _Context, ref: Any, key: Any) -> None:
+    addr, d = _local(c, ref)
+    _del(c, addr, d, key)
+
+
+def _frame_dig(c: _Context, s: list, i: int) -> Any:
+    frame = c.frames[-1]
+    if not frame[4]:
+        raise AVMError("frame_dig without proto")
+    pos = frame[1] + i
+    if pos < frame[1] - frame[2] or pos >= len(s):
+        raise AVMError(f"frame_dig {i} out of range")
+    return s[pos]
+
+
+def _frame_bury(c: _Context, s: list, i: int, value: Any) -> None:
+    frame = c.frames[-1]
+    if not frame[4]:
+        raise AVMError("frame_bury without proto")
+    pos = frame[1] + i
+    if pos < frame[1] - frame[2] or pos >= len(s):
+        raise AVMError(f"frame_bury {i} out of range")
+    s[pos] = value
+
+
+def _proto(c: _Context, s: list, args: int, rets: int) -> None:
+    if not c.frames:
+        raise AVMError("proto outside of a subroutine")
+    frame = c.frames[-1]
+    if len(s) < args:
+        raise AVMError(f"callsub to proto that requires {args} args with stack height {len(s)}")
+    frame[2], frame[3], frame[4] = args, rets, True
+
+
+def _retsub(c: _Context, s: list) -> int:
+    if not c.frames:
+        raise AVMError("retsub with empty callstack")
+    ret, height, args, rets, proto = c.frames.pop()
+    if proto:
+        if len(s) < height + rets:
+            raise AVMError("retsub executed with stack below frame")
+        values = s[len(s) - rets:] if rets else []
+        del s[height - args:]
+        s.extend(values)
+    return ret
+
+
+def _end(c: _Context, s: list) -> int:
+    if len(s) != 1:
+        raise AVMError(f"stack len is {len(s)} instead of 1")
+    c.result = _uint(s[0])
+    return -1
+
+
+def _extract(v: bytes, start: int, length: int) -> bytes:
+    if start + length > len(v):
+        raise AVMError("extraction end exceeds length")
+    return v[start:start + length]
+
+
+def _extract_uint(v: bytes, start: int, width: int) -> int:
+    if start + width > len(v):
+        raise AVMError("extraction end exceeds length")
+    return int.from_bytes(v[start:start + width], "big")
+
+
+def _replace(v: bytes, start: int, new: bytes) -> bytes:
+    if start + len(new) > len(v):
+        raise AVMError("replacement end exceeds length")
+    return v[:start] + new + v[start + len(new):]
+
+
+def _substring(v: bytes, start: int, end: int) -> bytes:
+    if end < start or end > len(v):
+        raise AVMError("substring range beyond length of string")
+    return v[start:end]
+
+
+def _getbyte(v: bytes, i: int) -> int:
+    if i >= len(v):
+        raise AVMError("getbyte index beyond array length")
+    return v[i]
+
+
+def _setbyte(v: bytes, i: int, b: int) -> bytes:
+    if i >= len(v):
+        raise AVMError("setbyte index beyond array length")
+    if b > 255:
+        raise AVMError("setbyte value > 255")
+    return v[:i] + bytes([b]) + v[i + 1:]
+
+
+def _getbit(v: Any, i: int) -> int:
+    if type(v) is int:
+        if i > 63:
+            raise AVMError("getbit index > 63 with uint64")
+        return (v >> i) & 1
+    if i >= len(v) * 8:
+        raise AVMError("getbit index beyond byteslice")
+    return (v[i // 8] >> (7 - i % 8)) & 1
+
+
+def _sha512_256(v: bytes) -> bytes:
+    return hashlib.new("sha512_256", v).digest()
+
+
+def _concat(a: bytes, b: bytes) -> bytes:
+    if len(a) + len(b) > 4096:
+        raise AVMError("concat produced a too big byte-array")
+    return a + b
+
+
+def _bint(v: bytes) -> int:
+    if len(v) > MAX_BIGINT_LEN:
+        raise AVMError("byte math input too long")
+    return int.from_bytes(v, "big")
+
+
+def _box_ref(c: _Context, name: Any) -> bytes:
+    """Check that some app call of the group references box ``name``."""
+    if type(name) is not bytes:
+        raise AVMError("box name must be bytes")
+    if not 1 <= len(name) <= MAX_KEY_LEN:
+        raise AVMError("box names must be 1 to 64 bytes")
+    for txn in c.group:
+        if name in txn.boxes:
+            return name
+    raise AVMError(f"invalid Box reference {name!r}")
+
+
+def _box_set(c: _Context, name: bytes, value: bytes) -> None:
+    boxes = c.ledger.boxes
+    c.writes.append((_BOXES, boxes, name, boxes.get(name, _MISSING), value))
+    boxes[name] = value
+
+
+def _box_value(c: _Context, name: Any) -> bytes:
+    value = c.ledger.boxes.get(_box_ref(c, name))
+    if value is None:
+        raise AVMError(f"no such box {name!r}")
+    return value
+
+
+def _box_create(c: _Context, name: Any, size: int) -> int:
+    old = c.ledger.boxes.get(_box_ref(c, name))
+    if old is not None:
+        if len(old) != size:
+            raise AVMError("box size mismatch")
+        return 0
+    if size > MAX_BOX_SIZE:
+        raise AVMError(f"box size {size} too large")
+    _box_set(c, name, bytes(size))
+    return 1
+
+
+def _box_replace(c: _Context, name: Any, start: int, new: bytes) -> None:
+    _box_set(c, name, _replace(_box_value(c, name), start, new))
+
+
+def _box_put(c: _Context, name: Any, value: bytes) -> None:
+    old = c.ledger.boxes.get(_box_ref(c, name))
+    if old is not None and len(old) != len(value):
+        raise AVMError("box_put wrong size")
+    if len(value) > MAX_BOX_SIZE:
+        raise AVMError(f"box size {len(value)} too large")
+    _box_set(c, name, value)
+
+
+def _gload(c: _Context, index: int, slot: int) -> Any:
+    """Scratch slot ``slot`` of an earlier app call of the group."""
+    if index >= c.txn.group_index:
+        raise AVMError(f"gload of transaction {index} from transaction {c.txn.group_index}: not an earlier one")
+    if index not in c.scratches:
+        raise AVMError(f"gload of transaction {index}: not an app call")
+    scratch = c.scratches[index]
+    return 0 if scratch is None else scratch[slot]
+
+
+def _box_get(c: _Context, name: Any) -> Tuple[bytes, int]:
+    value = c.ledger.boxes.get(_box_ref(c, name))
+    return (b"", 0) if value is None else (value, 1)
+
+
+def _box_del(c: _Context, name: Any) -> int:
+    boxes = c.ledger.boxes
+    old = boxes.get(_box_ref(c, name))
+    if old is None:
+        return 0
+    c.writes.append((_BOXES, boxes, name, old, None))
+    del boxes[name]
+    return 1
+
+
+_RUNTIME = {
+    name: value
+    for name, value in globals().items()
+    if name.startswith("_") and callable(value) and not name.startswith("__")
+}
+_RUNTIME.update(
+    AVMError=AVMError,
+    _U64=MAX_UINT64,
+    _NOT_OPTED_IN=_NOT_OPTED_IN,
+    _MISSING=_MISSING,
+    _ZERO=ZERO_ADDRESS,
+    _hashlib=hashlib,
+    _math=math,
+)
+
+
+# ---------------------------------------------------------------------------
+# Compilation to Python
+# ---------------------------------------------------------------------------
+
+# Stack value kinds tracked while compiling a block. A _COND is a pending
+# Python boolean expression, only turned into 0/1 if it is stored somewhere
+# rather than branched on.
+_U, _B, _SENDER, _ANY, _COND = "u", "b", "S", "?", "c"
+
+# Transaction fields: name -> (attribute expression on a txn, kind)
+TXN_FIELDS = {
+    "Sender": ("{t}.sender", _B),
+    "Fee": ("{t}.fee", _U),
+    "FirstValid": ("{t}.first_valid", _U),
+    "LastValid": ("{t}.last_valid", _U),
+    "Note": ("{t}.note", _B),
+    "Lease": ("{t}.lease", _B),
+    "Receiver": ("{t}.receiver", _B),
+    "Amount": ("{t}.amount", _U),
+    "CloseRemainderTo": ("{t}.close_remainder_to", _B),
+    "Type": ("{t}.type", _B),
+    "TypeEnum": ("{t}.type_enum", _U),
+    "GroupIndex": ("{t}.group_index", _U),
+    "TxID": ("{t}.txid", _B),
+    "ApplicationID": ("{t}.application_id", _U),
+    "OnCompletion": ("{t}.on_completion", _U),
+    "NumAppArgs": ("len({t}.application_args)", _U),
+    "NumAccounts": ("len({t}.accounts)", _U),
+    "NumAssets": ("len({t}.assets)", _U),
+    "NumApplications": ("len({t}.applications)", _U),
+    "RekeyTo": ("{t}.rekey_to", _B),
+    "XferAsset": ("{t}.xfer_asset", _U),
+    "AssetAmount": ("{t}.asset_amount", _U),
+    "AssetSender": ("{t}.asset_sender", _B),
+    "AssetReceiver": ("{t}.asset_receiver", _B),
+    "AssetCloseTo": ("{t}.asset_close_to", _B),
+}
+
+# Array transaction fields: name -> (indexing expression, kind)
+TXN_ARRAY_FIELDS = {
+    "ApplicationArgs": ("{t}.application_args[{i}]", _B),
+    "Accounts": ("(({t}.sender,) + {t}.accounts)[{i}]", _B),
+    "Assets": ("{t}.assets[{i}]", _U),
+    "Applications": ("((c.ledger.app_id,) + {t}.applications)[{i}]", _U),
+}
+
+GLOBAL_FIELDS = {
+    "MinTxnFee": ("1000", _U),
+    "MinBalance": ("100000", _U),
+    "MaxTxnLife": ("1000", _U),
+    "ZeroAddress": ("_ZERO", _B),
+    "GroupSize": ("len(c.group)", _U),
+    "LogicSigVersion": ("8", _U),
+    "Round": ("c.ledger.round", _U),
+    "LatestTimestamp": ("c.ledger.timestamp", _U),
+    "CurrentApplicationID": ("c.ledger.app_id", _U),
+    "CreatorAddress": ("c.ledger.creator", _B),
+    "CurrentApplicationAddress": ("c.ledger.app_address", _B),
+    "GroupID": ("_ZERO", _B),
+    "OpcodeBudget": ("(c.budget - c.cost)", _U),
+    "CallerApplicationID": ("0", _U),
+    "CallerApplicationAddress": ("_ZERO", _B),
+}
+
+# Control flow: conditional branches continue in the same block, the
+# unconditional exits end it
+_BRANCHES = {"bnz", "bz", "b", "callsub", "switch", "match"}
+_TERMINATORS = {"return", "err", "retsub", "b"}
+
+_SCRATCH_OPS = {"load", "store", "loads", "stores"}
+
+
+class _NotInlinable(Exception):
+    """A subroutine turned out not to be expandable at its call site."""
+
+
+class _BlockCompiler:
+    """Emits the Python body of one extended basic block with a symbolic stack.
+
+    ``cost`` accumulates the opcode cost of the instructions compiled since
+    the last exit and is charged to ``c.cost`` by :meth:`charge`. While a
+    subroutine is being inlined, ``frame`` is the number of its arguments
+    sitting at the bottom of ``stack``.
+    """
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.stack: List[Tuple[str, str]] = []
+        self.n = 0
+        self.cost = 0
+        self.frame: Optional[int] = None
+        self.fields: Dict[str, str] = {}
+
+    def emit(self, line: str) -> None:
+        self.lines.append(line)
+
+    def tmp(self) -> str:
+        self.n += 1
+        return f"v{self.n}"
+
+    def push(self, expr: str, kind: str) -> str:
+        name = self.tmp()
+        self.emit(f"{name} = {expr}")
+        self.stack.append((name, kind))
+        return name
+
+    def push_const(self, expr: str, kind: str) -> None:
+        self.stack.append((expr, kind))
+
+    def pop_raw(self) -> Tuple[str, str]:
+        if self.stack:
+            return self.stack.pop()
+        if self.frame is not None:
+            raise _NotInlinable()
+        name = self.tmp()
+        self.emit(f"{name} = s.pop()")
+        return name, _ANY
+
+    def pop(self) -> Tuple[str, str]:
+        item = self.pop_raw()
+        return self.materialize(item)
+
+    def pop_cond(self) -> str:
+        """Pop a value that is only tested for truth (bnz, assert, ...)."""
+        item = self.pop_raw()
+        return item[0] if item[1] == _COND else self.uint(item)
+
+    @staticmethod
+    def materialize(item: Tuple[str, str]) -> Tuple[str, str]:
+        return (f"(1 if {item[0]} else 0)", _U) if item[1] == _COND else item
+
+    def field(self, expr: str, kind: str) -> None:
+        """Push a transaction field; repeated reads within a block share a temp."""
+        name = self.fields.get(expr)
+        if name is None:
+            name = self.fields[expr] = self.tmp()
+            self.emit(f"{name} = {expr}")
+        self.stack.append((name, kind))
+
+    def charge(self) -> None:
+        if self.cost:
+            self.emit(f"c.cost += {self.cost}")
+            self.cost = 0
+
+    def exit(self, target: Union[int, str]) -> str:
+        """Statement leaving the block on a taken branch; the fallthrough
+        path keeps accumulating cost."""
+        if self.cost:
+            return f"c.cost += {self.cost}; return {target}"
+        return f"return {target}"
+
+    def flush(self) -> None:
+        if self.frame is not None:
+            raise _NotInlinable()
+        values = [self.materialize(item)[0] for item in self.stack]
+        if len(values) == 1:
+            self.emit(f"s.append({values[0]})")
+        elif values:
+            self.emit(f"s.extend(({', '.join(values)},))")
+        self.stack = []
+
+    def uint(self, item: Tuple[str, str]) -> str:
+        """Expression for ``item`` as a uint64, type-checked if not known."""
+        if item[1] == _U:
+            return item[0]
+        if item[0].isidentifier():
+            self.emit(f"if type({item[0]}) is not int: _uint({item[0]})")
+            return item[0]
+        return f"_uint({item[0]})"
+
+    def bytes(self, item: Tuple[str, str]) -> str:
+        if item[1] in (_B, _SENDER):
+            return item[0]
+        if item[0].isidentifier():
+            self.emit(f"if type({item[0]}) is not bytes: _bytes({item[0]})")
+            return item[0]
+        return f"_bytes({item[0]})"
+
+    def function(self, name: str) -> List[str]:
+        """The block as a function, with hot context attributes bound to locals."""
+        body = "\n".join(self.lines)
+        prologue = []
+        for attr in ("txn", "sl", "g", "writes"):
+            pattern = re.compile(rf"\bc\.{attr}\b")
+            if len(pattern.findall(body)) > 1:
+                body = pattern.sub(attr, body)
+                prologue.append(f"{attr} = c.{attr}")
+        return [f"def {name}(c, s):"] + [f"    {line}" for line in prologue + body.split("\n")]
+
+
+_OpHandler = Callable[[_BlockCompiler, Tuple[Any, ...]], None]
+_OPS: Dict[str, _OpHandler] = {}
+
+
+def _op(*names: str) -> Callable[[_OpHandler], _OpHandler]:
+    def register(fn: _OpHandler) -> _OpHandler:
+        for name in names:
+            _OPS[name] = fn
+        return fn
+    return register
+
+
+def _arith(expr: str, guard: Optional[str] = None, overflow: Optional[str] = None) -> _OpHandler:
+    """Binary uint64 op; ``guard`` rejects bad operands, ``overflow`` names the op to range-check."""
+
+    def handler(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+        b = e.uint(e.pop())
+        a = e.uint(e.pop())
+        if guard:
+            e.emit(guard.format(a=a, b=b))
+        name = e.push(expr.format(a=a, b=b), _U)
+        if overflow:
+            e.emit(f"if {name} > _U64: _overflow({overflow!r})")
+    return handler
+
+
+_OPS["+"] = _arith("{a} + {b}", overflow="+")
+_OPS["*"] = _arith("{a} * {b}", overflow="*")
+_OPS["-"] = _arith("{a} - {b}", "if {a} < {b}: _fail('- would result negative')")
+_OPS["/"] = _arith("{a} // {b}", "if {b} == 0: _fail('/ 0')")
+_OPS["%"] = _arith("{a} % {b}", "if {b} == 0: _fail('% 0')")
+_OPS["&"] = _arith("{a} & {b}")
+_OPS["|"] = _arith("{a} | {b}")
+_OPS["^"] = _arith("{a} ^ {b}")
+_OPS["shl"] = _arith("({a} << {b}) & _U64", "if {b} > 63: _fail('shl arg too big')")
+_OPS["shr"] = _arith("{a} >> {b}", "if {b} > 63: _fail('shr arg too big')")
+_OPS["exp"] = _arith("{a} ** {b}", "if {a} == 0 and {b} == 0: _fail('0^0 is undefined')", overflow="exp")
+def _compare(op: str) -> _OpHandler:
+    def handler(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+        b = e.uint(e.pop())
+        a = e.uint(e.pop())
+        e.push_const(f"({a} {op} {b})", _COND)
+    return handler
+
+
+def _logical(op: str) -> _OpHandler:
+    def handler(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+        b = e.pop_cond()
+        a = e.pop_cond()
+        e.push_const(f"({a} {op} {b})", _COND)
+    return handler
+
+
+for _cmp in ("<", ">", "<=", ">="):
+    _OPS[_cmp] = _compare(_cmp)
+_OPS["&&"] = _logical("and")
+_OPS["||"] = _logical("or")
+
+
+def _equality(negate: bool) -> _OpHandler:
+    def handler(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+        b, a = e.pop(), e.pop()
+        kinds = {a[1], b[1]}
+        if kinds <= {_U} or kinds <= {_B, _SENDER}:
+            e.push_const(f"({a[0]} {'!=' if negate else '=='} {b[0]})", _COND)
+        else:
+            e.push(f"{'1 - ' if negate else ''}_eq({a[0]}, {b[0]})", _U)
+    return handler
+
+
+_OPS["=="] = _equality(False)
+_OPS["!="] = _equality(True)
+
+
+def _byte_compare(op: str) -> _OpHandler:
+    """Byte-math comparison: operands are big-endian unsigned integers."""
+
+    def handler(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+        b = e.bytes(e.pop())
+        a = e.bytes(e.pop())
+        e.push(f"_bint({a}) {op} _bint({b})", _COND)
+    return handler
+
+
+for _cmp in ("<", ">", "<=", ">=", "==", "!="):
+    _OPS[f"b{_cmp}"] = _byte_compare(_cmp)
+
+
+@_op("!")
+def _op_not(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push_const(f"(not {e.pop_cond()})", _COND)
+
+
+@_op("~")
+def _op_bitnot(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"{e.uint(e.pop())} ^ _U64", _U)
+
+
+@_op("sqrt")
+def _op_sqrt(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"_math.isqrt({e.uint(e.pop())})", _U)
+
+
+@_op("int", "pushint")
+def _op_int(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push_const(repr(args[0]), _U)
+
+
+@_op("byte", "pushbytes")
+def _op_byte(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push_const(repr(args[0]), _B)
+
+
+@_op("pushints")
+def _op_pushints(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    for value in args:
+        e.push_const(repr(value), _U)
+
+
+@_op("pushbytess")
+def _op_pushbytess(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    for value in args:
+        e.push_const(repr(value), _B)
+
+
+@_op("txn")
+def _op_txn(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    field = args[0]
+    if field in TXN_ARRAY_FIELDS:
+        _op_txna(e, args)
+        return
+    expr, kind = TXN_FIELDS[field]
+    if field == "Sender":
+        e.push_const("c.txn.sender", _SENDER)
+        return
+    e.field(expr.format(t="c.txn"), kind)
+
+
+@_op("txna")
+def _op_txna(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    expr, kind = TXN_ARRAY_FIELDS[args[0]]
+    e.field(expr.format(t="c.txn", i=args[1]), kind)
+
+
+@_op("txnas")
+def _op_txnas(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    index = e.uint(e.pop())
+    expr, kind = TXN_ARRAY_FIELDS[args[0]]
+    e.push(expr.format(t="c.txn", i=index), kind)
+
+
+@_op("gtxn")
+def _op_gtxn(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    group, field = args[0], args[1]
+    if field in TXN_ARRAY_FIELDS:
+        _op_gtxna(e, args)
+        return
+    expr, kind = TXN_FIELDS[field]
+    e.field(expr.format(t=f"c.group[{group}]"), kind)
+
+
+@_op("gtxna")
+def _op_gtxna(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    expr, kind = TXN_ARRAY_FIELDS[args[1]]
+    e.field(expr.format(t=f"c.group[{args[0]}]", i=args[2]), kind)
+
+
+@_op("gtxns")
+def _op_gtxns(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    group = e.uint(e.pop())
+    expr, kind = TXN_FIELDS[args[0]]
+    e.push(expr.format(t=f"c.group[{group}]"), kind)
+
+
+@_op("gtxnsa")
+def _op_gtxnsa(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    group = e.uint(e.pop())
+    expr, kind = TXN_ARRAY_FIELDS[args[0]]
+    e.push(expr.format(t=f"c.group[{group}]", i=args[1]), kind)
+
+
+@_op("global")
+def _op_global(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    expr, kind = GLOBAL_FIELDS[args[0]]
+    if args[0] == "OpcodeBudget":
+        e.charge()
+        e.push(expr, kind)
+    else:
+        e.field(expr, kind)
+
+
+@_op("btoi")
+def _op_btoi(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    v = e.bytes(e.pop())
+    e.push(f"int.from_bytes({v}, 'big') if len({v}) <= 8 else _btoi({v})", _U)
+
+
+@_op("itob")
+def _op_itob(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"{e.uint(e.pop())}.to_bytes(8, 'big')", _B)
+
+
+@_op("len")
+def _op_len(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"len({e.bytes(e.pop())})", _U)
+
+
+@_op("concat")
+def _op_concat(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    b, a = e.bytes(e.pop()), e.bytes(e.pop())
+    e.push(f"_concat({a}, {b})", _B)
+
+
+@_op("extract")
+def _op_extract(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    v = e.bytes(e.pop())
+    start, length = args
+    if length == 0:
+        e.push(f"_substring({v}, {start}, len({v}))", _B)
+    else:
+        e.push(f"_extract({v}, {start}, {length})", _B)
+
+
+@_op("extract3")
+def _op_extract3(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    length, start, v = e.uint(e.pop()), e.uint(e.pop()), e.bytes(e.pop())
+    e.push(f"_extract({v}, {start}, {length})", _B)
+
+
+for _name, _width in (("extract_uint16", 2), ("extract_uint32", 4), ("extract_uint64", 8)):
+    def _make_extract_uint(width: int) -> _OpHandler:
+        def handler(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+            start, v = e.uint(e.pop()), e.bytes(e.pop())
+            e.push(f"_extract_uint({v}, {start}, {width})", _U)
+        return handler
+    _OPS[_name] = _make_extract_uint(_width)
+
+
+@_op("replace2")
+def _op_replace2(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    new, v = e.bytes(e.pop()), e.bytes(e.pop())
+    e.push(f"_replace({v}, {args[0]}, {new})", _B)
+
+
+@_op("replace3")
+def _op_replace3(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    new, start, v = e.bytes(e.pop()), e.uint(e.pop()), e.bytes(e.pop())
+    e.push(f"_replace({v}, {start}, {new})", _B)
+
+
+@_op("substring")
+def _op_substring(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    v = e.bytes(e.pop())
+    e.push(f"_substring({v}, {args[0]}, {args[1]})", _B)
+
+
+@_op("substring3")
+def _op_substring3(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    end, start, v = e.uint(e.pop()), e.uint(e.pop()), e.bytes(e.pop())
+    e.push(f"_substring({v}, {start}, {end})", _B)
+
+
+@_op("getbyte")
+def _op_getbyte(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    i, v = e.uint(e.pop()), e.bytes(e.pop())
+    e.push(f"_getbyte({v}, {i})", _U)
+
+
+@_op("setbyte")
+def _op_setbyte(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    b, i, v = e.uint(e.pop()), e.uint(e.pop()), e.bytes(e.pop())
+    e.push(f"_setbyte({v}, {i}, {b})", _B)
+
+
+@_op("getbit")
+def _op_getbit(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    i, v = e.uint(e.pop()), e.pop()
+    e.push(f"_getbit({v[0]}, {i})", _U)
+
+
+@_op("bzero")
+def _op_bzero(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    n = e.uint(e.pop())
+    e.emit(f"if {n} > 4096: _fail('bzero attempted to create a too large string')")
+    e.push(f"bytes({n})", _B)
+
+
+@_op("sha256")
+def _op_sha256(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"_hashlib.sha256({e.bytes(e.pop())}).digest()", _B)
+
+
+@_op("sha512_256")
+def _op_sha512_256(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"_sha512_256({e.bytes(e.pop())})", _B)
+
+
+@_op("assert")
+def _op_assert(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.emit(f"if not {e.pop_cond()}: _fail('assert failed')")
+
+
+@_op("pop")
+def _op_pop(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.pop()
+
+
+@_op("popn")
+def _op_popn(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    for _ in range(args[0]):
+        e.pop()
+
+
+@_op("dup")
+def _op_dup(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    item = e.pop()
+    e.stack.extend((item, item))
+
+
+@_op("dupn")
+def _op_dupn(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    item = e.pop()
+    e.stack.extend([item] * (args[0] + 1))
+
+
+@_op("dup2")
+def _op_dup2(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    b, a = e.pop(), e.pop()
+    e.stack.extend((a, b, a, b))
+
+
+@_op("swap")
+def _op_swap(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    b, a = e.pop(), e.pop()
+    e.stack.extend((b, a))
+
+
+@_op("select")
+def _op_select(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    cond = e.pop_cond()
+    b, a = e.pop(), e.pop()
+    kind = a[1] if a[1] == b[1] else _ANY
+    e.push(f"{b[0]} if {cond} else {a[0]}", kind)
+
+
+@_op("dig")
+def _op_dig(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    items = [e.pop() for _ in range(args[0] + 1)]
+    items.reverse()
+    e.stack.extend(items)
+    e.stack.append(items[0])
+
+
+@_op("cover")
+def _op_cover(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    top = e.pop()
+    below = [e.pop() for _ in range(args[0])]
+    below.reverse()
+    e.stack.append(top)
+    e.stack.extend(below)
+
+
+@_op("uncover")
+def _op_uncover(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    items = [e.pop() for _ in range(args[0] + 1)]
+    items.reverse()
+    e.stack.extend(items[1:])
+    e.stack.append(items[0])
+
+
+@_op("bury")
+def _op_bury(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    top = e.pop()
+    items = [e.pop() for _ in range(args[0])]
+    items.reverse()
+    items[0] = top
+    e.stack.extend(items)
+
+
+@_op("load")
+def _op_load(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"c.scratch[{args[0]}]", _ANY)
+
+
+@_op("store")
+def _op_store(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.emit(f"c.scratch[{args[0]}] = {e.pop()[0]}")
+
+
+@_op("loads")
+def _op_loads(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"c.scratch[{e.uint(e.pop())}]", _ANY)
+
+
+@_op("stores")
+def _op_stores(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    value, slot = e.pop(), e.uint(e.pop())
+    e.emit(f"c.scratch[{slot}] = {value[0]}")
+
+
+@_op("gloads")
+def _op_gloads(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"_gload(c, {e.uint(e.pop())}, {args[0]})", _ANY)
+
+
+@_op("app_global_get")
+def _op_app_global_get(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"c.g.get({e.pop()[0]}, 0)", _ANY)
+
+
+@_op("app_global_get_ex")
+def _op_app_global_get_ex(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    key = e.pop()
+    e.pop()  # only the current application is modelled
+    value = e.push(f"c.g.get({key[0]})", _ANY)
+    e.stack.pop()
+    e.push(f"0 if {value} is None else {value}", _ANY)
+    e.push(f"0 if {value} is None else 1", _U)
+
+
+def _const_key(item: Tuple[str, str]) -> bool:
+    """Whether ``item`` is a literal state key short enough to skip the checks."""
+    return item[1] == _B and item[0][:2] in ("b'", 'b"') and len(eval(item[0])) <= MAX_KEY_LEN
+
+
+def _emit_put(e: _BlockCompiler, d: str, addr: str, key: Tuple[str, str], value: Tuple[str, str], slow: str) -> None:
+    """Overwrite of an existing uint with a uint: no schema or length checks needed."""
+    if value[1] != _U or not _const_key(key):
+        e.emit(slow)
+        return
+    old = e.tmp()
+    e.emit(f"{old} = {d}.get({key[0]}, _MISSING)")
+    e.emit(f"if type({old}) is int:")
+    e.emit(f"    c.writes.append(({addr}, {d}, {key[0]}, {old}, {value[0]}))")
+    e.emit(f"    {d}[{key[0]}] = {value[0]}")
+    e.emit("else:")
+    e.emit(f"    {slow}")
+
+
+@_op("app_global_put")
+def _op_app_global_put(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    value, key = e.pop(), e.pop()
+    _emit_put(e, "c.g", "None", key, value, f"_gput(c, {key[0]}, {value[0]})")
+
+
+@_op("app_global_del")
+def _op_app_global_del(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.emit(f"_del(c, None, c.g, {e.pop()[0]})")
+
+
+@_op("app_local_get")
+def _op_app_local_get(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    key, account = e.pop(), e.pop()
+    if account[1] == _SENDER:
+        e.push(f"c.sl.get({key[0]}, 0)", _ANY)
+    else:
+        e.push(f"_lget(c, {account[0]}, {key[0]})", _ANY)
+
+
+@_op("app_local_get_ex")
+def _op_app_local_get_ex(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    key, app, account = e.pop(), e.pop(), e.pop()
+    pair = e.tmp()
+    e.emit(f"{pair} = _lget_ex(c, {account[0]}, {app[0]}, {key[0]})")
+    e.push(f"{pair}[0]", _ANY)
+    e.push(f"{pair}[1]", _U)
+
+
+@_op("app_local_put")
+def _op_app_local_put(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    value, key, account = e.pop(), e.pop(), e.pop()
+    if account[1] == _SENDER:
+        _emit_put(e, "c.sl", "c.txn.sender", key, value, f"_sender_put(c, {key[0]}, {value[0]})")
+    else:
+        e.emit(f"_lput(c, {account[0]}, {key[0]}, {value[0]})")
+
+
+@_op("app_local_del")
+def _op_app_local_del(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    key, account = e.pop(), e.pop()
+    e.emit(f"_ldel(c, {account[0]}, {key[0]})")
+
+
+@_op("box_create")
+def _op_box_create(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    size, name = e.uint(e.pop()), e.bytes(e.pop())
+    e.push(f"_box_create(c, {name}, {size})", _U)
+
+
+@_op("box_extract")
+def _op_box_extract(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    length, start, name = e.uint(e.pop()), e.uint(e.pop()), e.bytes(e.pop())
+    e.push(f"_extract(_box_value(c, {name}), {start}, {length})", _B)
+
+
+@_op("box_replace")
+def _op_box_replace(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    new, start, name = e.bytes(e.pop()), e.uint(e.pop()), e.bytes(e.pop())
+    e.emit(f"_box_replace(c, {name}, {start}, {new})")
+
+
+@_op("box_put")
+def _op_box_put(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    value, name = e.bytes(e.pop()), e.bytes(e.pop())
+    e.emit(f"_box_put(c, {name}, {value})")
+
+
+@_op("box_del")
+def _op_box_del(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.push(f"_box_del(c, {e.bytes(e.pop())})", _U)
+
+
+@_op("box_len")
+def _op_box_len(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    pair = e.tmp()
+    e.emit(f"{pair} = _box_get(c, {e.bytes(e.pop())})")
+    e.push(f"len({pair}[0])", _U)
+    e.push(f"{pair}[1]", _U)
+
+
+@_op("box_get")
+def _op_box_get(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    pair = e.tmp()
+    e.emit(f"{pair} = _box_get(c, {e.bytes(e.pop())})")
+    e.push(f"{pair}[0]", _B)
+    e.push(f"{pair}[1]", _U)
+
+
+@_op("app_opted_in")
+def _op_app_opted_in(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.pop()  # only the current application is modelled
+    account = e.pop()
+    e.push(f"1 if _account(c, {account[0]}) in c.ledger.locals else 0", _U)
+
+
+@_op("log")
+def _op_log(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.emit(f"c.logs.append({e.bytes(e.pop())})")
+
+
+@_op("proto")
+def _op_proto(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    e.flush()
+    e.emit(f"_proto(c, s, {args[0]}, {args[1]})")
+
+
+@_op("frame_dig")
+def _op_frame_dig(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    if e.frame is not None:
+        pos = e.frame + args[0]
+        if not 0 <= pos < len(e.stack):
+            raise _NotInlinable()
+        e.stack.append(e.stack[pos])
+        return
+    e.flush()
+    e.push(f"_frame_dig(c, s, {args[0]})", _ANY)
+
+
+@_op("frame_bury")
+def _op_frame_bury(e: _BlockCompiler, args: Tuple[Any, ...]) -> None:
+    value = e.pop()
+    if e.frame is not None:
+        pos = e.frame + args[0]
+        if not 0 <= pos < len(e.stack):
+            raise _NotInlinable()
+        e.stack[pos] = value
+        return
+    e.flush()
+    e.emit(f"_frame_bury(c, s, {args[0]}, {value[0]})")
+
+
+def _inlinable_subroutines(instructions: Sequence[Instruction], labels: Dict[str, int]) -> Dict[str, Tuple[int, int, int, int]]:
+    """Subroutines that can be expanded at their call sites.
+
+    These are the straight-line ``proto``/``retsub`` bodies PyTeal emits for
+    small helpers. Maps each label to ``(first, retsub, args, rets)``, where
+    ``first`` is the first instruction after ``proto``.
+    """
+    inside = set(labels.values())
+    found = {}
+    for ins in instructions:
+        if ins.op != "callsub" or ins.args[0] in found:
+            continue
+        start = labels.get(ins.args[0])
+        if start is None or instructions[start].op != "proto":
+            continue
+        end = start + 1
+        while end < len(instructions):
+            op = instructions[end].op
+            if op == "retsub" or op in _BRANCHES or op in _TERMINATORS or op == "proto" or end in inside:
+                break
+            end += 1
+        if end < len(instructions) and instructions[end].op == "retsub" and end not in inside:
+            found[ins.args[0]] = (start + 1, end) + tuple(instructions[start].args)
+    return found
+
+
+def _block_leaders(instructions: Sequence[Instruction], labels: Dict[str, int], inline: Dict[str, Any]) -> List[int]:
+    """Entry points of the extended blocks: jump targets, return points and
+    whatever follows an unconditional exit. Conditional branches do not split."""
+    leaders = {0}
+    leaders.update(labels.values())
+    for i, ins in enumerate(instructions):
+        if ins.op in _TERMINATORS or (ins.op == "callsub" and ins.args[0] not in inline):
+            leaders.add(i + 1)
+    return sorted(x for x in leaders if x < len(instructions))
+
+
+class _Codegen:
+    """Translates a parsed program into Python source, one function per block."""
+
+    def __init__(self, instructions: Sequence[Instruction], labels: Dict[str, int], inline: Dict[str, Any]):
+        self.instructions = instructions
+        self.labels = labels
+        self.inline = inline
+        self.leaders = _block_leaders(instructions, labels, inline)
+        self.index_of = {start: n for n, start in enumerate(self.leaders)}
+        self.constants: Dict[str, Tuple[Any, ...]] = {}
+        # Module-level lookup tables for match, defined ahead of the blocks
+        self.tables: List[str] = []
+        # Blocks reachable by a backward jump check the budget on entry so
+        # that loops cannot run away; everything else is checked at the end
+        self.loop_heads = set()
+        for i, ins in enumerate(instructions):
+            if ins.op in _BRANCHES:
+                for label in ins.args:
+                    if label in labels and labels[label] <= i:
+                        self.loop_heads.add(self.index_of[labels[label]])
+
+    def target(self, label: str) -> int:
+        if label not in self.labels:
+            raise ValueError(f"reference to undefined label {label!r}")
+        return self.index_of[self.labels[label]]
+
+    def source(self) -> str:
+        out: List[str] = []
+        for n, start in enumerate(self.leaders):
+            end = self.leaders[n + 1] if n + 1 < len(self.leaders) else len(self.instructions)
+            out.extend(self.block(n, start, end).function(f"block_{n}"))
+            out.append("")
+        out[:0] = self.tables
+        out.append(f"BLOCKS = ({', '.join(f'block_{n}' for n in range(len(self.leaders)))},)")
+        return "\n".join(out) + "\n"
+
+    def block(self, n: int, start: int, end: int) -> _BlockCompiler:
+        e = _BlockCompiler()
+        if n in self.loop_heads:
+            e.emit("if c.cost > c.budget: _over_budget(c)")
+        fallthrough = n + 1 if end < len(self.instructions) else None
+        for ins in self.instructions[start:end]:
+            e.cost += OPCODE_COST.get(ins.op, 1)
+            if self.control(e, ins, fallthrough):
+                return e
+        e.charge()
+        e.flush()
+        e.emit("return _end(c, s)" if fallthrough is None else f"return {fallthrough}")
+        return e
+
+    def control(self, e: _BlockCompiler, ins: Instruction, fallthrough: Optional[int]) -> bool:
+        """Compile one instruction; returns True when it ends the block."""
+        op, args = ins.op, ins.args
+        if op in ("bnz", "bz"):
+            cond = e.pop_cond()
+            e.flush()
+            e.emit(f"if {'' if op == 'bnz' else 'not '}{cond}: {e.exit(self.target(args[0]))}")
+        elif op == "b":
+            e.charge()
+            e.flush()
+            e.emit(f"return {self.target(args[0])}")
+            return True
+        elif op == "callsub" and args[0] in self.inline:
+            self.expand(e, *self.inline[args[0]])
+        elif op == "callsub":
+            e.charge()
+            e.flush()
+            ret = fallthrough if fallthrough is not None else -2
+            e.emit(f"c.frames.append([{ret}, len(s), 0, 0, False])")
+            e.emit(f"return {self.target(args[0])}")
+            return True
+        elif op == "retsub":
+            e.charge()
+            e.flush()
+            e.emit("return _retsub(c, s)")
+            return True
+        elif op == "return":
+            e.charge()
+            e.emit(f"c.result = {e.uint(e.pop())}")
+            e.emit("return -1")
+            return True
+        elif op == "err":
+            e.charge()
+            e.emit("_fail('err opcode executed')")
+            return True
+        elif op == "switch":
+            i = e.uint(e.pop())
+            e.flush()
+            targets = ", ".join(str(self.target(t)) for t in args)
+            e.emit(f"if {i} < {len(args)}: {e.exit(f'({targets},)[{i}]')}")
+        elif op == "match":
+            value = e.pop()
+            cases = [e.pop() for _ in args][::-1]
+            e.flush()
+            if value[1] in (_B, _SENDER) and all(kind == _B for _, kind in cases):
+                # A selector table: one dict probe instead of a test per case.
+                # Earlier cases win, as with the linear scan.
+                table = {}
+                for case, label in zip(cases, args):
+                    table.setdefault(case[0], self.target(label))
+                name = f"MATCH_{len(self.tables)}"
+                self.tables.append(f"{name} = {{{', '.join(f'{case}: {target}' for case, target in table.items())}}}")
+                t = e.tmp()
+                e.emit(f"{t} = {name}.get({value[0]})")
+                e.emit(f"if {t} is not None: {e.exit(t)}")
+            else:
+                for case, label in zip(cases, args):
+                    e.emit(f"if _eq({case[0]}, {value[0]}): {e.exit(self.target(label))}")
+        else:
+            self.simple(e, ins)
+        return False
+
+    def simple(self, e: _BlockCompiler, ins: Instruction) -> None:
+        op, args = ins.op, ins.args
+        if op in ("intcblock", "bytecblock"):
+            self.constants[op] = args
+        elif op.startswith("intc"):
+            index = args[0] if op == "intc" else int(op[5:])
+            e.push_const(repr(self.constants["intcblock"][index]), _U)
+        elif op.startswith("bytec"):
+            index = args[0] if op == "bytec" else int(op[6:])
+            e.push_const(repr(self.constants["bytecblock"][index]), _B)
+        elif op in _OPS:
+            try:
+                _OPS[op](e, args)
+            except KeyError as exc:
+                raise ValueError(f"line {ins.line}: unsupported field {exc} for {op}") from None
+        else:
+            raise ValueError(f"line {ins.line}: unsupported opcode {op!r}")
+
+    def expand(self, e: _BlockCompiler, first: int, retsub: int, nargs: int, nrets: int) -> None:
+        """Inline a ``proto`` subroutine, keeping its frame on the symbolic stack."""
+        # proto and retsub themselves
+        e.cost += 2
+        params = [e.pop() for _ in range(nargs)][::-1]
+        outer, e.stack, e.frame = e.stack, params, nargs
+        try:
+            for ins in self.instructions[first:retsub]:
+                e.cost += OPCODE_COST.get(ins.op, 1)
+                self.simple(e, ins)
+            if len(e.stack) < nargs + nrets:
+                raise _NotInlinable()
+            results = e.stack[len(e.stack) - nrets:] if nrets else []
+        finally:
+            e.frame = None
+        e.stack = outer + results
+
+
+def _compile_source(instructions: Sequence[Instruction], labels: Dict[str, int]) -> Tuple[str, List[int]]:
+    inline = _inlinable_subroutines(instructions, labels)
+    while True:
+        gen = _Codegen(instructions, labels, inline)
+        try:
+            return gen.source(), gen.leaders
+        except _NotInlinable:
+            # Find the offender by expanding each candidate on its own
+            for label in list(inline):
+                try:
+                    _Codegen(instructions, labels, {label: inline[label]}).source()
+                except _NotInlinable:
+                    del inline[label]
+                    break
+            else:
+                inline.clear()
+
+
+@lru_cache(maxsize=32)
+def compile_program(teal: str) -> Program:
+    """Parse ``teal`` and translate it into Python block functions."""
+    version, instructions, labels = parse_teal(teal)
+    source, leaders = _compile_source(instructions, labels)
+    namespace = dict(_RUNTIME)
+    exec(compile(source, "<teal>", "exec"), namespace)
+    return Program(
+        version=version,
+        instructions=tuple(instructions),
+        labels=labels,
+        blocks=namespace["BLOCKS"],
+        block_starts=tuple(leaders),
+        uses_scratch=any(ins.op in _SCRATCH_OPS for ins in instructions),
+        uses_frames="c.frames" in source,
+        source=source,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+class AVM:
+    """Applies application calls to a :class:`Ledger`."""
+
+    def __init__(
+        self,
+        approval: Union[str, Program],
+        clear: Union[str, Program, None] = None,
+        ledger: Optional[Ledger] = None,
+    ):
+        self.approval = compile_program(approval) if isinstance(approval, str) else approval
+        self.clear = compile_program(clear) if isinstance(clear, str) else clear
+        self.ledger = ledger if ledger is not None else Ledger()
+
+    @classmethod
+    def from_build(cls, ledger: Optional[Ledger] = None, storage: str = "keys", **ledger_fields: Any) -> "AVM":
+        """Engine for the current contract, via the offline build cache.
+
+        Without a ``ledger`` one is created with the build's schema and
+        ``ledger_fields`` (``app_id``, ``creator``, ...).
+        """
+        from . import build
+
+        artifact, _ = build.build(storage=storage)
+        if ledger is None:
+            g, l = artifact.global_schema, artifact.local_schema
+            ledger = Ledger(
+                global_schema=(g["num_uints"], g["num_byte_slices"]),
+                local_schema=(l["num_uints"], l["num_byte_slices"]),
+                **ledger_fields,
+            )
+        return cls(artifact.approval.teal, artifact.clear.teal, ledger)
+
+    def call(self, txn: Transaction) -> CallResult:
+        """Apply a single transaction as a group of one."""
+        return self.apply_group((txn,))[0]
+
+    def apply_group(self, group: Sequence[Transaction]) -> List[CallResult]:
+        """Apply an atomic group; a rejected app call rolls back the whole group.
+
+        Returns one result per application call in the group.
+        """
+        ledger = self.ledger
+        local_states = ledger.locals
+        app_calls = 0
+        for i, txn in enumerate(group):
+            txn.group_index = i
+            if txn.type_enum == 6:
+                app_calls += 1
+                if txn.application_id is None:
+                    txn.application_id = ledger.app_id
+
+        c = _Context()
+        c.group = group
+        c.ledger = ledger
+        c.g = ledger.globals
+        c.writes = writes = []
+        c.cost = 0
+        c.budget = APP_CALL_BUDGET * app_calls
+        c.scratches = scratches = {}
+
+        results: List[CallResult] = []
+        created: List[bytes] = []
+        cleared: List[Tuple[bytes, dict]] = []
+        failed = False
+        for txn in group:
+            if txn.type_enum != 6:
+                continue
+            if failed:
+                results.append(CallResult(False, "group rejected", 0))
+                continue
+            start_writes = len(writes)
+            start_cost = c.cost
+            sender = txn.sender
+            oc = txn.on_completion
+            if oc == OPT_IN and sender not in local_states:
+                local_states[sender] = {}
+                created.append(sender)
+            program = self.clear if oc == CLEAR_STATE else self.approval
+            c.txn = txn
+            c.sl = local_states.get(sender, _NOT_OPTED_IN)
+            c.result = 0
+            c.logs = []
+            error = None
+            if program is None:
+                if oc != CLEAR_STATE:
+                    error = "no program"
+            else:
+                c.frames = [] if program.uses_frames else None
+                c.scratch = scratches[txn.group_index] = [0] * 256 if program.uses_scratch else None
+                try:
+                    self._run(program, c)
+                    if not c.result:
+                        error = "program returned 0"
+                except AVMError as exc:
+                    error = str(exc)
+                except (IndexError, TypeError, AttributeError, KeyError, ValueError, OverflowError) as exc:
+                    error = f"{type(exc).__name__}: {exc}"
+            if error is not None:
+                if oc != CLEAR_STATE:
+                    failed = True
+                    results.append(CallResult(False, error, c.cost - start_cost, tuple(c.logs)))
+                    continue
+                # A failing clear-state program still clears, but its writes are discarded
+                self._undo(writes, start_writes)
+
+            if txn.application_id == 0 and ledger.app_id == 0:
+                ledger.app_id = 1
+            if (oc == CLOSE_OUT or oc == CLEAR_STATE) and sender in local_states:
+                cleared.append((sender, local_states.pop(sender)))
+            results.append(CallResult(
+                True,
+                None,
+                c.cost - start_cost,
+                tuple(c.logs) if c.logs else (),
+                writes if app_calls == 1 else writes[start_writes:],
+                sender if oc == CLOSE_OUT or oc == CLEAR_STATE else None,
+            ))
+
+        if failed:
+            self._rollback(writes, created, cleared)
+            return [
+                r if not r.accepted else CallResult(False, "group rejected", r.cost, r.logs)
+                for r in results
+            ]
+        return results
+
+    def apply_batch(self, batch: Iterable[Union[Transaction, Sequence[Transaction]]]) -> List[CallResult]:
+        """Apply many transactions or groups in order; results are flattened.
+
+        The cyclic garbage collector is paused for the duration: a batch
+        allocates millions of short-lived, acyclic tuples and dicts, and
+        collection passes over them cost about a third of the run time.
+        """
+        results: List[CallResult] = []
+        extend = results.extend
+        apply_group = self.apply_group
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for item in batch:
+                extend(apply_group((item,) if isinstance(item, Transaction) else item))
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return results
+
+    @staticmethod
+    def _run(program: Program, c: _Context) -> None:
+        blocks = program.blocks
+        s: list = []
+        b = 0
+        while b >= 0:
+            b = blocks[b](c, s)
+        if b == -2:
+            raise AVMError("program ended inside a subroutine")
+        if c.cost > c.budget:
+            _over_budget(c)
+
+    @staticmethod
+    def _undo(writes: list, start: int = 0) -> None:
+        while len(writes) > start:
+            _addr, d, key, old, _new = writes.pop()
+            if old is _MISSING:
+                d.pop(key, None)
+            else:
+                d[key] = old
+
+    def _rollback(self, writes: list, created: List[bytes], cleared: List[Tuple[bytes, dict]]) -> None:
+        self._undo(writes)
+        for sender, state in cleared:
+            self.ledger.locals[sender] = state
+        for sender in created:
+            self.ledger.locals.pop(sender, None)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic traffic replay
+# ---------------------------------------------------------------------------
+
+def player_address(n: int) -> bytes:
+    return hashlib.sha256(b"player" + n.to_bytes(8, "big")).digest()
+
+
+def synthetic_traffic(players: int, calls: int, seed: int = 0) -> List[Union[Transaction, Tuple[Transaction, ...]]]:
+    """A reproducible mix of gameplay calls across ``players`` accounts."""
+    rng = random.Random(seed)
+    addresses = [player_address(n) for n in range(players)]
+    weights = {"battle": 40, "move": 30, "save_progress": 10, "buy_item": 10, "claim_rewards": 5, "trade": 5}
+    ops = list(weights)
+    cum = list(itertools.accumulate(weights.values()))
+    traffic: List[Union[Transaction, Tuple[Transaction, ...]]] = []
+    for _ in range(calls):
+        op = rng.choices(ops, cum_weights=cum)[0]
+        sender = addresses[rng.randrange(players)]
+        if op == "battle":
+            traffic.append(method_call(sender, "battle", rng.randint(1, 10)))
+        elif op == "move":
+            traffic.append(method_call(sender, "move", rng.randrange(75), rng.randrange(75)))
+        elif op == "save_progress":
+            stats = [rng.randint(1, 20), rng.randint(0, 5000), rng.randint(0, 5000), 100, 100, 50, 50, 15, 10, 20]
+            traffic.append(method_call(sender, "save_progress", *stats, rng.randrange(75), rng.randrange(75)))
+        elif op == "buy_item":
+            traffic.append(method_call(sender, "buy_item", rng.choice((10, 15, 500))))
+        elif op == "claim_rewards":
+            traffic.append(method_call(sender, "claim_rewards"))
+        else:
+            other = addresses[rng.randrange(players)]
+            price = rng.randint(1000, 100000)
+            traffic.append((
+                method_call(sender, "trade", 1, price, accounts=[other]),
+                payment(sender, other, price if rng.random() < 0.9 else price // 2),
+            ))
+    return traffic
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay synthetic traffic through the offline AVM.")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=("keys", "packed"), default="keys", help="local-state layout to build")
+    args = parser.parse_args(argv)
+
+    admin = player_address(-1 & 0xFFFF)
+    avm = AVM.from_build(storage=args.storage, app_id=0, creator=admin)
+    avm.call(app_call(admin, application_id=0))
+    for n in range(args.players):
+        avm.call(method_call(player_address(n), "create_player", f"Hero{n}", on_completion=OPT_IN))
+
+    traffic = synthetic_traffic(args.players, args.calls, args.seed)
+    start = time.perf_counter()
+    results = avm.apply_batch(traffic)
+    elapsed = time.perf_counter() - start
+
+    accepted = sum(r.accepted for r in results)
+    print(f"{len(results)} app calls in {elapsed:.2f}s ({len(results) / elapsed:,.0f} calls/s)")
+    print(f"  accepted {accepted}, rejected {len(results) - accepted}")
+    print(f"  mean cost {sum(r.cost for r in results) / len(results):.1f} opcodes")
+    totals = {k.decode(): v for k, v in sorted(avm.ledger.globals.items()) if type(v) is int}
+    print(f"  global state {totals}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
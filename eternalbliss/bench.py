@@ -0,0 +1,284 @@
+"""Offline benchmark and regression suite.
+
+Measures what the project's performance claims rest on, with seeded
+workloads and no network (the offline AVM stands in for algod):
+
+* **contract** - PyTeal compile time, instruction count of the approval
+  program and opcode cost of every operation (:mod:`eternalbliss.profiler`);
+* **avm** - replay time and mean cost of synthetic gameplay traffic,
+  without and with the leaderboard boxes;
+* **notes** - encoded size of player, position and chat notes, legacy JSON
+  and binary, and decode time (:mod:`eternalbliss.notes`);
+* **map** - reading, packing and unpacking ``maps/bliss.json``;
+* **client** - ``bench/headless.js``: parsing and loading bliss.json in the
+  game, ``renderWorld``, ``canMoveTo``, ``findPath`` and the mapmaker's
+  ``fillArea`` on synthetic maps from 64x64 to 1024x1024 (needs node).
+
+Every metric is lower-is-better and carries a tolerance. Sizes, counts and
+opcode costs are deterministic and must not grow at all; a timing fails when
+it more than doubles, plus an absolute floor that absorbs timer noise on
+sub-millisecond metrics (best-of-five timings still vary by half on a busy
+machine, so a tighter bound only reports noise). The run exits 1 when any metric regresses
+against ``bench/baseline.json``::
+
+    python -m eternalbliss.bench                     # compare, exit 1 on regression
+    python -m eternalbliss.bench --suite notes map   # only some suites
+    python -m eternalbliss.bench --save              # record a new baseline
+
+Timings are the best of ``--repeat`` runs. Baselines are per machine: save
+one before a change and compare after it on the same host. Deterministic
+metrics are comparable everywhere.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = ROOT / "bench" / "baseline.json"
+HEADLESS = ROOT / "bench" / "headless.js"
+BLISS = ROOT / "maps" / "bliss.json"
+
+FORMAT = "eternalbliss-bench"
+FORMAT_VERSION = 1
+DEFAULT_SEED = 1
+DEFAULT_REPEAT = 5
+DEFAULT_SIZES = (64, 256, 1024)
+MIN_SAMPLE_S = 0.25
+MAX_RUNS = 200
+
+# unit -> (relative tolerance, absolute floor in that unit)
+TOLERANCES = {
+    "ms": (1.0, 0.1),
+    "us": (1.0, 1.0),
+    "ns": (1.0, 100.0),
+    "opcodes": (0.0, 0.0),
+    "instructions": (0.0, 0.0),
+    "bytes": (0.0, 0.0),
+    "chunks": (0.0, 0.0),
+}
+
+
+class Metric(NamedTuple):
+    value: float
+    unit: str
+    tolerance: float
+    floor: float
+
+    def limit(self) -> float:
+        """Largest value that is not a regression of this baseline."""
+        return self.value * (1 + self.tolerance) + self.floor
+
+
+def metric(value: float, unit: str) -> Metric:
+    tolerance, floor = TOLERANCES[unit]
+    return Metric(value, unit, tolerance, floor)
+
+
+Metrics = Dict[str, Metric]
+
+
+def _best(repeat: int, fn: Callable[[], Any]) -> float:
+    """Fastest run of fn in ms: after a warm-up run, ``repeat`` runs and
+    more until MIN_SAMPLE_S have passed, so short calls get enough samples."""
+    fn()
+    best = float("inf")
+    began = time.perf_counter()
+    runs = 0
+    while runs < repeat or (time.perf_counter() - began < MIN_SAMPLE_S and runs < MAX_RUNS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+        runs += 1
+    return best * 1000
+
+
+# ---------------------------------------------------------------------------
+# Suites
+# ---------------------------------------------------------------------------
+
+
+def bench_contract(seed: int, repeat: int) -> Metrics:
+    from . import avm, build, profiler
+
+    metrics: Metrics = {}
+    metrics["contract.compile"] = metric(_best(repeat, build.compile_teal), "ms")
+    approval, _ = build.compile_teal()
+    metrics["contract.approval.instructions"] = metric(len(avm.parse_teal(approval)[1]), "instructions")
+    for op in profiler.profile_current().operations:
+        if not op.accepted:
+            raise RuntimeError(f"profiler scenario {op.name} was rejected: {op.error}")
+        metrics[f"contract.cost.{op.name}"] = metric(op.cost, "opcodes")
+    return metrics
+
+
+def bench_avm(seed: int, repeat: int, players: int = 200, calls: int = 20_000) -> Metrics:
+    from . import avm
+
+    traffic = avm.synthetic_traffic(players, calls, seed)
+    admin = avm.player_address(-1 & 0xFFFF)
+    metrics: Metrics = {}
+    # Without the leaderboard boxes (as python -m eternalbliss.avm runs),
+    # then with them, as a deployed app ranks every change
+    for prefix, ranked in (("avm", False), ("avm.ranked", True)):
+        best, results = float("inf"), []
+        for _ in range(repeat):
+            engine = avm.AVM.from_build(app_id=0, creator=admin)
+            engine.call(avm.app_call(admin, application_id=0))
+            if ranked:
+                engine.call(avm.method_call(admin, "create_leaderboards"))
+            for n in range(players):
+                engine.call(avm.method_call(avm.player_address(n), "create_player", f"Hero{n}", on_completion=avm.OPT_IN))
+            start = time.perf_counter()
+            results = engine.apply_batch(traffic)
+            best = min(best, time.perf_counter() - start)
+        metrics[f"{prefix}.call"] = metric(best * 1e6 / len(results), "us")
+        metrics[f"{prefix}.call.cost"] = metric(round(sum(r.cost for r in results) / len(results), 2), "opcodes")
+    return metrics
+
+
+def bench_notes(seed: int, repeat: int, count: int = 2000) -> Metrics:
+    from . import notes
+
+    metrics: Metrics = {}
+    runs = [notes.benchmark(count, seed) for _ in range(repeat)]
+    for rows in zip(*runs):
+        label = rows[0][0].replace(" ", ".")
+        metrics[f"notes.{label}.json"] = metric(round(rows[0][1], 2), "bytes")
+        metrics[f"notes.{label}.binary"] = metric(round(rows[0][2], 2), "bytes")
+        metrics[f"notes.{label}.decode"] = metric(1e6 / max(row[4] for row in rows), "us")
+    return metrics
+
+
+def bench_map(seed: int, repeat: int) -> Metrics:
+    from . import mappack
+
+    text = BLISS.read_text()
+    data = mappack.read_export(text)
+    manifest, files = mappack.pack(data)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "bliss"
+        mappack.write(manifest, files, out)
+        unpack = _best(repeat, lambda: mappack.unpack(out))
+    return {
+        "map.bliss.read": metric(_best(repeat, lambda: mappack.read_export(text)), "ms"),
+        "map.bliss.pack": metric(_best(repeat, lambda: mappack.pack(data)), "ms"),
+        "map.bliss.unpack": metric(unpack, "ms"),
+        "map.bliss.size": metric(sum(map(len, files.values())), "bytes"),
+        "map.bliss.chunks": metric(len(manifest["chunks"]), "chunks"),
+    }
+
+
+def bench_client(seed: int, repeat: int, sizes: Sequence[int] = DEFAULT_SIZES) -> Metrics:
+    node = shutil.which("node")
+    if not node:
+        raise RuntimeError("the client suite needs node on the PATH")
+    out = subprocess.run(
+        [node, str(HEADLESS), "--json", "--seed", str(seed), "--repeat", str(repeat), "--sizes", ",".join(map(str, sizes))],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return {name: metric(m["value"], m["unit"]) for name, m in json.loads(out).items()}
+
+
+SUITES: Dict[str, Callable[[int, int], Metrics]] = {
+    "contract": bench_contract,
+    "avm": bench_avm,
+    "notes": bench_notes,
+    "map": bench_map,
+    "client": bench_client,
+}
+
+
+def run(suites: Sequence[str] = tuple(SUITES), seed: int = DEFAULT_SEED, repeat: int = DEFAULT_REPEAT) -> Metrics:
+    metrics: Metrics = {}
+    for name in suites:
+        metrics.update(SUITES[name](seed, repeat))
+    return metrics
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+
+def save(metrics: Metrics, path: Path, seed: int) -> None:
+    data = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "seed": seed,
+        "machine": f"{platform.machine()} {platform.system()} python {platform.python_version()}",
+        "metrics": {name: m._replace(value=round(m.value, 4))._asdict() for name, m in sorted(metrics.items())},
+    }
+    path.write_text(json.dumps(data, indent=1) + "\n")
+
+
+def load(path: Path) -> Metrics:
+    data = json.loads(path.read_text())
+    if data.get("format") != FORMAT or data.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} benchmark baseline")
+    return {name: Metric(**m) for name, m in data["metrics"].items()}
+
+
+def compare(metrics: Metrics, baseline: Metrics) -> List[str]:
+    """Names of the metrics that regressed against the baseline."""
+    return [name for name, m in metrics.items() if name in baseline and m.value > baseline[name].limit()]
+
+
+def format_table(metrics: Metrics, baseline: Metrics) -> str:
+    header = f"{'metric':<38}{'value':>12}{'baseline':>12}{'change':>9}  unit"
+    lines = [header, "-" * len(header)]
+    for name, m in metrics.items():
+        old = baseline.get(name)
+        if old is None:
+            lines.append(f"{name:<38}{m.value:>12.3f}{'new':>12}{'':>9}  {m.unit}")
+            continue
+        change = f"{m.value / old.value - 1:+.1%}" if old.value else ""
+        status = "  REGRESSED" if m.value > old.limit() else ""
+        lines.append(f"{name:<38}{m.value:>12.3f}{old.value:>12.3f}{change:>9}  {m.unit}{status}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks and check them against a baseline.")
+    parser.add_argument("--suite", nargs="+", choices=tuple(SUITES), default=list(SUITES), help="suites to run")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per timing; the best counts")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    metrics = run(args.suite, args.seed, args.repeat)
+    if args.save:
+        if args.baseline.exists() and set(args.suite) != set(SUITES):
+            # Keep the other suites' baselines
+            metrics = {**load(args.baseline), **metrics}
+        save(metrics, args.baseline, args.seed)
+        print(f"saved {len(metrics)} metrics to {args.baseline}")
+        return 0
+
+    baseline = load(args.baseline) if args.baseline.exists() else {}
+    if args.json:
+        print(json.dumps({name: m._asdict() for name, m in metrics.items()}, indent=1))
+    else:
+        print(format_table(metrics, baseline))
+    regressed = compare(metrics, baseline)
+    if regressed:
+        print(f"\n{len(regressed)} regression(s): {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
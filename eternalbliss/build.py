@@ -0,0 +1,281 @@
+"""Build the EternalBliss programs with a content-addressed compile cache.
+
+Each build is keyed by the hash of the contract source, the installed PyTeal
+version, the TEAL version and the local-state storage mode. A cache entry holds the TEAL for both programs
+and, once assembled by algod, their bytecode and program hashes, so repeat
+builds (and deploys reading the artifact) skip compilation entirely when
+nothing has changed. Bytecode does not depend on the network, so one entry
+serves every deploy target.
+
+Usage::
+
+    python -m eternalbliss.build                 # compile + assemble via algod
+    python -m eternalbliss.build --offline       # TEAL only, no algod round-trip
+    python -m eternalbliss.build --storage packed  # one packed record per player
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from dataclasses import asdict, dataclass, field
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from . import abi, contract, leaderboard, record, routing, sync
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONTRACTS_DIR = REPO_ROOT / "contracts"
+BUILD_DIR = CONTRACTS_DIR / "build"
+DEFAULT_CACHE_DIR = BUILD_DIR / "cache"
+DEFAULT_ARTIFACT = BUILD_DIR / "eternalbliss.json"
+
+DEFAULT_ALGOD_URL = "https://testnet-api.algonode.cloud"
+
+# Bump when the artifact layout changes so stale entries are ignored
+ARTIFACT_FORMAT = 2
+
+
+@dataclass
+class Program:
+    """One compiled program: TEAL source plus its assembled form."""
+
+    teal: str
+    bytecode: Optional[str] = None  # base64, as returned by algod /v2/teal/compile
+    hash: Optional[str] = None  # program address
+
+    @property
+    def assembled(self) -> bool:
+        return self.bytecode is not None and self.hash is not None
+
+
+@dataclass
+class BuildArtifact:
+    """Everything a deploy needs, addressed by ``key``."""
+
+    key: str
+    source_hash: str
+    pyteal_version: str
+    teal_version: int
+    approval: Program
+    clear: Program
+    global_schema: Dict[str, int] = field(default_factory=dict)
+    local_schema: Dict[str, int] = field(default_factory=dict)
+    storage: str = contract.DEFAULT_STORAGE
+    format: int = ARTIFACT_FORMAT
+
+    @property
+    def assembled(self) -> bool:
+        return self.approval.assembled and self.clear.assembled
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2, sort_keys=True) + "\n"
+
+    @classmethod
+    def from_json(cls, text: str) -> "BuildArtifact":
+        data = json.loads(text)
+        data["approval"] = Program(**data["approval"])
+        data["clear"] = Program(**data["clear"])
+        return cls(**data)
+
+
+def source_hash(path: Optional[Path] = None) -> str:
+    """SHA-256 of the contract source and the modules that shape its TEAL:
+    the ABI method table, the record, action-log and leaderboard layouts and
+    the routing pass."""
+    paths = [Path(path)] if path else [Path(m.__file__) for m in (contract, abi, record, sync, leaderboard, routing)]
+    digest = hashlib.sha256()
+    for p in paths:
+        digest.update(p.read_bytes())
+    return digest.hexdigest()
+
+
+def pyteal_version() -> str:
+    try:
+        return metadata.version("pyteal")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def cache_key(src_hash: str, pyteal: str, teal_version: int, storage: str = contract.DEFAULT_STORAGE) -> str:
+    """Content address for a build of ``src_hash`` with a given toolchain."""
+    material = f"{ARTIFACT_FORMAT}\0{src_hash}\0{pyteal}\0{teal_version}\0{storage}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def schema(storage: str = contract.DEFAULT_STORAGE) -> Tuple[Dict[str, int], Dict[str, int]]:
+    local_uints, local_bytes = contract.local_schema(storage)
+    return (
+        {"num_uints": contract.GLOBAL_NUM_UINTS, "num_byte_slices": contract.GLOBAL_NUM_BYTE_SLICES},
+        {"num_uints": local_uints, "num_byte_slices": local_bytes},
+    )
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _write_if_changed(path: Path, text: str) -> bool:
+    """Write ``text`` unless the file already holds it; keeps mtimes stable."""
+    if path.exists() and path.read_text() == text:
+        return False
+    _write_atomic(path, text)
+    return True
+
+
+class CompileCache:
+    """Directory of ``<key>.json`` build artifacts."""
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[BuildArtifact]:
+        try:
+            artifact = BuildArtifact.from_json(self.path(key).read_text())
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+        if artifact.key != key or artifact.format != ARTIFACT_FORMAT:
+            return None
+        return artifact
+
+    def put(self, artifact: BuildArtifact) -> None:
+        _write_atomic(self.path(artifact.key), artifact.to_json())
+
+
+def compile_teal(teal_version: int = contract.TEAL_VERSION, storage: str = contract.DEFAULT_STORAGE) -> Tuple[str, str]:
+    """Compile the approval and clear-state programs to TEAL.
+
+    The approval program's selector chain is lowered to a ``match``.
+    """
+    from pyteal import Mode, compileTeal
+
+    approval = compileTeal(contract.approval_program(storage), mode=Mode.Application, version=teal_version)
+    approval = routing.lower_method_dispatch(approval)
+    clear = compileTeal(contract.clear_state_program(), mode=Mode.Application, version=teal_version)
+    return approval, clear
+
+
+def assemble(algod_client: Any, teal: str) -> Program:
+    """Assemble ``teal`` through algod's compile endpoint."""
+    result = algod_client.compile(teal)
+    return Program(teal=teal, bytecode=result["result"], hash=result["hash"])
+
+
+def build(
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    algod_client: Any = None,
+    force: bool = False,
+    storage: str = contract.DEFAULT_STORAGE,
+) -> Tuple[BuildArtifact, bool]:
+    """Build both programs, reusing the cache whenever possible.
+
+    Returns ``(artifact, cache_hit)``. A cached entry without bytecode is
+    upgraded in place when an ``algod_client`` is supplied, reusing its TEAL.
+    """
+    cache = CompileCache(cache_dir)
+    src_hash = source_hash()
+    pyteal = pyteal_version()
+    key = cache_key(src_hash, pyteal, contract.TEAL_VERSION, storage)
+
+    cached = None if force else cache.get(key)
+    if cached is not None and (cached.assembled or algod_client is None):
+        return cached, True
+
+    if cached is not None:
+        approval_teal, clear_teal = cached.approval.teal, cached.clear.teal
+    else:
+        approval_teal, clear_teal = compile_teal(contract.TEAL_VERSION, storage)
+
+    if algod_client is not None:
+        approval = assemble(algod_client, approval_teal)
+        clear = assemble(algod_client, clear_teal)
+    else:
+        approval, clear = Program(approval_teal), Program(clear_teal)
+
+    global_schema, local_schema = schema(storage)
+    artifact = BuildArtifact(
+        key=key,
+        source_hash=src_hash,
+        pyteal_version=pyteal,
+        teal_version=contract.TEAL_VERSION,
+        approval=approval,
+        clear=clear,
+        global_schema=global_schema,
+        local_schema=local_schema,
+        storage=storage,
+    )
+    cache.put(artifact)
+    return artifact, False
+
+
+def write_outputs(
+    artifact: BuildArtifact,
+    artifact_path: Path = DEFAULT_ARTIFACT,
+    teal_dir: Path = CONTRACTS_DIR,
+) -> None:
+    """Publish the artifact and the plain ``.teal`` files used by the deployers."""
+    _write_if_changed(Path(artifact_path), artifact.to_json())
+    _write_if_changed(Path(teal_dir) / "approval.teal", artifact.approval.teal)
+    _write_if_changed(Path(teal_dir) / "clear.teal", artifact.clear.teal)
+
+
+def _algod_client(url: str, token: str) -> Any:
+    try:
+        from algosdk.v2client.algod import AlgodClient
+    except ImportError:
+        raise SystemExit("py-algorand-sdk is required to assemble; install eternalbliss[algod] or pass --offline")
+    return AlgodClient(token, url)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the EternalBliss PyTeal programs.")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--artifact", type=Path, default=DEFAULT_ARTIFACT, help="where to write the deploy artifact")
+    parser.add_argument("--teal-dir", type=Path, default=CONTRACTS_DIR, help="where to write approval.teal/clear.teal")
+    parser.add_argument("--algod-url", default=os.environ.get("ALGOD_URL", DEFAULT_ALGOD_URL))
+    parser.add_argument("--algod-token", default=os.environ.get("ALGOD_TOKEN", ""))
+    parser.add_argument("--offline", action="store_true", help="skip assembly; cache TEAL only")
+    parser.add_argument("--force", action="store_true", help="ignore the cache and rebuild")
+    parser.add_argument(
+        "--storage",
+        choices=contract.STORAGE_MODES,
+        default=contract.DEFAULT_STORAGE,
+        help="local-state layout: one key per stat, or one packed record",
+    )
+    args = parser.parse_args(argv)
+
+    algod_client = None if args.offline else _algod_client(args.algod_url, args.algod_token)
+    artifact, hit = build(args.cache_dir, algod_client, force=args.force, storage=args.storage)
+    write_outputs(artifact, args.artifact, args.teal_dir)
+
+    print(f"EternalBliss build {artifact.key[:12]} ({'cache hit' if hit else 'compiled'})")
+    print(f"  PyTeal {artifact.pyteal_version}, TEAL v{artifact.teal_version}, {artifact.storage} storage")
+    if artifact.assembled:
+        print(f"  approval: {artifact.approval.hash}")
+        print(f"  clear:    {artifact.clear.hash}")
+    else:
+        print("  bytecode: not assembled (offline)")
+    g, l = artifact.global_schema, artifact.local_schema
+    print(f"  Global State: {g['num_uints']} uints, {g['num_byte_slices']} bytes")
+    print(f"  Local State: {l['num_uints']} uints, {l['num_byte_slices']} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,497 @@
+"""On-chain game bundle: chunked, compressed, content-addressed releases.
+
+The client (``index.html``, ``styles.css``, ``script.js``, its helper
+scripts and the packed map) is published as transaction notes and loaded
+back by the id of one entry transaction. Each file is cut into blocks at
+content-defined boundaries (a gear rolling hash over the file bytes), so an
+edit changes the blocks it touches and leaves the others byte-identical.
+Every block is zlib-compressed (or kept raw when that is smaller) and split
+into chunks that fit one note::
+
+    note    "CHRPG:BUNDLE:", version byte, payload (up to CHUNK_SIZE bytes)
+    block   encoding byte (0 raw, 1 zlib), then the file bytes it covers
+
+A chunk is addressed by the SHA-256 of its payload. The manifest lists
+every file (size, SHA-256 and its blocks as chunk indexes) and every chunk
+(SHA-256, size, txid), plus a Merkle root over the chunk hashes. It is
+published compressed in chunks of its own, and the entry note names them
+together with the manifest's hash and the root, so the entry txid pins the
+whole release.
+
+Publishing sends 0-ALGO self-payments carrying the notes, in atomic groups
+of :data:`GROUP_SIZE`; given the previous release, chunks it already
+published are referenced by their old txids instead of being sent again.
+Loading fetches the entry and the manifest, then every chunk in parallel,
+verifies each one against its hash and keeps it in a local cache, so the
+next release only downloads the chunks that changed. ``loader.html`` does
+the same in the browser, with Cache Storage as the cache::
+
+    python -m eternalbliss.bundle --publish --previous bundle.json   # mnemonic in $ETERNALBLISS_MNEMONIC
+    python -m eternalbliss.bundle --publish --sender <address> --unsigned bundle.txns
+    python -m eternalbliss.bundle --load <entry txid> --out site/
+    python -m eternalbliss.bundle --offline   # cold start, sequential vs parallel, and an upgrade
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .indexer import DEFAULT_INDEXER_URL
+
+FORMAT = "eternalbliss-bundle"
+FORMAT_VERSION = 1
+NOTE_VERSION = 1
+PREFIX = b"CHRPG:BUNDLE:"
+NOTE_SIZE = 1024
+CHUNK_SIZE = NOTE_SIZE - len(PREFIX) - 1
+# Transactions per atomic group
+GROUP_SIZE = 16
+# Entry notes are JSON and must fit one note, which bounds the manifest
+MAX_MANIFEST_PARTS = 14
+DEFAULT_WORKERS = 8
+
+RAW = 0
+DEFLATE = 1
+
+# Files of a release, relative to the repository root; directories are
+# published whole
+DEFAULT_FILES = ("index.html", "styles.css", "note-codec.js", "txn-service.js", "client-worker.js", "perf-monitor.js", "script.js", "maps/bliss")
+ROOT = Path(__file__).resolve().parent.parent
+
+# Content-defined block boundaries: a cut after a byte where the top
+# BLOCK_BITS bits of the rolling hash are zero, so blocks average about
+# MIN_BLOCK + 2 ** BLOCK_BITS bytes
+MIN_BLOCK = 2048
+MAX_BLOCK = 32768
+BLOCK_BITS = 12
+_GEAR = [int.from_bytes(hashlib.sha256(bytes((i,))).digest()[:4], "big") for i in range(256)]
+
+Send = Callable[[List[bytes]], List[str]]
+
+
+def collect(root: Path, paths: Sequence[str] = DEFAULT_FILES) -> Dict[str, bytes]:
+    """``{posix path: bytes}`` of the files under ``root``, directories expanded."""
+    files: Dict[str, bytes] = {}
+    for path in paths:
+        full = root / path
+        members = sorted(p for p in full.rglob("*") if p.is_file()) if full.is_dir() else [full]
+        for member in members:
+            files[member.relative_to(root).as_posix()] = member.read_bytes()
+    return files
+
+
+# ---------------------------------------------------------------------------
+# Blocks and chunks
+# ---------------------------------------------------------------------------
+
+def split_blocks(data: bytes) -> List[bytes]:
+    """``data`` cut at content-defined boundaries."""
+    blocks = []
+    start, n = 0, len(data)
+    shift = 32 - BLOCK_BITS
+    while start < n:
+        end = min(n, start + MAX_BLOCK)
+        cut = end
+        h = 0
+        for i in range(start, end):
+            h = ((h << 1) + _GEAR[data[i]]) & 0xFFFFFFFF
+            if i - start >= MIN_BLOCK and not h >> shift:
+                cut = i + 1
+                break
+        blocks.append(data[start:cut])
+        start = cut
+    return blocks
+
+
+def encode_block(data: bytes) -> bytes:
+    packed = zlib.compress(data, 9)
+    if len(packed) < len(data):
+        return bytes((DEFLATE,)) + packed
+    return bytes((RAW,)) + data
+
+
+def decode_block(data: bytes) -> bytes:
+    if data[0] == DEFLATE:
+        return zlib.decompress(data[1:])
+    if data[0] == RAW:
+        return data[1:]
+    raise ValueError(f"unknown block encoding {data[0]}")
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def merkle_root(digests: Sequence[str]) -> str:
+    """Root of a binary hash tree over ``digests``; an odd node is carried up."""
+    level = [bytes.fromhex(d) for d in digests] or [hashlib.sha256().digest()]
+    while len(level) > 1:
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def note(payload: bytes) -> bytes:
+    if len(payload) > CHUNK_SIZE:
+        raise ValueError(f"{len(payload)} bytes do not fit one note")
+    return PREFIX + bytes((NOTE_VERSION,)) + payload
+
+
+def payload(note_bytes: bytes) -> bytes:
+    """The payload of a bundle note."""
+    if not note_bytes.startswith(PREFIX) or len(note_bytes) <= len(PREFIX):
+        raise ValueError("not a bundle note")
+    if note_bytes[len(PREFIX)] != NOTE_VERSION:
+        raise ValueError(f"unsupported bundle note version {note_bytes[len(PREFIX)]}")
+    return note_bytes[len(PREFIX) + 1:]
+
+
+def _pieces(data: bytes) -> List[bytes]:
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)] or [b""]
+
+
+def pack(files: Dict[str, bytes]) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """``(manifest, {sha256: chunk})`` of a release; chunks carry no txid yet."""
+    index: Dict[str, int] = {}
+    chunks: Dict[str, bytes] = {}
+    entries = []
+    for path, data in files.items():
+        blocks = []
+        for block in split_blocks(data):
+            refs = []
+            for piece in _pieces(encode_block(block)):
+                digest = sha256(piece)
+                if digest not in index:
+                    index[digest] = len(index)
+                    chunks[digest] = piece
+                refs.append(index[digest])
+            blocks.append(refs)
+        entries.append({"path": path, "size": len(data), "sha256": sha256(data), "blocks": blocks})
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "files": entries,
+        "chunks": [{"sha256": digest, "bytes": len(piece), "txid": None} for digest, piece in chunks.items()],
+        "root": merkle_root(list(chunks)),
+    }
+    return manifest, chunks
+
+
+def assemble(manifest: Dict[str, Any], chunks: Dict[str, bytes]) -> Dict[str, bytes]:
+    """The files of a release from its verified chunks, checking every file hash."""
+    digests = [c["sha256"] for c in manifest["chunks"]]
+    files = {}
+    for entry in manifest["files"]:
+        data = b"".join(decode_block(b"".join(chunks[digests[i]] for i in refs)) for refs in entry["blocks"])
+        if len(data) != entry["size"] or sha256(data) != entry["sha256"]:
+            raise ValueError(f"{entry['path']}: hash mismatch")
+        files[entry["path"]] = data
+    return files
+
+
+# ---------------------------------------------------------------------------
+# Publishing
+# ---------------------------------------------------------------------------
+
+class Release(NamedTuple):
+    entry: str
+    manifest: Dict[str, Any]
+    sent: int
+    reused: int
+
+
+def publish(files: Dict[str, bytes], send: Send, previous: Optional[Dict[str, Any]] = None) -> Release:
+    """Publish a release through ``send``, which sends one atomic group of
+    notes and returns their txids.
+
+    Chunks listed with a txid in ``previous`` (an earlier release's
+    manifest) are not sent again. Groups go out in order: new chunks, the
+    manifest, then the entry on its own.
+    """
+    manifest, chunks = pack(files)
+    known = {c["sha256"]: c["txid"] for c in (previous or {}).get("chunks", []) if c.get("txid")}
+    fresh = [digest for digest in chunks if digest not in known]
+    txids = dict(known)
+    for start in range(0, len(fresh), GROUP_SIZE):
+        group = fresh[start:start + GROUP_SIZE]
+        txids.update(zip(group, send([note(chunks[digest]) for digest in group])))
+    for chunk in manifest["chunks"]:
+        chunk["txid"] = txids[chunk["sha256"]]
+
+    text = json.dumps(manifest, separators=(",", ":")).encode()
+    parts = _pieces(zlib.compress(text, 9))
+    if len(parts) > MAX_MANIFEST_PARTS:
+        raise ValueError(f"manifest needs {len(parts)} notes, at most {MAX_MANIFEST_PARTS} fit an entry")
+    part_txids = []
+    for start in range(0, len(parts), GROUP_SIZE):
+        part_txids += send([note(part) for part in parts[start:start + GROUP_SIZE]])
+
+    entry = {"format": FORMAT, "version": FORMAT_VERSION, "manifest": sha256(text), "root": manifest["root"], "parts": part_txids}
+    entry_txid = send([note(json.dumps(entry, separators=(",", ":")).encode())])[0]
+    return Release(entry_txid, manifest, len(fresh) + len(parts) + 1, len(chunks) - len(fresh))
+
+
+class AlgodPublisher:
+    """Sends notes as 0-ALGO self-payments through algod (needs py-algorand-sdk).
+
+    Without a private key the groups are only built: their txids are final
+    once the group ids are assigned, and :meth:`write` saves them unsigned
+    for signing elsewhere within the validity window.
+    """
+
+    def __init__(self, sender: str, private_key: Optional[str] = None,
+                 url: str = "https://testnet-api.algonode.cloud", token: str = ""):
+        try:
+            from algosdk import transaction
+            from algosdk.v2client import algod
+        except ImportError:
+            raise SystemExit("py-algorand-sdk is required to publish a bundle; install eternalbliss[algod]")
+        self.transaction = transaction
+        self.client = algod.AlgodClient(token, url)
+        self.sender = sender
+        self.private_key = private_key
+        self.params = self.client.suggested_params()
+        self.unsigned: List[Any] = []
+
+    def send(self, notes: List[bytes]) -> List[str]:
+        txns = [self.transaction.PaymentTxn(self.sender, self.params, self.sender, 0, note=n) for n in notes]
+        if len(txns) > 1:
+            self.transaction.assign_group_id(txns)
+        if self.private_key is None:
+            self.unsigned += txns
+        else:
+            self.client.send_transactions([txn.sign(self.private_key) for txn in txns])
+        return [txn.get_txid() for txn in txns]
+
+    def wait(self, txid: str) -> None:
+        self.transaction.wait_for_confirmation(self.client, txid, 10)
+
+    def write(self, path: Path) -> None:
+        self.transaction.write_to_file(self.unsigned, str(path))
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+class IndexerNotes:
+    """Notes by txid from an Algorand indexer (needs py-algorand-sdk)."""
+
+    def __init__(self, url: str = DEFAULT_INDEXER_URL, token: str = ""):
+        try:
+            from algosdk.v2client.indexer import IndexerClient
+        except ImportError:
+            raise SystemExit("py-algorand-sdk is required to read an indexer; install eternalbliss[algod]")
+        self.client = IndexerClient(token, url)
+
+    def note(self, txid: str) -> bytes:
+        return base64.b64decode(self.client.transaction(txid)["transaction"].get("note", ""))
+
+
+class LocalNotes:
+    """In-memory stand-in for the chain: ``send`` confirms a group of notes,
+    ``note`` reads one back.
+
+    ``latency`` delays every read, to stand in for the indexer round trip.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.notes: Dict[str, bytes] = {}
+        self.reads = 0
+        self._lock = threading.Lock()
+
+    def send(self, notes: List[bytes]) -> List[str]:
+        txids = []
+        for n in notes:
+            txid = f"TX{len(self.notes):08d}"
+            self.notes[txid] = n
+            txids.append(txid)
+        return txids
+
+    def note(self, txid: str) -> bytes:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.reads += 1
+        return self.notes[txid]
+
+
+class Loaded(NamedTuple):
+    files: Dict[str, bytes]
+    manifest: Dict[str, Any]
+    fetched: int
+    cached: int
+
+
+def load(source: Any, entry_txid: str, cache: Optional[Path] = None, workers: int = DEFAULT_WORKERS) -> Loaded:
+    """Fetch, verify and assemble the release whose entry is ``entry_txid``.
+
+    Chunks found in ``cache`` (one file per chunk, named by its hash) are
+    not fetched; fetched chunks are written there once verified.
+    """
+    entry = json.loads(payload(source.note(entry_txid)))
+    if entry.get("format") != FORMAT or entry.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{entry_txid} is not a version {FORMAT_VERSION} bundle entry")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(lambda txid: payload(source.note(txid)), entry["parts"]))
+        text = zlib.decompress(b"".join(parts))
+        if sha256(text) != entry["manifest"]:
+            raise ValueError("manifest hash mismatch")
+        manifest = json.loads(text)
+        digests = [c["sha256"] for c in manifest["chunks"]]
+        if merkle_root(digests) != entry["root"] or manifest["root"] != entry["root"]:
+            raise ValueError("root hash mismatch")
+
+        chunks: Dict[str, bytes] = {}
+        if cache is not None:
+            cache.mkdir(parents=True, exist_ok=True)
+            for digest in digests:
+                path = cache / digest
+                if path.exists():
+                    data = path.read_bytes()
+                    if sha256(data) == digest:
+                        chunks[digest] = data
+        missing = [c for c in manifest["chunks"] if c["sha256"] not in chunks]
+
+        def fetch(chunk: Dict[str, Any]) -> Tuple[str, bytes]:
+            data = payload(source.note(chunk["txid"]))
+            if sha256(data) != chunk["sha256"]:
+                raise ValueError(f"chunk {chunk['txid']}: hash mismatch")
+            if cache is not None:
+                temp = cache / f"{chunk['sha256']}.part"
+                temp.write_bytes(data)
+                temp.replace(cache / chunk["sha256"])
+            return chunk["sha256"], data
+
+        chunks.update(pool.map(fetch, missing))
+    return Loaded(assemble(manifest, chunks), manifest, 1 + len(parts) + len(missing), len(digests) - len(missing))
+
+
+def write_site(files: Dict[str, bytes], out: Path) -> None:
+    for path, data in files.items():
+        target = out / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+
+# ---------------------------------------------------------------------------
+# Offline benchmark
+# ---------------------------------------------------------------------------
+
+def _edit(data: bytes) -> bytes:
+    """``data`` with one line inserted halfway, as a small release would."""
+    middle = data.index(b"\n", len(data) // 2) + 1
+    return data[:middle] + b"// patched\n" + data[middle:]
+
+
+def _offline(latency: float, workers: int) -> int:
+    files = collect(ROOT)
+    source = LocalNotes(latency)
+    release = publish(files, source.send)
+    manifest = release.manifest
+    size = sum(map(len, files.values()))
+    stored = sum(c["bytes"] for c in manifest["chunks"])
+    print(f"{len(files)} files, {size:,} bytes -> {len(manifest['chunks'])} chunks, {stored:,} bytes; "
+          f"{release.sent} notes published")
+
+    for label, n in (("sequential", 1), (f"{workers} parallel", workers)):
+        start = time.perf_counter()
+        loaded = load(source, release.entry, workers=n)
+        print(f"  cold start, {label:>11}: {loaded.fetched} notes in {time.perf_counter() - start:.2f}s")
+        if loaded.files != files:
+            print("  MISMATCH: loaded files differ from the published ones")
+            return 1
+
+    with tempfile.TemporaryDirectory() as cache:
+        load(source, release.entry, Path(cache), workers)
+        start = time.perf_counter()
+        again = load(source, release.entry, Path(cache), workers)
+        print(f"  warm start: {again.fetched} notes, {again.cached} chunks cached, {time.perf_counter() - start:.2f}s")
+
+        files["script.js"] = _edit(files["script.js"])
+        upgrade = publish(files, source.send, manifest)
+        start = time.perf_counter()
+        loaded = load(source, upgrade.entry, Path(cache), workers)
+        print(f"  upgrade (one line of script.js): {upgrade.sent} notes published, {upgrade.reused} chunks reused; "
+              f"{loaded.fetched} notes fetched in {time.perf_counter() - start:.2f}s")
+        if loaded.files != files:
+            print("  MISMATCH: upgraded files differ from the published ones")
+            return 1
+    return 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Publish the game bundle on-chain, or load it back.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--publish", action="store_true", help="publish the files under --root")
+    mode.add_argument("--load", metavar="TXID", help="load the release with this entry txid")
+    mode.add_argument("--offline", action="store_true", help="publish and load through an in-memory chain")
+    parser.add_argument("--root", type=Path, default=ROOT, help="directory the bundle files are read from")
+    parser.add_argument("--files", nargs="+", default=list(DEFAULT_FILES), help="files and directories to publish")
+    parser.add_argument("--previous", type=Path, help="manifest of the last release; its chunks are not sent again")
+    parser.add_argument("--manifest", type=Path, default=Path("bundle.json"), help="where --publish writes the release manifest")
+    parser.add_argument("--sender", help="build unsigned transactions from this address (with --unsigned)")
+    parser.add_argument("--unsigned", type=Path, help="write the groups unsigned to this file instead of sending")
+    parser.add_argument("--algod-url", default="https://testnet-api.algonode.cloud")
+    parser.add_argument("--algod-token", default="")
+    parser.add_argument("--indexer-url", default=DEFAULT_INDEXER_URL)
+    parser.add_argument("--indexer-token", default="")
+    parser.add_argument("--out", type=Path, help="directory --load writes the files to")
+    parser.add_argument("--cache", type=Path, default=Path.home() / ".cache" / "eternalbliss" / "bundle")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--latency", type=float, default=0.15, help="seconds per --offline note read (indexer round trip)")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        return _offline(args.latency, args.workers)
+
+    if args.load:
+        source = IndexerNotes(args.indexer_url, args.indexer_token)
+        start = time.perf_counter()
+        loaded = load(source, args.load, args.cache, args.workers)
+        print(f"{args.load}: {len(loaded.files)} files, {loaded.fetched} notes fetched, {loaded.cached} chunks cached, "
+              f"{time.perf_counter() - start:.1f}s")
+        if args.out:
+            write_site(loaded.files, args.out)
+            print(f"  written to {args.out}/")
+        return 0
+
+    if args.unsigned:
+        if not args.sender:
+            parser.error("--unsigned needs --sender")
+        publisher = AlgodPublisher(args.sender, None, args.algod_url, args.algod_token)
+    else:
+        words = os.environ.get("ETERNALBLISS_MNEMONIC")
+        if not words:
+            parser.error("set ETERNALBLISS_MNEMONIC to publish, or use --unsigned")
+        from .client import Account
+
+        account = Account.from_mnemonic(words)
+        publisher = AlgodPublisher(account.address, account.private_key, args.algod_url, args.algod_token)
+    previous = json.loads(args.previous.read_text()) if args.previous else None
+    release = publish(collect(args.root, args.files), publisher.send, previous)
+    args.manifest.write_text(json.dumps(dict(release.manifest, entry=release.entry), indent=1))
+    if args.unsigned:
+        publisher.write(args.unsigned)
+        print(f"{release.sent} transactions written unsigned to {args.unsigned}")
+    else:
+        publisher.wait(release.entry)
+    print(f"entry {release.entry}: {release.sent} notes sent, {release.reused} chunks reused; manifest in {args.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,917 @@
+"""Asyncio client for the EternalBliss application.
+
+The browser talks to the contract through ``EternalBlissContract`` in
+``contracts/eternalbliss-contract.js``, one request at a time. Bots and ops
+tools drive thousands of calls an hour, so :class:`EternalBlissClient` offers
+the same surface for asyncio, built for throughput:
+
+* algod requests go over a pool of HTTP/1.1 keep-alive connections
+  (:class:`ConnectionPool`, stdlib only);
+* suggested params and confirmations are shared by every call, as in
+  ``txn-service.js``: params are fetched once and slid forward each round,
+  and one block watcher resolves every pending transaction from the block's
+  txid list (:class:`TxnService`);
+* many signed calls are submitted concurrently, with at most ``in_flight``
+  sent but unconfirmed at once (:meth:`EternalBlissClient.call_many`);
+* player states are read concurrently (:meth:`EternalBlissClient.get_player_states`).
+
+Typical use::
+
+    async with EternalBlissClient(app_id, "http://localhost:4001", token) as client:
+        await client.opt_in(bot, "Bot1")
+        await client.battle_enemy(bot, 3)
+        results = await client.call_many([(bot, "move", (x, y)) for bot, x, y in moves])
+        states = await client.get_player_states(addresses)
+
+Building and signing transactions needs py-algorand-sdk
+(``eternalbliss[algod]``). :class:`MockAlgod` serves the algod endpoints the
+client uses from an in-memory :class:`eternalbliss.avm.AVM`, for tests and
+load runs; ``python -m eternalbliss.client`` runs a bot session against it,
+sequential and pipelined.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import collections
+import json
+import logging
+import random
+import ssl
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Union
+from urllib.parse import parse_qs, quote, urlparse
+
+from . import leaderboard, record
+from .abi import call_args
+
+DEFAULT_ALGOD_URL = "https://testnet-api.algonode.cloud"
+# Keep-alive connections per client (the block watcher has its own)
+DEFAULT_CONNECTIONS = 8
+# Transactions sent but not yet confirmed, per client
+DEFAULT_IN_FLIGHT = 64
+# Rounds a transaction may stay unconfirmed, as the JS client waits
+WAIT_ROUNDS = 4
+# Refetch suggested params (fee, genesis) at least this often
+PARAMS_REFRESH_ROUNDS = 100
+# With no watcher running, the last round seen is trusted this long
+ROUND_TIME = 3.3
+# First wait before the watcher retries a failed algod request; it doubles
+# up to ROUND_TIME
+RETRY_DELAY = 0.25
+# While algod is unreachable, a wait fails this many rounds' time after its
+# own rounds would have passed
+DEADLINE_SLACK_ROUNDS = 2
+
+log = logging.getLogger(__name__)
+# Validity window of a transaction, in rounds
+VALID_ROUNDS = 1000
+
+Value = Union[int, bytes]
+
+
+def _algosdk() -> Any:
+    try:
+        import algosdk
+        import algosdk.account
+        import algosdk.atomic_transaction_composer
+        import algosdk.mnemonic
+        import algosdk.transaction
+    except ImportError:
+        raise SystemExit("py-algorand-sdk is required to build transactions; install eternalbliss[algod]")
+    return algosdk
+
+
+class AlgodHTTPError(Exception):
+    """algod answered with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class Account(NamedTuple):
+    address: str
+    private_key: str
+
+    @classmethod
+    def generate(cls) -> "Account":
+        private_key, address = _algosdk().account.generate_account()
+        return cls(address, private_key)
+
+    @classmethod
+    def from_mnemonic(cls, words: str) -> "Account":
+        sdk = _algosdk()
+        private_key = sdk.mnemonic.to_private_key(words)
+        return cls(sdk.account.address_from_private_key(private_key), private_key)
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+class ConnectionPool:
+    """HTTP/1.1 keep-alive connections to one host.
+
+    At most ``size`` requests are on the wire at once, each on an idle
+    connection when there is one. A request that fails on a reused
+    connection (the server closed it while idle) is retried on another;
+    resending a transaction is harmless, algod rejects a duplicate txid.
+    """
+
+    def __init__(self, url: str, headers: Optional[Mapping[str, str]] = None, size: int = DEFAULT_CONNECTIONS, timeout: float = 30.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.tls = parsed.scheme == "https"
+        self.port = parsed.port or (443 if self.tls else 80)
+        self.base = parsed.path.rstrip("/")
+        self.headers = {"Host": parsed.netloc, "Connection": "keep-alive", **(headers or {})}
+        self.timeout = timeout
+        self.opened = 0
+        self.requests = 0
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        context = ssl.create_default_context() if self.tls else None
+        connection = await asyncio.open_connection(self.host, self.port, ssl=context)
+        self.opened += 1
+        return connection
+
+    @staticmethod
+    def _close(connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter]) -> None:
+        connection[1].close()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b"",
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, bytes]:
+        """Send one request; returns ``(status, body)``."""
+        lines = [f"{method} {self.base}{path} HTTP/1.1"]
+        lines += [f"{name}: {value}" for name, value in {**self.headers, **(headers or {})}.items()]
+        lines.append(f"Content-Length: {len(body)}")
+        message = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                connection = self._idle.pop() if reused else await self._open()
+                try:
+                    status, data, keep = await asyncio.wait_for(
+                        self._exchange(connection, message), self.timeout if timeout is None else timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self._close(connection)
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    self._close(connection)
+                    raise
+                self.requests += 1
+                if keep:
+                    self._idle.append(connection)
+                else:
+                    self._close(connection)
+                return status, data
+
+    @staticmethod
+    async def _exchange(connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter], message: bytes) -> Tuple[int, bytes, bool]:
+        reader, writer = connection
+        writer.write(message)
+        await writer.drain()
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError("connection closed by server")
+        version, status = line.split(None, 2)[:2]
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if not size:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep = False
+        return int(status), data, keep
+
+    def close(self) -> None:
+        while self._idle:
+            self._close(self._idle.pop())
+
+
+class AsyncAlgod:
+    """The algod v2 endpoints the client uses, as JSON.
+
+    Long polls (``status_after_block``) go over their own connection, so the
+    block watcher never holds one of the pool's.
+    """
+
+    def __init__(self, url: str = DEFAULT_ALGOD_URL, token: str = "", connections: int = DEFAULT_CONNECTIONS, timeout: float = 30.0):
+        headers = {"X-Algo-API-Token": token} if token else {}
+        self.pool = ConnectionPool(url, headers, connections, timeout)
+        self.long_poll = ConnectionPool(url, headers, 1, timeout)
+
+    async def _json(self, method: str, path: str, body: bytes = b"", pool: Optional[ConnectionPool] = None, **kwargs: Any) -> Any:
+        status, data = await (pool or self.pool).request(method, path, body, **kwargs)
+        try:
+            payload = json.loads(data) if data else {}
+        except ValueError:
+            payload = {"message": data.decode(errors="replace")}
+        if status >= 400:
+            raise AlgodHTTPError(status, payload.get("message", "") if isinstance(payload, dict) else str(payload))
+        return payload
+
+    async def status(self) -> Dict[str, Any]:
+        return await self._json("GET", "/v2/status")
+
+    async def status_after_block(self, round: int) -> Dict[str, Any]:
+        # algod answers within a minute even if no block arrives
+        return await self._json("GET", f"/v2/status/wait-for-block-after/{round}", pool=self.long_poll, timeout=90.0)
+
+    async def suggested_params(self) -> Dict[str, Any]:
+        return await self._json("GET", "/v2/transactions/params")
+
+    async def send_raw(self, signed: bytes) -> str:
+        result = await self._json("POST", "/v2/transactions", signed, headers={"Content-Type": "application/x-binary"})
+        return result["txId"]
+
+    async def pending(self, txid: str) -> Dict[str, Any]:
+        return await self._json("GET", f"/v2/transactions/pending/{txid}")
+
+    async def block_txids(self, round: int) -> List[str]:
+        return (await self._json("GET", f"/v2/blocks/{round}/txids")).get("blockTxids") or []
+
+    async def account_application(self, address: str, app_id: int) -> Dict[str, Any]:
+        return await self._json("GET", f"/v2/accounts/{address}/applications/{app_id}")
+
+    async def application(self, app_id: int) -> Dict[str, Any]:
+        return await self._json("GET", f"/v2/applications/{app_id}")
+
+    async def box(self, app_id: int, name: bytes) -> bytes:
+        encoded = base64.b64encode(name).decode()
+        result = await self._json("GET", f"/v2/applications/{app_id}/box?name=b64:{quote(encoded)}")
+        return base64.b64decode(result["value"])
+
+    def close(self) -> None:
+        self.pool.close()
+        self.long_poll.close()
+
+
+# ---------------------------------------------------------------------------
+# Params and confirmations
+# ---------------------------------------------------------------------------
+
+class TxnService:
+    """Suggested params and confirmations shared by every sender of a
+    client; the asyncio counterpart of ``txn-service.js``."""
+
+    def __init__(self, algod: AsyncAlgod, wait_rounds: int = WAIT_ROUNDS, round_time: float = ROUND_TIME):
+        self.algod = algod
+        self.wait_rounds = wait_rounds
+        self.round_time = round_time
+        self.round = 0
+        self._round_seen = float("-inf")
+        self._params: Optional[Dict[str, Any]] = None
+        self._params_round = 0
+        self._fetching: Optional[asyncio.Future] = None
+        # txid -> (future, last round it may confirm in, or None until the
+        # watcher sets it, rounds, monotonic deadline)
+        self._pending: Dict[str, List[Any]] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self._block_txids = True
+        # Txids of the last few blocks checked, for a send whose response
+        # arrives after the watcher has already passed its block
+        self._recent: Dict[int, Set[str]] = {}
+
+    def _observe(self, round: int) -> None:
+        if round >= self.round:
+            self.round = round
+            self._round_seen = time.monotonic()
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self._round_seen > self.round_time
+
+    async def params(self) -> Any:
+        """algosdk ``SuggestedParams`` for the current round."""
+        if self._params is None or self._stale() or self.round - self._params_round >= PARAMS_REFRESH_ROUNDS:
+            if self._fetching is None:
+                self._fetching = asyncio.ensure_future(self.algod.suggested_params())
+                try:
+                    self._params = await self._fetching
+                finally:
+                    self._fetching = None
+                self._params_round = self._params["last-round"]
+                self._observe(self._params_round)
+            else:
+                await self._fetching
+        params = self._params
+        return _algosdk().transaction.SuggestedParams(
+            fee=params["fee"],
+            first=self.round,
+            last=self.round + VALID_ROUNDS,
+            gh=params["genesis-hash"],
+            gen=params.get("genesis-id"),
+            min_fee=params.get("min-fee"),
+        )
+
+    async def send(self, signed: bytes) -> str:
+        return await self.algod.send_raw(signed)
+
+    def wait(self, txid: str, rounds: Optional[int] = None, timeout: Optional[float] = None) -> "asyncio.Future[int]":
+        """Future of the round ``txid`` confirms in; fails with
+        ``TimeoutError`` after ``rounds`` rounds, or once ``timeout`` seconds
+        (by default the rounds' time plus :data:`DEADLINE_SLACK_ROUNDS`)
+        pass while algod cannot be reached."""
+        entry = self._pending.get(txid)
+        if entry is None:
+            rounds = rounds or self.wait_rounds
+            deadline = time.monotonic() + (timeout or (rounds + DEADLINE_SLACK_ROUNDS) * self.round_time)
+            entry = self._pending[txid] = [asyncio.get_running_loop().create_future(), None, rounds, deadline]
+            for round, txids in self._recent.items():
+                if txid in txids:
+                    self._settle(txid, round)
+                    return entry[0]
+            if self._watcher is None:
+                self._watcher = asyncio.ensure_future(self._watch())
+        return entry[0]
+
+    async def submit(self, signed: bytes) -> Tuple[str, int]:
+        """Send and wait; returns ``(txid, confirmed round)``."""
+        txid = await self.send(signed)
+        return txid, await self.wait(txid)
+
+    def _settle(self, txid: str, round: Optional[int] = None, error: Optional[BaseException] = None) -> None:
+        future = self._pending.pop(txid)[0]
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(round)
+
+    async def _watch(self) -> None:
+        # A failed request is retried for the same round: only the round
+        # passing an entry's last round, a pool error, or the entry's
+        # deadline passing while algod is unreachable fails an entry
+        delay = RETRY_DELAY
+        next_round = None
+        try:
+            while self._pending:
+                try:
+                    if next_round is None:
+                        if self._stale():
+                            self._observe((await self.algod.status())["last-round"])
+                        # Anything sent after round r was seen can only land after r
+                        next_round = self.round + 1
+                    for txid, entry in list(self._pending.items()):
+                        if entry[0].done():
+                            # Cancelled by the waiter
+                            del self._pending[txid]
+                        elif entry[1] is None:
+                            entry[1] = next_round - 1 + entry[2]
+                    status = await self.algod.status_after_block(next_round - 1)
+                    self._observe(status["last-round"])
+                    while next_round <= self.round and self._pending:
+                        await self._check_round(next_round)
+                        next_round += 1
+                    delay = RETRY_DELAY
+                except (AlgodHTTPError, OSError, EOFError) as exc:
+                    now = time.monotonic()
+                    for txid, entry in list(self._pending.items()):
+                        if now >= entry[3]:
+                            self._settle(txid, error=TimeoutError(f"transaction {txid} not confirmed: algod unreachable ({exc})"))
+                    if not self._pending:
+                        break
+                    log.warning("round %s: %s; retrying in %.2fs", next_round, exc, delay)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.round_time)
+        except Exception as exc:
+            # A bug, not algod: fail the waits with it rather than hang them
+            for txid in list(self._pending):
+                self._settle(txid, error=exc)
+            raise
+        finally:
+            self._watcher = None
+
+    async def _check_round(self, round: int) -> None:
+        if self._block_txids:
+            try:
+                txids = self._recent[round] = set(await self.algod.block_txids(round))
+                for seen in [seen for seen in self._recent if seen <= round - self.wait_rounds]:
+                    del self._recent[seen]
+                for txid in txids & self._pending.keys():
+                    self._settle(txid, round)
+            except AlgodHTTPError as exc:
+                if exc.status != 404:
+                    raise
+                # algod without /v2/blocks/{round}/txids
+                self._block_txids = False
+        if not self._block_txids:
+            infos = await asyncio.gather(*(self.algod.pending(txid) for txid in self._pending))
+            for txid, info in zip(list(self._pending), infos):
+                if info.get("confirmed-round"):
+                    self._settle(txid, info["confirmed-round"])
+                elif info.get("pool-error"):
+                    self._settle(txid, error=AlgodHTTPError(400, info["pool-error"]))
+        expired = [txid for txid, entry in self._pending.items() if entry[1] is not None and round >= entry[1]]
+        if expired:
+            # One last lookup each: a send answered later than the blocks
+            # kept in _recent may have confirmed unseen
+            infos = await asyncio.gather(*(self.algod.pending(txid) for txid in expired), return_exceptions=True)
+            for txid, info in zip(expired, infos):
+                if isinstance(info, dict) and info.get("confirmed-round"):
+                    self._settle(txid, info["confirmed-round"])
+                elif isinstance(info, dict) and info.get("pool-error"):
+                    self._settle(txid, error=AlgodHTTPError(400, info["pool-error"]))
+                else:
+                    rounds = self._pending[txid][2]
+                    self._settle(txid, error=TimeoutError(f"transaction {txid} not confirmed after {rounds} rounds"))
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+def _decode_state(key_values: Iterable[Mapping[str, Any]]) -> Dict[bytes, Value]:
+    """algod's ``key-value`` list as ``{key: int | bytes}``."""
+    state: Dict[bytes, Value] = {}
+    for kv in key_values:
+        value = kv["value"]
+        state[base64.b64decode(kv["key"])] = base64.b64decode(value.get("bytes", "")) if value["type"] == 1 else value.get("uint", 0)
+    return state
+
+
+class EternalBlissClient:
+    """Calls and state reads for one deployed application.
+
+    Create it inside a running event loop, ideally with ``async with``.
+    Every call method returns the txid once the call is confirmed (or as
+    soon as it is accepted with ``wait=False``).
+    """
+
+    def __init__(
+        self,
+        app_id: int,
+        algod_url: str = DEFAULT_ALGOD_URL,
+        token: str = "",
+        *,
+        connections: int = DEFAULT_CONNECTIONS,
+        in_flight: int = DEFAULT_IN_FLIGHT,
+        wait_rounds: int = WAIT_ROUNDS,
+    ):
+        self.app_id = app_id
+        self.algod = AsyncAlgod(algod_url, token, connections)
+        self.txns = TxnService(self.algod, wait_rounds)
+        self._in_flight = asyncio.Semaphore(in_flight)
+        # txids built per first-valid round: identical calls in one round
+        # would share a txid, so repeats get a nonce note
+        self._built: Dict[int, Set[str]] = {}
+        self._nonce = 0
+
+    async def __aenter__(self) -> "EternalBlissClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.algod.close()
+
+    # -- transactions ------------------------------------------------------
+
+    def method_txn(self, sender: str, method: str, values: Sequence[Union[int, str, bytes]], params: Any, accounts: Sequence[str] = ()) -> Any:
+        """An unsigned ARC-4 call to ``method`` (see :mod:`eternalbliss.abi`)."""
+        transaction = _algosdk().transaction
+        on_complete = transaction.OnComplete.OptInOC if method == "create_player" else transaction.OnComplete.NoOpOC
+        txn = transaction.ApplicationCallTxn(
+            sender, params, self.app_id, on_complete, app_args=call_args(method, *values), accounts=list(accounts) or None,
+            boxes=[(0, name) for name in leaderboard.box_names(method)] or None,
+        )
+        built = self._built.setdefault(params.first, set())
+        if len(self._built) > 2:
+            for round in sorted(self._built)[:-2]:
+                del self._built[round]
+        txid = txn.get_txid()
+        while txid in built:
+            self._nonce += 1
+            txn.note = self._nonce.to_bytes(8, "big")
+            txid = txn.get_txid()
+        built.add(txid)
+        return txn
+
+    @staticmethod
+    def sign(account: Account, txns: Sequence[Any]) -> bytes:
+        """Sign ``txns`` (grouped when more than one) as raw bytes for algod."""
+        sdk = _algosdk()
+        if len(txns) > 1:
+            sdk.transaction.assign_group_id(txns)
+        signer = sdk.atomic_transaction_composer.AccountTransactionSigner(account.private_key)
+        signed = signer.sign_transactions(list(txns), list(range(len(txns))))
+        return b"".join(base64.b64decode(sdk.encoding.msgpack_encode(stxn)) for stxn in signed)
+
+    async def submit(self, signed: bytes, wait: bool = True) -> str:
+        """Send signed transactions; waits for confirmation unless ``wait`` is false."""
+        async with self._in_flight:
+            txid = await self.txns.send(signed)
+            if wait:
+                await self.txns.wait(txid)
+        return txid
+
+    async def submit_many(self, signed: Iterable[bytes], wait: bool = True) -> List[Union[str, BaseException]]:
+        """Submit concurrently; one txid or exception per entry, in order."""
+        return await asyncio.gather(*(self.submit(blob, wait) for blob in signed), return_exceptions=True)
+
+    async def call(self, account: Account, method: str, *values: Union[int, str, bytes], wait: bool = True, accounts: Sequence[str] = ()) -> str:
+        txn = self.method_txn(account.address, method, values, await self.txns.params(), accounts)
+        return await self.submit(self.sign(account, [txn]), wait)
+
+    async def call_many(
+        self, calls: Iterable[Tuple[Account, str, Sequence[Union[int, str, bytes]]]], wait: bool = True
+    ) -> List[Union[str, BaseException]]:
+        """Build, sign and submit ``(account, method, values)`` calls concurrently."""
+        params = await self.txns.params()
+        signed = [self.sign(account, [self.method_txn(account.address, method, values, params)]) for account, method, values in calls]
+        return await self.submit_many(signed, wait)
+
+    async def opt_in(self, account: Account, player_name: str, wait: bool = True) -> str:
+        """Opt in to the application (create player)."""
+        return await self.call(account, "create_player", player_name, wait=wait)
+
+    async def update_stats(self, account: Account, level: int, xp: int, gold: int, wait: bool = True) -> str:
+        return await self.call(account, "update_stats", level, xp, gold, wait=wait)
+
+    async def move_player(self, account: Account, x: int, y: int, wait: bool = True) -> str:
+        return await self.call(account, "move", x, y, wait=wait)
+
+    async def battle_enemy(self, account: Account, enemy_level: int, wait: bool = True) -> str:
+        return await self.call(account, "battle", enemy_level, wait=wait)
+
+    async def save_progress(self, account: Account, player: Mapping[str, int], wait: bool = True) -> str:
+        """Save full progress; ``player`` has the :data:`eternalbliss.record.SAVE_FIELDS`."""
+        return await self.call(account, "save_progress", *(player[field] for field in record.SAVE_FIELDS), wait=wait)
+
+    # -- state -------------------------------------------------------------
+
+    async def get_player_state(self, address: str) -> Optional[Dict[str, Union[int, str]]]:
+        """A player's stats in either storage layout, or None if not opted in."""
+        try:
+            info = await self.algod.account_application(address, self.app_id)
+        except AlgodHTTPError as exc:
+            if exc.status == 404:
+                return None
+            raise
+        local = info.get("app-local-state")
+        if local is None:
+            return None
+        return record.from_local_state(_decode_state(local.get("key-value") or []))
+
+    async def get_player_states(self, addresses: Iterable[str]) -> Dict[str, Optional[Dict[str, Union[int, str]]]]:
+        """:meth:`get_player_state` for many addresses, read concurrently."""
+        unique = list(dict.fromkeys(addresses))
+        states = await asyncio.gather(*(self.get_player_state(address) for address in unique))
+        return dict(zip(unique, states))
+
+    async def get_global_state(self) -> Dict[str, Value]:
+        info = await self.algod.application(self.app_id)
+        state = _decode_state(info["params"].get("global-state") or [])
+        return {key.decode(errors="replace"): value for key, value in state.items()}
+
+    async def get_leaderboard(self, field: str) -> List[leaderboard.Entry]:
+        """One on-chain leaderboard (see :mod:`eternalbliss.leaderboard`), best first."""
+        return leaderboard.decode(await self.algod.box(self.app_id, leaderboard.box_name(field)))
+
+
+# ---------------------------------------------------------------------------
+# Mock algod
+# ---------------------------------------------------------------------------
+
+def _encode_state(state: Mapping[bytes, Value]) -> List[Dict[str, Any]]:
+    return [
+        {"key": base64.b64encode(key).decode(), "value": {"type": 1, "bytes": base64.b64encode(value).decode(), "uint": 0}}
+        if isinstance(value, bytes)
+        else {"key": base64.b64encode(key).decode(), "value": {"type": 2, "bytes": "", "uint": value}}
+        for key, value in state.items()
+    ]
+
+
+class MockAlgod:
+    """algod stand-in over HTTP, backed by :class:`eternalbliss.avm.AVM`.
+
+    A block is cut every ``round_time`` seconds with whatever was accepted
+    since the last one. Incoming transactions are evaluated on arrival, so
+    a rejected call gets algod's 400 and state is visible before its block;
+    signatures are not checked. The leaderboard boxes are created at start.
+    ``latency`` delays every response, to stand in for the network.
+    ``calls`` counts requests per endpoint::
+
+        with MockAlgod() as mock:
+            client = EternalBlissClient(mock.app_id, mock.url)
+    """
+
+    GENESIS_HASH = base64.b64encode(bytes(32)).decode()
+
+    def __init__(self, app_id: int = 1001, round_time: float = 0.05, latency: float = 0.0, storage: str = "keys", block_txids: bool = True):
+        from .avm import AVM, app_call, method_call, player_address
+
+        self.app_id = app_id
+        self.round_time = round_time
+        self.latency = latency
+        self.block_txids = block_txids
+        creator = player_address(0xFFFF)
+        self.avm = AVM.from_build(storage=storage, app_id=0, creator=creator)
+        self.avm.call(app_call(creator, application_id=0))
+        self.avm.call(method_call(creator, "create_leaderboards"))
+        self.avm.ledger.app_id = app_id
+        self.avm.ledger.round = self.round = 1000
+        self.pool: List[str] = []
+        self.blocks: Dict[int, List[str]] = {}
+        self.confirmed: Dict[str, int] = {}
+        self.calls: collections.Counter = collections.Counter()
+        self.url = ""
+        self._lock = threading.Condition()
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def __enter__(self) -> "MockAlgod":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def start(self, port: int = 0) -> str:
+        """Serve on ``port`` (any free port by default); returns the URL."""
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._blocks, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        return self.url
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _blocks(self) -> None:
+        while not self._stop.wait(self.round_time):
+            with self._lock:
+                self.round += 1
+                self.avm.ledger.round = self.round
+                self.blocks[self.round] = self.pool
+                for txid in self.pool:
+                    self.confirmed[txid] = self.round
+                self.pool = []
+                self._lock.notify_all()
+
+    def _status(self) -> Dict[str, Any]:
+        return {"last-round": self.round, "time-since-last-round": 0, "catchup-time": 0}
+
+    def _submit(self, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        import msgpack
+
+        from . import avm
+
+        sdk = _algosdk()
+        groups: List[List[Tuple[str, Any]]] = []
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(body)
+        for fields in unpacker:
+            stxn = sdk.transaction.SignedTransaction.undictify(fields)
+            txn = stxn.transaction
+            if groups and txn.group and groups[-1][0][1].group == txn.group:
+                groups[-1].append((stxn.get_txid(), txn))
+            else:
+                groups.append([(stxn.get_txid(), txn)])
+
+        first_txid = groups[0][0][0] if groups else ""
+        with self._lock:
+            for group in groups:
+                avm_group = []
+                for txid, txn in group:
+                    common = dict(
+                        fee=txn.fee, first_valid=txn.first_valid_round, last_valid=txn.last_valid_round,
+                        note=txn.note or b"", txid=avm.decode_address(txid),
+                    )
+                    sender = avm.decode_address(txn.sender)
+                    if txn.type == "appl":
+                        if txn.index != self.app_id:
+                            return 400, {"message": f"TransactionPool.Remember: application {txn.index} does not exist"}
+                        avm_group.append(avm.Transaction(
+                            sender, "appl", application_id=txn.index, on_completion=int(txn.on_complete),
+                            application_args=txn.app_args or (), accounts=[avm.decode_address(a) for a in txn.accounts or ()],
+                            boxes=tuple(box.name for box in txn.boxes or ()),
+                            **common,
+                        ))
+                    elif txn.type == "pay":
+                        avm_group.append(avm.payment(sender, avm.decode_address(txn.receiver), txn.amt, **common))
+                    else:
+                        avm_group.append(avm.Transaction(sender, txn.type, **common))
+                    if txid in self.confirmed or txid in self.pool:
+                        return 400, {"message": f"TransactionPool.Remember: transaction already in ledger: {txid}"}
+                for (txid, _), result in zip(group, self.avm.apply_group(avm_group)):
+                    if not result.accepted:
+                        return 400, {"message": f"TransactionPool.Remember: transaction {txid}: logic eval error: {result.error}"}
+                self.pool.extend(txid for txid, _ in group)
+        return 200, {"txId": first_txid}
+
+    def _route(self, method: str, path: str, body: bytes, query: str = "") -> Tuple[int, Any]:
+        parts = path.strip("/").split("/")[1:]
+        if method == "POST" and parts == ["transactions"]:
+            return self._submit(body)
+        if parts == ["status"]:
+            return 200, self._status()
+        if parts[:2] == ["status", "wait-for-block-after"]:
+            after = int(parts[2])
+            with self._lock:
+                self._lock.wait_for(lambda: self.round > after or self._stop.is_set(), timeout=60)
+                return 200, self._status()
+        if parts == ["transactions", "params"]:
+            return 200, {
+                "consensus-version": "mock", "fee": 0, "min-fee": 1000, "last-round": self.round,
+                "genesis-id": "mock-v1", "genesis-hash": self.GENESIS_HASH,
+            }
+        if parts[:2] == ["transactions", "pending"]:
+            txid = parts[2]
+            if txid in self.confirmed:
+                return 200, {"confirmed-round": self.confirmed[txid], "pool-error": ""}
+            if txid in self.pool:
+                return 200, {"confirmed-round": 0, "pool-error": ""}
+            return 404, {"message": "txn does not exist"}
+        if parts[:1] == ["blocks"] and parts[2:] == ["txids"] and self.block_txids:
+            round = int(parts[1])
+            if round not in self.blocks:
+                return 404, {"message": f"round {round} not found"}
+            return 200, {"blockTxids": self.blocks[round]}
+        if parts[:1] == ["accounts"] and parts[2:3] == ["applications"]:
+            from .avm import decode_address
+
+            state = self.avm.ledger.locals.get(decode_address(parts[1]))
+            if state is None or int(parts[3]) != self.app_id:
+                return 404, {"message": "account application info not found"}
+            return 200, {"round": self.round, "app-local-state": {"id": self.app_id, "key-value": _encode_state(state)}}
+        if parts[:1] == ["applications"]:
+            if int(parts[1]) != self.app_id:
+                return 404, {"message": "application does not exist"}
+            if parts[2:] == ["box"]:
+                encoding, _, name = parse_qs(query).get("name", [""])[0].partition(":")
+                name = base64.b64decode(name) if encoding == "b64" else name.encode()
+                if name not in self.avm.ledger.boxes:
+                    return 404, {"message": "box not found"}
+                return 200, {"round": self.round, "name": base64.b64encode(name).decode(),
+                             "value": base64.b64encode(self.avm.ledger.boxes[name]).decode()}
+            return 200, {"id": self.app_id, "params": {"global-state": _encode_state(self.avm.ledger.globals)}}
+        return 404, {"message": "not found"}
+
+    def _handler(self) -> type:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def respond(self, method: str) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                url = urlparse(self.path)
+                path = url.path
+                # Count per endpoint: rounds, txids and addresses as {}
+                endpoint = "/".join("{}" if part[:1].isdigit() or len(part) >= 52 else part for part in path.split("/"))
+                mock.calls[f"{method} {endpoint}"] += 1
+                try:
+                    status, payload = mock._route(method, path, body, url.query)
+                except (ValueError, IndexError) as exc:
+                    status, payload = 400, {"message": str(exc)}
+                if mock.latency:
+                    time.sleep(mock.latency)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self.respond("GET")
+
+            def do_POST(self) -> None:
+                self.respond("POST")
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+# ---------------------------------------------------------------------------
+# Bot session
+# ---------------------------------------------------------------------------
+
+def bot_traffic(bots: Sequence[Account], calls: int, seed: int = 0) -> List[Tuple[Account, str, Tuple[int, ...]]]:
+    """A reproducible mix of battles, moves and saves across ``bots``."""
+    rng = random.Random(seed)
+    traffic = []
+    for _ in range(calls):
+        bot = bots[rng.randrange(len(bots))]
+        roll = rng.random()
+        if roll < 0.5:
+            traffic.append((bot, "battle", (rng.randint(1, 10),)))
+        elif roll < 0.9:
+            traffic.append((bot, "move", (rng.randrange(75), rng.randrange(75))))
+        else:
+            stats = (rng.randint(1, 20), rng.randint(0, 5000), rng.randint(0, 5000), 100, 100, 50, 50, 15, 10, 20)
+            traffic.append((bot, "save_progress", stats + (rng.randrange(75), rng.randrange(75))))
+    return traffic
+
+
+async def _session(mock: MockAlgod, bots: List[Account], traffic: list, sequential: bool, in_flight: int) -> Dict[str, Any]:
+    mock.calls.clear()
+    options = dict(connections=1, in_flight=1) if sequential else dict(in_flight=in_flight)
+    async with EternalBlissClient(mock.app_id, mock.url, **options) as client:
+        start = time.perf_counter()
+        if sequential:
+            results: List[Any] = []
+            for bot, method, values in traffic:
+                try:
+                    results.append(await client.call(bot, method, *values))
+                except (AlgodHTTPError, TimeoutError) as exc:
+                    results.append(exc)
+        else:
+            results = await client.call_many(traffic)
+        calls_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if sequential:
+            states = {bot.address: await client.get_player_state(bot.address) for bot in bots}
+        else:
+            states = await client.get_player_states(bot.address for bot in bots)
+        reads_elapsed = time.perf_counter() - start
+        opened = client.algod.pool.opened + client.algod.long_poll.opened
+
+    return {
+        "calls": calls_elapsed,
+        "reads": reads_elapsed,
+        "confirmed": sum(isinstance(r, str) for r in results),
+        "rejected": sum(not isinstance(r, str) for r in results),
+        "states": sum(s is not None for s in states.values()),
+        "requests": sum(mock.calls.values()),
+        "connections": opened,
+    }
+
+
+async def _bench(args: argparse.Namespace) -> None:
+    with MockAlgod(round_time=args.round_time, latency=args.latency, storage=args.storage) as mock:
+        bots = [Account.generate() for _ in range(args.bots)]
+        async with EternalBlissClient(mock.app_id, mock.url) as client:
+            await client.call_many([(bot, "create_player", (f"Bot{n}",)) for n, bot in enumerate(bots)])
+        traffic = bot_traffic(bots, args.calls, args.seed)
+        print(f"{args.bots} bots, {args.calls} calls, {args.round_time * 1000:.0f} ms rounds, {args.latency * 1000:.0f} ms latency")
+        for label, sequential in (("sequential", True), (f"pipelined (in_flight={args.in_flight})", False)):
+            r = await _session(mock, bots, traffic, sequential, args.in_flight)
+            print(f"  {label}: {r['calls']:.2f}s ({args.calls / r['calls']:,.0f} calls/s), "
+                  f"{r['confirmed']} confirmed, {r['rejected']} rejected, {r['requests']} algod requests "
+                  f"on {r['connections']} connections; {r['states']} player states read in {r['reads'] * 1000:.0f} ms")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive bot traffic through the async client against a mock algod.")
+    parser.add_argument("--bots", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--in-flight", type=int, default=DEFAULT_IN_FLIGHT)
+    parser.add_argument("--round-time", type=float, default=0.02, help="seconds per mock block")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds added to every mock response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=("keys", "packed"), default="keys", help="local-state layout to build")
+    args = parser.parse_args(argv)
+    asyncio.run(_bench(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,484 @@
+"""Monte Carlo economy simulator driven by the contract's own reward rules.
+
+Gold enters the game through ``calculate_battle_reward`` and
+``claim_rewards`` and leaves through ``buy_item``, and ``save_progress``
+adds the saved gold to the ``total_gold`` counter. :func:`contract_rules`
+reads those rules from the PyTeal source of :mod:`eternalbliss.contract`
+(the reward subroutines become NumPy-ready functions, the claim threshold
+and amount are read off ``claim_rewards``), so the simulation cannot drift
+from the contract. :func:`verify_rules` replays the extracted rules
+against the compiled program in :mod:`eternalbliss.avm`.
+
+:class:`Simulation` advances every player one day per tick, as NumPy arrays:
+each behaviour :class:`Profile` sets battles, purchases, claims and saves
+per day (Poisson), the level of the enemies fought and the daily churn.
+Levels follow the client's curve (``checkLevelUp`` in ``script.js``: the
+first level takes 100 XP, each next one 1.4 times the last). Every tick
+records the gold supply, gold minted and burned, the ``total_gold``
+counter, XP percentiles and the level distribution::
+
+    python -m eternalbliss.economy --players 1000000 --days 365
+    python -m eternalbliss.economy --battle-gold "level * 8 + 15" --claim-gold 25
+
+A changed formula or claim is simulated next to the contract's rules, from
+the same seed, and the two are compared. ``--out`` saves the history as
+``.npz``. Needs NumPy (``eternalbliss[analytics]``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from . import record
+
+# Levels above this share the last bucket of the level distribution
+LEVEL_CAP = 100
+# Players sampled for the per-tick XP percentiles
+QUANTILE_SAMPLE = 100_000
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        raise SystemExit("NumPy is required for the economy simulator; install eternalbliss[analytics]")
+    return numpy
+
+
+# ---------------------------------------------------------------------------
+# Rules
+# ---------------------------------------------------------------------------
+
+class Formula(NamedTuple):
+    """A uint64 formula of one variable; ``fn`` accepts ints or arrays."""
+
+    source: str
+    fn: Callable[[Any], Any]
+
+    def __call__(self, value: Any) -> Any:
+        return self.fn(value)
+
+
+class Rules(NamedTuple):
+    battle_gold: Formula
+    battle_xp: Formula
+    claim_min_level: int
+    claim_gold: int
+    # The save_progress argument that is added to the total_gold counter
+    total_gold_field: str
+
+
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod)
+
+
+def _is_int(node: ast.AST) -> bool:
+    """``Int(<literal>)``"""
+    return (
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "Int"
+        and len(node.args) == 1 and isinstance(node.args[0], ast.Constant) and type(node.args[0].value) is int
+    )
+
+
+def _lower(node: ast.AST, variable: str) -> ast.AST:
+    """PyTeal arithmetic to plain Python: ``Int(n)`` to ``n``, ``/`` to ``//``."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, _OPERATORS):
+        op = ast.FloorDiv() if isinstance(node.op, ast.Div) else node.op
+        return ast.BinOp(_lower(node.left, variable), op, _lower(node.right, variable))
+    if _is_int(node):
+        return node.args[0]
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return node
+    if isinstance(node, ast.Name) and node.id == variable:
+        return ast.Name(variable, ast.Load())
+    raise ValueError(f"unsupported expression in a reward formula: {ast.unparse(node)}")
+
+
+def formula(source: str, variable: Optional[str] = None) -> Formula:
+    """Compile an integer formula such as ``"level * 10 + 15"``.
+
+    ``Int(n)`` is accepted as in PyTeal and ``/`` divides as the AVM does.
+    Without ``variable`` the formula's single name is the variable.
+    """
+    tree = ast.parse(source.strip(), mode="eval").body
+    if variable is None:
+        names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id != "Int"}
+        if len(names) > 1:
+            raise ValueError(f"formula {source!r} has more than one variable: {sorted(names)}")
+        variable = names.pop() if names else "level"
+    body = _lower(tree, variable)
+    lam = ast.Expression(ast.Lambda(
+        args=ast.arguments(posonlyargs=[], args=[ast.arg(arg=variable)], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=body,
+    ))
+    fn = eval(compile(ast.fix_missing_locations(lam), "<formula>", "eval"), {"__builtins__": {}})
+    return Formula(source.strip(), fn)
+
+
+def _call(node: ast.AST, name: str) -> bool:
+    func = getattr(node, "func", None)
+    return isinstance(node, ast.Call) and (getattr(func, "id", None) == name or getattr(func, "attr", None) == name)
+
+
+def _player_get(node: ast.AST, field: str) -> bool:
+    """``player.get("<field>")``"""
+    return _call(node, "get") and len(node.args) == 1 and getattr(node.args[0], "value", None) == field
+
+
+def _handler(tree: ast.AST, name: str) -> ast.AST:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            return node.value
+    raise ValueError(f"{name} not found in the contract source")
+
+
+def _subroutine(tree: ast.AST, name: str) -> Formula:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == name:
+            returns = [n for n in node.body if isinstance(n, ast.Return)]
+            if len(node.args.args) != 1 or len(returns) != 1:
+                raise ValueError(f"{name} is no longer a one-argument formula")
+            return formula(ast.unparse(returns[0].value), node.args.args[0].arg)
+    raise ValueError(f"{name} not found in the contract source")
+
+
+def contract_rules(path: Union[str, Path, None] = None) -> Rules:
+    """The economy rules as written in ``eternalbliss/contract.py``.
+
+    Raises ValueError when a rule no longer has the shape read here, so a
+    contract change that the simulator cannot follow fails loudly.
+    """
+    path = Path(path) if path else Path(__file__).with_name("contract.py")
+    tree = ast.parse(path.read_text(), str(path))
+
+    claim = _handler(tree, "claim_rewards")
+    min_level = next(
+        (c.comparators[0].args[0].value for c in ast.walk(claim)
+         if isinstance(c, ast.Compare) and _player_get(c.left, "level") and isinstance(c.ops[0], ast.GtE) and _is_int(c.comparators[0])),
+        None,
+    )
+    claim_gold = next(
+        (v.right.args[0].value for d in ast.walk(claim) if isinstance(d, ast.Dict)
+         for k, v in zip(d.keys, d.values)
+         if getattr(k, "value", None) == "gold" and isinstance(v, ast.BinOp) and isinstance(v.op, ast.Add)
+         and _player_get(v.left, "gold") and _is_int(v.right)),
+        None,
+    )
+    if min_level is None or claim_gold is None:
+        raise ValueError("claim_rewards no longer checks a level and adds a fixed amount of gold")
+
+    buy = _handler(tree, "buy_item")
+    if not any(
+        getattr(k, "value", None) == "gold" and isinstance(v, ast.BinOp) and isinstance(v.op, ast.Sub) and _player_get(v.left, "gold")
+        for d in ast.walk(buy) if isinstance(d, ast.Dict) for k, v in zip(d.keys, d.values)
+    ):
+        raise ValueError("buy_item no longer deducts the price from gold")
+
+    save = _handler(tree, "save_progress")
+    counted = next(
+        (c.args[1].right for c in ast.walk(save)
+         if _call(c, "globalPut") and getattr(c.args[0], "id", None) == "global_total_gold"
+         and isinstance(c.args[1], ast.BinOp) and _call(c.args[1].right, "arg")),
+        None,
+    )
+    if counted is None:
+        raise ValueError("save_progress no longer adds an argument to global_total_gold")
+
+    return Rules(
+        battle_gold=_subroutine(tree, "calculate_battle_reward"),
+        battle_xp=_subroutine(tree, "calculate_xp_reward"),
+        claim_min_level=min_level,
+        claim_gold=claim_gold,
+        total_gold_field=record.SAVE_FIELDS[counted.args[1].value - 1],
+    )
+
+
+def verify_rules(rules: Rules, levels: Sequence[int] = range(1, 21)) -> List[str]:
+    """Check ``rules`` against the compiled contract; returns the mismatches."""
+    from .avm import AVM, OPT_IN, app_call, method_call, player_address
+
+    admin, player = player_address(0xFFFF), player_address(1)
+    avm = AVM.from_build(app_id=0, creator=admin)
+    avm.call(app_call(admin, application_id=0))
+    avm.call(method_call(player, "create_player", "Sim", on_completion=OPT_IN))
+    state = avm.ledger.locals[player]
+    mismatches = []
+
+    for level in levels:
+        gold, xp = state[b"gold"], state[b"xp"]
+        avm.call(method_call(player, "battle", level))
+        if (state[b"gold"] - gold, state[b"xp"] - xp) != (rules.battle_gold(level), rules.battle_xp(level)):
+            mismatches.append(f"battle at level {level}: contract pays {state[b'gold'] - gold} gold / {state[b'xp'] - xp} xp, "
+                              f"rules {rules.battle_gold(level)} / {rules.battle_xp(level)}")
+
+    avm.call(method_call(player, "update_stats", rules.claim_min_level - 1, 0, 1000))
+    if avm.call(method_call(player, "claim_rewards")).accepted:
+        mismatches.append(f"claim_rewards accepted below level {rules.claim_min_level}")
+    avm.call(method_call(player, "update_stats", rules.claim_min_level, 0, 1000))
+    if not avm.call(method_call(player, "claim_rewards")).accepted or state[b"gold"] != 1000 + rules.claim_gold:
+        mismatches.append(f"claim_rewards at level {rules.claim_min_level} does not pay {rules.claim_gold} gold")
+
+    saved = {field: 7 + i for i, field in enumerate(record.SAVE_FIELDS)}
+    total = avm.ledger.globals[b"total_gold"]
+    avm.call(method_call(player, "save_progress", *saved.values()))
+    if avm.ledger.globals[b"total_gold"] - total != saved[rules.total_gold_field]:
+        mismatches.append(f"save_progress does not add {rules.total_gold_field} to total_gold")
+    return mismatches
+
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+
+class Profile(NamedTuple):
+    """How one kind of player plays, per simulated day."""
+
+    name: str
+    share: float              # fraction of the player base
+    battles: float            # battles won per day (Poisson mean)
+    enemy_offset: int = 0     # enemy level relative to the player's
+    enemy_spread: int = 2     # uniform +/- around it
+    buys: float = 1.0         # shop purchases per day, when affordable
+    price: int = 15           # gold per purchase
+    claims: float = 1.0       # claim_rewards calls per day, once eligible
+    saves: float = 1.0        # save_progress calls per day
+    churn: float = 0.0        # chance per day of quitting for good
+
+
+PROFILES = (
+    Profile("casual", 0.6, battles=6, buys=1, claims=0.5, saves=1, churn=0.01),
+    Profile("regular", 0.3, battles=25, buys=3, claims=1, saves=3, churn=0.004),
+    Profile("grinder", 0.1, battles=120, enemy_offset=1, buys=8, claims=1, saves=8, churn=0.001),
+)
+
+# Client level curve (script.js checkLevelUp)
+FIRST_LEVEL_XP = 100
+LEVEL_XP_GROWTH = 1.4
+
+
+class Simulation:
+    """Every player's stats as arrays, advanced one day per :meth:`step`.
+
+    Players are grouped by profile into contiguous blocks, so each block
+    draws with its profile's scalar rates. Players who quit are dropped
+    from the arrays and kept only in the totals (their gold still counts
+    toward the supply, their level toward the distribution). The
+    ``total_gold`` counter grows by the expected number of saves times
+    each player's gold, which at this scale is exact to a fraction of a
+    percent.
+    """
+
+    def __init__(
+        self,
+        rules: Rules,
+        players: int,
+        profiles: Sequence[Profile] = PROFILES,
+        seed: int = 0,
+        first_level_xp: int = FIRST_LEVEL_XP,
+        level_xp_growth: float = LEVEL_XP_GROWTH,
+    ):
+        np = self.np = _numpy()
+        if rules.total_gold_field not in ("level", "xp", "gold"):
+            raise ValueError(f"cannot simulate a total_gold counter of {rules.total_gold_field}")
+        self.rules = rules
+        self.profiles = tuple(profiles)
+        self.growth = level_xp_growth
+        self.rng = np.random.default_rng(seed)
+        self.players = players
+
+        shares = np.array([p.share for p in self.profiles], dtype=float)
+        self.counts = self.rng.multinomial(players, shares / shares.sum())
+        self.sizes = self.counts
+        self.level = np.full(players, record.INITIAL["level"], dtype=np.int64)
+        self.xp = np.full(players, record.INITIAL["xp"], dtype=np.int64)
+        self.xp_next = np.full(players, first_level_xp, dtype=np.int64)
+        self.xp_earned = np.zeros(players, dtype=np.int64)
+        self.gold = np.full(players, record.INITIAL["gold"], dtype=np.int64)
+
+        # Players who quit, by profile
+        self.retired_levels = np.zeros(LEVEL_CAP + 1, dtype=np.int64)
+        self.retired_level = np.zeros(len(self.profiles), dtype=np.int64)
+        self.retired_gold = np.zeros(len(self.profiles), dtype=np.int64)
+        self.total_gold = 0
+        self.day = 0
+        self.history: Dict[str, List[Any]] = {}
+
+    def _blocks(self) -> List[Tuple[Profile, slice]]:
+        ends = self.np.cumsum(self.sizes)
+        return [(profile, slice(int(end - size), int(end))) for profile, size, end in zip(self.profiles, self.sizes, ends)]
+
+    def _record(self, **values: Any) -> None:
+        for name, value in values.items():
+            self.history.setdefault(name, []).append(value)
+
+    def step(self) -> None:
+        np, rng, rules = self.np, self.rng, self.rules
+        level, gold = self.level, self.gold
+        blocks = self._blocks()
+
+        # Battles, all against one enemy level per player and day
+        won_gold = np.empty_like(gold)
+        won_xp = np.empty_like(gold)
+        for profile, block in blocks:
+            size = block.stop - block.start
+            battles = rng.poisson(profile.battles, size)
+            spread = rng.integers(-profile.enemy_spread, profile.enemy_spread + 1, size)
+            enemy = np.maximum(level[block] + (profile.enemy_offset + spread), 1)
+            won_gold[block] = battles * rules.battle_gold(enemy)
+            won_xp[block] = battles * rules.battle_xp(enemy)
+        gold += won_gold
+        self.xp += won_xp
+        self.xp_earned += won_xp
+
+        # Level ups, as the client applies them
+        up = np.flatnonzero(self.xp >= self.xp_next)
+        while up.size:
+            level[up] += 1
+            self.xp[up] -= self.xp_next[up]
+            self.xp_next[up] = np.floor(self.xp_next[up] * self.growth).astype(np.int64)
+            up = up[self.xp[up] >= self.xp_next[up]]
+
+        claimed = burned = 0
+        saved = 0.0
+        counted = {"level": level, "xp": self.xp, "gold": gold}[rules.total_gold_field]
+        for profile, block in blocks:
+            size = block.stop - block.start
+            claims = rng.poisson(profile.claims, size) * (level[block] >= rules.claim_min_level)
+            gold[block] += claims * rules.claim_gold
+            claimed += int(claims.sum()) * rules.claim_gold
+
+            buys = np.minimum(rng.poisson(profile.buys, size), gold[block] // profile.price)
+            gold[block] -= buys * profile.price
+            burned += int(buys.sum()) * profile.price
+
+            saved += profile.saves * float(counted[block].sum())
+        self.total_gold += round(saved)
+        minted = int(won_gold.sum()) + claimed
+
+        # Churn: drop the players who quit, keeping their totals
+        stay = np.ones(len(level), dtype=bool)
+        for profile, block in blocks:
+            stay[block] = rng.random(block.stop - block.start) >= profile.churn
+        if not stay.all():
+            gone = ~stay
+            owner = np.repeat(np.arange(len(self.profiles)), self.sizes)[gone]
+            self.retired_levels += np.bincount(np.minimum(level[gone], LEVEL_CAP), minlength=LEVEL_CAP + 1)
+            self.retired_level += np.bincount(owner, weights=level[gone], minlength=len(self.profiles)).astype(np.int64)
+            self.retired_gold += np.bincount(owner, weights=gold[gone], minlength=len(self.profiles)).astype(np.int64)
+            self.sizes = self.sizes - np.bincount(owner, minlength=len(self.profiles))
+            self.level, self.xp, self.xp_next, self.xp_earned, self.gold = (
+                array[stay] for array in (level, self.xp, self.xp_next, self.xp_earned, self.gold)
+            )
+        self.day += 1
+
+        # XP percentiles over an evenly strided sample of those still playing
+        sampled = self.xp_earned[::max(1, len(self.xp_earned) // QUANTILE_SAMPLE)]
+        p50, p90, p99 = np.percentile(sampled, [50, 90, 99]) if sampled.size else (0, 0, 0)
+        blocks = self._blocks()
+        self._record(
+            active=len(self.level),
+            gold_supply=int(self.gold.sum() + self.retired_gold.sum()),
+            gold_minted=minted,
+            gold_burned=burned,
+            total_gold_counter=self.total_gold,
+            xp_p50=int(p50),
+            xp_p90=int(p90),
+            xp_p99=int(p99),
+            level_hist=np.bincount(np.minimum(self.level, LEVEL_CAP), minlength=LEVEL_CAP + 1) + self.retired_levels,
+            profile_level=self.retired_level + [int(self.level[block].sum()) for _, block in blocks],
+            profile_gold=self.retired_gold + [int(self.gold[block].sum()) for _, block in blocks],
+        )
+
+    def run(self, days: int) -> Dict[str, Any]:
+        """Advance ``days`` ticks; returns the history as arrays, one row per day."""
+        for _ in range(days):
+            self.step()
+        return self.results()
+
+    def results(self) -> Dict[str, Any]:
+        np = self.np
+        results = {name: np.array(values) for name, values in self.history.items()}
+        results["profile_level"] = results["profile_level"] / np.maximum(self.counts, 1)
+        results["profile_gold"] = results["profile_gold"] / np.maximum(self.counts, 1)
+        results["profiles"] = np.array([p.name for p in self.profiles])
+        return results
+
+
+def _report(results: Dict[str, Any], players: int) -> None:
+    np = _numpy()
+    days = len(results["active"])
+    print(f"  {'day':>4} {'active':>9} {'gold supply':>15} {'minted/day':>13} {'burned/day':>12} {'total_gold':>17} "
+          f"{'mean lvl':>8} {'p99 lvl':>7} {'xp p50':>9}")
+    for day in sorted({1, 7, 30, 90, 180, 365, days} & set(range(1, days + 1))):
+        i = day - 1
+        hist = results["level_hist"][i]
+        levels = np.arange(len(hist))
+        p99 = int(levels[np.searchsorted(np.cumsum(hist), 0.99 * players)])
+        print(f"  {day:>4} {results['active'][i]:>9,} {results['gold_supply'][i]:>15,} {results['gold_minted'][i]:>13,} "
+              f"{results['gold_burned'][i]:>12,} {results['total_gold_counter'][i]:>17,} "
+              f"{(hist * levels).sum() / players:>8.2f} {p99:>7} {results['xp_p50'][i]:>9,}")
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate the game economy under the contract's reward rules.")
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--battle-gold", metavar="EXPR", help="alternative battle gold formula, e.g. 'level * 8 + 15'")
+    parser.add_argument("--battle-xp", metavar="EXPR", help="alternative battle XP formula")
+    parser.add_argument("--claim-gold", type=int, help="alternative claim_rewards amount")
+    parser.add_argument("--claim-level", type=int, help="alternative claim_rewards minimum level")
+    parser.add_argument("--no-verify", action="store_true", help="skip checking the rules against the compiled contract")
+    parser.add_argument("--out", type=Path, help="save the history (and the variant's, if any) as .npz")
+    args = parser.parse_args(argv)
+
+    rules = contract_rules()
+    print(f"contract rules: battle gold = {rules.battle_gold.source}, battle xp = {rules.battle_xp.source}, "
+          f"claim_rewards = +{rules.claim_gold} gold from level {rules.claim_min_level}, "
+          f"total_gold += saved {rules.total_gold_field}")
+    if not args.no_verify:
+        mismatches = verify_rules(rules)
+        for mismatch in mismatches:
+            print(f"  MISMATCH {mismatch}")
+        if mismatches:
+            return 1
+        print("  verified against the compiled contract")
+
+    runs: List[Tuple[str, Rules]] = [("contract", rules)]
+    changes: Dict[str, Any] = {}
+    if args.battle_gold:
+        changes["battle_gold"] = formula(args.battle_gold)
+    if args.battle_xp:
+        changes["battle_xp"] = formula(args.battle_xp)
+    if args.claim_gold is not None:
+        changes["claim_gold"] = args.claim_gold
+    if args.claim_level is not None:
+        changes["claim_min_level"] = args.claim_level
+    if changes:
+        runs.append(("variant", rules._replace(**changes)))
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for label, run_rules in runs:
+        start = time.perf_counter()
+        results[label] = Simulation(run_rules, args.players, seed=args.seed).run(args.days)
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {args.players:,} players x {args.days} days in {elapsed:.1f}s "
+              f"({args.players * args.days / elapsed / 1e6:.0f}M player-days/s)")
+        _report(results[label], args.players)
+
+    if changes:
+        base, variant = results["contract"]["gold_supply"][-1], results["variant"]["gold_supply"][-1]
+        print(f"gold supply after {args.days} days: {variant:,} vs {base:,} ({(variant - base) / base:+.1%})")
+    if args.out:
+        np = _numpy()
+        np.savez(args.out, **{f"{label}_{name}": value for label, run in results.items() for name, value in run.items()})
+        print(f"history saved to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
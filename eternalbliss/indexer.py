@@ -0,0 +1,459 @@
+"""Local note-stream indexer for the game's ``CHRPG:*`` transaction notes.
+
+Every browser client used to scan the Algorand indexer on its own: player
+positions over the last 86,400 rounds every 15 s, chat over the last 1,000
+rounds every 10 s. This service does that work once. It tails new rounds
+from an indexer, decodes every game note into an SQLite store and answers
+delta queries, so each client only asks for what changed since its last
+poll::
+
+    python -m eternalbliss.indexer --db notes.sqlite --serve 8980
+
+    GET /positions?since=<round>   latest position of every player updated after <round>,
+                                   within the last POSITION_WINDOW rounds
+    GET /chat?after=<id>           chat messages with id > <id>, oldest first
+    GET /chat?limit=<n>            the latest <n> chat messages, oldest first
+    GET /battles?since=<round>     battle notes after <round>
+    GET /trades?since=<round>      trade notes after <round>
+    GET /player/<address>          latest saved player snapshot
+    GET /cursors                   round up to which each stream is ingested
+
+Notes are decoded with :mod:`eternalbliss.notes`, binary or legacy JSON;
+delta player saves are applied to the full save they name. Each note
+stream keeps its own round cursor, so a stream that fails to ingest (or is
+added later) catches up without re-reading the others, and a restart
+resumes where the last poll committed. :class:`LocalSource` is an
+in-memory stand-in for the indexer, for tests and offline runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import sqlite3
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+from . import notes
+from .notes import PREFIXES
+
+DEFAULT_INDEXER_URL = "https://testnet-idx.algonode.cloud"
+# Rounds covered the first time a stream is ingested (~24 h, as the game did)
+DEFAULT_BACKFILL = 86_400
+# Positions older than this many rounds before the cursor count as players
+# who left, as the game's own indexer query did
+POSITION_WINDOW = 86_400
+PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    stream TEXT PRIMARY KEY,
+    round INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    address TEXT PRIMARY KEY,
+    round INTEGER NOT NULL,
+    txid TEXT NOT NULL,
+    data TEXT NOT NULL,
+    -- last full save, which later delta saves apply to
+    base_round INTEGER,
+    base_data TEXT
+);
+CREATE TABLE IF NOT EXISTS positions (
+    address TEXT PRIMARY KEY,
+    round INTEGER NOT NULL,
+    round_time INTEGER,
+    name TEXT,
+    level INTEGER,
+    x INTEGER,
+    y INTEGER
+);
+CREATE INDEX IF NOT EXISTS positions_round ON positions (round);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stream TEXT NOT NULL,
+    txid TEXT NOT NULL UNIQUE,
+    round INTEGER NOT NULL,
+    round_time INTEGER,
+    sender TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_stream_round ON events (stream, round);
+"""
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+class IndexerSource:
+    """Notes from an Algorand indexer (needs py-algorand-sdk)."""
+
+    def __init__(self, url: str = DEFAULT_INDEXER_URL, token: str = ""):
+        try:
+            from algosdk.v2client.indexer import IndexerClient
+        except ImportError:
+            raise SystemExit("py-algorand-sdk is required to tail an indexer; install eternalbliss[algod]")
+        self.client = IndexerClient(token, url)
+
+    def latest_round(self) -> int:
+        return self.client.health()["round"]
+
+    def search(self, note_prefix: bytes, min_round: int, max_round: int, next_page: Optional[str] = None) -> Dict[str, Any]:
+        return self.client.search_transactions(
+            note_prefix=note_prefix,
+            min_round=min_round,
+            max_round=max_round,
+            limit=PAGE_SIZE,
+            next_page=next_page,
+        )
+
+
+class LocalSource:
+    """In-memory stand-in for an indexer.
+
+    ``add_note`` confirms a note in the current round; ``advance`` moves to
+    the next one. ``search`` answers like the indexer, pages included.
+    """
+
+    def __init__(self, round: int = 1, page_size: int = PAGE_SIZE):
+        self.round = round
+        self.page_size = page_size
+        self.transactions: List[Dict[str, Any]] = []
+
+    def advance(self, rounds: int = 1) -> int:
+        self.round += rounds
+        return self.round
+
+    def add_note(self, sender: str, note: Union[str, bytes], round: Optional[int] = None) -> str:
+        round = self.round if round is None else round
+        txid = f"TX{len(self.transactions):08d}"
+        note_bytes = note.encode() if isinstance(note, str) else note
+        self.transactions.append({
+            "id": txid,
+            "sender": sender,
+            "confirmed-round": round,
+            "round-time": 1_700_000_000 + round * 3,
+            "intra-round-offset": sum(1 for t in self.transactions if t["confirmed-round"] == round),
+            "note": base64.b64encode(note_bytes).decode(),
+        })
+        return txid
+
+    def latest_round(self) -> int:
+        return self.round
+
+    def search(self, note_prefix: bytes, min_round: int, max_round: int, next_page: Optional[str] = None) -> Dict[str, Any]:
+        matches = [
+            t for t in self.transactions
+            if min_round <= t["confirmed-round"] <= max_round and base64.b64decode(t["note"]).startswith(note_prefix)
+        ]
+        start = int(next_page or 0)
+        page = matches[start:start + self.page_size]
+        result: Dict[str, Any] = {"current-round": self.round, "transactions": page}
+        if start + self.page_size < len(matches):
+            result["next-token"] = str(start + self.page_size)
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+class NoteStore:
+    """SQLite store of decoded notes with per-stream round cursors.
+
+    One connection per thread; writes happen only in :meth:`ingest`, which
+    commits a stream's rows and its cursor together.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:"):
+        self.path = str(path)
+        self._local = threading.local()
+        # An in-memory database exists per connection, so share one
+        self._shared = sqlite3.connect(self.path, check_same_thread=False) if self.path == ":memory:" else None
+        self._lock = threading.Lock()
+        with self._lock:
+            db = self.db
+            db.executescript(_SCHEMA)
+            db.commit()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._shared is not None:
+            return self._shared
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def cursor(self, stream: str) -> Optional[int]:
+        row = self.db.execute("SELECT round FROM cursors WHERE stream = ?", (stream,)).fetchone()
+        return row[0] if row else None
+
+    def cursors(self) -> Dict[str, int]:
+        return dict(self.db.execute("SELECT stream, round FROM cursors").fetchall())
+
+    def ingest(self, stream: str, transactions: List[Dict[str, Any]], up_to: int) -> int:
+        """Store one stream's transactions and move its cursor to ``up_to``.
+
+        Returns how many notes were stored. Notes are decoded with
+        :mod:`eternalbliss.notes`; undecodable notes, and delta saves whose
+        full save this store has not seen, are skipped.
+        """
+        stored = 0
+        rows = sorted(transactions, key=lambda t: (t["confirmed-round"], t.get("intra-round-offset", 0)))
+        with self._lock:
+            db = self.db
+            with db:
+                for txn in rows:
+                    note = txn.get("note", "")
+                    base_round = notes.base_round(note, stream) if stream in notes.DELTA_STREAMS else None
+                    try:
+                        data = notes.decode(note, stream, self._base(db, txn["sender"], base_round))
+                    except notes.MissingBase:
+                        continue
+                    if data is None:
+                        continue
+                    stored += self._store(db, stream, txn, data, full=base_round is None)
+                db.execute(
+                    "INSERT INTO cursors (stream, round) VALUES (?, ?) "
+                    "ON CONFLICT (stream) DO UPDATE SET round = excluded.round",
+                    (stream, up_to),
+                )
+        return stored
+
+    @staticmethod
+    def _base(db: sqlite3.Connection, address: str, round: Optional[int]) -> Optional[Dict[str, Any]]:
+        """The full save from ``round`` a delta save applies to, if stored."""
+        if round is None:
+            return None
+        row = db.execute("SELECT base_data FROM players WHERE address = ? AND base_round = ?", (address, round)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _store(db: sqlite3.Connection, stream: str, txn: Dict[str, Any], data: Dict[str, Any], full: bool = True) -> int:
+        sender, rnd, when = txn["sender"], txn["confirmed-round"], txn.get("round-time")
+        if stream == "player":
+            encoded = json.dumps(data)
+            db.execute(
+                "INSERT INTO players (address, round, txid, data, base_round, base_data) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (address) DO UPDATE SET round = excluded.round, txid = excluded.txid, "
+                "data = excluded.data, base_round = COALESCE(excluded.base_round, players.base_round), "
+                "base_data = COALESCE(excluded.base_data, players.base_data) WHERE excluded.round >= players.round",
+                (sender, rnd, txn["id"], encoded, rnd if full else None, encoded if full else None),
+            )
+        elif stream == "pos":
+            db.execute(
+                "INSERT INTO positions (address, round, round_time, name, level, x, y) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (address) DO UPDATE SET round = excluded.round, round_time = excluded.round_time, "
+                "name = excluded.name, level = excluded.level, x = excluded.x, y = excluded.y "
+                "WHERE excluded.round >= positions.round",
+                (sender, rnd, when, data.get("name"), data.get("level"), data.get("x"), data.get("y")),
+            )
+        else:
+            cur = db.execute(
+                "INSERT OR IGNORE INTO events (stream, txid, round, round_time, sender, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (stream, txn["id"], rnd, when, sender, json.dumps(data)),
+            )
+            return cur.rowcount
+        return 1
+
+    # Delta queries -------------------------------------------------------
+
+    def positions_since(self, round: int, min_round: int = 0) -> List[Dict[str, Any]]:
+        """Latest position of every player whose position changed after
+        ``round``, and not before ``min_round``."""
+        rows = self.db.execute(
+            "SELECT address, round, round_time, name, level, x, y FROM positions WHERE round > ? AND round >= ? "
+            "ORDER BY round",
+            (round, min_round),
+        ).fetchall()
+        keys = ("address", "round", "round_time", "name", "level", "x", "y")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def chat_after(self, id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Chat messages with id greater than ``id``, oldest first."""
+        return self._events("chat", "id > ?", id, limit)
+
+    def recent_chat(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The latest ``limit`` chat messages, oldest first."""
+        row = self.db.execute(
+            "SELECT id FROM events WHERE stream = 'chat' ORDER BY id DESC LIMIT 1 OFFSET ?", (limit,)
+        ).fetchone()
+        return self.chat_after(row[0] if row else 0, limit)
+
+    def battles_since(self, round: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        return self._events("battle", "round > ?", round, limit)
+
+    def trades_since(self, round: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        return self._events("trade", "round > ?", round, limit)
+
+    def player(self, address: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute("SELECT round, txid, data FROM players WHERE address = ?", (address,)).fetchone()
+        if row is None:
+            return None
+        return {"address": address, "round": row[0], "txid": row[1], "data": json.loads(row[2])}
+
+    def _events(self, stream: str, where: str, value: int, limit: int) -> List[Dict[str, Any]]:
+        rows = self.db.execute(
+            f"SELECT id, txid, round, round_time, sender, data FROM events WHERE stream = ? AND {where} ORDER BY id LIMIT ?",
+            (stream, value, limit),
+        ).fetchall()
+        return [
+            {"id": i, "txid": txid, "round": rnd, "round_time": when, "sender": sender, "data": json.loads(data)}
+            for i, txid, rnd, when, sender, data in rows
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Ingest
+# ---------------------------------------------------------------------------
+
+class Ingestor:
+    """Tails ``source`` into ``store``, one stream cursor at a time."""
+
+    def __init__(self, store: NoteStore, source: Any, backfill: int = DEFAULT_BACKFILL, streams: Optional[List[str]] = None):
+        self.store = store
+        self.source = source
+        self.backfill = backfill
+        self.streams = list(streams or PREFIXES)
+
+    def _pages(self, prefix: bytes, min_round: int, max_round: int) -> Iterator[List[Dict[str, Any]]]:
+        token = None
+        while True:
+            result = self.source.search(prefix, min_round, max_round, token)
+            yield result.get("transactions", [])
+            token = result.get("next-token")
+            if not token:
+                return
+
+    def poll(self) -> Dict[str, int]:
+        """Ingest every stream up to the source's current round.
+
+        Returns the number of notes stored per stream.
+        """
+        tip = self.source.latest_round()
+        stored = {}
+        for stream in self.streams:
+            cursor = self.store.cursor(stream)
+            start = max(0, tip - self.backfill) if cursor is None else cursor + 1
+            if start > tip:
+                stored[stream] = 0
+                continue
+            transactions = [t for page in self._pages(PREFIXES[stream], start, tip) for t in page]
+            stored[stream] = self.store.ingest(stream, transactions, tip)
+        return stored
+
+    def run(self, interval: float, stop: Optional[threading.Event] = None, log: Callable[[str], None] = print) -> None:
+        """Poll every ``interval`` seconds until ``stop`` is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                stored = self.poll()
+                if any(stored.values()):
+                    log(" ".join(f"{stream}+{n}" for stream, n in stored.items() if n))
+            except Exception as exc:  # keep tailing through transient indexer errors
+                log(f"poll failed: {exc}")
+            stop.wait(interval)
+
+
+# ---------------------------------------------------------------------------
+# HTTP API
+# ---------------------------------------------------------------------------
+
+def _int_param(query: Dict[str, List[str]], name: str, default: int = 0) -> int:
+    values = query.get(name)
+    return int(values[0]) if values else default
+
+
+def make_handler(store: NoteStore) -> type:
+    """Request handler class serving ``store`` as JSON."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            try:
+                status, body = self.route(url.path, query)
+            except ValueError as exc:
+                status, body = 400, {"error": str(exc)}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def route(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, Any]:
+            cursors = store.cursors()
+            if path == "/positions":
+                min_round = (cursors.get("pos") or 0) - POSITION_WINDOW
+                return 200, {
+                    "round": cursors.get("pos"),
+                    "window": POSITION_WINDOW,
+                    "positions": store.positions_since(_int_param(query, "since"), min_round),
+                }
+            if path == "/chat":
+                limit = _int_param(query, "limit", 100)
+                if "after" in query:
+                    messages = store.chat_after(_int_param(query, "after"), limit)
+                else:
+                    messages = store.recent_chat(limit)
+                return 200, {"round": cursors.get("chat"), "messages": messages}
+            if path == "/battles":
+                return 200, {"round": cursors.get("battle"), "battles": store.battles_since(_int_param(query, "since"))}
+            if path == "/trades":
+                return 200, {"round": cursors.get("trade"), "trades": store.trades_since(_int_param(query, "since"))}
+            if path.startswith("/player/"):
+                player = store.player(path[len("/player/"):])
+                return (200, player) if player else (404, {"error": "unknown player"})
+            if path == "/cursors":
+                return 200, cursors
+            return 404, {"error": "not found"}
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tail CHRPG:* notes into SQLite and serve delta queries.")
+    parser.add_argument("--db", type=Path, default=Path("notes.sqlite"))
+    parser.add_argument("--indexer-url", default=DEFAULT_INDEXER_URL)
+    parser.add_argument("--indexer-token", default="")
+    parser.add_argument("--interval", type=float, default=4.0, help="seconds between polls (about one round)")
+    parser.add_argument("--backfill", type=int, default=DEFAULT_BACKFILL, help="rounds to read on a stream's first poll")
+    parser.add_argument("--once", action="store_true", help="poll once and exit")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="serve the HTTP API on this port while tailing")
+    args = parser.parse_args(argv)
+
+    store = NoteStore(args.db)
+    ingestor = Ingestor(store, IndexerSource(args.indexer_url, args.indexer_token), args.backfill)
+    if args.once:
+        stored = ingestor.poll()
+        print(" ".join(f"{stream}+{n}" for stream, n in stored.items()), store.cursors())
+        return 0
+
+    stop = threading.Event()
+    if args.serve:
+        server = ThreadingHTTPServer(("", args.serve), make_handler(store))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"serving on :{args.serve}")
+    try:
+        ingestor.run(args.interval, stop)
+    except KeyboardInterrupt:
+        stop.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
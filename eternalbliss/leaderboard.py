@@ -0,0 +1,285 @@
+"""On-chain leaderboards: box layout, box references and a reader.
+
+The contract keeps the top :data:`SIZE` players by level, battles won and
+gold, one application box per stat (``top:level``, ``top:battles_won``,
+``top:gold``). A box holds :data:`CAPACITY` entries of :data:`ENTRY_SIZE`
+bytes, best first: the score as a big-endian uint64 followed by the player's
+32-byte public key. Entries therefore compare as plain bytes, with ties
+going to the higher key, and a player's entry is found by a binary search
+for their current score. Moving an entry is a fixed number of box reads
+and at most five ``box_replace`` calls, whatever the number of players.
+Unused slots are zero. The entries past :data:`SIZE` are slack that refills
+the top when ranked players fall.
+
+Every method that changes a ranked stat moves the sender's entries (a
+group of ``apply_batch`` calls does so once, in its last call), so an
+entry always carries the player's current score. Registering ranks
+nothing: it only removes any entry the player left behind by clearing
+their state, and closing out removes the player. A player enters a board
+on their first ranked change that beats its last entry. Zero scores are
+never ranked.
+
+Which ranks are guaranteed: when the last entry leaves the board or falls
+to a lower score, the players off the board can now outrank it, and the
+contract raises the board's watermark (the key after the entries) to it.
+Every player off the board has a key no higher than the watermark or the
+last entry, so an entry not below the watermark has the same rank as in a
+full scan of every account (:attr:`Entry.exact`). On a board that has only
+risen, such as battles won, that is every entry. On one whose scores also
+fall, the ranks below the watermark are a best effort, and the watermark
+never comes down. A player who cleared their state without registering
+again keeps their entry until it is pushed off.
+
+Calls must reference the boxes they touch: :func:`box_names` lists them
+per method, and the clients add them. A box is under 1 KiB, so one
+reference covers it. The boards exist once the admin calls
+``create_leaderboards`` with the app account funded for
+:data:`MIN_BALANCE`; until then ranking is skipped.
+
+Reading a whole board is one box read::
+
+    python -m eternalbliss.leaderboard --app-id 1234 gold level
+    python -m eternalbliss.leaderboard --offline --players 2000   # check against a full scan and the budget
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import random
+import sys
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+# Ranked stats, each with its own board
+FIELDS = ("level", "battles_won", "gold")
+
+# Entries shown per board, and kept: the slack below the top refills it
+# when ranked players fall
+SIZE = 16
+CAPACITY = 24
+ENTRY_SIZE = 8 + 32
+# Offset of the watermark, the highest last entry that ever left a board
+# or fell, which follows the entries
+WATERMARK = CAPACITY * ENTRY_SIZE
+BOX_SIZE = WATERMARK + ENTRY_SIZE
+
+# Methods that change a ranked stat, and the boards they update;
+# create_player only drops what a rejoining player left behind
+RANKED: Dict[str, Tuple[str, ...]] = {
+    "battle": ("battles_won", "gold"),
+    "update_stats": ("level", "gold"),
+    "save_progress": ("level", "gold"),
+    "buy_item": ("gold",),
+    "claim_rewards": ("gold",),
+    "apply_batch": ("battles_won", "gold"),
+    "create_player": FIELDS,
+    "create_leaderboards": FIELDS,
+}
+# CloseOut calls remove the player from every board
+CLOSE_OUT = FIELDS
+
+# The offline check fails on any call within this many opcodes of the
+# 700 per-call budget, so ranking cannot creep up to it unnoticed
+BUDGET_MARGIN = 50
+
+
+def box_name(field: str) -> bytes:
+    return b"top:" + field.encode()
+
+
+def box_names(method: str) -> List[bytes]:
+    """Boxes a call to ``method`` must reference."""
+    return [box_name(field) for field in RANKED.get(method, ())]
+
+
+def start_key(field: str) -> bytes:
+    """A new board's watermark: the highest key at the starting score."""
+    from .record import INITIAL
+
+    start = INITIAL[field]
+    return start.to_bytes(8, "big") + b"\xff" * 32 if start else bytes(ENTRY_SIZE)
+
+
+# Minimum balance the app account needs for all boards, in microAlgos
+MIN_BALANCE = sum(2500 + 400 * (len(box_name(field)) + BOX_SIZE) for field in FIELDS)
+
+
+def encode_address(public_key: bytes) -> str:
+    """Algorand address of a 32-byte public key."""
+    checksum = hashlib.new("sha512_256", public_key).digest()[-4:]
+    return base64.b32encode(public_key + checksum).decode().rstrip("=")
+
+
+class Entry(NamedTuple):
+    rank: int
+    address: str
+    score: int
+    # Not below the watermark: a full scan ranks the player the same
+    exact: bool = True
+
+
+def decode(value: bytes, size: int = SIZE) -> List[Entry]:
+    """The top ``size`` entries of one board, best first; empty slots are
+    skipped."""
+    if len(value) != BOX_SIZE:
+        raise ValueError(f"board of {len(value)} bytes, expected {BOX_SIZE}")
+    watermark = value[WATERMARK:]
+    entries = []
+    for offset in range(0, min(size, CAPACITY) * ENTRY_SIZE, ENTRY_SIZE):
+        entry = value[offset:offset + ENTRY_SIZE]
+        if any(entry):
+            entries.append(Entry(
+                len(entries) + 1, encode_address(entry[8:]), int.from_bytes(entry[:8], "big"), entry >= watermark
+            ))
+    return entries
+
+
+def read(algod_client: Any, app_id: int, field: str) -> List[Entry]:
+    """One board of a deployed application, via algod (py-algorand-sdk)."""
+    box = algod_client.application_box_by_name(app_id, box_name(field))
+    return decode(base64.b64decode(box["value"]))
+
+
+def scan(locals_: Mapping[bytes, Mapping[bytes, Any]], field: str) -> List[Entry]:
+    """The board as a full scan of every player's local state would rank it."""
+    from .record import from_local_state
+
+    scores = []
+    for address, state in locals_.items():
+        stats = from_local_state(state)
+        scores.append((stats[field], address))
+    scores.sort(reverse=True)
+    return [Entry(rank, encode_address(address), score) for rank, (score, address) in enumerate(scores[:SIZE], 1)]
+
+
+def _print_board(field: str, entries: List[Entry]) -> None:
+    print(f"top {field}")
+    for entry in entries:
+        print(f"  {entry.rank:>3} {entry.address} {entry.score:>14,}")
+
+
+def _rejoin(storage: str) -> bool:
+    """Clear state and register again: the player must be ranked once, at
+    their new scores."""
+    from .avm import AVM, CLEAR_STATE, OPT_IN, app_call, method_call, player_address
+
+    admin, player = player_address(0xAD), player_address(0)
+    avm = AVM.from_build(storage=storage, app_id=0, creator=admin)
+    avm.call(app_call(admin, application_id=0))
+    avm.call(method_call(admin, "create_leaderboards"))
+    for txn in (
+        method_call(player, "create_player", "Hero", on_completion=OPT_IN),
+        method_call(player, "update_stats", 10, 500, 9000),
+        app_call(player, on_completion=CLEAR_STATE),
+        method_call(player, "create_player", "Hero", on_completion=OPT_IN),
+        method_call(player, "update_stats", 3, 10, 200),
+    ):
+        result = avm.call(txn)
+        if not result.accepted:
+            raise RuntimeError(f"rejoin scenario rejected: {result.error}")
+    boards = {field: [e.score for e in decode(avm.ledger.boxes[box_name(field)])] for field in FIELDS}
+    print(f"rejoin after ClearState: {boards}")
+    return boards == {"level": [3], "battles_won": [], "gold": [200]}
+
+
+def _offline(players: int, calls: int, seed: int, storage: str) -> int:
+    """Replay synthetic traffic, with players clearing their state and
+    registering again throughout, through the offline AVM; compare every
+    board with a full scan of local state and check every call's cost
+    against the budget."""
+    from .avm import (
+        APP_CALL_BUDGET, AVM, CLEAR_STATE, OPT_IN, app_call, decode_address, method_call, player_address,
+        synthetic_traffic,
+    )
+    from .record import from_local_state
+
+    failed = 0
+    if not _rejoin(storage):
+        failed += 1
+        print("  WRONG: a player who cleared state and registered again is ranked twice or not at all")
+
+    admin = player_address(0xAD)
+    avm = AVM.from_build(storage=storage, app_id=0, creator=admin)
+    avm.call(app_call(admin, application_id=0))
+    avm.call(method_call(admin, "create_leaderboards"))
+    for n in range(players):
+        avm.call(method_call(player_address(n), "create_player", f"Hero{n}", on_completion=OPT_IN))
+
+    traffic = synthetic_traffic(players, calls, seed)
+    rng = random.Random(seed)
+    for _ in range(calls // 100):
+        player = player_address(rng.randrange(players))
+        at = rng.randrange(len(traffic) + 1)
+        traffic[at:at] = [
+            app_call(player, on_completion=CLEAR_STATE),
+            method_call(player, "create_player", "Hero", on_completion=OPT_IN),
+        ]
+    start = time.perf_counter()
+    results = avm.apply_batch(traffic)
+    elapsed = time.perf_counter() - start
+    costs = sorted(r.cost for r in results if r.accepted)
+    print(f"{len(results)} app calls in {elapsed:.2f}s, {len(costs)} accepted; "
+          f"cost median {costs[len(costs) // 2]}, max {costs[-1]} opcodes")
+    limit = APP_CALL_BUDGET - BUDGET_MARGIN
+    over = sum(1 for r in results if r.cost > limit or not r.accepted and "budget" in (r.error or ""))
+    if over:
+        failed += 1
+        print(f"  OVER BUDGET: {over} calls above {limit} of {APP_CALL_BUDGET} opcodes")
+
+    # Every entry must carry its player's current score, in order, and the
+    # top SIZE must be those of a full scan
+    for field in FIELDS:
+        board = decode(avm.ledger.boxes[box_name(field)])
+        expected = scan(avm.ledger.locals, field)
+        ranked = sum(1 for e in expected if e.score)
+        _print_board(field, board[:5])
+        current = [from_local_state(avm.ledger.locals[decode_address(e.address)])[field] for e in board]
+        scores = [e.score for e in board]
+        if scores != current or scores != sorted(scores, reverse=True):
+            failed += 1
+            print("  STALE: entries do not match the players' current scores")
+        agree = next((i for i, (e, x) in enumerate(zip(board, expected)) if e[1:3] != x[1:3]), min(len(board), ranked))
+        exact = sum(e.exact for e in board)
+        print(f"  {len(board)} entries, the top {agree} as ranked by a full scan of {len(avm.ledger.locals)} players, "
+              f"{exact} guaranteed")
+        if agree < min(SIZE, ranked) or exact > agree:
+            failed += 1
+            print("  WRONG: the board disagrees with a full scan")
+    return 1 if failed else 0
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Read the on-chain leaderboards.")
+    parser.add_argument("fields", nargs="*", metavar="FIELD",
+                        help=f"boards to read: {', '.join(FIELDS)} (default: all)")
+    parser.add_argument("--app-id", type=int)
+    parser.add_argument("--algod-url", default="https://testnet-api.algonode.cloud")
+    parser.add_argument("--algod-token", default="")
+    parser.add_argument("--offline", action="store_true", help="replay synthetic traffic through the offline AVM instead")
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=("keys", "packed"), default="keys", help="local-state layout to build")
+    args = parser.parse_args(argv)
+
+    unknown = sorted(set(args.fields) - set(FIELDS))
+    if unknown:
+        parser.error(f"no leaderboard for {', '.join(unknown)}")
+    if args.offline:
+        return _offline(args.players, args.calls, args.seed, args.storage)
+    if args.app_id is None:
+        parser.error("--app-id is required unless --offline")
+    try:
+        from algosdk.v2client import algod
+    except ImportError:
+        raise SystemExit("py-algorand-sdk is required to read from algod; install eternalbliss[algod]")
+    client = algod.AlgodClient(args.algod_token, args.algod_url)
+    for field in args.fields or FIELDS:
+        _print_board(field, read(client, args.app_id, field))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
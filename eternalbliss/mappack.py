@@ -0,0 +1,308 @@
+"""Chunked map packer: mapmaker exports to palette + run-length chunks.
+
+The mapmaker's code export (``maps/bliss.json``) spells out every terrain
+tile as a string, ``"water"``, ``"forest"``, ..., so a 75x75 map is 88 KB
+before any entity is listed. This packer reads that export, or the JSON
+one, and writes a directory::
+
+    manifest.json        size, chunk size, terrain palette, areas, chunk list
+    <sha256[:16]>.bin    one file per distinct chunk, named by its content
+
+Each chunk covers ``chunk_size`` x ``chunk_size`` tiles (less at the right
+and bottom edges): a version byte, then a zlib stream of::
+
+    terrain    (run varint, palette index varint) pairs, row-major, until
+               the chunk is full
+    entities   the rest: compact JSON of the buildings, NPCs, enemies and
+               items standing in the chunk, as {kind: {"keys", "rows"}}
+
+The manifest lists every chunk with its SHA-256, plus a root hash over all
+chunk hashes, so a loader can verify what it fetched and a publisher can
+address the whole map by one digest. Identical chunks (open sea) share a
+file. ``loadCustomMap()`` in script.js fetches the manifest,
+then fetches and decodes only the chunks around the player::
+
+    python -m eternalbliss.mappack maps/bliss.json --name Bliss
+    python -m eternalbliss.mappack --verify maps/bliss --against maps/bliss.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+FORMAT = "eternalbliss-map"
+FORMAT_VERSION = 1
+CHUNK_VERSION = 1
+DEFAULT_CHUNK_SIZE = 32
+
+# Export key -> entity kind, as loadCustomMap() names them
+ENTITY_KINDS = {
+    "customBuildings": "buildings",
+    "customNPCs": "npcs",
+    "customEnemies": "enemies",
+    "customItems": "items",
+}
+
+_CONST = re.compile(r"const (custom\w+) = ")
+_SIZE = re.compile(r"gameState\.world\.(width|height) = (\d+);")
+
+
+def read_export(text: str) -> Dict[str, Any]:
+    """A map in loadCustomMap()'s shape from either mapmaker export.
+
+    The JSON export already has that shape; the code export
+    (``const customTerrain = [...]`` and friends) is converted.
+    """
+    stripped = text.lstrip()
+    if stripped.startswith("{"):
+        data = json.loads(stripped)
+        if "terrain" not in data:
+            raise ValueError("map export has no terrain")
+        return data
+
+    decoder = json.JSONDecoder()
+    consts = {m.group(1): decoder.raw_decode(text, m.end())[0] for m in _CONST.finditer(text)}
+    if "customTerrain" not in consts:
+        raise ValueError("map export has no customTerrain")
+    terrain = consts["customTerrain"]
+    size = {k: int(v) for k, v in _SIZE.findall(text)}
+    data: Dict[str, Any] = {
+        "name": "Custom Map",
+        "width": size.get("width", len(terrain[0]) if terrain else 0),
+        "height": size.get("height", len(terrain)),
+        "terrain": terrain,
+        "areas": consts.get("customAreas", []),
+    }
+    for const, kind in ENTITY_KINDS.items():
+        data[kind] = consts.get(const, [])
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Chunks
+# ---------------------------------------------------------------------------
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    n, shift = 0, 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _table(entities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    keys: List[str] = []
+    for entity in entities:
+        keys.extend(k for k in entity if k not in keys)
+    return {"keys": keys, "rows": [[entity.get(k) for k in keys] for entity in entities]}
+
+
+def _untable(table: Dict[str, Any]) -> List[Dict[str, Any]]:
+    keys = table["keys"]
+    return [{k: v for k, v in zip(keys, row) if v is not None} for row in table["rows"]]
+
+
+def encode_chunk(tiles: List[List[str]], palette: Dict[str, int], entities: Dict[str, List[Dict[str, Any]]]) -> bytes:
+    """One chunk from its rows of tile names and the entities standing in it."""
+    out = bytearray()
+    run, current = 0, -1
+    for row in tiles:
+        for tile in row:
+            index = palette[tile]
+            if index == current:
+                run += 1
+                continue
+            if run:
+                _put_varint(out, run)
+                _put_varint(out, current)
+            run, current = 1, index
+    if run:
+        _put_varint(out, run)
+        _put_varint(out, current)
+    tables = {kind: _table(rows) for kind, rows in entities.items() if rows}
+    if tables:
+        out += json.dumps(tables, separators=(",", ":")).encode()
+    return bytes((CHUNK_VERSION,)) + zlib.compress(bytes(out), 9)
+
+
+def decode_chunk(data: bytes, width: int, height: int, palette: List[str]) -> Tuple[List[List[str]], Dict[str, List[Dict[str, Any]]]]:
+    """``(rows of tile names, {kind: entities})`` of a ``width`` x ``height`` chunk."""
+    if data[0] != CHUNK_VERSION:
+        raise ValueError(f"unsupported chunk version {data[0]}")
+    data = zlib.decompress(data[1:])
+    flat: List[str] = []
+    pos, total = 0, width * height
+    while len(flat) < total:
+        run, pos = _get_varint(data, pos)
+        index, pos = _get_varint(data, pos)
+        flat.extend([palette[index]] * run)
+    if len(flat) != total:
+        raise ValueError("terrain runs overflow the chunk")
+    tiles = [flat[y * width:(y + 1) * width] for y in range(height)]
+    entities = {kind: _untable(table) for kind, table in json.loads(data[pos:]).items()} if pos < len(data) else {}
+    return tiles, entities
+
+
+def _chunk_bounds(width: int, height: int, size: int) -> Iterator[Tuple[int, int, int, int]]:
+    """``(cx, cy, chunk width, chunk height)`` of every chunk, row-major."""
+    for cy in range((height + size - 1) // size):
+        for cx in range((width + size - 1) // size):
+            yield cx, cy, min(size, width - cx * size), min(size, height - cy * size)
+
+
+def chunk_file(digest: str) -> str:
+    """File name of the chunk with SHA-256 ``digest``."""
+    return f"{digest[:16]}.bin"
+
+
+def pack(data: Dict[str, Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+    """``(manifest, {file name: chunk bytes})`` for a map."""
+    width, height, terrain = data["width"], data["height"], data["terrain"]
+    if len(terrain) != height or any(len(row) != width for row in terrain):
+        raise ValueError(f"terrain is not {width}x{height}")
+
+    palette_list: List[str] = []
+    for row in terrain:
+        palette_list.extend(t for t in dict.fromkeys(row) if t not in palette_list)
+    palette = {tile: i for i, tile in enumerate(palette_list)}
+
+    placed: Dict[Tuple[int, int], Dict[str, List[Dict[str, Any]]]] = {}
+    for kind in ENTITY_KINDS.values():
+        for entity in data.get(kind) or []:
+            key = (int(entity["x"]) // chunk_size, int(entity["y"]) // chunk_size)
+            placed.setdefault(key, {}).setdefault(kind, []).append(entity)
+
+    files: Dict[str, bytes] = {}
+    chunks = []
+    root = hashlib.sha256()
+    for cx, cy, w, h in _chunk_bounds(width, height, chunk_size):
+        x0, y0 = cx * chunk_size, cy * chunk_size
+        tiles = [terrain[y][x0:x0 + w] for y in range(y0, y0 + h)]
+        blob = encode_chunk(tiles, palette, placed.get((cx, cy), {}))
+        digest = hashlib.sha256(blob).hexdigest()
+        files[chunk_file(digest)] = blob
+        root.update(bytes.fromhex(digest))
+        chunks.append({"x": cx, "y": cy, "bytes": len(blob), "sha256": digest})
+
+    manifest = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "name": data.get("name", "Custom Map"),
+        "width": width,
+        "height": height,
+        "chunkSize": chunk_size,
+        "palette": palette_list,
+        "areas": data.get("areas") or [],
+        "chunks": chunks,
+        "root": root.hexdigest(),
+    }
+    return manifest, files
+
+
+def write(manifest: Dict[str, Any], files: Dict[str, bytes], out: Path) -> int:
+    """Write a packed map to ``out``; returns the total bytes written."""
+    out.mkdir(parents=True, exist_ok=True)
+    for stale in out.glob("*.bin"):
+        if stale.name not in files:
+            stale.unlink()
+    text = json.dumps(manifest, separators=(",", ":")).encode()
+    (out / "manifest.json").write_bytes(text)
+    for name, blob in files.items():
+        (out / name).write_bytes(blob)
+    return len(text) + sum(map(len, files.values()))
+
+
+def unpack(directory: Path) -> Dict[str, Any]:
+    """Read a packed map back into loadCustomMap()'s shape, checking every hash."""
+    manifest = json.loads((directory / "manifest.json").read_bytes())
+    if manifest.get("format") != FORMAT or manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{directory} is not a version {FORMAT_VERSION} packed map")
+    width, height, size = manifest["width"], manifest["height"], manifest["chunkSize"]
+    terrain: List[List[str]] = [[] for _ in range(height)]
+    data: Dict[str, Any] = {"name": manifest["name"], "width": width, "height": height, "terrain": terrain,
+                            "areas": manifest["areas"]}
+    data.update({kind: [] for kind in ENTITY_KINDS.values()})
+    root = hashlib.sha256()
+    bounds = {(cx, cy): (w, h) for cx, cy, w, h in _chunk_bounds(width, height, size)}
+    for chunk in manifest["chunks"]:
+        blob = (directory / chunk_file(chunk["sha256"])).read_bytes()
+        digest = hashlib.sha256(blob).hexdigest()
+        if digest != chunk["sha256"]:
+            raise ValueError(f"chunk {chunk['x']},{chunk['y']}: hash mismatch")
+        root.update(bytes.fromhex(digest))
+        w, h = bounds[chunk["x"], chunk["y"]]
+        tiles, entities = decode_chunk(blob, w, h, manifest["palette"])
+        for dy, row in enumerate(tiles):
+            terrain[chunk["y"] * size + dy].extend(row)
+        for kind, rows in entities.items():
+            data[kind].extend(rows)
+    if root.hexdigest() != manifest["root"]:
+        raise ValueError("root hash mismatch")
+    return data
+
+
+def _same_map(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    def key(entity: Dict[str, Any]) -> str:
+        return json.dumps(entity, sort_keys=True)
+
+    return (
+        a["terrain"] == b["terrain"]
+        and a.get("areas", []) == b.get("areas", [])
+        and all(sorted(map(key, a.get(k) or [])) == sorted(map(key, b.get(k) or [])) for k in ENTITY_KINDS.values())
+    )
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pack a mapmaker export into palette + run-length chunks.")
+    parser.add_argument("export", type=Path, nargs="?", help="mapmaker export (code or JSON)")
+    parser.add_argument("--out", type=Path, help="output directory (default: next to the export, without suffix)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--name", help="map name (default: from the export)")
+    parser.add_argument("--verify", type=Path, metavar="DIR", help="check a packed map's hashes and decode it")
+    parser.add_argument("--against", type=Path, metavar="EXPORT", help="with --verify: compare with this export")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        data = unpack(args.verify)
+        print(f"{args.verify}: {data['width']}x{data['height']}, hashes ok")
+        if args.against:
+            same = _same_map(data, read_export(args.against.read_text()))
+            print(f"  matches {args.against}: {'yes' if same else 'NO'}")
+            return 0 if same else 1
+        return 0
+    if args.export is None:
+        parser.error("an export to pack, or --verify, is required")
+
+    text = args.export.read_text()
+    data = read_export(text)
+    if args.name:
+        data["name"] = args.name
+    manifest, files = pack(data, args.chunk_size)
+    out = args.out or args.export.with_suffix("")
+    total = write(manifest, files, out)
+    source = len(text.encode())
+    print(f"{args.export} ({source:,} bytes) -> {out}/: {len(manifest['chunks'])} chunks in {len(files)} files, "
+          f"{total:,} bytes ({source / total:.1f}x smaller)")
+    print(f"  root {manifest['root']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,455 @@
+"""Versioned binary codec for the game's ``CHRPG:*`` transaction notes.
+
+A note has always been ``prefix + JSON``; a save carried the whole
+``inventory`` and ``stats`` objects, the gold twice and ``xpToNext`` next
+to the level it follows from, in a 1 KB note field. The binary format keeps
+the text prefix, so indexer prefix searches work unchanged, and follows it
+with::
+
+    version     u8       FORMAT_VERSION (legacy JSON starts with "{")
+    flags       varint   bit 0: delta
+    base round  varint   delta only: round of the full save it is against
+    presence    varint   bit i set = field i of the stream's schema follows
+    fields      ...      in schema order
+
+Numbers are unsigned LEB128 varints and strings a varint length plus UTF-8.
+A field left out of a full note takes its schema default (``hp`` defaults
+to ``maxHp``, ``xpToNext`` to the value the level implies, and so on), so
+values the reader can work out cost one bit.
+
+A *delta* player save lists only the fields that changed since the last
+full save, numbers as zigzag-encoded differences; the reader applies it to
+that save, found by its round. Writers send a delta only when it is smaller
+than a full save.
+
+Objects the schema cannot carry (unknown keys, fractions, negative numbers)
+and streams without a schema (battle and trade notes) are written as legacy
+JSON, which :func:`decode` reads as before. ``note-codec.js`` is the same
+codec for the browser; the benchmark compares both formats::
+
+    python -m eternalbliss.notes --notes 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# Stream name -> note prefix, as in NOTE_PREFIXES in script.js
+PREFIXES: Dict[str, bytes] = {
+    "player": b"CHRPG:PLAYER:",
+    "pos": b"CHRPG:POS:",
+    "chat": b"CHRPG:CHAT:",
+    "battle": b"CHRPG:BATTLE:",
+    "trade": b"CHRPG:TRADE:",
+}
+
+FORMAT_VERSION = 1
+DELTA = 1
+
+UINT = "u"
+STR = "s"
+
+
+class Field(NamedTuple):
+    key: str
+    # Enclosing object ("inventory" for inventory.gold), or None at the top
+    parent: Optional[str]
+    kind: str
+    # Value of the field when it is left out of a full note: a constant, a
+    # function of the top-level fields decoded before it, or None for "absent".
+    default: Any = None
+
+
+def xp_to_next(level: int) -> int:
+    """``xpToNext`` at ``level``, as ``checkLevelUp`` in script.js grows it."""
+    value = 100
+    for _ in range(level - 1):
+        value = int(value * 1.4)
+    return value
+
+
+def _field(path: str, kind: str = UINT, default: Any = None) -> Field:
+    parent, _, key = path.rpartition(".")
+    return Field(key, parent or None, kind, default)
+
+
+# Field order is the layout; append only.
+SCHEMAS: Dict[str, Tuple[Field, ...]] = {
+    "player": (
+        _field("name", STR),
+        _field("level"),
+        _field("xp", default=0),
+        _field("xpToNext", default=lambda d: xp_to_next(d.get("level", 1))),
+        _field("maxHp"),
+        _field("hp", default=lambda d: d.get("maxHp")),
+        _field("maxMp"),
+        _field("mp", default=lambda d: d.get("maxMp")),
+        _field("attack"),
+        _field("defense"),
+        _field("magic"),
+        _field("gold"),
+        _field("x"),
+        _field("y"),
+        _field("inventory.gold", default=lambda d: d.get("gold")),
+        _field("inventory.healthPotions", default=0),
+        _field("inventory.manaPotions", default=0),
+        _field("inventory.keys", default=0),
+        _field("stats.enemiesDefeated", default=0),
+        _field("stats.treasuresFound", default=0),
+        _field("stats.townsVisited", default=1),
+        _field("timestamp"),
+    ),
+    "pos": (
+        _field("name", STR),
+        _field("level"),
+        _field("x"),
+        _field("y"),
+        _field("timestamp"),
+    ),
+    "chat": (
+        _field("name", STR),
+        _field("message", STR),
+        _field("level"),
+        _field("timestamp"),
+    ),
+}
+
+# Streams whose notes may be deltas against an earlier full note
+DELTA_STREAMS = ("player",)
+
+Note = Union[str, bytes]
+
+
+class MissingBase(ValueError):
+    """A delta note was decoded without the full save it applies to."""
+
+    def __init__(self, round: int):
+        super().__init__(f"delta note needs the full save from round {round}")
+        self.round = round
+
+
+# ---------------------------------------------------------------------------
+# Varints
+# ---------------------------------------------------------------------------
+
+def _put_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    n, shift = 0, 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _zigzag(n: int) -> int:
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+# ---------------------------------------------------------------------------
+# Codec
+# ---------------------------------------------------------------------------
+
+_ABSENT = object()
+
+
+def _get(data: Dict[str, Any], field: Field) -> Any:
+    if field.parent is not None:
+        data = data.get(field.parent)
+        if not isinstance(data, dict):
+            return _ABSENT
+    return data.get(field.key, _ABSENT)
+
+
+def _target(data: Dict[str, Any], field: Field) -> Dict[str, Any]:
+    if field.parent is None:
+        return data
+    inner = data.get(field.parent)
+    if inner is None:
+        inner = data[field.parent] = {}
+    return inner
+
+
+def _encodable(schema: Tuple[Field, ...], data: Dict[str, Any]) -> bool:
+    known = {(f.parent, f.key): f.kind for f in schema}
+    for key, value in data.items():
+        items = value.items() if isinstance(value, dict) else ((None, value),)
+        for inner, v in items:
+            path = (key, inner) if inner is not None else (None, key)
+            kind = known.get(path)
+            if kind is None:
+                return False
+            if kind == UINT and (type(v) is not int or v < 0):
+                return False
+            if kind == STR and not isinstance(v, str):
+                return False
+    return True
+
+
+def _default(field: Field, decoded: Dict[str, Any]) -> Any:
+    default = field.default
+    return default(decoded) if callable(default) else default
+
+
+def encode_body(stream: str, data: Dict[str, Any], base: Optional[Dict[str, Any]] = None, base_round: int = 0) -> Optional[bytes]:
+    """The binary body of a note (without prefix), or ``None`` if ``data``
+    does not fit the stream's schema.
+
+    With ``base`` (a decoded full save) and ``base_round``, the body is a
+    delta against it.
+    """
+    schema = SCHEMAS.get(stream)
+    if schema is None or not _encodable(schema, data):
+        return None
+    out = bytearray((FORMAT_VERSION,))
+    values = bytearray()
+    present = 0
+    if base is None:
+        _put_varint(out, 0)
+        for i, field in enumerate(schema):
+            value = _get(data, field)
+            if value is _ABSENT:
+                continue
+            if field.default is not None and value == _default(field, data):
+                continue
+            present |= 1 << i
+            _put_value(values, field.kind, value)
+    else:
+        _put_varint(out, DELTA)
+        _put_varint(out, base_round)
+        for i, field in enumerate(schema):
+            value, old = _get(data, field), _get(base, field)
+            if value is _ABSENT or value == old:
+                continue
+            present |= 1 << i
+            if field.kind == UINT and old is not _ABSENT:
+                _put_varint(values, _zigzag(value - old))
+            else:
+                _put_value(values, field.kind, value)
+    _put_varint(out, present)
+    return bytes(out + values)
+
+
+def _put_value(out: bytearray, kind: str, value: Any) -> None:
+    if kind == UINT:
+        _put_varint(out, value)
+    else:
+        raw = value.encode()
+        _put_varint(out, len(raw))
+        out += raw
+
+
+def encode(stream: str, data: Dict[str, Any], base: Optional[Dict[str, Any]] = None, base_round: int = 0) -> bytes:
+    """A complete note: prefix and binary body, or prefix and JSON."""
+    body = encode_body(stream, data, base, base_round)
+    if body is None:
+        body = json.dumps(data, separators=(",", ":")).encode()
+    return PREFIXES[stream] + body
+
+
+def _raw(note: Note, stream: str) -> Optional[bytes]:
+    raw = base64.b64decode(note) if isinstance(note, str) else note
+    prefix = PREFIXES[stream]
+    return raw[len(prefix):] if raw.startswith(prefix) else None
+
+
+def base_round(note: Note, stream: str) -> Optional[int]:
+    """Round of the full save a delta note applies to; ``None`` otherwise."""
+    body = _raw(note, stream)
+    if not body or body[0] != FORMAT_VERSION:
+        return None
+    flags, pos = _get_varint(body, 1)
+    return _get_varint(body, pos)[0] if flags & DELTA else None
+
+
+def decode(note: Note, stream: str, base: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """The object a note carries, or ``None`` if it is not a valid note of
+    ``stream``.
+
+    ``note`` is raw bytes or base64 as the indexer returns it. A delta needs
+    ``base``, the decoded full save from :func:`base_round`; without it
+    :class:`MissingBase` is raised.
+    """
+    body = _raw(note, stream)
+    if not body:
+        return None
+    if body[0] != FORMAT_VERSION:
+        try:
+            data = json.loads(body)
+        except (UnicodeDecodeError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+    try:
+        return _decode_body(body, SCHEMAS[stream], base)
+    except (IndexError, KeyError, UnicodeDecodeError):
+        return None
+
+
+def _decode_body(body: bytes, schema: Tuple[Field, ...], base: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    flags, pos = _get_varint(body, 1)
+    delta = flags & DELTA
+    if delta:
+        round, pos = _get_varint(body, pos)
+        if base is None:
+            raise MissingBase(round)
+        data = {k: dict(v) if isinstance(v, dict) else v for k, v in base.items()}
+    else:
+        data = {}
+    present, pos = _get_varint(body, pos)
+    for field in schema:
+        if present & 1:
+            n = body[pos]
+            pos += 1
+            if n >= 0x80:
+                n, pos = _get_varint(body, pos - 1)
+            if field.kind == STR:
+                value: Any = body[pos:pos + n].decode()
+                pos += n
+            elif delta:
+                old = _get(data, field)
+                value = n if old is _ABSENT else old + _unzigzag(n)
+            else:
+                value = n
+            _target(data, field)[field.key] = value
+        elif not delta and field.default is not None:
+            _target(data, field)[field.key] = _default(field, data)
+        present >>= 1
+    if pos != len(body):
+        raise IndexError("trailing bytes in note")
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def sample_player(rng: random.Random) -> Dict[str, Any]:
+    """A save as ``saveToAlgorand`` writes it."""
+    level = rng.randint(1, 30)
+    max_hp, max_mp = 100 + (level - 1) * 20, 50 + (level - 1) * 10
+    gold = rng.randint(0, 5000)
+    return {
+        "name": rng.choice(("Hero", "Aria", "Bjorn the Bold", "Zed")),
+        "level": level,
+        "hp": rng.choice((max_hp, rng.randint(1, max_hp))),
+        "maxHp": max_hp,
+        "mp": max_mp,
+        "maxMp": max_mp,
+        "xp": rng.randint(0, 100),
+        "xpToNext": xp_to_next(level),
+        "attack": 15 + (level - 1) * 3,
+        "defense": 10 + (level - 1) * 2,
+        "magic": 20 + (level - 1) * 4,
+        "gold": gold,
+        "x": rng.randrange(50),
+        "y": rng.randrange(37),
+        "inventory": {"gold": gold, "healthPotions": rng.randint(0, 9), "manaPotions": rng.randint(0, 9), "keys": rng.randint(0, 2)},
+        "stats": {"enemiesDefeated": rng.randint(0, 500), "treasuresFound": rng.randint(0, 20), "townsVisited": rng.randint(1, 6)},
+        "timestamp": 1_700_000_000_000 + rng.randrange(10 ** 10),
+    }
+
+
+def next_save(rng: random.Random, save: Dict[str, Any]) -> Dict[str, Any]:
+    """The next save of the same player, a few battles later."""
+    nxt = json.loads(json.dumps(save))
+    won = rng.randint(1, 5)
+    nxt["gold"] += won * 25
+    nxt["inventory"]["gold"] = nxt["gold"]
+    nxt["xp"] += won * 30
+    nxt["stats"]["enemiesDefeated"] += won
+    nxt["hp"] = rng.randint(1, nxt["maxHp"])
+    nxt["x"], nxt["y"] = rng.randrange(50), rng.randrange(37)
+    nxt["timestamp"] += rng.randint(60_000, 600_000)
+    return nxt
+
+
+def sample_notes(stream: str, count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    if stream == "player":
+        return [sample_player(rng) for _ in range(count)]
+    if stream == "pos":
+        return [{"name": "Hero", "level": rng.randint(1, 30), "x": rng.randrange(50), "y": rng.randrange(37),
+                 "timestamp": 1_700_000_000_000 + rng.randrange(10 ** 10)} for _ in range(count)]
+    words = ("hi", "anyone near the castle?", "gg", "selling potions", "where is the temple")
+    return [{"name": "Hero", "message": rng.choice(words), "level": rng.randint(1, 30),
+             "timestamp": 1_700_000_000_000 + rng.randrange(10 ** 10)} for _ in range(count)]
+
+
+def _rate(fn: Callable[[], Any], count: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def benchmark(count: int, seed: int = 0) -> List[Tuple[str, float, float, float, float]]:
+    """``(stream, json bytes, binary bytes, json notes/s, binary notes/s)``
+    per stream, plus a ``player delta`` row; notes are base64 as the indexer
+    returns them."""
+    rows = []
+    for stream in SCHEMAS:
+        objects = sample_notes(stream, count, seed)
+        legacy = [PREFIXES[stream] + json.dumps(o).encode() for o in objects]
+        binary = [encode(stream, o) for o in objects]
+        rows.append(_row(stream, stream, legacy, binary))
+        if stream in DELTA_STREAMS:
+            rng = random.Random(seed)
+            saves = [next_save(rng, o) for o in objects]
+            bases = [decode(note, stream) for note in binary]
+            deltas = [encode(stream, save, base, 1) for save, base in zip(saves, bases)]
+            legacy = [PREFIXES[stream] + json.dumps(save).encode() for save in saves]
+            rows.append(_row(f"{stream} delta", stream, legacy, deltas, bases))
+    return rows
+
+
+def _row(label: str, stream: str, legacy: List[bytes], binary: List[bytes], bases: Optional[list] = None) -> Tuple[str, float, float, float, float]:
+    b64_legacy = [base64.b64encode(n).decode() for n in legacy]
+    b64_binary = [base64.b64encode(n).decode() for n in binary]
+    prefix = len(PREFIXES[stream])
+    loads, b64decode = json.loads, base64.b64decode
+    json_rate = _rate(lambda: [loads(b64decode(n)[prefix:]) for n in b64_legacy], len(legacy))
+    if bases is None:
+        binary_rate = _rate(lambda: [decode(n, stream) for n in b64_binary], len(binary))
+    else:
+        binary_rate = _rate(lambda: [decode(n, stream, b) for n, b in zip(b64_binary, bases)], len(binary))
+    return (
+        label,
+        sum(map(len, legacy)) / len(legacy),
+        sum(map(len, binary)) / len(binary),
+        json_rate,
+        binary_rate,
+    )
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare note sizes and decode speed, legacy JSON vs binary.")
+    parser.add_argument("--notes", type=int, default=20000, help="notes per stream")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'stream':<14}{'json B':>8}{'binary B':>10}{'saved':>8}{'json notes/s':>15}{'binary notes/s':>16}")
+    for label, json_bytes, binary_bytes, json_rate, binary_rate in benchmark(args.notes, args.seed):
+        saved = 1 - binary_bytes / json_bytes
+        print(f"{label:<14}{json_bytes:>8.1f}{binary_bytes:>10.1f}{saved:>8.0%}{json_rate:>15,.0f}{binary_rate:>16,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""Per-operation opcode cost and dispatch depth of the approval program.
+
+Every operation the contract supports is run once through the offline
+engine (:mod:`eternalbliss.avm`) against a small fixture ledger. For each
+one the report shows:
+
+* **depth** - how many tests of the top-level dispatcher the call passes
+  through before reaching its body (all labels of one ``match`` share a
+  depth);
+* **dispatch** - opcodes spent in the dispatcher;
+* **body** - opcodes spent in the operation itself;
+* **total** and the share of the pooled budget it consumes.
+
+Reports can be saved and compared, so every contract revision shows what
+it did to the hot path::
+
+    python -m eternalbliss.profiler --save before.json
+    # ... edit eternalbliss/contract.py ...
+    python -m eternalbliss.profiler --baseline before.json
+
+``--baseline`` also accepts a ``.teal`` file, e.g. an older build pulled out
+of git with ``git show HEAD~1:contracts/approval.teal``. ``--storage packed``
+profiles the packed player record layout instead of one key per stat, so
+the two can be compared::
+
+    python -m eternalbliss.profiler --save keys.json
+    python -m eternalbliss.profiler --storage packed --baseline keys.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import leaderboard, sync
+from .avm import (
+    APP_CALL_BUDGET,
+    AVM,
+    CLEAR_STATE,
+    CLOSE_OUT,
+    DELETE_APPLICATION,
+    OPCODE_COST,
+    OPT_IN,
+    UPDATE_APPLICATION,
+    Ledger,
+    Program,
+    Transaction,
+    app_call,
+    compile_program,
+    method_call,
+    payment,
+    player_address,
+)
+
+ADMIN = player_address(0xAD)
+PLAYER = player_address(1)
+OTHER = player_address(2)
+
+# Bump when the report layout changes
+REPORT_FORMAT = 1
+
+# Local schema (uints, byte slices) of the default "keys" storage mode
+KEYS_LOCAL_SCHEMA = (15, 1)
+
+
+@dataclass
+class Branch:
+    """One test of the top-level dispatcher."""
+
+    depth: int
+    label: str
+    block: int
+    cost: int  # opcodes spent in the dispatcher when this branch is taken
+    test: str
+
+
+@dataclass
+class OperationProfile:
+    name: str
+    accepted: bool
+    error: Optional[str]
+    cost: int
+    budget: int
+    depth: Optional[int]
+    dispatch_cost: int
+
+    @property
+    def body_cost(self) -> int:
+        return self.cost - self.dispatch_cost
+
+    @property
+    def budget_share(self) -> float:
+        return self.cost / self.budget
+
+
+@dataclass
+class Report:
+    program_hash: str
+    operations: List[OperationProfile]
+    format: int = REPORT_FORMAT
+
+    def by_name(self) -> Dict[str, OperationProfile]:
+        return {op.name: op for op in self.operations}
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2) + "\n"
+
+    @classmethod
+    def from_json(cls, text: str) -> "Report":
+        data = json.loads(text)
+        data["operations"] = [OperationProfile(**op) for op in data["operations"]]
+        return cls(**data)
+
+
+# A scenario is (name, setup transactions, measured group). Setup runs on a
+# ledger where the app and its leaderboards exist and PLAYER and OTHER
+# are registered.
+Scenario = Tuple[str, Sequence[Transaction], Sequence[Transaction]]
+
+
+def scenarios() -> List[Scenario]:
+    """One representative, accepted call per operation."""
+    stats = [5, 1200, 800, 90, 100, 40, 50, 18, 12, 22, 30, 40]
+    level_5 = method_call(PLAYER, "update_stats", 5, 1200, 800)
+    # An offline session settled as sync does: six battle levels, a
+    # purchase and a move
+    session = [("battle", level) for level in range(1, 7)] + [("buy", 10), ("move", 20, 12)]
+    close_out_boxes = [leaderboard.box_name(field) for field in leaderboard.CLOSE_OUT]
+    return [
+        ("opt_in", [], [method_call(player_address(3), "create_player", "Newcomer", on_completion=OPT_IN)]),
+        ("close_out", [], [app_call(PLAYER, on_completion=CLOSE_OUT, boxes=close_out_boxes)]),
+        ("clear_state", [], [app_call(PLAYER, on_completion=CLEAR_STATE)]),
+        ("update_application", [], [app_call(ADMIN, on_completion=UPDATE_APPLICATION)]),
+        ("delete_application", [], [app_call(ADMIN, on_completion=DELETE_APPLICATION)]),
+        ("update_stats", [], [method_call(PLAYER, "update_stats", 2, 150, 300)]),
+        ("move", [], [method_call(PLAYER, "move", 16, 11)]),
+        ("battle", [], [method_call(PLAYER, "battle", 3)]),
+        ("trade", [], [method_call(PLAYER, "trade", 1, 5000, accounts=[OTHER]), payment(PLAYER, OTHER, 5000)]),
+        ("buy_item", [], [method_call(PLAYER, "buy_item", 15)]),
+        ("save_progress", [], [method_call(PLAYER, "save_progress", *stats)]),
+        ("mint_nft", [], [method_call(PLAYER, "mint_nft", 123456)]),
+        ("claim_rewards", [level_5], [method_call(PLAYER, "claim_rewards")]),
+        ("admin_pause", [], [method_call(ADMIN, "admin_pause", 1)]),
+        ("update_fee", [], [method_call(ADMIN, "update_fee", OTHER)]),
+        ("create_leaderboards", [], [method_call(ADMIN, "create_leaderboards")]),
+        ("apply_batch", [], list(sync.sync_groups(PLAYER, session)[0])),
+    ]
+
+
+def fixture(approval: Program, clear: Optional[Program], local_schema: Tuple[int, int] = KEYS_LOCAL_SCHEMA) -> AVM:
+    """An engine with the app and its leaderboards created and PLAYER and
+    OTHER registered."""
+    avm = AVM(approval, clear, Ledger(app_id=0, creator=ADMIN, local_schema=local_schema))
+    setup = [
+        app_call(ADMIN, application_id=0),
+        method_call(PLAYER, "create_player", "Hero", on_completion=OPT_IN),
+        method_call(OTHER, "create_player", "Rival", on_completion=OPT_IN),
+    ]
+    for result in avm.apply_batch(setup):
+        if not result.accepted:
+            raise RuntimeError(f"fixture setup rejected: {result.error}")
+    # A baseline from before the leaderboards rejects this; it is then
+    # measured without them
+    avm.call(method_call(ADMIN, "create_leaderboards"))
+    return avm
+
+
+def dispatch_table(program: Program) -> List[Branch]:
+    """The branches of the first block, in the order they are tested."""
+    end = program.block_starts[1] if len(program.block_starts) > 1 else len(program.instructions)
+    block_of = {start: n for n, start in enumerate(program.block_starts)}
+    branches: List[Branch] = []
+    cost = depth = 0
+    test: List[str] = []
+    cases: Tuple = ()
+    for ins in program.instructions[:end]:
+        cost += OPCODE_COST.get(ins.op, 1)
+        if ins.op in ("bnz", "bz", "switch", "match"):
+            depth += 1
+            for n, label in enumerate(ins.args):
+                block = block_of[program.labels[label]]
+                if ins.op == "match" and len(cases) == len(ins.args):
+                    described = f"match {_describe_value(cases[n])}"
+                else:
+                    described = " ".join(test) or ins.op
+                branches.append(Branch(depth, label, block, cost, described))
+            test, cases = [], ()
+        else:
+            test.append(_describe(ins))
+            if ins.op in ("pushbytess", "pushints"):
+                cases = ins.args
+    return branches
+
+
+def _describe(ins) -> str:
+    args = " ".join(_describe_value(a) for a in ins.args)
+    return f"{ins.op} {args}".strip()
+
+
+def _describe_value(value) -> str:
+    return f"0x{value.hex()}" if isinstance(value, bytes) else str(value)
+
+
+def _traced(program: Program, trace: List[int]) -> Program:
+    """``program`` with every block recording its index in ``trace``."""
+
+    def wrap(index: int, block: Callable) -> Callable:
+        def traced_block(c, s):
+            trace.append(index)
+            return block(c, s)
+        return traced_block
+
+    return program._replace(blocks=tuple(wrap(i, b) for i, b in enumerate(program.blocks)))
+
+
+def _first_block_cost(program: Program) -> int:
+    end = program.block_starts[1] if len(program.block_starts) > 1 else len(program.instructions)
+    return sum(OPCODE_COST.get(ins.op, 1) for ins in program.instructions[:end])
+
+
+def profile(
+    approval_teal: str,
+    clear_teal: Optional[str] = None,
+    local_schema: Tuple[int, int] = KEYS_LOCAL_SCHEMA,
+) -> Report:
+    """Run every scenario against ``approval_teal`` and collect its costs."""
+    approval = compile_program(approval_teal)
+    clear = compile_program(clear_teal) if clear_teal else None
+    branches = dispatch_table(approval)
+    by_block = {}
+    for branch in branches:
+        by_block.setdefault(branch.block, branch)
+
+    trace: List[int] = []
+    traced = _traced(approval, trace)
+    operations = []
+
+    all_scenarios = [("create", [], [app_call(ADMIN, application_id=0)])] + scenarios()
+    for name, setup, group in all_scenarios:
+        if name == "create":
+            avm = AVM(approval, clear, Ledger(app_id=0, creator=ADMIN, local_schema=local_schema))
+        else:
+            avm = fixture(approval, clear, local_schema)
+        for txn in setup:
+            avm.call(txn)
+        avm.approval = traced
+        del trace[:]
+        result = avm.apply_group(list(group))[0]
+        budget = APP_CALL_BUDGET * sum(1 for txn in group if txn.type == b"appl")
+        branch = by_block.get(trace[1]) if len(trace) > 1 and trace[0] == 0 else None
+        if branch is not None:
+            depth, dispatch_cost = branch.depth, branch.cost
+        elif name == "clear_state":
+            depth, dispatch_cost = None, 0
+        else:
+            # Fell through every test (or never left the first block)
+            depth, dispatch_cost = None, min(result.cost, _first_block_cost(approval))
+        operations.append(OperationProfile(name, result.accepted, result.error, result.cost, budget, depth, dispatch_cost))
+
+    return Report(hashlib.sha256(approval_teal.encode()).hexdigest(), operations)
+
+
+def profile_current(storage: str = "keys") -> Report:
+    """Profile the contract as it is in the working tree (via the build cache)."""
+    from . import build
+
+    artifact, _ = build.build(storage=storage)
+    schema = artifact.local_schema
+    return profile(artifact.approval.teal, artifact.clear.teal, (schema["num_uints"], schema["num_byte_slices"]))
+
+
+def load_baseline(path: Path, local_schema: Tuple[int, int] = KEYS_LOCAL_SCHEMA) -> Report:
+    """A saved JSON report, or a ``.teal`` approval program to profile."""
+    text = Path(path).read_text()
+    if Path(path).suffix == ".teal":
+        return profile(text, local_schema=local_schema)
+    return Report.from_json(text)
+
+
+def format_report(report: Report, baseline: Optional[Report] = None) -> str:
+    before = baseline.by_name() if baseline else {}
+    header = f"{'operation':<20}{'depth':>6}{'dispatch':>10}{'body':>7}{'total':>7}{'budget':>8}"
+    if baseline:
+        header += f"{'before':>8}{'delta':>7}"
+    lines = [header, "-" * len(header)]
+    for op in sorted(report.operations, key=lambda op: (op.depth is None, op.depth or 0, op.name)):
+        depth = "-" if op.depth is None else str(op.depth)
+        line = f"{op.name:<20}{depth:>6}{op.dispatch_cost:>10}{op.body_cost:>7}{op.cost:>7}{op.budget_share:>8.1%}"
+        if baseline:
+            old = before.get(op.name)
+            if old is None:
+                line += f"{'new':>8}{'':>7}"
+            else:
+                line += f"{old.cost:>8}{op.cost - old.cost:>+7}"
+        if not op.accepted:
+            line += f"  REJECTED: {op.error}"
+        lines.append(line)
+    if baseline:
+        common = [op for op in report.operations if op.name in before]
+        total = sum(op.cost for op in common)
+        total_before = sum(before[op.name].cost for op in common)
+        lines.append("-" * len(header))
+        lines.append(f"{'sum':<58}{total_before:>8}{total - total_before:>+7}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile opcode cost and dispatch depth per contract operation.")
+    parser.add_argument("--teal", type=Path, help="profile this approval program instead of the current build")
+    parser.add_argument("--baseline", type=Path, help="saved report (.json) or approval program (.teal) to compare against")
+    parser.add_argument("--save", type=Path, help="write the report as JSON")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON instead of a table")
+    parser.add_argument("--dispatch", action="store_true", help="also list the dispatcher's tests in order")
+    parser.add_argument(
+        "--storage",
+        choices=("keys", "packed"),
+        default="keys",
+        help="local-state layout to build, or that --teal/--baseline programs use",
+    )
+    args = parser.parse_args(argv)
+
+    from . import build
+
+    schema = build.schema(args.storage)[1]
+    local_schema = (schema["num_uints"], schema["num_byte_slices"])
+    if args.teal:
+        approval_teal = args.teal.read_text()
+        report = profile(approval_teal, local_schema=local_schema)
+    else:
+        approval_teal = build.build(storage=args.storage)[0].approval.teal
+        report = profile_current(args.storage)
+    baseline = load_baseline(args.baseline, local_schema) if args.baseline else None
+
+    if args.save:
+        args.save.write_text(report.to_json())
+    if args.json:
+        print(report.to_json(), end="")
+    else:
+        print(format_report(report, baseline))
+    if args.dispatch:
+        print()
+        for branch in dispatch_table(compile_program(approval_teal)):
+            print(f"{branch.depth:>3}  {branch.cost:>4}  {branch.label:<28}{branch.test}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
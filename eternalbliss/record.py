@@ -0,0 +1,132 @@
+"""Packed player record: the layout behind ``storage="packed"``.
+
+In the default ``"keys"`` storage mode every player stat is its own
+local-state key, so opting in writes 16 keys and a save writes 12. In
+``"packed"`` mode the hot stats live in one fixed-layout byte string under
+:data:`RECORD_KEY`, next to the name. Each field is a big-endian uint64 at
+a fixed offset, which the contract reads with ``extract_uint64`` and
+updates with ``replace``, so a handler loads the record once and writes
+it back once.
+
+The first twelve fields are in the same order as the arguments of
+``save_progress``. Their ABI encoding is already this layout, so a save
+writes the arguments straight into the record.
+
+This module is the Python codec. ``contracts/eternalbliss-contract.js``
+carries the same layout for the browser::
+
+    >>> record = pack({"level": 3, "gold": 250})
+    >>> unpack(record)["gold"]
+    250
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Union
+
+# Local-state key of the packed record
+RECORD_KEY = b"p"
+# Local-state key of the player name, in both storage modes
+NAME_KEY = b"name"
+
+# Field order is the layout; append only. The names are the local-state
+# keys the "keys" storage mode uses for the same values.
+FIELDS = (
+    "level",
+    "xp",
+    "gold",
+    "hp",
+    "max_hp",
+    "mp",
+    "max_mp",
+    "attack",
+    "defense",
+    "magic",
+    "x",
+    "y",
+    "battles_won",
+    "treasures",
+    "nft_id",
+)
+
+FIELD_SIZE = 8
+OFFSETS: Dict[str, int] = {name: i * FIELD_SIZE for i, name in enumerate(FIELDS)}
+RECORD_SIZE = len(FIELDS) * FIELD_SIZE
+
+# Fields covered by one save_progress call (its twelve arguments, in order)
+SAVE_FIELDS = FIELDS[:12]
+
+# A newly registered player
+INITIAL: Dict[str, int] = {
+    "level": 1,
+    "xp": 0,
+    "gold": 100,
+    "hp": 100,
+    "max_hp": 100,
+    "mp": 50,
+    "max_mp": 50,
+    "attack": 15,
+    "defense": 10,
+    "magic": 20,
+    "x": 15,
+    "y": 10,
+    "battles_won": 0,
+    "treasures": 0,
+    "nft_id": 0,
+}
+
+_RECORD = struct.Struct(f">{len(FIELDS)}Q")
+
+Value = Union[int, bytes]
+
+
+def pack(values: Mapping[str, int], base: Optional[bytes] = None) -> bytes:
+    """Encode ``values`` as a record; unspecified fields come from ``base``
+    (a record) or are zero."""
+    fields = list(_RECORD.unpack(base)) if base is not None else [0] * len(FIELDS)
+    for name, value in values.items():
+        fields[FIELDS.index(name)] = value
+    return _RECORD.pack(*fields)
+
+
+def unpack(record: bytes) -> Dict[str, int]:
+    """Decode a record into ``{field: value}``."""
+    if len(record) != RECORD_SIZE:
+        raise ValueError(f"player record is {len(record)} bytes, expected {RECORD_SIZE}")
+    return dict(zip(FIELDS, _RECORD.unpack(record)))
+
+
+def unpack_many(records: Iterable[bytes]) -> Iterator[Dict[str, int]]:
+    """Decode many records; one ``struct`` call per record."""
+    fields, decode = FIELDS, _RECORD.unpack
+    for record in records:
+        yield dict(zip(fields, decode(record)))
+
+
+def read_field(record: bytes, name: str) -> int:
+    """One field of a record, without decoding the rest."""
+    return int.from_bytes(record[OFFSETS[name]:OFFSETS[name] + FIELD_SIZE], "big")
+
+
+def from_local_state(state: Mapping[bytes, Value]) -> Dict[str, Union[int, str]]:
+    """A player's stats from their local state, in either storage mode.
+
+    Returns ``{field: value}`` plus ``"name"``; missing fields are omitted.
+    """
+    player: Dict[str, Union[int, str]] = {}
+    name = state.get(NAME_KEY)
+    if isinstance(name, bytes):
+        player["name"] = name.decode(errors="replace")
+    record = state.get(RECORD_KEY)
+    if isinstance(record, bytes):
+        player.update(unpack(record))
+        return player
+    for field in FIELDS:
+        value = state.get(field.encode())
+        if isinstance(value, int):
+            player[field] = value
+    return player
+
+
+INITIAL_RECORD = pack(INITIAL)
@@ -0,0 +1,74 @@
+"""Selector routing for the compiled approval program.
+
+PyTeal has no ``match`` expression, so the contract's method routing is
+written as a ``Cond`` whose arms compare ``application_args[0]`` with each
+ARC-4 selector. Compiled as-is, that is a chain of four opcodes per method
+and a call pays for every method tested before its own.
+
+:func:`lower_method_dispatch` rewrites every such chain in the compiled TEAL
+into a single AVM v8 ``match`` over a ``pushbytess`` of the selectors::
+
+    txna ApplicationArgs 0          pushbytess 0x... 0x... 0x...
+    method "battle(uint64)void"     txna ApplicationArgs 0
+    ==                         =>   match main_l24 main_l23 main_l22
+    bnz main_l24
+    ...
+
+Dispatch then costs three opcodes for any method, however many there are.
+An unmatched selector falls through to whatever followed the chain (the
+``err`` PyTeal emits after the last ``Cond`` arm), exactly as before.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, Tuple
+
+from .abi import selector
+
+# match and pushbytess arrived in AVM v8
+MIN_VERSION = 8
+
+_METHOD = re.compile(r'method "([^"]*)"$')
+_PRAGMA = re.compile(r"#pragma version (\d+)")
+
+
+def _selector_test(lines: List[str], i: int) -> Tuple[str, str]:
+    """``(signature, label)`` if ``lines[i:i + 4]`` is one selector test, else ``("", "")``."""
+    if i + 3 >= len(lines) or lines[i] != "txna ApplicationArgs 0" or lines[i + 2] != "==":
+        return "", ""
+    method = _METHOD.match(lines[i + 1])
+    branch = lines[i + 3].split()
+    if method is None or len(branch) != 2 or branch[0] != "bnz":
+        return "", ""
+    return method.group(1), branch[1]
+
+
+def lower_method_dispatch(teal: str) -> str:
+    """Replace chains of two or more selector tests with one ``match``."""
+    pragma = _PRAGMA.match(teal)
+    if pragma is None or int(pragma.group(1)) < MIN_VERSION:
+        return teal
+
+    lines = teal.split("\n")
+    out: List[str] = []
+    i = 0
+    while i < len(lines):
+        run = []
+        j = i
+        while True:
+            signature, label = _selector_test(lines, j)
+            if not signature:
+                break
+            run.append((signature, label))
+            j += 4
+        if len(run) < 2:
+            out.append(lines[i])
+            i += 1
+            continue
+        out.extend(f"// {selector(signature).hex()} {signature}" for signature, _ in run)
+        out.append("pushbytess " + " ".join(f"0x{selector(signature).hex()}" for signature, _ in run))
+        out.append("txna ApplicationArgs 0")
+        out.append("match " + " ".join(label for _, label in run))
+        i = j
+    return "\n".join(out)
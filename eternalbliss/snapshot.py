@@ -0,0 +1,478 @@
+"""Columnar snapshots of every player's local state.
+
+Reading the player base one ``getPlayerState(address)`` at a time costs a
+request and a key-by-key decode per account. This module pages through every
+account opted in to the application instead, a thousand per indexer
+request, and writes the stats as columns that analytics and leaderboard
+jobs memory-map::
+
+    python -m eternalbliss.snapshot --app-id 746639029 --out players/
+
+    players/
+        manifest.json          app, row count, columns, rounds covered
+        address.npy            (rows, 32) uint8 public keys, ascending
+        level.npy ... nft_id.npy   (rows,) uint64, one per record field
+        name.offsets.npy       (rows + 1,) uint64 into name.data.npy
+        name.data.npy          player names, UTF-8, concatenated
+
+The address space is split into shards that workers page through in
+parallel, each starting from its own lower bound (the indexer's account
+cursor is an address). Every page is appended to the shard's part file and
+checkpointed in ``progress.json``, so an interrupted export resumes where
+each shard stopped. Both storage layouts decode in bulk: keys are matched
+in their base64 form, and packed records become one big-endian array per
+page. Reading a snapshot back::
+
+    snapshot = Snapshot("players/")
+    top = snapshot.top("xp", 10)
+    [(snapshot.name(i), int(snapshot["level"][i])) for i in top]
+
+Needs NumPy (``eternalbliss[analytics]``). :class:`LedgerAccounts` serves
+an in-memory :class:`eternalbliss.avm.Ledger` like the indexer, for tests
+and ``--synthetic`` runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import bisect
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from . import record
+from .avm import Ledger, decode_address
+from .indexer import DEFAULT_INDEXER_URL
+
+FORMAT = "eternalbliss-snapshot"
+VERSION = 1
+# Accounts per indexer request (the indexer's maximum)
+PAGE_SIZE = 1000
+DEFAULT_WORKERS = 8
+# Shards per worker, so a dense part of the address space is shared out
+SHARDS_PER_WORKER = 4
+
+COLUMNS = record.FIELDS
+
+# Local-state keys as the indexer sends them, base64
+_KEY_COLUMNS = {base64.b64encode(field.encode()).decode(): i for i, field in enumerate(COLUMNS)}
+_NAME_KEY = base64.b64encode(record.NAME_KEY).decode()
+_RECORD_KEY = base64.b64encode(record.RECORD_KEY).decode()
+_ENCODED_KEYS = {key: base64.b64encode(key).decode() for key in (*(f.encode() for f in COLUMNS), record.NAME_KEY, record.RECORD_KEY)}
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        raise SystemExit("NumPy is required for snapshots; install eternalbliss[analytics]")
+    return numpy
+
+
+def _row_dtype() -> Any:
+    # One player in a shard's part file
+    return _numpy().dtype([("address", "u1", (32,)), ("values", "<u8", (len(COLUMNS),)), ("name_length", "<u2")])
+
+
+def encode_address(public_key: bytes) -> str:
+    """Algorand address of a 32-byte public key."""
+    checksum = hashlib.new("sha512_256", public_key).digest()[-4:]
+    return base64.b32encode(public_key + checksum).decode().rstrip("=")
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+class IndexerAccounts:
+    """Accounts opted in to an application, from an Algorand indexer (needs py-algorand-sdk)."""
+
+    def __init__(self, url: str = DEFAULT_INDEXER_URL, token: str = ""):
+        try:
+            from algosdk.v2client.indexer import IndexerClient
+        except ImportError:
+            raise SystemExit("py-algorand-sdk is required to read an indexer; install eternalbliss[algod]")
+        self.client = IndexerClient(token, url)
+
+    def page(self, app_id: int, after: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """Accounts with addresses after ``after``: ``(accounts, next token, round)``."""
+        result = self.client.accounts(application_id=app_id, limit=limit, next_page=after)
+        return result.get("accounts", []), result.get("next-token"), result.get("current-round", 0)
+
+
+class LedgerAccounts:
+    """In-memory stand-in for the indexer over a :class:`Ledger`'s local states.
+
+    ``latency`` delays every page, to stand in for the indexer round trip.
+    """
+
+    def __init__(self, ledger: Ledger, round: int = 1, latency: float = 0.0):
+        self.ledger = ledger
+        self.round = round
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._keys: List[bytes] = []
+
+    def _sorted(self) -> List[bytes]:
+        with self._lock:
+            if len(self._keys) != len(self.ledger.locals):
+                self._keys = sorted(self.ledger.locals)
+            return self._keys
+
+    @staticmethod
+    def _key_values(state: Dict[bytes, Union[int, bytes]], encoded: Dict[bytes, str]) -> List[Dict[str, Any]]:
+        return [
+            {"key": encoded.get(key) or base64.b64encode(key).decode(), "value": {"type": 1, "bytes": base64.b64encode(value).decode(), "uint": 0}}
+            if isinstance(value, bytes)
+            else {"key": encoded.get(key) or base64.b64encode(key).decode(), "value": {"type": 2, "uint": value}}
+            for key, value in state.items()
+        ]
+
+    def page(self, app_id: int, after: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        if self.latency:
+            time.sleep(self.latency)
+        keys = self._sorted()
+        start = bisect.bisect_right(keys, decode_address(after)) if after else 0
+        accounts = [
+            {
+                "address": encode_address(key),
+                "apps-local-state": [{"id": app_id, "key-value": self._key_values(self.ledger.locals[key], _ENCODED_KEYS)}],
+            }
+            for key in keys[start:start + limit]
+        ]
+        token = accounts[-1]["address"] if len(accounts) == limit else None
+        return accounts, token, self.round
+
+
+def synthetic_ledger(players: int, storage: str = "keys", seed: int = 0) -> Ledger:
+    """A ledger of ``players`` registered players with random stats."""
+    rng = random.Random(seed)
+    ledger = Ledger()
+    for n in range(players):
+        stats = dict(record.INITIAL)
+        stats.update(
+            level=rng.randint(1, 50), xp=rng.randrange(200_000), gold=rng.randrange(100_000),
+            x=rng.randrange(75), y=rng.randrange(75), battles_won=rng.randrange(5_000),
+        )
+        address = hashlib.sha256(b"player" + n.to_bytes(8, "big")).digest()
+        state: Dict[bytes, Union[int, bytes]] = {record.NAME_KEY: f"Hero{n}".encode()}
+        if storage == "packed":
+            state[record.RECORD_KEY] = record.pack(stats)
+        else:
+            state.update((field.encode(), value) for field, value in stats.items())
+        ledger.locals[address] = state
+    return ledger
+
+
+# ---------------------------------------------------------------------------
+# Decoding
+# ---------------------------------------------------------------------------
+
+def public_keys(addresses: Sequence[str]) -> Any:
+    """``(n, 32)`` uint8 public keys of ``n`` addresses, decoded together."""
+    np = _numpy()
+    table = np.full(256, 0, dtype="u1")
+    table[np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", dtype="u1")] = np.arange(32, dtype="u1")
+    chars = np.frombuffer("".join(addresses).encode(), dtype="u1").reshape(len(addresses), 58)
+    bits = np.unpackbits(table[chars][..., None], axis=-1)[..., 3:]
+    return np.packbits(bits.reshape(len(addresses), -1), axis=1)[:, :32]
+
+
+def decode_page(accounts: Sequence[Dict[str, Any]], app_id: int, stop: Optional[bytes] = None) -> Tuple[Any, List[bytes], bool]:
+    """Part-file rows and names for a page of indexer accounts.
+
+    Accounts at or past the public key ``stop`` are left out; the flag
+    returned says whether one was reached.
+    """
+    np = _numpy()
+    keys = public_keys([account["address"] for account in accounts]) if accounts else np.zeros((0, 32), "u1")
+    reached = False
+    if stop is not None and len(keys) and keys[-1].tobytes() >= stop:
+        # Pages are in address order: find the first account past the shard
+        reached = True
+        cut = bisect.bisect_left([key.tobytes() for key in keys], stop)
+        accounts, keys = accounts[:cut], keys[:cut]
+
+    kept: List[int] = []
+    rows: List[List[int]] = []
+    names: List[bytes] = []
+    packed: List[bytes] = []
+    packed_rows: List[int] = []
+    for i, account in enumerate(accounts):
+        state = next((s for s in account.get("apps-local-state") or () if s.get("id") == app_id), None)
+        if state is None or state.get("deleted"):
+            continue
+        row = [0] * len(COLUMNS)
+        name = b""
+        for kv in state.get("key-value") or ():
+            key, value = kv["key"], kv["value"]
+            column = _KEY_COLUMNS.get(key)
+            if column is not None:
+                row[column] = value.get("uint", 0)
+            elif key == _RECORD_KEY:
+                packed.append(base64.b64decode(value.get("bytes", "")))
+                packed_rows.append(len(rows))
+            elif key == _NAME_KEY:
+                name = base64.b64decode(value.get("bytes", ""))[:0xFFFF]
+        kept.append(i)
+        rows.append(row)
+        names.append(name)
+
+    out = np.zeros(len(rows), dtype=_row_dtype())
+    if rows:
+        out["address"] = keys[kept]
+        out["values"] = np.array(rows, dtype="<u8")
+        out["name_length"] = [len(name) for name in names]
+    if packed:
+        out["values"][packed_rows] = np.frombuffer(b"".join(packed), dtype=">u8").reshape(-1, len(COLUMNS))
+    return out, names, reached
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _shard_bounds(shards: int) -> List[Optional[bytes]]:
+    """Lower public-key bound of each shard, then None for the end."""
+    return [(i * 0x10000 // shards).to_bytes(2, "big") + bytes(30) for i in range(shards)] + [None]
+
+
+class Exporter:
+    """Pages every account opted in to ``app_id`` into a snapshot at ``out``.
+
+    Resumes from ``out/progress.json`` when it was left by an export of the
+    same application with the same number of shards.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        app_id: int,
+        out: Union[str, Path],
+        workers: int = DEFAULT_WORKERS,
+        shards: Optional[int] = None,
+        page_size: int = PAGE_SIZE,
+        log: Callable[[str], None] = print,
+    ):
+        self.source = source
+        self.app_id = app_id
+        self.out = Path(out)
+        self.workers = workers
+        self.shards = shards or workers * SHARDS_PER_WORKER
+        self.page_size = page_size
+        self.log = log
+        self.parts = self.out / "parts"
+        self._lock = threading.Lock()
+        self.progress: Dict[str, Any] = {}
+
+    def _part(self, shard: int, kind: str) -> Path:
+        return self.parts / f"shard-{shard:04d}.{kind}"
+
+    def _load_progress(self) -> None:
+        path = self.out / "progress.json"
+        if path.exists():
+            progress = json.loads(path.read_text())
+            if progress.get("app_id") == self.app_id and len(progress.get("shards", ())) == self.shards:
+                self.progress = progress
+                done = sum(s["rows"] for s in progress["shards"])
+                self.log(f"resuming: {done} players already exported")
+                # Drop anything appended after the last checkpoint
+                row_size = _row_dtype().itemsize
+                for shard, state in enumerate(progress["shards"]):
+                    for kind, size in (("rows", state["rows"] * row_size), ("names", state["name_bytes"])):
+                        with open(self._part(shard, kind), "ab") as f:
+                            f.truncate(size)
+                return
+        self.parts.mkdir(parents=True, exist_ok=True)
+        for part in self.parts.iterdir():
+            part.unlink()
+        self.progress = {
+            "app_id": self.app_id,
+            "rounds": [None, None],
+            "shards": [{"after": None, "rows": 0, "name_bytes": 0, "done": False} for _ in range(self.shards)],
+        }
+        bounds = _shard_bounds(self.shards)
+        for shard in range(1, self.shards):
+            self.progress["shards"][shard]["after"] = encode_address(bounds[shard])
+        self._save_progress()
+
+    def _save_progress(self) -> None:
+        path = self.out / "progress.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.progress))
+        os.replace(tmp, path)
+
+    def _export_shard(self, shard: int) -> int:
+        state = self.progress["shards"][shard]
+        stop = _shard_bounds(self.shards)[shard + 1]
+        exported = 0
+        with open(self._part(shard, "rows"), "ab") as rows_file, open(self._part(shard, "names"), "ab") as names_file:
+            while not state["done"]:
+                accounts, token, round = self.source.page(self.app_id, state["after"], self.page_size)
+                rows, names, reached = decode_page(accounts, self.app_id, stop)
+                rows_file.write(rows.tobytes())
+                names_file.write(b"".join(names))
+                rows_file.flush()
+                names_file.flush()
+                with self._lock:
+                    state["rows"] += len(rows)
+                    state["name_bytes"] += sum(len(name) for name in names)
+                    state["after"] = token
+                    state["done"] = reached or not token
+                    lo, hi = self.progress["rounds"]
+                    self.progress["rounds"] = [round if lo is None else min(lo, round), round if hi is None else max(hi, round)]
+                    self._save_progress()
+                exported += len(rows)
+        return exported
+
+    def _assemble(self) -> Dict[str, Any]:
+        np = _numpy()
+        shards = self.progress["shards"]
+        total = sum(s["rows"] for s in shards)
+        open_memmap = np.lib.format.open_memmap
+        columns = {name: open_memmap(self.out / f"{name}.npy", mode="w+", dtype="<u8", shape=(total,)) for name in COLUMNS}
+        addresses = open_memmap(self.out / "address.npy", mode="w+", dtype="u1", shape=(total, 32))
+        offsets = open_memmap(self.out / "name.offsets.npy", mode="w+", dtype="<u8", shape=(total + 1,))
+        names = open_memmap(self.out / "name.data.npy", mode="w+", dtype="u1", shape=(sum(s["name_bytes"] for s in shards),))
+
+        row = name_at = 0
+        offsets[0] = 0
+        for shard, state in enumerate(shards):
+            if not state["rows"]:
+                continue
+            part = np.fromfile(self._part(shard, "rows"), dtype=_row_dtype(), count=state["rows"])
+            end = row + len(part)
+            addresses[row:end] = part["address"]
+            values = part["values"]
+            for i, name in enumerate(COLUMNS):
+                columns[name][row:end] = values[:, i]
+            offsets[row + 1:end + 1] = name_at + np.cumsum(part["name_length"], dtype="<u8")
+            data = np.fromfile(self._part(shard, "names"), dtype="u1", count=state["name_bytes"])
+            names[name_at:name_at + len(data)] = data
+            row, name_at = end, name_at + len(data)
+
+        for array in (*columns.values(), addresses, offsets, names):
+            array.flush()
+        manifest = {
+            "format": FORMAT,
+            "version": VERSION,
+            "app_id": self.app_id,
+            "rows": total,
+            "columns": list(COLUMNS),
+            "rounds": self.progress["rounds"],
+        }
+        (self.out / "manifest.json").write_text(json.dumps(manifest, indent=2))
+        return manifest
+
+    def run(self) -> Dict[str, Any]:
+        """Export (or finish exporting) and assemble; returns the manifest."""
+        self.out.mkdir(parents=True, exist_ok=True)
+        self._load_progress()
+        pending = [i for i, s in enumerate(self.progress["shards"]) if not s["done"]]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(self._export_shard, pending))
+        manifest = self._assemble()
+        for part in self.parts.iterdir():
+            part.unlink()
+        self.parts.rmdir()
+        (self.out / "progress.json").unlink()
+        return manifest
+
+
+def export(source: Any, app_id: int, out: Union[str, Path], **options: Any) -> Dict[str, Any]:
+    """Snapshot every player of ``app_id`` into ``out``; see :class:`Exporter`."""
+    return Exporter(source, app_id, out, **options).run()
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class Snapshot:
+    """A snapshot directory, memory-mapped.
+
+    ``snapshot["gold"]`` is a read-only uint64 array with one entry per
+    player, in address order; nothing is read until it is touched.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        np = _numpy()
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / "manifest.json").read_text())
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError(f"{self.path} is not a player snapshot")
+        self.columns = {name: np.load(self.path / f"{name}.npy", mmap_mode="r") for name in self.manifest["columns"]}
+        self.addresses = np.load(self.path / "address.npy", mmap_mode="r")
+        self._name_offsets = np.load(self.path / "name.offsets.npy", mmap_mode="r")
+        self._names = np.load(self.path / "name.data.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    def __getitem__(self, column: str) -> Any:
+        return self.columns[column]
+
+    def address(self, i: int) -> str:
+        return encode_address(self.addresses[i].tobytes())
+
+    def name(self, i: int) -> str:
+        start, end = self._name_offsets[i], self._name_offsets[i + 1]
+        return self._names[start:end].tobytes().decode(errors="replace")
+
+    def top(self, column: str, k: int = 10) -> List[int]:
+        """Rows of the ``k`` highest values of ``column``, highest first."""
+        np = _numpy()
+        values = self.columns[column]
+        k = min(k, len(values))
+        if not k:
+            return []
+        best = np.argpartition(values, len(values) - k)[-k:]
+        return [int(i) for i in best[np.argsort(values[best])[::-1]]]
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export every player's local state into a columnar snapshot.")
+    parser.add_argument("--out", type=Path, required=True, help="snapshot directory")
+    parser.add_argument("--app-id", type=int, default=0)
+    parser.add_argument("--indexer-url", default=DEFAULT_INDEXER_URL)
+    parser.add_argument("--indexer-token", default="")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--shards", type=int, help=f"address-range shards (default workers x {SHARDS_PER_WORKER})")
+    parser.add_argument("--synthetic", type=int, metavar="PLAYERS", help="export an in-memory ledger of random players instead")
+    parser.add_argument("--storage", choices=("keys", "packed"), default="keys", help="local-state layout of --synthetic players")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per page of --synthetic players (indexer round trip)")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        start = time.perf_counter()
+        source: Any = LedgerAccounts(synthetic_ledger(args.synthetic, args.storage), latency=args.latency)
+        print(f"generated {args.synthetic} {args.storage} players in {time.perf_counter() - start:.1f}s")
+    else:
+        if not args.app_id:
+            parser.error("--app-id is required unless --synthetic is given")
+        source = IndexerAccounts(args.indexer_url, args.indexer_token)
+
+    start = time.perf_counter()
+    manifest = export(source, args.app_id, args.out, workers=args.workers, shards=args.shards)
+    elapsed = time.perf_counter() - start
+    print(f"exported {manifest['rows']} players in {elapsed:.1f}s ({manifest['rows'] / elapsed:,.0f}/s) to {args.out}")
+
+    start = time.perf_counter()
+    snapshot = Snapshot(args.out)
+    top = snapshot.top("xp", 5)
+    print(f"loaded and ranked by xp in {(time.perf_counter() - start) * 1000:.0f} ms:")
+    for i in top:
+        print(f"  {snapshot.name(i):12} level {int(snapshot['level'][i]):3}  xp {int(snapshot['xp'][i])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Batched offline sync: an offline session settled in a few app calls.
+
+While offline the game queues what the player did. An action is one of::
+
+    ("battle", enemy_level)
+    ("move", x, y)
+    ("buy", price)
+
+:func:`compress` turns that queue into an *action log* of fixed-size
+events, and :func:`sync_groups` packs the log into atomic groups of up to
+:data:`MAX_GROUP_SIZE` ``apply_batch`` calls. The contract verifies each
+event and applies it with the same rules as the single-event methods:
+battle rewards still go through ``calculate_battle_reward`` and
+``calculate_xp_reward``, and a purchase still needs the gold for it.
+
+Compression keeps the on-chain result identical to replaying the session
+one call at a time:
+
+* battles between two purchases commute, so each run is grouped by enemy
+  level into one event per level (``count`` battles at ``level``);
+* consecutive purchases at the same price become one event;
+* only the last move matters, so it is sent once, at the end.
+
+A group is settled as one: its last call moves the player on the
+leaderboards once, so a group may hold nothing but the player's
+``apply_batch`` calls, and :func:`chunk` sizes groups to fit their shared
+opcode budget. A 200-battle session with a few shop visits becomes a few
+dozen events, settled by a single group of six calls::
+
+    python -m eternalbliss.sync --battles 200
+
+Event layout (big-endian, :data:`EVENT_SIZE` bytes): ``kind`` u8, ``a`` u16,
+``b`` u32. Battles and purchases carry ``a = count`` and ``b = level`` or
+``price``; a move carries ``a = x`` and ``b = y``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import struct
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+BATTLE = 1
+MOVE = 2
+BUY = 3
+
+KINDS = {"battle": BATTLE, "move": MOVE, "buy": BUY}
+
+_EVENT = struct.Struct(">BHI")
+EVENT_SIZE = _EVENT.size
+
+MAX_COUNT = 0xFFFF
+MAX_VALUE = 0xFFFFFFFF
+
+# Atomic groups are capped at 16 transactions
+MAX_GROUP_SIZE = 16
+# Events per apply_batch call, at most
+EVENTS_PER_CALL = 8
+
+# The app calls of a group share one opcode budget of 700 each. Worst-case
+# apply_batch costs, for sizing groups: per call (decoding, the group
+# checks and the writes), per event (a battle; moves and purchases cost
+# less), and moving the sender on the battles_won and gold leaderboards,
+# which the last call of a group does once.
+APP_CALL_BUDGET = 700
+CALL_COST = 190
+EVENT_COST = 70
+RANK_COST = 460
+
+Action = Tuple[Any, ...]
+
+
+class Event(NamedTuple):
+    kind: int
+    a: int
+    b: int
+
+
+def compress(actions: Iterable[Action]) -> List[Event]:
+    """The action log for a queue of offline actions."""
+    events: List[Event] = []
+    battles: Dict[int, int] = {}
+    last_move: Optional[Event] = None
+
+    def flush_battles() -> None:
+        for level in sorted(battles):
+            count = battles[level]
+            while count:
+                n = min(count, MAX_COUNT)
+                events.append(Event(BATTLE, n, level))
+                count -= n
+        battles.clear()
+
+    for action in actions:
+        kind = action[0]
+        if kind == "battle":
+            level = _value(action[1])
+            battles[level] = battles.get(level, 0) + 1
+        elif kind == "buy":
+            flush_battles()
+            price = _value(action[1])
+            if events and events[-1].kind == BUY and events[-1].b == price and events[-1].a < MAX_COUNT:
+                events[-1] = Event(BUY, events[-1].a + 1, price)
+            else:
+                events.append(Event(BUY, 1, price))
+        elif kind == "move":
+            x, y = action[1], action[2]
+            if not isinstance(x, int) or not 0 <= x <= MAX_COUNT:
+                raise ValueError(f"x out of range: {x}")
+            last_move = Event(MOVE, x, _value(y))
+        else:
+            raise ValueError(f"unknown action {kind!r}")
+    flush_battles()
+    if last_move is not None:
+        events.append(last_move)
+    return events
+
+
+def _value(v: int) -> int:
+    if not isinstance(v, int) or not 0 <= v <= MAX_VALUE:
+        raise ValueError(f"value out of range: {v}")
+    return v
+
+
+def encode(events: Sequence[Event]) -> bytes:
+    return b"".join(_EVENT.pack(*event) for event in events)
+
+
+def decode(log: bytes) -> List[Event]:
+    if len(log) % EVENT_SIZE:
+        raise ValueError(f"action log length {len(log)} is not a multiple of {EVENT_SIZE}")
+    return [Event(*fields) for fields in _EVENT.iter_unpack(log)]
+
+
+def battle_reward(level: int) -> int:
+    """Mirror of the contract's ``calculate_battle_reward``."""
+    return level * 10 + 15
+
+
+def xp_reward(level: int) -> int:
+    """Mirror of the contract's ``calculate_xp_reward``."""
+    return level * 15 + 20
+
+
+def replay(events: Iterable[Event], stats: Dict[str, int]) -> Dict[str, int]:
+    """The stats after the chain applies ``events``; raises ``ValueError``
+    where the contract would reject the call.
+
+    ``stats`` uses the local-state field names (see ``record.FIELDS``).
+    """
+    stats = dict(stats)
+    for kind, a, b in events:
+        if kind == BATTLE:
+            if stats["hp"] == 0:
+                raise ValueError("battle with 0 hp")
+            stats["gold"] += a * battle_reward(b)
+            stats["xp"] += a * xp_reward(b)
+            stats["battles_won"] += a
+        elif kind == BUY:
+            if stats["gold"] < a * b:
+                raise ValueError(f"not enough gold for {a} x {b}")
+            stats["gold"] -= a * b
+        elif kind == MOVE:
+            stats["x"], stats["y"] = a, b
+        else:
+            raise ValueError(f"unknown event kind {kind}")
+    return stats
+
+
+def group_capacity(calls: int, per_call: int = EVENTS_PER_CALL) -> int:
+    """Events a group of ``calls`` apply_batch calls can settle within its budget."""
+    budget = calls * (APP_CALL_BUDGET - CALL_COST) - RANK_COST
+    return max(0, min(calls * per_call, budget // EVENT_COST))
+
+
+def chunk(events: Sequence[Event], per_call: int = EVENTS_PER_CALL, group_size: int = MAX_GROUP_SIZE) -> List[List[bytes]]:
+    """Split the log into groups of per-call logs, in order: each group has
+    as few calls as can settle what is left, up to ``group_size``, and its
+    events are spread evenly over them."""
+    groups = []
+    start = 0
+    while start < len(events):
+        left = len(events) - start
+        calls = next((n for n in range(1, group_size + 1) if group_capacity(n, per_call) >= left), group_size)
+        size, extra = divmod(min(left, group_capacity(calls, per_call)), calls)
+        logs = []
+        for n in range(calls):
+            end = start + size + (n < extra)
+            logs.append(encode(events[start:end]))
+            start = end
+        groups.append(logs)
+    return groups
+
+
+def sync_groups(sender: bytes, actions: Iterable[Action], **fields: Any) -> List[Tuple[Any, ...]]:
+    """``apply_batch`` transaction groups (for :mod:`eternalbliss.avm`)
+    settling ``actions``; submit them in order."""
+    from .avm import method_call
+
+    return [
+        tuple(method_call(sender, "apply_batch", log, **fields) for log in logs)
+        for logs in chunk(compress(actions))
+    ]
+
+
+def offline_session(battles: int, seed: int = 0) -> List[Action]:
+    """A reproducible offline session: battles, some shopping, some walking."""
+    rng = random.Random(seed)
+    actions: List[Action] = []
+    for n in range(battles):
+        actions.append(("battle", rng.randint(1, 8)))
+        if rng.random() < 0.5:
+            actions.append(("move", rng.randrange(75), rng.randrange(75)))
+        if n % 50 == 49:
+            actions.append(("buy", rng.choice((10, 15))))
+    return actions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Settle a synthetic offline session through apply_batch.")
+    parser.add_argument("--battles", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=("keys", "packed"), default="keys", help="local-state layout to build")
+    args = parser.parse_args(argv)
+
+    from .avm import AVM, OPT_IN, app_call, method_call, player_address
+    from .record import from_local_state
+
+    admin, player = player_address(0xAD), player_address(1)
+    avm = AVM.from_build(storage=args.storage, app_id=0, creator=admin)
+    avm.call(app_call(admin, application_id=0))
+    avm.call(method_call(admin, "create_leaderboards"))
+    avm.call(method_call(player, "create_player", "Hero", on_completion=OPT_IN))
+    before = from_local_state(avm.ledger.locals[player])
+
+    actions = offline_session(args.battles, args.seed)
+    events = compress(actions)
+    groups = sync_groups(player, actions)
+    results = [avm.apply_group(list(group)) for group in groups]
+    accepted = all(r.accepted for group in results for r in group)
+
+    expected = replay(events, {k: v for k, v in before.items() if k != "name"})
+    after = from_local_state(avm.ledger.locals[player])
+    calls = sum(len(group) for group in groups)
+    cost = sum(r.cost for group in results for r in group)
+    print(f"{len(actions)} offline actions -> {len(events)} events ({len(encode(events))} bytes)")
+    print(f"  {len(groups)} group(s), {calls} app call(s), {cost} opcodes, {'accepted' if accepted else 'REJECTED'}")
+    for group in results:
+        for r in group:
+            if not r.accepted:
+                print(f"  rejected: {r.error}")
+    print(f"  gold {before['gold']} -> {after['gold']}, xp {before['xp']} -> {after['xp']}, "
+          f"battles {after['battles_won']}, at ({after['x']}, {after['y']})")
+    matches = all(after[k] == v for k, v in expected.items())
+    print(f"  matches single-call replay: {'yes' if matches else 'NO'}")
+    return 0 if accepted and matches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -31,6 +31,446 @@ let editorState = {
     areaStartPos: null
 };
 
+// Terrain engine. The terrain lives in a Uint8Array of palette codes;
+// mapData.terrain is kept in step as the row arrays that export, code export
+// and auto-save write out. Edits record only the cells they change, and the
+// canvas and minimap redraw only the rectangle that changed.
+const TILE_SIZE = 32;
+const TERRAIN_CHUNK_TILES = 16;
+const MAX_TERRAIN_CHUNKS = 96;
+const UNDO_LIMIT = 200;
+
+const terrainPalette = ['grass', 'water', 'mountain', 'forest', 'road', 'sand', 'door'];
+
+let terrainGrid = {
+    width: 0,
+    height: 0,
+    cells: new Uint8Array(0),
+    counts: []
+};
+
+let editHistory = {
+    undo: [],
+    redo: [],
+    current: null
+};
+
+let terrainView = {
+    chunks: new Map(),        // "cx,cy" -> canvas
+    sprites: new Map(),       // terrain type -> 32x32 canvas
+    minimap: null,            // 1px-per-tile canvas
+    dirty: null,              // {x0, y0, x1, y1} waiting for the next frame
+    frame: 0
+};
+
+function terrainCode(terrain) {
+    let code = terrainPalette.indexOf(terrain);
+    if (code === -1) {
+        if (terrainPalette.length === 256) throw new Error('Too many terrain types');
+        code = terrainPalette.push(terrain) - 1;
+    }
+    return code;
+}
+
+// Rebuild the grid from mapData.terrain after the whole map was replaced
+function loadTerrainGrid() {
+    const width = mapData.width;
+    const height = mapData.height;
+    const cells = new Uint8Array(width * height);
+    const counts = [];
+    
+    for (let y = 0; y < height; y++) {
+        const row = mapData.terrain[y];
+        for (let x = 0; x < width; x++) {
+            const code = terrainCode(row[x]);
+            cells[y * width + x] = code;
+            counts[code] = (counts[code] || 0) + 1;
+        }
+    }
+    
+    terrainGrid = { width, height, cells, counts };
+    editHistory = { undo: [], redo: [], current: null };
+}
+
+// Set one cell without recording it
+function writeCell(index, code) {
+    const grid = terrainGrid;
+    const old = grid.cells[index];
+    grid.cells[index] = code;
+    grid.counts[old]--;
+    grid.counts[code] = (grid.counts[code] || 0) + 1;
+    
+    const x = index % grid.width;
+    const y = (index - x) / grid.width;
+    mapData.terrain[y][x] = terrainPalette[code];
+    markDirty(x, y, x + 1, y + 1);
+}
+
+// Set a recorded list of cells (undo/redo), marking their bounding box dirty once
+function writeCells(indices, codes, reverse) {
+    const { width, cells, counts } = terrainGrid;
+    const rows = mapData.terrain;
+    const count = indices.length;
+    if (!count) return;
+    let x0 = width, y0 = Infinity, x1 = 0, y1 = 0;
+    
+    for (let k = 0; k < count; k++) {
+        const n = reverse ? count - 1 - k : k;
+        const index = indices[n];
+        const code = codes[n];
+        const y = Math.floor(index / width);
+        const x = index - y * width;
+        counts[cells[index]]--;
+        counts[code] = (counts[code] || 0) + 1;
+        cells[index] = code;
+        rows[y][x] = terrainPalette[code];
+        if (x < x0) x0 = x;
+        if (x > x1) x1 = x;
+        if (y < y0) y0 = y;
+        if (y > y1) y1 = y;
+    }
+    markDirty(x0, y0, x1 + 1, y1 + 1);
+}
+
+// Set one cell as part of the open edit
+function setCell(x, y, terrain) {
+    const index = y * terrainGrid.width + x;
+    const code = terrainCode(terrain);
+    const old = terrainGrid.cells[index];
+    if (old === code) return false;
+    
+    const edit = editHistory.current;
+    if (edit) {
+        edit.indices.push(index);
+        edit.before.push(old);
+        edit.after.push(code);
+    }
+    writeCell(index, code);
+    return true;
+}
+
+// Start recording an edit; returns false if one (a paint stroke) is already open
+function beginEdit(label) {
+    if (editHistory.current) return false;
+    editHistory.current = { label, indices: [], before: [], after: [], entities: [] };
+    return true;
+}
+
+// Record an entity added to or removed from mapData[list] by the open edit
+function recordEntity(list, item, added) {
+    if (editHistory.current) editHistory.current.entities.push({ list, item, added });
+}
+
+// Close the open edit and push it onto the undo log
+function commitEdit() {
+    const edit = editHistory.current;
+    if (!edit) return;
+    editHistory.current = null;
+    if (!edit.indices.length && !edit.entities.length) return;
+    
+    editHistory.undo.push({
+        label: edit.label,
+        indices: Uint32Array.from(edit.indices),
+        before: Uint8Array.from(edit.before),
+        after: Uint8Array.from(edit.after),
+        entities: edit.entities
+    });
+    if (editHistory.undo.length > UNDO_LIMIT) editHistory.undo.shift();
+    editHistory.redo = [];
+}
+
+function undo() {
+    commitEdit();
+    const edit = editHistory.undo.pop();
+    if (!edit) {
+        updateStatus('Nothing to undo');
+        return;
+    }
+    
+    // Reverse order restores the first value of cells an edit touched twice
+    writeCells(edit.indices, edit.before, true);
+    for (let n = edit.entities.length - 1; n >= 0; n--) {
+        applyEntityChange(edit.entities[n], true);
+    }
+    
+    editHistory.redo.push(edit);
+    afterHistoryStep(edit);
+    updateStatus(`Undid ${edit.label}`);
+}
+
+function redo() {
+    commitEdit();
+    const edit = editHistory.redo.pop();
+    if (!edit) {
+        updateStatus('Nothing to redo');
+        return;
+    }
+    
+    writeCells(edit.indices, edit.after, false);
+    edit.entities.forEach(change => applyEntityChange(change, false));
+    
+    editHistory.undo.push(edit);
+    afterHistoryStep(edit);
+    updateStatus(`Redid ${edit.label}`);
+}
+
+function applyEntityChange(change, reverse) {
+    if (change.added !== reverse) {
+        mapData[change.list].push(change.item);
+    } else {
+        mapData[change.list] = mapData[change.list].filter(item => item !== change.item);
+    }
+}
+
+function afterHistoryStep(edit) {
+    if (edit.entities.length) {
+        renderEntities();
+        updateMinimap();
+        updateStats();
+    }
+}
+
+function markDirty(x0, y0, x1, y1) {
+    const dirty = terrainView.dirty;
+    if (dirty) {
+        dirty.x0 = Math.min(dirty.x0, x0);
+        dirty.y0 = Math.min(dirty.y0, y0);
+        dirty.x1 = Math.max(dirty.x1, x1);
+        dirty.y1 = Math.max(dirty.y1, y1);
+    } else {
+        terrainView.dirty = { x0, y0, x1, y1 };
+    }
+    if (!terrainView.frame) {
+        terrainView.frame = requestAnimationFrame(redrawDirty);
+    }
+}
+
+// Redraw the changed rectangle in the cached canvas chunks and the minimap
+function redrawDirty() {
+    terrainView.frame = 0;
+    const dirty = terrainView.dirty;
+    if (!dirty) return;
+    terrainView.dirty = null;
+    
+    const size = TERRAIN_CHUNK_TILES;
+    for (let cy = Math.floor(dirty.y0 / size); cy * size < dirty.y1; cy++) {
+        for (let cx = Math.floor(dirty.x0 / size); cx * size < dirty.x1; cx++) {
+            const canvas = terrainView.chunks.get(`${cx},${cy}`);
+            if (!canvas) continue;
+            drawTerrainTiles(canvas.getContext('2d'), cx * size, cy * size,
+                Math.max(dirty.x0, cx * size), Math.max(dirty.y0, cy * size),
+                Math.min(dirty.x1, (cx + 1) * size, terrainGrid.width),
+                Math.min(dirty.y1, (cy + 1) * size, terrainGrid.height));
+        }
+    }
+    drawMinimapTerrain(dirty.x0, dirty.y0, dirty.x1, dirty.y1);
+    updateStats();
+}
+
+// Drop the chunk canvases and lay out the terrain layers for the current map size
+function resetTerrainLayer(canvasGrid) {
+    if (terrainView.frame) cancelAnimationFrame(terrainView.frame);
+    terrainView.frame = 0;
+    terrainView.dirty = null;
+    terrainView.chunks.clear();
+    
+    canvasGrid.innerHTML = '';
+    ['terrainLayer', 'gridOverlay', 'entityLayer', 'tileCursor'].forEach(id => {
+        const layer = document.createElement('div');
+        layer.id = id;
+        layer.className = id.replace(/[A-Z]/g, c => '-' + c.toLowerCase());
+        canvasGrid.appendChild(layer);
+    });
+    document.getElementById('gridOverlay').style.display = editorState.showGrid ? '' : 'none';
+    updateVisibleChunks();
+}
+
+// Make sure every chunk the camera can see has a canvas, evicting far ones
+function updateVisibleChunks() {
+    const layer = document.getElementById('terrainLayer');
+    const view = document.getElementById('canvasView');
+    if (!layer || !view) return;
+    
+    const span = TERRAIN_CHUNK_TILES * TILE_SIZE;
+    const cx0 = Math.max(0, Math.floor(-editorState.cameraX / span));
+    const cy0 = Math.max(0, Math.floor(-editorState.cameraY / span));
+    const cx1 = Math.min(Math.ceil(terrainGrid.width / TERRAIN_CHUNK_TILES), Math.ceil((view.clientWidth - editorState.cameraX) / span));
+    const cy1 = Math.min(Math.ceil(terrainGrid.height / TERRAIN_CHUNK_TILES), Math.ceil((view.clientHeight - editorState.cameraY) / span));
+    
+    const visible = new Set();
+    for (let cy = cy0; cy < cy1; cy++) {
+        for (let cx = cx0; cx < cx1; cx++) {
+            const key = `${cx},${cy}`;
+            visible.add(key);
+            if (!terrainView.chunks.has(key)) {
+                const canvas = createTerrainChunk(cx, cy);
+                terrainView.chunks.set(key, canvas);
+                layer.appendChild(canvas);
+            }
+        }
+    }
+    
+    if (terrainView.chunks.size > MAX_TERRAIN_CHUNKS) {
+        terrainView.chunks.forEach((canvas, key) => {
+            if (!visible.has(key)) {
+                canvas.remove();
+                terrainView.chunks.delete(key);
+            }
+        });
+    }
+}
+
+function createTerrainChunk(cx, cy) {
+    const size = TERRAIN_CHUNK_TILES;
+    const x0 = cx * size;
+    const y0 = cy * size;
+    const x1 = Math.min(x0 + size, terrainGrid.width);
+    const y1 = Math.min(y0 + size, terrainGrid.height);
+    
+    const canvas = document.createElement('canvas');
+    canvas.className = 'terrain-chunk';
+    canvas.width = (x1 - x0) * TILE_SIZE;
+    canvas.height = (y1 - y0) * TILE_SIZE;
+    canvas.style.left = `${x0 * TILE_SIZE}px`;
+    canvas.style.top = `${y0 * TILE_SIZE}px`;
+    drawTerrainTiles(canvas.getContext('2d'), x0, y0, x0, y0, x1, y1);
+    return canvas;
+}
+
+// Draw tiles [x0, x1) x [y0, y1) into a chunk whose origin is (ox, oy)
+function drawTerrainTiles(ctx, ox, oy, x0, y0, x1, y1) {
+    const { width, cells } = terrainGrid;
+    for (let y = y0; y < y1; y++) {
+        for (let x = x0; x < x1; x++) {
+            ctx.drawImage(terrainSprite(terrainPalette[cells[y * width + x]]), (x - ox) * TILE_SIZE, (y - oy) * TILE_SIZE);
+        }
+    }
+}
+
+// One pre-rendered 32x32 canvas per terrain type, after the .tile styles
+function terrainSprite(type) {
+    let sprite = terrainView.sprites.get(type);
+    if (sprite) return sprite;
+    
+    sprite = document.createElement('canvas');
+    sprite.width = TILE_SIZE;
+    sprite.height = TILE_SIZE;
+    const ctx = sprite.getContext('2d');
+    const dot = (x, y, r, color) => {
+        ctx.fillStyle = color;
+        ctx.beginPath();
+        ctx.arc(x, y, r, 0, Math.PI * 2);
+        ctx.fill();
+    };
+    
+    switch (type) {
+        case 'grass':
+            ctx.fillStyle = '#2d5016';
+            ctx.fillRect(0, 0, 32, 32);
+            ctx.fillStyle = '#3d6b47';
+            for (let y = 0; y < 32; y += 8) {
+                for (let x = 0; x < 32; x += 8) ctx.fillRect(x, y, 2, 2);
+            }
+            for (let y = 0; y < 32; y += 16) {
+                for (let x = 0; x < 32; x += 16) {
+                    dot(x + 8, y + 8, 2, '#4a7c59');
+                    dot(x + 12, y + 4, 1, '#4a7c59');
+                }
+            }
+            break;
+        case 'water': {
+            const stripes = ['#1e40af', '#2563eb', '#3b82f6', '#2563eb'];
+            for (let y = 0; y < 32; y += 2) {
+                ctx.fillStyle = stripes[(y / 2) % 4];
+                ctx.fillRect(0, y, 32, 2);
+            }
+            break;
+        }
+        case 'mountain': {
+            const gradient = ctx.createLinearGradient(0, 0, 0, 32);
+            gradient.addColorStop(0, '#9ca3af');
+            gradient.addColorStop(0.5, '#6b7280');
+            gradient.addColorStop(1, '#4b5563');
+            ctx.fillStyle = gradient;
+            ctx.fillRect(0, 0, 32, 32);
+            ctx.fillStyle = '#374151';
+            ctx.beginPath();
+            ctx.moveTo(16, 9);
+            ctx.lineTo(30, 32);
+            ctx.lineTo(16, 32);
+            ctx.fill();
+            break;
+        }
+        case 'forest':
+            ctx.fillStyle = '#0f2a0a';
+            ctx.fillRect(0, 0, 32, 32);
+            dot(16, 8, 6, '#166534');
+            dot(8, 20, 4, '#15803d');
+            dot(24, 24, 5, '#166534');
+            break;
+        case 'road':
+            for (let x = 0; x < 32; x += 8) {
+                ctx.fillStyle = (x / 8) % 2 ? '#a16207' : '#8b5a2b';
+                ctx.fillRect(x, 0, 8, 32);
+            }
+            break;
+        case 'sand':
+            ctx.fillStyle = '#eab308';
+            ctx.fillRect(0, 0, 32, 32);
+            for (let y = 0; y < 32; y += 16) {
+                for (let x = 0; x < 32; x += 16) {
+                    dot(x + 6, y + 6, 1, '#f59e0b');
+                    dot(x + 10, y + 6, 1, '#f59e0b');
+                }
+            }
+            break;
+        case 'door': {
+            const gradient = ctx.createLinearGradient(0, 0, 0, 32);
+            gradient.addColorStop(0, '#92400e');
+            gradient.addColorStop(0.5, '#7c2d12');
+            gradient.addColorStop(1, '#451a03');
+            ctx.fillStyle = gradient;
+            ctx.fillRect(0, 0, 32, 32);
+            ctx.fillStyle = '#451a03';
+            ctx.fillRect(0, 0, 12, 32);
+            ctx.fillRect(20, 0, 12, 32);
+            break;
+        }
+        default:
+            ctx.fillStyle = getTerrainColor(type);
+            ctx.fillRect(0, 0, 32, 32);
+    }
+    
+    terrainView.sprites.set(type, sprite);
+    return sprite;
+}
+
+// Paint tiles [x0, x1) x [y0, y1) of the 1px-per-tile minimap canvas
+function drawMinimapTerrain(x0, y0, x1, y1) {
+    const canvas = terrainView.minimap;
+    if (!canvas || x1 <= x0 || y1 <= y0) return;
+    
+    const rgb = terrainPalette.map(type => {
+        const hex = getTerrainColor(type);
+        return [parseInt(hex.slice(1, 3), 16), parseInt(hex.slice(3, 5), 16), parseInt(hex.slice(5, 7), 16)];
+    });
+    const ctx = canvas.getContext('2d');
+    const image = ctx.createImageData(x1 - x0, y1 - y0);
+    const { width, cells } = terrainGrid;
+    let p = 0;
+    for (let y = y0; y < y1; y++) {
+        for (let x = x0; x < x1; x++) {
+            const color = rgb[cells[y * width + x]];
+            image.data[p] = color[0];
+            image.data[p + 1] = color[1];
+            image.data[p + 2] = color[2];
+            image.data[p + 3] = 255;
+            p += 4;
+        }
+    }
+    ctx.putImageData(image, x0, y0);
+}
+
 function initMapMaker() {
     initializeMap();
     setupEventListeners();
@@ -54,6 +494,7 @@ function initializeMap() {
             mapData.terrain[y][x] = 'grass';
         }
     }
+    loadTerrainGrid();
 }
 
 function setupEventListeners() {
@@ -95,14 +536,16 @@ function setupEventListeners() {
     
     document.getElementById('showGrid').addEventListener('change', (e) => {
         editorState.showGrid = e.target.checked;
-        renderCanvas();
+        document.getElementById('gridOverlay').style.display = editorState.showGrid ? '' : 'none';
     });
 
     document.getElementById('showAreas').addEventListener('change', (e) => {
         editorState.showAreas = e.target.checked;
-        renderCanvas();
+        renderEntities();
     });
     
+    window.addEventListener('resize', updateVisibleChunks);
+    
     document.addEventListener('keydown', handleKeyboard);
 }
 
@@ -127,6 +570,10 @@ function handleMouseDown(e) {
         editorState.areaStartPos = coords;
         updateStatus(`Drawing area from (${coords.x}, ${coords.y})`);
     } else {
+        // A drag with the paint or erase tool is one undo step
+        if (editorState.currentTool === 'paint' || editorState.currentTool === 'erase') {
+            beginEdit(editorState.currentTool);
+        }
         performAction(coords.x, coords.y);
     }
 }
@@ -135,6 +582,12 @@ function handleMouseMove(e) {
     const coords = getCanvasCoordinates(e);
     document.getElementById('coordinates').textContent = `X: ${coords.x}, Y: ${coords.y}`;
     
+    const cursor = document.getElementById('tileCursor');
+    if (cursor) {
+        cursor.style.left = `${coords.x * TILE_SIZE}px`;
+        cursor.style.top = `${coords.y * TILE_SIZE}px`;
+    }
+    
     if (editorState.isPanning && editorState.isMouseDown) {
         const deltaX = e.clientX - editorState.panStart.x;
         const deltaY = e.clientY - editorState.panStart.y;
@@ -164,6 +617,7 @@ function handleMouseUp(e) {
         editorState.areaStartPos = null;
     }
     
+    commitEdit();
     editorState.isMouseDown = false;
     editorState.isPanning = false;
     document.getElementById('canvasView').style.cursor = editorState.currentTool === 'pan' ? 'grab' : 'crosshair';
@@ -206,7 +660,7 @@ function createArea(startPos, endPos) {
     };
     
     mapData.areas.push(area);
-    renderCanvas();
+    renderEntities();
     updateStats();
     updateStatus(`Created area "${areaName}" at (${startX}, ${startY})`);
 }
@@ -255,6 +709,7 @@ function performAction(x, y) {
 function paintTerrain(centerX, centerY) {
     const size = editorState.brushSize;
     const radius = Math.floor(size / 2);
+    const ownEdit = beginEdit('paint');
     
     for (let dy = -radius; dy <= radius; dy++) {
         for (let dx = -radius; dx <= radius; dx++) {
@@ -263,20 +718,19 @@ function paintTerrain(centerX, centerY) {
             
             if (x >= 0 && x < mapData.width && y >= 0 && y < mapData.height) {
                 if (size === 1 || Math.sqrt(dx*dx + dy*dy) <= radius) {
-                    mapData.terrain[y][x] = editorState.selectedTerrain;
+                    setCell(x, y, editorState.selectedTerrain);
                 }
             }
         }
     }
     
-    renderCanvas();
-    updateMinimap();
-    updateStats();
+    if (ownEdit) commitEdit();
     updateStatus(`Painted ${editorState.selectedTerrain} at (${centerX}, ${centerY})`);
 }
 
 function placeBuilding(x, y) {
-    mapData.buildings = mapData.buildings.filter(b => !(b.x === x && b.y === y));
+    const ownEdit = beginEdit('building');
+    removeEntitiesAt('buildings', x, y);
     
     const buildingData = {
         x: x,
@@ -287,8 +741,10 @@ function placeBuilding(x, y) {
     };
     
     mapData.buildings.push(buildingData);
+    recordEntity('buildings', buildingData, true);
+    if (ownEdit) commitEdit();
     
-    renderCanvas();
+    renderEntities();
     updateMinimap();
     updateStats();
     updateStatus(`Placed ${editorState.selectedBuilding} at (${x}, ${y})`);
@@ -342,7 +798,8 @@ function placeNPC(x, y) {
     const npcDialogue = customDialogue !== null ? customDialogue : npcType.dialogue;
     
     // Remove existing NPC at this position
-    mapData.npcs = mapData.npcs.filter(n => !(n.x === x && n.y === y));
+    const ownEdit = beginEdit('NPC');
+    removeEntitiesAt('npcs', x, y);
     
     const npcData = {
         x: x,
@@ -353,8 +810,10 @@ function placeNPC(x, y) {
     };
     
     mapData.npcs.push(npcData);
+    recordEntity('npcs', npcData, true);
+    if (ownEdit) commitEdit();
     
-    renderCanvas();
+    renderEntities();
     updateMinimap();
     updateStats();
     updateStatus(`Placed ${npcName} at (${x}, ${y})`);
@@ -424,7 +883,8 @@ function placeEnemy(x, y) {
     const enemyName = customName.trim() || enemyType.name;
     
     // Remove existing enemy at this position
-    mapData.enemies = mapData.enemies.filter(e => !(e.x === x && e.y === y));
+    const ownEdit = beginEdit('enemy');
+    removeEntitiesAt('enemies', x, y);
     
     const enemyData = {
         x: x,
@@ -439,8 +899,10 @@ function placeEnemy(x, y) {
     };
     
     mapData.enemies.push(enemyData);
+    recordEntity('enemies', enemyData, true);
+    if (ownEdit) commitEdit();
     
-    renderCanvas();
+    renderEntities();
     updateMinimap();
     updateStats();
     updateStatus(`Placed ${enemyName} at (${x}, ${y})`);
@@ -448,7 +910,8 @@ function placeEnemy(x, y) {
 
 function placeItem(x, y) {
     // Remove existing item at this position
-    mapData.items = mapData.items.filter(i => !(i.x === x && i.y === y));
+    const ownEdit = beginEdit('item');
+    removeEntitiesAt('items', x, y);
     
     const itemTypes = {
         gold: {
@@ -489,19 +952,34 @@ function placeItem(x, y) {
     };
     
     mapData.items.push(itemData);
+    recordEntity('items', itemData, true);
+    if (ownEdit) commitEdit();
     
-    renderCanvas();
+    renderEntities();
     updateMinimap();
     updateStats();
     updateStatus(`Placed ${itemType.type.replace('_', ' ')} at (${x}, ${y})`);
 }
 
+// Remove the entities of mapData[list] standing at (x, y), recording them
+function removeEntitiesAt(list, x, y) {
+    mapData[list] = mapData[list].filter(entity => {
+        if (entity.x !== x || entity.y !== y) return true;
+        recordEntity(list, entity, false);
+        return false;
+    });
+}
+
 function eraseTile(x, y) {
-    mapData.terrain[y][x] = 'grass';
-    mapData.buildings = mapData.buildings.filter(b => !(b.x === x && b.y === y));
-    mapData.npcs = mapData.npcs.filter(n => !(n.x === x && n.y === y));
-    mapData.enemies = mapData.enemies.filter(e => !(e.x === x && e.y === y));
-    mapData.items = mapData.items.filter(i => !(i.x === x && i.y === y));
+    if (x < 0 || x >= mapData.width || y < 0 || y >= mapData.height) return;
+    
+    const ownEdit = beginEdit('erase');
+    const entityCount = editHistory.current.entities.length;
+    setCell(x, y, 'grass');
+    removeEntitiesAt('buildings', x, y);
+    removeEntitiesAt('npcs', x, y);
+    removeEntitiesAt('enemies', x, y);
+    removeEntitiesAt('items', x, y);
     
     // Check if clicking on an area
     const area = mapData.areas.find(a => 
@@ -511,44 +989,83 @@ function eraseTile(x, y) {
     
     if (area && confirm(`Delete area "${area.name}"?`)) {
         mapData.areas = mapData.areas.filter(a => a.id !== area.id);
+        recordEntity('areas', area, false);
     }
     
-    renderCanvas();
-    updateMinimap();
-    updateStats();
+    // Terrain redraws itself; entities only if one was removed
+    if (editHistory.current.entities.length > entityCount) {
+        renderEntities();
+        updateMinimap();
+    }
+    if (ownEdit) commitEdit();
     updateStatus(`Erased tile at (${x}, ${y})`);
 }
 
+// Scanline flood fill over the typed-array grid: each span of matching
+// cells is filled in one pass, seeding the rows above and below once per
+// run instead of pushing four neighbours per tile
 function fillArea(startX, startY) {
-    const targetTerrain = mapData.terrain[startY][startX];
+    const { width, height, cells } = terrainGrid;
+    const target = cells[startY * width + startX];
     const newTerrain = editorState.selectedTerrain;
-    
-    if (targetTerrain === newTerrain) return;
-    
-    const stack = [{x: startX, y: startY}];
-    const visited = new Set();
-    
-    while (stack.length > 0) {
-        const {x, y} = stack.pop();
-        const key = `${x},${y}`;
-        
-        if (visited.has(key)) continue;
-        if (x < 0 || x >= mapData.width || y < 0 || y >= mapData.height) continue;
-        if (mapData.terrain[y][x] !== targetTerrain) continue;
+    const code = terrainCode(newTerrain);
+    
+    if (target === code) return;
+    
+    const ownEdit = beginEdit('fill');
+    const edit = editHistory.current;
+    const counts = terrainGrid.counts;
+    const seeds = [startX, startY];
+    let filled = 0;
+    let x0 = startX, y0 = startY, x1 = startX, y1 = startY;
+    
+    while (seeds.length > 0) {
+        const y = seeds.pop();
+        let x = seeds.pop();
+        let i = y * width + x;
+        if (cells[i] !== target) continue;
         
-        visited.add(key);
-        mapData.terrain[y][x] = newTerrain;
+        while (x > 0 && cells[i - 1] === target) {
+            x--;
+            i--;
+        }
+        x0 = Math.min(x0, x);
+        y0 = Math.min(y0, y);
+        y1 = Math.max(y1, y);
         
-        stack.push({x: x + 1, y: y});
-        stack.push({x: x - 1, y: y});
-        stack.push({x: x, y: y + 1});
-        stack.push({x: x, y: y - 1});
+        const row = mapData.terrain[y];
+        let seedAbove = false;
+        let seedBelow = false;
+        for (; x < width && cells[i] === target; x++, i++) {
+            cells[i] = code;
+            row[x] = newTerrain;
+            edit.indices.push(i);
+            filled++;
+            
+            if (y > 0) {
+                const above = cells[i - width] === target;
+                if (above && !seedAbove) seeds.push(x, y - 1);
+                seedAbove = above;
+            }
+            if (y < height - 1) {
+                const below = cells[i + width] === target;
+                if (below && !seedBelow) seeds.push(x, y + 1);
+                seedBelow = below;
+            }
+        }
+        x1 = Math.max(x1, x - 1);
     }
     
-    renderCanvas();
-    updateMinimap();
-    updateStats();
-    updateStatus(`Filled area with ${newTerrain} from (${startX}, ${startY})`);
+    for (let n = 0; n < filled; n++) {
+        edit.before.push(target);
+        edit.after.push(code);
+    }
+    counts[target] -= filled;
+    counts[code] = (counts[code] || 0) + filled;
+    markDirty(x0, y0, x1 + 1, y1 + 1);
+    
+    if (ownEdit) commitEdit();
+    updateStatus(`Filled ${filled} tiles with ${newTerrain} from (${startX}, ${startY})`);
 }
 
 function selectTool(tool) {
@@ -633,30 +1150,24 @@ function selectBrushSize(size) {
 function updateCameraPosition() {
     const canvasGrid = document.getElementById('canvasGrid');
     canvasGrid.style.transform = `translate3d(${editorState.cameraX}px, ${editorState.cameraY}px, 0)`;
+    updateVisibleChunks();
 }
 
+// Full render: terrain chunks are rebuilt from the grid, then the entities
 function renderCanvas() {
     const canvasGrid = document.getElementById('canvasGrid');
-    canvasGrid.innerHTML = '';
     
     canvasGrid.style.width = `${mapData.width * 32}px`;
     canvasGrid.style.height = `${mapData.height * 32}px`;
     
-    // Render terrain
-    for (let y = 0; y < mapData.height; y++) {
-        for (let x = 0; x < mapData.width; x++) {
-            const tile = document.createElement('div');
-            tile.className = `tile ${mapData.terrain[y][x]}`;
-            tile.style.left = `${x * 32}px`;
-            tile.style.top = `${y * 32}px`;
-            
-            if (!editorState.showGrid) {
-                tile.style.border = 'none';
-            }
-            
-            canvasGrid.appendChild(tile);
-        }
-    }
+    resetTerrainLayer(canvasGrid);
+    renderEntities();
+}
+
+// Rebuild the areas, buildings, NPCs, enemies and items above the terrain
+function renderEntities() {
+    const layer = document.getElementById('entityLayer');
+    layer.innerHTML = '';
     
     // Render areas (behind everything else)
     if (editorState.showAreas) {
@@ -692,7 +1203,7 @@ function renderCanvas() {
             label.onclick = () => editArea(area);
             
             areaEl.appendChild(label);
-            canvasGrid.appendChild(areaEl);
+            layer.appendChild(areaEl);
         });
     }
     
@@ -707,7 +1218,7 @@ function renderCanvas() {
             e.stopPropagation();
             editObject('building', building);
         };
-        canvasGrid.appendChild(buildingEl);
+        layer.appendChild(buildingEl);
     });
     
     // Render NPCs
@@ -735,7 +1246,7 @@ function renderCanvas() {
         };
         npcEl.onmouseenter = () => npcEl.style.transform = 'scale(1.1)';
         npcEl.onmouseleave = () => npcEl.style.transform = 'scale(1)';
-        canvasGrid.appendChild(npcEl);
+        layer.appendChild(npcEl);
     });
     
     // Render enemies
@@ -773,7 +1284,7 @@ function renderCanvas() {
         };
         enemyEl.onmouseenter = () => enemyEl.style.transform = 'scale(1.1)';
         enemyEl.onmouseleave = () => enemyEl.style.transform = 'scale(1)';
-        canvasGrid.appendChild(enemyEl);
+        layer.appendChild(enemyEl);
     });
 
 // Render items
@@ -813,7 +1324,7 @@ mapData.items.forEach(item => {
         };
         itemEl.onmouseenter = () => itemEl.style.transform = 'scale(1.15)';
         itemEl.onmouseleave = () => itemEl.style.transform = 'scale(1)';
-        canvasGrid.appendChild(itemEl);
+        layer.appendChild(itemEl);
     });
 }
 
@@ -880,7 +1391,7 @@ function saveAreaEdit(button) {
     const b = parseInt(colorHex.slice(5, 7), 16);
     area.color = `rgba(${r}, ${g}, ${b}, 0.3)`;
     
-    renderCanvas();
+    renderEntities();
     updateStats();
     modal.remove();
     updateStatus(`Updated area "${area.name}"`);
@@ -888,7 +1399,7 @@ function saveAreaEdit(button) {
 
 function deleteArea(areaId) {
     mapData.areas = mapData.areas.filter(a => a.id !== areaId);
-    renderCanvas();
+    renderEntities();
     updateStats();
     updateStatus('Area deleted');
 }
@@ -1020,7 +1531,7 @@ function saveEdit(type, button) {
         obj.value = parseInt(document.getElementById('editValue').value);
     }
     
-    renderCanvas();
+    renderEntities();
     updateStats();
     modal.remove();
     updateStatus(`Updated ${type}`);
@@ -1037,7 +1548,7 @@ function deleteObject(type, x, y) {
         mapData.items = mapData.items.filter(i => !(i.x === x && i.y === y));
     }
     
-    renderCanvas();
+    renderEntities();
     updateStats();
     updateStatus(`Deleted ${type} at (${x}, ${y})`);
 }
@@ -1054,19 +1565,14 @@ function updateMinimap() {
     minimapContent.style.width = `${mapData.width}px`;
     minimapContent.style.height = `${mapData.height}px`;
     
-    // Terrain
-    for (let y = 0; y < mapData.height; y++) {
-        for (let x = 0; x < mapData.width; x++) {
-            const pixel = document.createElement('div');
-            pixel.style.position = 'absolute';
-            pixel.style.left = `${x}px`;
-            pixel.style.top = `${y}px`;
-            pixel.style.width = '1px';
-            pixel.style.height = '1px';
-            pixel.style.backgroundColor = getTerrainColor(mapData.terrain[y][x]);
-            minimapContent.appendChild(pixel);
-        }
-    }
+    // Terrain, one canvas pixel per tile; edits repaint only what changed
+    const terrain = document.createElement('canvas');
+    terrain.className = 'minimap-terrain';
+    terrain.width = mapData.width;
+    terrain.height = mapData.height;
+    minimapContent.appendChild(terrain);
+    terrainView.minimap = terrain;
+    drawMinimapTerrain(0, 0, mapData.width, mapData.height);
     
     // Areas
     mapData.areas.forEach(area => {
@@ -1149,18 +1655,12 @@ function getTerrainColor(terrain) {
 
 function updateStats() {
     const totalTiles = mapData.width * mapData.height;
-    const terrainCounts = {};
-    
-    for (let y = 0; y < mapData.height; y++) {
-        for (let x = 0; x < mapData.width; x++) {
-            const terrain = mapData.terrain[y][x];
-            terrainCounts[terrain] = (terrainCounts[terrain] || 0) + 1;
-        }
-    }
+    // The grid keeps a running count per terrain type
+    const terrainTypes = terrainGrid.counts.filter(count => count > 0).length;
     
     document.getElementById('tileCount').textContent = totalTiles;
     document.getElementById('buildingCount').textContent = mapData.buildings.length;
-    document.getElementById('terrainTypes').textContent = Object.keys(terrainCounts).length;
+    document.getElementById('terrainTypes').textContent = terrainTypes;
     
     const npcCountEl = document.getElementById('npcCount');
     const enemyCountEl = document.getElementById('enemyCount');
@@ -1180,6 +1680,18 @@ function updateStatus(message) {
 function handleKeyboard(e) {
     if (e.target.tagName === 'INPUT' || e.target.tagName === 'TEXTAREA') return;
     
+    if (e.ctrlKey || e.metaKey) {
+        const key = e.key.toLowerCase();
+        if (key === 'z' && !e.shiftKey) {
+            e.preventDefault();
+            undo();
+        } else if (key === 'y' || (key === 'z' && e.shiftKey)) {
+            e.preventDefault();
+            redo();
+        }
+        return;
+    }
+    
     switch (e.key) {
         case '1': selectTool('paint'); break;
         case '2': selectTool('building'); break;
@@ -1204,14 +1716,14 @@ function toggleGrid() {
     const checkbox = document.getElementById('showGrid');
     checkbox.checked = !checkbox.checked;
     editorState.showGrid = checkbox.checked;
-    renderCanvas();
+    document.getElementById('gridOverlay').style.display = editorState.showGrid ? '' : 'none';
 }
 
 function toggleAreas() {
     const checkbox = document.getElementById('showAreas');
     checkbox.checked = !checkbox.checked;
     editorState.showAreas = checkbox.checked;
-    renderCanvas();
+    renderEntities();
 }
 
 function centerView() {
@@ -1225,8 +1737,8 @@ function resizeMap() {
     const newWidth = parseInt(document.getElementById('mapWidth').value);
     const newHeight = parseInt(document.getElementById('mapHeight').value);
     
-    if (newWidth < 10 || newWidth > 200 || newHeight < 10 || newHeight > 150) {
-        alert('Invalid map size! Width: 10-200, Height: 10-150');
+    if (newWidth < 10 || newWidth > 1024 || newHeight < 10 || newHeight > 1024) {
+        alert('Invalid map size! Width: 10-1024, Height: 10-1024');
         return;
     }
     
@@ -1252,6 +1764,7 @@ function resizeMap() {
     
     mapData.width = newWidth;
     mapData.height = newHeight;
+    loadTerrainGrid();
     
     renderCanvas();
     updateMinimap();
@@ -1389,6 +1902,7 @@ function generateRandom() {
             });
         }
         
+        loadTerrainGrid();
         renderCanvas();
         updateMinimap();
         updateStats();
@@ -1460,6 +1974,7 @@ function importMap() {
         mapData.enemies = importedData.enemies || [];
         mapData.items = importedData.items || [];
         mapData.areas = importedData.areas || [];
+        loadTerrainGrid();
         
         document.getElementById('mapName').value = mapData.name;
         document.getElementById('mapWidth').value = mapData.width;
@@ -1532,6 +2047,7 @@ function loadAutoSave() {
         if (savedData) {
             const parsed = JSON.parse(savedData);
             mapData = parsed.mapData;
+            loadTerrainGrid();
             
             if (parsed.editorState) {
                 selectTool(parsed.editorState.currentTool);
@@ -0,0 +1,408 @@
+// EternalBliss - Binary note codec
+// Browser side of eternalbliss/notes.py: versioned binary CHRPG:* notes with
+// varint fields, a field-presence bitmap and delta player saves. Legacy
+// "prefix + JSON" notes still decode. `node note-codec.js` benchmarks both.
+
+class NoteCodec {
+    static VERSION = 1;
+    static DELTA = 1;
+
+    static textEncoder = new TextEncoder();
+    static textDecoder = new TextDecoder();
+
+    static PREFIXES = {
+        player: 'CHRPG:PLAYER:',
+        pos: 'CHRPG:POS:',
+        chat: 'CHRPG:CHAT:',
+        battle: 'CHRPG:BATTLE:',
+        trade: 'CHRPG:TRADE:',
+    };
+
+    // xpToNext at a level, as checkLevelUp grows it
+    static xpToNext(level) {
+        let value = 100;
+        for (let i = 1; i < level; i++) value = Math.floor(value * 1.4);
+        return value;
+    }
+
+    // [key, parent, kind, default]; field order is the layout, append only.
+    // A default is a constant or a function of the top-level fields before
+    // it; fields without one are absent when left out of a full note.
+    static SCHEMAS = {
+        player: [
+            ['name', null, 's'],
+            ['level', null, 'u'],
+            ['xp', null, 'u', 0],
+            ['xpToNext', null, 'u', d => NoteCodec.xpToNext(d.level ?? 1)],
+            ['maxHp', null, 'u'],
+            ['hp', null, 'u', d => d.maxHp],
+            ['maxMp', null, 'u'],
+            ['mp', null, 'u', d => d.maxMp],
+            ['attack', null, 'u'],
+            ['defense', null, 'u'],
+            ['magic', null, 'u'],
+            ['gold', null, 'u'],
+            ['x', null, 'u'],
+            ['y', null, 'u'],
+            ['gold', 'inventory', 'u', d => d.gold],
+            ['healthPotions', 'inventory', 'u', 0],
+            ['manaPotions', 'inventory', 'u', 0],
+            ['keys', 'inventory', 'u', 0],
+            ['enemiesDefeated', 'stats', 'u', 0],
+            ['treasuresFound', 'stats', 'u', 0],
+            ['townsVisited', 'stats', 'u', 1],
+            ['timestamp', null, 'u'],
+        ],
+        pos: [
+            ['name', null, 's'],
+            ['level', null, 'u'],
+            ['x', null, 'u'],
+            ['y', null, 'u'],
+            ['timestamp', null, 'u'],
+        ],
+        chat: [
+            ['name', null, 's'],
+            ['message', null, 's'],
+            ['level', null, 'u'],
+            ['timestamp', null, 'u'],
+        ],
+    };
+
+    // Varints are built with arithmetic, not bit operators, so values up
+    // to 2^53 (millisecond timestamps) survive.
+    static putVarint(out, n) {
+        while (n > 0x7F) {
+            out.push((n % 0x80) | 0x80);
+            n = Math.floor(n / 0x80);
+        }
+        out.push(n);
+    }
+
+    static getVarint(buf, pos) {
+        let n = 0;
+        let scale = 1;
+        for (;;) {
+            const b = buf[pos++];
+            if (b === undefined) throw new RangeError('truncated note');
+            n += (b & 0x7F) * scale;
+            if (b < 0x80) return [n, pos];
+            scale *= 0x80;
+        }
+    }
+
+    static zigzag(n) {
+        return n >= 0 ? n * 2 : -n * 2 - 1;
+    }
+
+    static unzigzag(n) {
+        return n % 2 === 0 ? n / 2 : -(n + 1) / 2;
+    }
+
+    static get(data, field) {
+        const target = field[1] === null ? data : data[field[1]];
+        return target && typeof target === 'object' ? target[field[0]] : undefined;
+    }
+
+    static set(data, field, value) {
+        const parent = field[1];
+        const target = parent === null ? data : (data[parent] || (data[parent] = {}));
+        target[field[0]] = value;
+    }
+
+    // base64 (as the indexer returns notes) to bytes, without atob's
+    // intermediate binary string
+    static fromBase64(text) {
+        let table = NoteCodec._base64;
+        if (!table) {
+            table = NoteCodec._base64 = new Uint8Array(128);
+            const alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/';
+            for (let i = 0; i < alphabet.length; i++) table[alphabet.charCodeAt(i)] = i;
+        }
+        let end = text.length;
+        while (end > 0 && text.charCodeAt(end - 1) === 61) end--; // '='
+        const out = new Uint8Array((end * 3) >> 2);
+        let o = 0;
+        for (let i = 0; i < end; i += 4) {
+            const a = table[text.charCodeAt(i)];
+            const b = table[text.charCodeAt(i + 1)];
+            const c = i + 2 < end ? table[text.charCodeAt(i + 2)] : 0;
+            const d = i + 3 < end ? table[text.charCodeAt(i + 3)] : 0;
+            const n = (a << 18) | (b << 12) | (c << 6) | d;
+            out[o++] = n >> 16;
+            if (o < out.length) out[o++] = (n >> 8) & 0xFF;
+            if (o < out.length) out[o++] = n & 0xFF;
+        }
+        return out;
+    }
+
+    static text(bytes, start, end) {
+        let ascii = '';
+        for (let i = start; i < end; i++) {
+            if (bytes[i] >= 0x80) return NoteCodec.textDecoder.decode(bytes.subarray(start, end));
+            ascii += String.fromCharCode(bytes[i]);
+        }
+        return ascii;
+    }
+
+    static defaultOf(field, data) {
+        const def = field[3];
+        return typeof def === 'function' ? def(data) : def;
+    }
+
+    // Whether every value of data has a slot of the right kind in schema
+    static encodable(schema, data) {
+        const kinds = new Map(schema.map(([key, parent, kind]) => [`${parent}.${key}`, kind]));
+        const ok = (path, value) => {
+            const kind = kinds.get(path);
+            if (kind === 'u') return Number.isSafeInteger(value) && value >= 0;
+            return kind === 's' && typeof value === 'string';
+        };
+        for (const [key, value] of Object.entries(data)) {
+            if (value && typeof value === 'object') {
+                for (const [inner, v] of Object.entries(value)) {
+                    if (!ok(`${key}.${inner}`, v)) return false;
+                }
+            } else if (!ok(`null.${key}`, value)) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    // Binary body (without prefix), or null when data does not fit the
+    // schema. With base (a decoded full save) the body is a delta against it.
+    static encodeBody(stream, data, base = null, baseRound = 0) {
+        const schema = NoteCodec.SCHEMAS[stream];
+        if (!schema || !NoteCodec.encodable(schema, data)) return null;
+        const header = [NoteCodec.VERSION];
+        const values = [];
+        const putValue = (kind, value) => {
+            if (kind === 'u') {
+                NoteCodec.putVarint(values, value);
+            } else {
+                const raw = NoteCodec.textEncoder.encode(value);
+                NoteCodec.putVarint(values, raw.length);
+                for (const b of raw) values.push(b);
+            }
+        };
+
+        let present = 0;
+        let bit = 1;
+        if (base === null) {
+            NoteCodec.putVarint(header, 0);
+            for (const field of schema) {
+                const value = NoteCodec.get(data, field);
+                if (value !== undefined && !(field[3] !== undefined && value === NoteCodec.defaultOf(field, data))) {
+                    present += bit;
+                    putValue(field[2], value);
+                }
+                bit *= 2;
+            }
+        } else {
+            NoteCodec.putVarint(header, NoteCodec.DELTA);
+            NoteCodec.putVarint(header, baseRound);
+            for (const field of schema) {
+                const value = NoteCodec.get(data, field);
+                const old = NoteCodec.get(base, field);
+                if (value !== undefined && value !== old) {
+                    present += bit;
+                    if (field[2] === 'u' && old !== undefined) {
+                        NoteCodec.putVarint(values, NoteCodec.zigzag(value - old));
+                    } else {
+                        putValue(field[2], value);
+                    }
+                }
+                bit *= 2;
+            }
+        }
+        NoteCodec.putVarint(header, present);
+        return Uint8Array.from(header.concat(values));
+    }
+
+    // A complete note: prefix and binary body, or prefix and JSON
+    static encode(stream, data, base = null, baseRound = 0) {
+        const prefix = NoteCodec.textEncoder.encode(NoteCodec.PREFIXES[stream]);
+        const body = NoteCodec.encodeBody(stream, data, base, baseRound)
+            || NoteCodec.textEncoder.encode(JSON.stringify(data));
+        const note = new Uint8Array(prefix.length + body.length);
+        note.set(prefix);
+        note.set(body, prefix.length);
+        return note;
+    }
+
+    // A player save: a delta against lastFull ({round, data}) when that is
+    // smaller than a full note. Returns {note, full}.
+    static encodeSave(data, lastFull = null) {
+        const full = NoteCodec.encode('player', data);
+        if (lastFull) {
+            const delta = NoteCodec.encode('player', data, lastFull.data, lastFull.round);
+            if (delta.length < full.length && NoteCodec.baseRound(delta, 'player') !== null) {
+                return { note: delta, full: false };
+            }
+        }
+        return { note: full, full: true };
+    }
+
+    // Note body bytes after the stream's prefix, or null
+    static body(note, stream) {
+        const raw = typeof note === 'string' ? NoteCodec.fromBase64(note) : note;
+        const prefix = NoteCodec.PREFIXES[stream];
+        if (raw.length < prefix.length) return null;
+        for (let i = 0; i < prefix.length; i++) {
+            if (raw[i] !== prefix.charCodeAt(i)) return null;
+        }
+        return raw.subarray(prefix.length);
+    }
+
+    // Whether a note is in the binary format (not legacy JSON)
+    static isBinary(note, stream) {
+        const body = NoteCodec.body(note, stream);
+        return body !== null && body[0] === NoteCodec.VERSION;
+    }
+
+    // Round of the full save a delta note applies to; null otherwise
+    static baseRound(note, stream) {
+        const body = NoteCodec.body(note, stream);
+        if (!body || body[0] !== NoteCodec.VERSION) return null;
+        const [flags, pos] = NoteCodec.getVarint(body, 1);
+        return flags & NoteCodec.DELTA ? NoteCodec.getVarint(body, pos)[0] : null;
+    }
+
+    // The object a note carries (base64 as the indexer returns it, or
+    // bytes), or null if it is not a valid note of the stream. A delta needs
+    // base, the decoded full save from baseRound(); without it this throws
+    // an Error with a baseRound property.
+    static decode(note, stream, base = null) {
+        const body = NoteCodec.body(note, stream);
+        if (!body || body.length === 0) return null;
+        if (body[0] !== NoteCodec.VERSION) {
+            try {
+                const data = JSON.parse(NoteCodec.textDecoder.decode(body));
+                return data && typeof data === 'object' && !Array.isArray(data) ? data : null;
+            } catch (e) {
+                return null;
+            }
+        }
+        const schema = NoteCodec.SCHEMAS[stream];
+        if (!schema) return null;
+
+        let [flags, pos] = NoteCodec.getVarint(body, 1);
+        const delta = flags & NoteCodec.DELTA;
+        let data = {};
+        if (delta) {
+            let round;
+            [round, pos] = NoteCodec.getVarint(body, pos);
+            if (!base) {
+                const error = new Error(`Delta note needs the full save from round ${round}`);
+                error.baseRound = round;
+                throw error;
+            }
+            for (const [key, value] of Object.entries(base)) {
+                data[key] = value && typeof value === 'object' ? { ...value } : value;
+            }
+        }
+        let present;
+        try {
+            [present, pos] = NoteCodec.getVarint(body, pos);
+            for (let i = 0; i < schema.length; i++) {
+                const field = schema[i];
+                if (present % 2 === 1) {
+                    let n = body[pos++];
+                    if (n >= 0x80) {
+                        n &= 0x7F;
+                        let scale = 0x80;
+                        let b;
+                        do {
+                            b = body[pos++];
+                            n += (b & 0x7F) * scale;
+                            scale *= 0x80;
+                        } while (b >= 0x80);
+                    }
+                    let value = n;
+                    if (field[2] === 's') {
+                        if (pos + n > body.length) return null;
+                        value = NoteCodec.text(body, pos, pos + n);
+                        pos += n;
+                    } else if (delta) {
+                        const old = NoteCodec.get(data, field);
+                        if (old !== undefined) value = old + NoteCodec.unzigzag(n);
+                    }
+                    NoteCodec.set(data, field, value);
+                } else if (!delta && field[3] !== undefined) {
+                    NoteCodec.set(data, field, NoteCodec.defaultOf(field, data));
+                }
+                present = Math.floor(present / 2);
+            }
+        } catch (e) {
+            return null;
+        }
+        return pos === body.length ? data : null;
+    }
+
+    // Bytes per note and decode rate, legacy JSON vs binary, for count
+    // sample notes per stream. Notes are base64, as the indexer returns them.
+    static benchmark(count = 20000) {
+        let seed = 1;
+        const rand = n => {
+            seed = (seed * 1103515245 + 12345) % 2147483648;
+            return seed % n;
+        };
+        const samples = {
+            player: () => {
+                const level = 1 + rand(30);
+                const gold = rand(5000);
+                const maxHp = 100 + (level - 1) * 20;
+                const maxMp = 50 + (level - 1) * 10;
+                return {
+                    name: 'Hero', level, hp: rand(2) ? maxHp : 1 + rand(maxHp), maxHp, mp: maxMp, maxMp,
+                    xp: rand(100), xpToNext: NoteCodec.xpToNext(level),
+                    attack: 15 + (level - 1) * 3, defense: 10 + (level - 1) * 2, magic: 20 + (level - 1) * 4,
+                    gold, x: rand(50), y: rand(37),
+                    inventory: { gold, healthPotions: rand(10), manaPotions: rand(10), keys: rand(3) },
+                    stats: { enemiesDefeated: rand(500), treasuresFound: rand(20), townsVisited: 1 + rand(6) },
+                    timestamp: 1700000000000 + rand(2000000000),
+                };
+            },
+            pos: () => ({ name: 'Hero', level: 1 + rand(30), x: rand(50), y: rand(37), timestamp: 1700000000000 + rand(2000000000) }),
+            chat: () => ({ name: 'Hero', message: ['hi', 'gg', 'selling potions', 'anyone near the castle?'][rand(4)],
+                level: 1 + rand(30), timestamp: 1700000000000 + rand(2000000000) }),
+        };
+        const toBase64 = bytes => btoa(String.fromCharCode(...bytes));
+        const time = fn => {
+            fn(); // warm up the JIT
+            const start = performance.now();
+            fn();
+            return count / ((performance.now() - start) / 1000);
+        };
+
+        const rows = [];
+        for (const stream of Object.keys(samples)) {
+            const objects = Array.from({ length: count }, samples[stream]);
+            const prefix = NoteCodec.PREFIXES[stream];
+            const legacy = objects.map(o => btoa(prefix + JSON.stringify(o)));
+            const binary = objects.map(o => toBase64(NoteCodec.encode(stream, o)));
+            rows.push({
+                stream,
+                jsonBytes: objects.reduce((n, o) => n + prefix.length + JSON.stringify(o).length, 0) / count,
+                binaryBytes: binary.reduce((n, b) => n + atob(b).length, 0) / count,
+                jsonRate: time(() => legacy.forEach(n => JSON.parse(atob(n).replace(prefix, '')))),
+                binaryRate: time(() => binary.forEach(n => NoteCodec.decode(n, stream))),
+            });
+        }
+        return rows;
+    }
+}
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = NoteCodec;
+    if (require.main === module) {
+        const count = Number(process.argv[2]) || 20000;
+        console.log('stream    json B  binary B   json notes/s  binary notes/s');
+        for (const r of NoteCodec.benchmark(count)) {
+            console.log(`${r.stream.padEnd(8)}${r.jsonBytes.toFixed(1).padStart(8)}${r.binaryBytes.toFixed(1).padStart(10)}`
+                + `${Math.round(r.jsonRate).toLocaleString().padStart(15)}${Math.round(r.binaryRate).toLocaleString().padStart(16)}`);
+        }
+    }
+} else if (typeof window !== 'undefined') {
+    window.NoteCodec = NoteCodec;
+}
@@ -0,0 +1,299 @@
+// EternalBliss - Client performance monitor
+// Times the hot paths (rendering, movement, the minimap, sync, note decoding)
+// and every algod/indexer request into rolling windows, samples DOM node
+// counts, and shows percentiles in an overlay (F9) that exports JSON.
+// Functions are wrapped only while monitoring is on and restored when it is
+// switched off, so a disabled monitor costs nothing on any call. Monitoring
+// starts on with ?perf in the URL or when it was left on (localStorage).
+// `node perf-monitor.js` measures the per-call cost of a wrapped function.
+
+class PerfMonitor {
+    // Samples kept per metric; percentiles cover this many recent calls
+    static WINDOW = 512;
+    // Histogram buckets: calls up to 2^(i - 6) ms, 1/64 ms to 8 s
+    static BUCKETS = 20;
+    static BUCKET_OFFSET = 6;
+    static SAMPLE_MS = 1000;
+    static STORAGE_KEY = 'eternalblissPerf';
+    static TOGGLE_KEY = 'F9';
+
+    constructor() {
+        this.enabled = false;
+        this.metrics = new Map();     // name -> {count, total, max, samples, next}
+        this.gauges = [];             // [{t, nodes, world}], the last WINDOW samples
+        this.wrapped = [];            // [{target, name, original}] to restore
+        this.setups = [];             // installers run on every enable
+        this.startedAt = 0;
+        this.overlay = null;
+        this.timer = null;
+    }
+
+    // Whether this page asked for monitoring
+    static requested() {
+        try {
+            return new URLSearchParams(location.search).has('perf') ||
+                localStorage.getItem(PerfMonitor.STORAGE_KEY) === 'on';
+        } catch (error) {
+            return false;
+        }
+    }
+
+    // Register what to instrument; runs now if monitoring is already on
+    setup(installer) {
+        this.setups.push(installer);
+        if (this.enabled) installer(this);
+    }
+
+    enable() {
+        if (this.enabled) return;
+        this.enabled = true;
+        this.startedAt = Date.now();
+        this.setups.forEach(installer => installer(this));
+        if (typeof document !== 'undefined') {
+            this.timer = setInterval(() => this.tick(), PerfMonitor.SAMPLE_MS);
+        }
+    }
+
+    disable() {
+        if (!this.enabled) return;
+        this.enabled = false;
+        for (const { target, name, original } of this.wrapped.reverse()) target[name] = original;
+        this.wrapped = [];
+        if (this.timer) clearInterval(this.timer);
+        this.timer = null;
+    }
+
+    reset() {
+        this.metrics.clear();
+        this.gauges = [];
+        this.startedAt = Date.now();
+    }
+
+    record(name, ms) {
+        let metric = this.metrics.get(name);
+        if (!metric) {
+            metric = { count: 0, total: 0, max: 0, samples: new Float64Array(PerfMonitor.WINDOW), next: 0 };
+            this.metrics.set(name, metric);
+        }
+        metric.count++;
+        metric.total += ms;
+        if (ms > metric.max) metric.max = ms;
+        metric.samples[metric.next] = ms;
+        metric.next = (metric.next + 1) % PerfMonitor.WINDOW;
+    }
+
+    // fn, timed under `name`; a returned promise is timed until it settles
+    wrap(name, fn) {
+        const monitor = this;
+        return function (...args) {
+            const start = performance.now();
+            let result;
+            try {
+                result = fn.apply(this, args);
+            } finally {
+                if (!(result && typeof result.then === 'function')) monitor.record(name, performance.now() - start);
+            }
+            if (result && typeof result.then === 'function') {
+                const done = () => monitor.record(name, performance.now() - start);
+                result.then(done, done);
+            }
+            return result;
+        };
+    }
+
+    // Wrap target[name] for each of `names` until disable()
+    instrument(target, names, prefix = '') {
+        if (!target) return;
+        for (const name of names) {
+            const original = target[name];
+            if (typeof original !== 'function' || this.wrapped.some(w => w.target === target && w.name === name)) continue;
+            target[name] = this.wrap(prefix + name, original);
+            this.wrapped.push({ target, name, original });
+        }
+    }
+
+    // Time every request of an algosdk client (Algodv2 or Indexer), by
+    // method and path with addresses, txids and numbers folded
+    instrumentClient(client, label) {
+        const http = client && client.c;
+        if (!http) return;
+        for (const method of ['get', 'post', 'delete']) {
+            const original = http[method];
+            if (typeof original !== 'function') continue;
+            const monitor = this;
+            http[method] = function (path, ...args) {
+                const name = `${label} ${method.toUpperCase()} ${PerfMonitor.route(path)}`;
+                return monitor.wrap(name, original).call(this, path, ...args);
+            };
+            this.wrapped.push({ target: http, name: method, original });
+        }
+    }
+
+    static route(path) {
+        return String(path)
+            .replace(/\/[A-Z2-7]{58}(?=\/|$)/g, '/:address')
+            .replace(/\/[A-Z2-7]{52}(?=\/|$)/g, '/:txid')
+            .replace(/\/\d+(?=\/|$)/g, '/:n');
+    }
+
+    // Value at quantile q of the recent samples
+    static quantile(sorted, q) {
+        if (!sorted.length) return 0;
+        return sorted[Math.min(sorted.length - 1, Math.floor(q * sorted.length))];
+    }
+
+    static bucket(ms) {
+        const i = ms > 0 ? Math.ceil(Math.log2(ms)) + PerfMonitor.BUCKET_OFFSET : 0;
+        return Math.max(0, Math.min(PerfMonitor.BUCKETS - 1, i));
+    }
+
+    // {name: {count, totalMs, maxMs, window, p50, p95, p99, histogram}}
+    summary() {
+        const out = {};
+        for (const [name, metric] of this.metrics) {
+            const n = Math.min(metric.count, PerfMonitor.WINDOW);
+            const recent = Array.from(metric.samples.subarray(0, n)).sort((a, b) => a - b);
+            const histogram = new Array(PerfMonitor.BUCKETS).fill(0);
+            recent.forEach(ms => histogram[PerfMonitor.bucket(ms)]++);
+            out[name] = {
+                count: metric.count,
+                totalMs: metric.total,
+                maxMs: metric.max,
+                window: n,
+                p50: PerfMonitor.quantile(recent, 0.5),
+                p95: PerfMonitor.quantile(recent, 0.95),
+                p99: PerfMonitor.quantile(recent, 0.99),
+                histogram,
+            };
+        }
+        return out;
+    }
+
+    export() {
+        return {
+            format: 'eternalbliss-perf',
+            version: 1,
+            startedAt: this.startedAt,
+            exportedAt: Date.now(),
+            userAgent: typeof navigator !== 'undefined' ? navigator.userAgent : null,
+            bucketsMs: Array.from({ length: PerfMonitor.BUCKETS }, (_, i) => 2 ** (i - PerfMonitor.BUCKET_OFFSET)),
+            metrics: this.summary(),
+            dom: this.gauges,
+        };
+    }
+
+    download() {
+        const blob = new Blob([JSON.stringify(this.export(), null, 1)], { type: 'application/json' });
+        const link = document.createElement('a');
+        link.href = URL.createObjectURL(blob);
+        link.download = `eternalbliss-perf-${new Date().toISOString().replace(/[:.]/g, '-')}.json`;
+        link.click();
+        setTimeout(() => URL.revokeObjectURL(link.href), 1000);
+    }
+
+    // Once a second while on: DOM node counts, and the overlay if shown
+    tick() {
+        const world = document.getElementById('worldGrid');
+        this.gauges.push({
+            t: Date.now(),
+            nodes: document.getElementsByTagName('*').length,
+            world: world ? world.getElementsByTagName('*').length : 0,
+        });
+        if (this.gauges.length > PerfMonitor.WINDOW) this.gauges.shift();
+        if (this.overlay && this.overlay.style.display !== 'none') this.renderOverlay();
+    }
+
+    // F9: monitoring and the overlay on/off together
+    toggle() {
+        const on = !this.enabled;
+        if (on) this.enable(); else this.disable();
+        try {
+            localStorage.setItem(PerfMonitor.STORAGE_KEY, on ? 'on' : 'off');
+        } catch (error) {
+            // Storage may be unavailable; the toggle still applies to this page
+        }
+        this.showOverlay(on);
+    }
+
+    showOverlay(show) {
+        if (!this.overlay) {
+            this.overlay = document.createElement('div');
+            this.overlay.id = 'perfOverlay';
+            this.overlay.className = 'perf-overlay';
+            this.overlay.addEventListener('click', event => {
+                const action = event.target.dataset && event.target.dataset.perf;
+                if (action === 'export') this.download();
+                if (action === 'reset') { this.reset(); this.renderOverlay(); }
+                if (action === 'close') this.toggle();
+            });
+            document.body.appendChild(this.overlay);
+        }
+        this.overlay.style.display = show ? 'block' : 'none';
+        if (show) this.renderOverlay();
+    }
+
+    renderOverlay() {
+        const fmt = ms => (ms >= 100 ? ms.toFixed(0) : ms >= 1 ? ms.toFixed(1) : ms.toFixed(2));
+        const rows = Object.entries(this.summary())
+            .sort((a, b) => b[1].totalMs - a[1].totalMs)
+            .map(([name, m]) => `<tr><td>${name}</td><td>${m.count}</td><td>${fmt(m.p50)}</td>` +
+                `<td>${fmt(m.p95)}</td><td>${fmt(m.maxMs)}</td><td>${fmt(m.totalMs)}</td></tr>`)
+            .join('');
+        const dom = this.gauges[this.gauges.length - 1];
+        this.overlay.innerHTML = `
+            <div class="perf-header">
+                <strong>Performance</strong>
+                <span>${dom ? `${dom.nodes} DOM nodes, ${dom.world} in world` : ''}</span>
+                <span>
+                    <button data-perf="export">Export</button>
+                    <button data-perf="reset">Reset</button>
+                    <button data-perf="close">×</button>
+                </span>
+            </div>
+            <table>
+                <tr><th>ms</th><th>calls</th><th>p50</th><th>p95</th><th>max</th><th>total</th></tr>
+                ${rows || '<tr><td colspan="6">No calls yet</td></tr>'}
+            </table>`;
+    }
+
+    // Per-call cost of a trivial function, bare and wrapped (in ns)
+    static benchmark(calls = 1000000) {
+        const monitor = new PerfMonitor();
+        const target = { step: x => x + 1 };
+        const time = () => {
+            let x = 0;
+            const start = performance.now();
+            for (let i = 0; i < calls; i++) x = target.step(x);
+            return ((performance.now() - start) * 1e6) / calls;
+        };
+        time();
+        const bare = time();
+        monitor.enable();
+        monitor.instrument(target, ['step']);
+        time();
+        const wrapped = time();
+        monitor.disable();
+        const restored = time();
+        return { calls, bare, wrapped, restored };
+    }
+}
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = PerfMonitor;
+    if (require.main === module) {
+        const r = PerfMonitor.benchmark(Number(process.argv[2]) || 1000000);
+        console.log(`${r.calls} calls of a trivial function`);
+        console.log(`  not monitored: ${r.bare.toFixed(1)} ns/call`);
+        console.log(`  monitored:     ${r.wrapped.toFixed(1)} ns/call`);
+        console.log(`  switched off:  ${r.restored.toFixed(1)} ns/call`);
+    }
+} else {
+    window.PerfMonitor = PerfMonitor;
+    window.perfMonitor = new PerfMonitor();
+    document.addEventListener('keydown', event => {
+        if (event.key === PerfMonitor.TOGGLE_KEY) {
+            event.preventDefault();
+            window.perfMonitor.toggle();
+        }
+    });
+}
@@ -9,6 +9,8 @@
 // ============================================
 // Set to null to use procedurally generated map
 // Set to a map object to use custom map
+// Set to a packed map manifest URL (python -m eternalbliss.mappack), e.g.
+// 'maps/bliss/manifest.json', to load map chunks around the player on demand
 const DEFAULT_MAP = null; // Change this to your custom map object
 
 // Example: 
@@ -80,6 +82,9 @@ world: {
 
 let algodClient = null;
 let indexerClient = null;
+// Shared suggested params and confirmation tracking for every sender
+// (see txn-service.js)
+let txnService = null;
 let account = null;
 let walletMethod = 'mnemonic';
 
@@ -92,6 +97,18 @@ const ALGOD_TOKEN = '';
 // Application ID for the smart contract (will be deployed separately)
 let APP_ID = 746639029; // Will be set when contract is deployed
 
+// Last full binary save ({round, data}); later saves are sent as deltas
+// against it when that is smaller (see note-codec.js)
+let lastFullSave = null;
+
+// Optional local note indexer (python -m eternalbliss.indexer --serve 8980).
+// When set, players and chat are fetched from it as deltas since the last
+// poll instead of re-scanning the public indexer.
+const NOTE_SERVICE_URL = null; // e.g. 'http://localhost:8980'
+const noteServiceCursor = { positionsRound: 0, chatId: null };
+// Players whose last position is older than this are gone (~24 hours of blocks)
+const POSITION_WINDOW_ROUNDS = 86400;
+
 // Note field prefixes for data storage
 const NOTE_PREFIXES = {
     PLAYER_DATA: 'CHRPG:PLAYER:',
@@ -105,20 +122,25 @@ const NOTE_PREFIXES = {
 // BROWSER COMPATIBLE BUFFER UTILITIES
 // ============================================
 
-function decodeBase64Note(base64String) {
-    try {
-        return atob(base64String);
-    } catch (error) {
-        console.error('Failed to decode base64:', error);
-        return '';
-    }
-}
-
 // Browser-compatible note prefix creation
 function createNotePrefix(prefix) {
     return new TextEncoder().encode(prefix);
 }
 
+// Indexer search for notes with a prefix, as fetched and decoded by the
+// client worker (client-worker.js)
+function noteSearchUrl(prefix, { sender, minRound, maxRound, limit } = {}) {
+    const query = new URLSearchParams({ 'note-prefix': btoa(prefix) });
+    if (sender) {
+        query.set('address', sender);
+        query.set('address-role', 'sender');
+    }
+    if (minRound !== undefined) query.set('min-round', Math.max(0, minRound));
+    if (maxRound !== undefined) query.set('max-round', maxRound);
+    if (limit) query.set('limit', limit);
+    return `${INDEXER_SERVER}/v2/transactions?${query}`;
+}
+
 // World data arrays
 let worldMap = [];
 let buildings = [];
@@ -131,10 +153,6 @@ let otherPlayers = new Map();
 let keyStates = {};
 let moveInterval = null;
 
-// Chat update interval
-let chatUpdateInterval = null;
-let playerUpdateInterval = null;
-
 // ============================================
 // ALGORAND INITIALIZATION FUNCTIONS
 // ============================================
@@ -143,6 +161,7 @@ let playerUpdateInterval = null;
 function initAlgorand() {
     try {
         algodClient = new algosdk.Algodv2(ALGOD_TOKEN, ALGOD_SERVER, ALGOD_PORT);
+        txnService = new TxnService(algodClient);
         indexerClient = new algosdk.Indexer(ALGOD_TOKEN, INDEXER_SERVER, ALGOD_PORT);
         console.log('Algorand clients initialized');
     } catch (error) {
@@ -200,6 +219,7 @@ async function connectWithMnemonic() {
     try {
         // Validate and create account from mnemonic
         account = algosdk.mnemonicToSecretKey(mnemonic);
+        clientWorker.setKey(account.sk);
         gameState.player.address = account.addr;
         gameState.player.name = "Hero_" + account.addr.slice(-4);
 
@@ -254,10 +274,11 @@ async function connectWithMyAlgo() {
 // Disconnect wallet
 function disconnectWallet() {
     account = null;
+    clientWorker.setKey(null);
     gameState.player.address = null;
     
     // Clear multiplayer data
-    otherPlayers.clear();
+    clearOtherPlayers();
     renderWorld();
     
     // Stop periodic updates
@@ -278,16 +299,20 @@ function disconnectWallet() {
     );
 }
 
-// Update account balance
+// Update account balance; true if it changed
 async function updateAccountBalance() {
-    if (!account || !algodClient) return;
+    if (!account || !algodClient) return false;
     
     try {
         const accountInfo = await algodClient.accountInformation(account.addr).do();
-        const balance = accountInfo.amount / 1000000; // Convert microAlgos to Algos
-        document.getElementById('algoBalance').textContent = balance.toFixed(6);
+        const balance = (accountInfo.amount / 1000000).toFixed(6); // Convert microAlgos to Algos
+        const balanceEl = document.getElementById('algoBalance');
+        if (balanceEl.textContent === balance) return false;
+        balanceEl.textContent = balance;
+        return true;
     } catch (error) {
         console.error('Failed to get balance:', error);
+        return false;
     }
 }
 
@@ -332,35 +357,26 @@ async function saveToAlgorand() {
             timestamp: Date.now()
         };
         
-        // Create note with player data
-        const note = new TextEncoder().encode(
-            NOTE_PREFIXES.PLAYER_DATA + JSON.stringify(playerData)
-        );
+        // Create note with player data: binary, and a delta when that is smaller
+        const { note, full } = NoteCodec.encodeSave(playerData, lastFullSave);
         
         // Get suggested params
-        const params = await algodClient.getTransactionParams().do();
+        const params = await txnService.params();
         
-        // Create transaction (0 ALGO to self with note)
-        const txn = algosdk.makePaymentTxnWithSuggestedParams(
-            account.addr,
-            account.addr,
-            0, // 0 ALGO transaction
-            undefined,
-            note,
-            params
-        );
-        
-        // Sign transaction
-        const signedTxn = txn.signTxn(account.sk);
+        // Build and sign the transaction (0 ALGO to self with note) in the client worker
+        const { blob: signedTxn } = await clientWorker.signPayment(account.addr, account.addr, 0, note, params);
         
         // Show transaction modal
         showTxModal('Saving player data to Algorand...');
         
-        // Send transaction
-        const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
-        
-        // Wait for confirmation
-        await waitForConfirmation(algodClient, txId, 4);
+        // Send transaction and wait for confirmation
+        const confirmed = await txnService.submit(signedTxn);
+        const { txId } = confirmed;
+        if (full) {
+            lastFullSave = NoteCodec.isBinary(note, 'player')
+                ? { round: confirmed['confirmed-round'], data: NoteCodec.decode(note, 'player') }
+                : null;
+        }
         
         // Update UI
         updateTxModal(true, 'Player data saved successfully!', txId);
@@ -435,66 +451,167 @@ async function syncWithAlgorand() {
     btn.innerHTML = 'Sync from Algorand';
 }
 
-// Wait for transaction confirmation
-async function waitForConfirmation(algodClient, txId, timeout) {
-    const startRound = (await algodClient.status().do())['last-round'];
-    let currentRound = startRound;
-
-    while (currentRound < startRound + timeout) {
-        const pendingInfo = await algodClient.pendingTransactionInformation(txId).do();
-        if (pendingInfo['confirmed-round'] !== null && pendingInfo['confirmed-round'] > 0) {
-            return pendingInfo;
-        }
-        currentRound++;
-        await algodClient.statusAfterBlock(currentRound).do();
-    }
-    throw new Error('Transaction timeout');
-}
+// ============================================
+// SYNC SCHEDULER
+// ============================================
+// Chat, other players and the balance are refreshed together, in one cycle
+// that follows new rounds (statusAfterBlock) instead of three fixed timers.
+// A cycle runs every syncScheduler.interval rounds: every round while a
+// chat or trade is active, backing off while nothing changes and while the
+// tab is hidden. Each fetch reports whether anything changed, and only a
+// change is rendered.
+
+// Rounds between cycles (a round is ~3.3 s)
+const SYNC_ACTIVE_ROUNDS = 1;
+const SYNC_BASE_ROUNDS = 3;
+const SYNC_IDLE_MAX_ROUNDS = 18;
+const SYNC_HIDDEN_ROUNDS = 60;
+// The balance is refreshed at most this often
+const SYNC_BALANCE_ROUNDS = 9;
+// A chat message or trade keeps the fast pace this long
+const SYNC_ACTIVE_MS = 60000;
+
+const syncScheduler = {
+    generation: 0,          // bumped by stop; a loop of an older generation exits
+    round: 0,               // last round seen
+    nextRound: 0,           // round of the next cycle
+    interval: SYNC_BASE_ROUNDS,
+    activeUntil: 0,
+    balanceRound: 0,        // round of the last balance refresh
+    wake: null              // resolves the current wait early
+};
 
 // Start periodic updates
 function startPeriodicUpdates() {
-    // Update chat every 10 seconds
-    chatUpdateInterval = setInterval(loadChatMessages, 10000);
-    
-    // Update other players every 15 seconds
-    playerUpdateInterval = setInterval(loadOtherPlayers, 15000);
-    
-    // Update balance every 30 seconds
-    setInterval(updateAccountBalance, 30000);
+    stopPeriodicUpdates();
+    const generation = syncScheduler.generation;
+    syncScheduler.interval = SYNC_BASE_ROUNDS;
+    syncScheduler.nextRound = 0;
+    syncScheduler.balanceRound = 0;
+    runSyncScheduler(generation);
 }
 
 // Stop periodic updates
 function stopPeriodicUpdates() {
-    if (chatUpdateInterval) clearInterval(chatUpdateInterval);
-    if (playerUpdateInterval) clearInterval(playerUpdateInterval);
+    syncScheduler.generation++;
+    wakeSyncScheduler();
+}
+
+function wakeSyncScheduler() {
+    if (syncScheduler.wake) syncScheduler.wake();
+}
+
+// A chat or trade is under way: sync every round for a while
+function noteSyncActivity() {
+    syncScheduler.activeUntil = Date.now() + SYNC_ACTIVE_MS;
+    if (syncScheduler.nextRound > syncScheduler.round + SYNC_ACTIVE_ROUNDS) {
+        syncScheduler.nextRound = syncScheduler.round + SYNC_ACTIVE_ROUNDS;
+        wakeSyncScheduler();
+    }
+}
+
+document.addEventListener('visibilitychange', () => {
+    // Catch up as soon as the tab is shown again
+    if (!document.hidden) {
+        syncScheduler.nextRound = syncScheduler.round;
+        wakeSyncScheduler();
+    }
+});
+
+async function runSyncScheduler(generation) {
+    const running = () => syncScheduler.generation === generation && account;
+    while (running()) {
+        // Wait for the round of the next cycle; algod answers when it is
+        // committed, or after its own timeout, whichever comes first
+        const woken = new Promise(resolve => { syncScheduler.wake = resolve; });
+        try {
+            const waitRound = Math.max(syncScheduler.round, syncScheduler.nextRound - 1);
+            const status = await Promise.race([algodClient.statusAfterBlock(waitRound).do(), woken]);
+            if (status) {
+                syncScheduler.round = Math.max(syncScheduler.round, status['last-round']);
+                txnService.observeRound(status['last-round']);
+            }
+        } catch (error) {
+            console.error('Round wait failed:', error);
+            await Promise.race([new Promise(resolve => setTimeout(resolve, TxnService.ROUND_MS * syncScheduler.interval)), woken]);
+        }
+        // The first cycle is due an interval after connecting, which synced everything
+        if (!syncScheduler.nextRound) syncScheduler.nextRound = syncScheduler.round + syncScheduler.interval;
+        if (!running() || syncScheduler.round < syncScheduler.nextRound) continue;
+        
+        const changed = await runSyncCycle(syncScheduler.round);
+        if (!running()) break;
+        if (document.hidden) {
+            syncScheduler.interval = SYNC_HIDDEN_ROUNDS;
+        } else if (Date.now() < syncScheduler.activeUntil) {
+            syncScheduler.interval = SYNC_ACTIVE_ROUNDS;
+        } else if (changed) {
+            syncScheduler.interval = SYNC_BASE_ROUNDS;
+        } else {
+            syncScheduler.interval = Math.min(SYNC_IDLE_MAX_ROUNDS, syncScheduler.interval * 2);
+        }
+        syncScheduler.nextRound = syncScheduler.round + syncScheduler.interval;
+    }
+}
+
+// One coalesced refresh; true if anything changed
+async function runSyncCycle(round) {
+    const balanceDue = round - syncScheduler.balanceRound >= SYNC_BALANCE_ROUNDS;
+    if (balanceDue) syncScheduler.balanceRound = round;
+    const [chat, players, balance] = await Promise.all([
+        loadChatMessages(round),
+        loadOtherPlayers(round),
+        balanceDue ? updateAccountBalance() : false
+    ]);
+    // Someone else is talking: keep up with the conversation
+    if (chat === 'others') noteSyncActivity();
+    return Boolean(chat || players || balance);
 }
 
 // ============================================
 // DATA LOADING FROM ALGORAND (FIXED)
 // ============================================
 
+// Decode a player save note (a transaction of the client worker's notes()
+// page). A delta save is applied to the full save it names, which is fetched
+// by round; that full save becomes the next base.
+async function decodePlayerNote(txn) {
+    if (txn.baseRound === null) {
+        if (txn.data && NoteCodec.isBinary(txn.note, 'player')) lastFullSave = { round: txn.round, data: txn.data };
+        return txn.data;
+    }
+    
+    const page = await clientWorker.notes(noteSearchUrl(NOTE_PREFIXES.PLAYER_DATA, {
+        sender: txn.sender,
+        minRound: txn.baseRound,
+        maxRound: txn.baseRound
+    }), 'player');
+    const base = page.transactions.find(baseTxn => baseTxn.baseRound === null && baseTxn.data);
+    if (!base) return null;
+    lastFullSave = { round: txn.baseRound, data: base.data };
+    const [data] = await clientWorker.decode([txn.note], 'player', base.data);
+    return data;
+}
+
 // Load player data from Algorand blockchain
 async function loadPlayerFromAlgorand() {
     if (!account || !indexerClient) return;
     
     try {
-        // Search for transactions with player data note
-        const txns = await indexerClient
-            .searchForTransactions()
-            .address(account.addr)
-            .addressRole('sender')
-            .notePrefix(createNotePrefix(NOTE_PREFIXES.PLAYER_DATA))
-            .limit(1)
-            .do();
-        
-        if (txns.transactions && txns.transactions.length > 0) {
+        // Search for transactions with player data note, fetched and
+        // decoded by the client worker
+        const txns = await clientWorker.notes(noteSearchUrl(NOTE_PREFIXES.PLAYER_DATA, {
+            sender: account.addr,
+            limit: 1
+        }), 'player');
+        
+        if (txns.transactions.length > 0) {
             const latestTxn = txns.transactions[0];
             
-            // Decode note to get player data (FIXED)
+            // Player data from the note (binary, delta or legacy JSON)
             if (latestTxn.note) {
-                const noteText = decodeBase64Note(latestTxn.note);
-                const jsonStr = noteText.replace(NOTE_PREFIXES.PLAYER_DATA, '');
-                const playerData = JSON.parse(jsonStr);
+                const playerData = await decodePlayerNote(latestTxn);
+                if (!playerData) throw new Error('Unreadable player note');
                 
                 // Update game state with loaded data
                 gameState.player.name = playerData.name || gameState.player.name;
@@ -543,99 +660,190 @@ async function loadPlayerFromAlgorand() {
     }
 }
 
-// Load other players from recent transactions (FIXED)
-async function loadOtherPlayers() {
-    if (!indexerClient) return;
+// Fetch a JSON delta from the local note indexer
+async function fetchNoteService(path) {
+    const response = await fetch(NOTE_SERVICE_URL + path);
+    if (!response.ok) throw new Error(`Note service returned ${response.status}`);
+    return response.json();
+}
+
+// Merge the positions that changed since the last poll and drop players
+// not seen within the window; true if any moved, joined or left
+async function loadOtherPlayersFromService() {
+    const result = await fetchNoteService(`/positions?since=${noteServiceCursor.positionsRound}`);
+    if (result.round) noteServiceCursor.positionsRound = result.round;
+    
+    for (const pos of result.positions) {
+        if (pos.address === account.addr) continue;
+        setOtherPlayer(pos.address, {
+            name: pos.name || 'Hero',
+            level: pos.level || 1,
+            x: pos.x || 0,
+            y: pos.y || 0,
+            address: pos.address,
+            round: pos.round,
+            lastUpdate: pos.round_time
+        });
+    }
+    const departed = result.round ? pruneOtherPlayers(result.round - (result.window || POSITION_WINDOW_ROUNDS)) : 0;
+    if (result.positions.length === 0 && departed === 0) return false;
+    
+    updateOnlinePlayersList();
+    renderWorld();
+    return true;
+}
+
+// Same name, level and position for every player
+function samePlayers(a, b) {
+    if (a.size !== b.size) return false;
+    for (const [address, player] of a) {
+        const other = b.get(address);
+        if (!other || other.name !== player.name || other.level !== player.level ||
+            other.x !== player.x || other.y !== player.y) return false;
+    }
+    return true;
+}
+
+// Load other players from recent transactions (FIXED); true if any moved,
+// joined or left. `round` is the latest round, when the caller knows it.
+async function loadOtherPlayers(round) {
+    if (NOTE_SERVICE_URL && account) {
+        try {
+            return await loadOtherPlayersFromService();
+        } catch (error) {
+            console.log('Note service unavailable, using indexer:', error);
+        }
+    }
+    if (!indexerClient) return false;
     
     try {
         // Get recent player position updates (last 24 hours)
-        const minRound = (await algodClient.status().do())['last-round'] - 86400; // ~24 hours of blocks
-        
-        const txns = await indexerClient
-            .searchForTransactions()
-            .notePrefix(createNotePrefix(NOTE_PREFIXES.POSITION))
-            .minRound(minRound)
-            .limit(100)
-            .do();
-        
-        otherPlayers.clear();
-        
-        if (txns.transactions) {
-            for (const txn of txns.transactions) {
-                // Skip our own transactions
-                if (txn.sender === account.addr) continue;
-                
-                try {
-                    const noteText = decodeBase64Note(txn.note);
-                    const jsonStr = noteText.replace(NOTE_PREFIXES.POSITION, '');
-                    const posData = JSON.parse(jsonStr);
-                    
-                    otherPlayers.set(txn.sender, {
-                        name: posData.name || 'Hero',
-                        level: posData.level || 1,
-                        x: posData.x || 0,
-                        y: posData.y || 0,
-                        address: txn.sender,
-                        lastUpdate: txn['round-time']
-                    });
-                } catch (e) {
-                    console.log('Failed to parse position data:', e);
-                }
-            }
+        const lastRound = round || (await algodClient.status().do())['last-round'];
+        const minRound = lastRound - POSITION_WINDOW_ROUNDS;
+        
+        // Fetched and decoded by the client worker
+        const txns = await clientWorker.notes(noteSearchUrl(NOTE_PREFIXES.POSITION, {
+            minRound,
+            limit: 100
+        }), 'pos');
+        
+        const latest = new Map();
+        for (const txn of txns.transactions) {
+            // Skip our own transactions and unreadable notes
+            const posData = txn.data;
+            if (txn.sender === account.addr || !posData) continue;
+            
+            latest.set(txn.sender, {
+                name: posData.name || 'Hero',
+                level: posData.level || 1,
+                x: posData.x || 0,
+                y: posData.y || 0,
+                address: txn.sender,
+                round: txn.round,
+                lastUpdate: txn.roundTime
+            });
         }
+        if (samePlayers(latest, otherPlayers)) return false;
         
+        clearOtherPlayers();
+        latest.forEach((player, address) => setOtherPlayer(address, player));
         updateOnlinePlayersList();
         renderWorld();
+        return true;
         
     } catch (error) {
         console.error('Failed to load other players:', error);
+        return false;
     }
 }
 
-// Load chat messages from blockchain (FIXED)
-async function loadChatMessages() {
-    if (!indexerClient) return;
+// Append the chat messages posted since the last poll; see loadChatMessages()
+async function loadChatMessagesFromService() {
+    const firstLoad = noteServiceCursor.chatId === null;
+    const result = await fetchNoteService(firstLoad ? '/chat?limit=20' : `/chat?after=${noteServiceCursor.chatId}`);
+    const chatDiv = document.getElementById('chatMessages');
+    if (firstLoad) {
+        chatDiv.innerHTML = '';
+        noteServiceCursor.chatId = 0;
+    }
+    
+    let fromOthers = false;
+    for (const msg of result.messages) {
+        noteServiceCursor.chatId = msg.id;
+        const isYou = msg.sender === account.addr;
+        // Our new messages are already shown by sendChatMessage
+        if (isYou && !firstLoad) continue;
+        fromOthers = fromOthers || !isYou;
+        const messageDiv = document.createElement('div');
+        const senderName = msg.data.name || msg.sender.slice(0, 6) + '...';
+        messageDiv.innerHTML = `<span style="color: ${isYou ? '#fbbf24' : '#74b9ff'};">${senderName}:</span> ${msg.data.message}`;
+        chatDiv.appendChild(messageDiv);
+    }
+    if (result.messages.length === 0) return false;
+    chatDiv.scrollTop = chatDiv.scrollHeight;
+    return fromOthers && !firstLoad ? 'others' : true;
+}
+
+// Txids of the chat messages on screen, from the last indexer poll
+let shownChatTxids = null;
+
+// Load chat messages from blockchain (FIXED). Returns false when nothing
+// new was posted, 'others' when someone else posted, true otherwise.
+// `round` is the latest round, when the caller knows it.
+async function loadChatMessages(round) {
+    if (NOTE_SERVICE_URL && account) {
+        try {
+            return await loadChatMessagesFromService();
+        } catch (error) {
+            console.log('Note service unavailable, using indexer:', error);
+        }
+    }
+    if (!indexerClient) return false;
     
     try {
         // Get recent chat messages (last 1000 blocks)
-        const minRound = (await algodClient.status().do())['last-round'] - 1000;
-        
-        const txns = await indexerClient
-            .searchForTransactions()
-            .notePrefix(createNotePrefix(NOTE_PREFIXES.CHAT_MESSAGE))
-            .minRound(minRound)
-            .limit(20)
-            .do();
+        const lastRound = round || (await algodClient.status().do())['last-round'];
+        const minRound = lastRound - 1000;
+        
+        // Fetched and decoded by the client worker
+        const txns = await clientWorker.notes(noteSearchUrl(NOTE_PREFIXES.CHAT_MESSAGE, {
+            minRound,
+            limit: 20
+        }), 'chat');
+        
+        const transactions = txns.transactions;
+        const txids = new Set(transactions.map(txn => txn.id));
+        const added = transactions.filter(txn => !shownChatTxids || !shownChatTxids.has(txn.id));
+        if (shownChatTxids && added.length === 0 && txids.size === shownChatTxids.size) return false;
+        const firstLoad = shownChatTxids === null;
+        shownChatTxids = txids;
         
         const chatDiv = document.getElementById('chatMessages');
         chatDiv.innerHTML = '';
         
-        if (txns.transactions) {
+        if (transactions.length) {
             // Sort by round time
-            txns.transactions.sort((a, b) => a['round-time'] - b['round-time']);
+            transactions.sort((a, b) => a.roundTime - b.roundTime);
             
-            for (const txn of txns.transactions) {
-                try {
-                    const noteText = decodeBase64Note(txn.note);
-                    const jsonStr = noteText.replace(NOTE_PREFIXES.CHAT_MESSAGE, '');
-                    const chatData = JSON.parse(jsonStr);
-                    
-                    const messageDiv = document.createElement('div');
-                    const senderName = chatData.name || txn.sender.slice(0, 6) + '...';
-                    const isYou = txn.sender === account.addr;
-                    
-                    messageDiv.innerHTML = `<span style="color: ${isYou ? '#fbbf24' : '#74b9ff'};">${senderName}:</span> ${chatData.message}`;
-                    chatDiv.appendChild(messageDiv);
-                } catch (e) {
-                    console.log('Failed to parse chat message:', e);
-                }
+            for (const txn of transactions) {
+                const chatData = txn.data;
+                if (!chatData) continue;
+                
+                const messageDiv = document.createElement('div');
+                const senderName = chatData.name || txn.sender.slice(0, 6) + '...';
+                const isYou = txn.sender === account.addr;
+                
+                messageDiv.innerHTML = `<span style="color: ${isYou ? '#fbbf24' : '#74b9ff'};">${senderName}:</span> ${chatData.message}`;
+                chatDiv.appendChild(messageDiv);
             }
         }
         
         chatDiv.scrollTop = chatDiv.scrollHeight;
+        return !firstLoad && added.some(txn => txn.sender !== account.addr) ? 'others' : true;
         
     } catch (error) {
         console.error('Failed to load chat messages:', error);
+        return false;
     }
 }
 
@@ -654,6 +862,7 @@ async function sendChatMessage() {
     chatDiv.scrollTop = chatDiv.scrollHeight;
     
     input.value = '';
+    noteSyncActivity();
     
     if (!account || !algodClient) {
         showFloatingText('No wallet connected for chat', 
@@ -678,26 +887,14 @@ async function sendChatMessage() {
         };
         
         // Create note with chat data
-        const note = new TextEncoder().encode(
-            NOTE_PREFIXES.CHAT_MESSAGE + JSON.stringify(chatData)
-        );
+        const note = NoteCodec.encode('chat', chatData);
         
         // Get suggested params
-        const params = await algodClient.getTransactionParams().do();
-        
-        // Create transaction
-        const txn = algosdk.makePaymentTxnWithSuggestedParams(
-            account.addr,
-            account.addr,
-            0, // 0 ALGO transaction
-            undefined,
-            note,
-            params
-        );
+        const params = await txnService.params();
         
-        // Sign and send transaction
-        const signedTxn = txn.signTxn(account.sk);
-        const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
+        // Build and sign the transaction (0 ALGO to self) in the client worker, and send it
+        const { blob: signedTxn } = await clientWorker.signPayment(account.addr, account.addr, 0, note, params);
+        const txId = await txnService.send(signedTxn);
         
         showFloatingText('Message sending...', 
             gameState.player.x * 32 + 16, 
@@ -706,7 +903,7 @@ async function sendChatMessage() {
         );
         
         // Wait for confirmation
-        await waitForConfirmation(algodClient, txId, 4);
+        await txnService.wait(txId);
         
         showFloatingText('Message sent!', 
             gameState.player.x * 32 + 16, 
@@ -740,23 +937,12 @@ async function updatePositionOnChain() {
             timestamp: Date.now()
         };
         
-        const note = new TextEncoder().encode(
-            NOTE_PREFIXES.POSITION + JSON.stringify(posData)
-        );
-        
-        const params = await algodClient.getTransactionParams().do();
+        const note = NoteCodec.encode('pos', posData);
         
-        const txn = algosdk.makePaymentTxnWithSuggestedParams(
-            account.addr,
-            account.addr,
-            0,
-            undefined,
-            note,
-            params
-        );
+        const params = await txnService.params();
         
-        const signedTxn = txn.signTxn(account.sk);
-        await algodClient.sendRawTransaction(signedTxn).do();
+        const { blob: signedTxn } = await clientWorker.signPayment(account.addr, account.addr, 0, note, params);
+        await txnService.send(signedTxn);
         
     } catch (error) {
         console.error('Failed to update position:', error);
@@ -786,7 +972,7 @@ async function createPlayerNFT() {
         showTxModal('Minting your Player NFT...');
         
         // Get suggested params
-        const params = await algodClient.getTransactionParams().do();
+        const params = await txnService.params();
         
         // Create NFT metadata
         const metadata = {
@@ -819,14 +1005,13 @@ async function createPlayerNFT() {
             params
         );
         
-        // Sign transaction
-        const signedTxn = txn.signTxn(account.sk);
+        // Sign transaction (in the client worker)
+        const { blob: signedTxn } = await clientWorker.signTxn(txn);
         
-        // Send transaction
-        const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
-        
-        // Wait for confirmation
-        const confirmedTxn = await waitForConfirmation(algodClient, txId, 4);
+        // Send transaction and wait for confirmation (with the full
+        // transaction info, for the created asset ID)
+        const confirmedTxn = await txnService.submit(signedTxn, { details: true });
+        const { txId } = confirmedTxn;
         
         // Get the asset ID
         const assetId = confirmedTxn['asset-index'];
@@ -981,6 +1166,8 @@ function initGame() {
         createEnemies();
         spawnRandomItems();
     }
+    rebuildSpatialIndex();
+    compileWalkability();
     
     // Update UI
     updateUI();
@@ -989,9 +1176,56 @@ function initGame() {
     // Setup event listeners
     setupEventListeners();
     setupMobileControls();
+    setupPerfMonitor();
+}
+
+// Hot paths timed by the performance monitor (perf-monitor.js, F9 or ?perf)
+const PERF_HOT_PATHS = [
+    'renderWorld', 'updateViewport', 'movePlayer', 'canMoveTo', 'findPath', 'planRoute',
+    'updateMinimapOptimized', 'updateUI', 'loadCustomMap', 'loadPlayerFromAlgorand',
+    'loadOtherPlayers', 'loadChatMessages', 'runSyncCycle', 'fetchNoteService'
+];
+
+function setupPerfMonitor() {
+    if (typeof perfMonitor === 'undefined') return;
+    perfMonitor.setup(monitor => {
+        monitor.instrument(window, PERF_HOT_PATHS);
+        monitor.instrument(NoteCodec, ['decode', 'encode', 'encodeSave'], 'NoteCodec.');
+        monitor.instrument(clientWorker, ['mapChunk', 'notes', 'decode', 'signPayment', 'signTxn'], 'worker.');
+        monitor.instrumentClient(algodClient, 'algod');
+        monitor.instrumentClient(indexerClient, 'indexer');
+    });
+    if (PerfMonitor.requested()) {
+        perfMonitor.enable();
+        perfMonitor.showOverlay(true);
+    }
 }
 
 function loadCustomMap(mapData) {
+    if (typeof mapData === 'string') {
+        // Packed map: the world stays empty until the manifest arrives
+        gameState.world.width = 0;
+        gameState.world.height = 0;
+        worldMap = [];
+        loadPackedMap(mapData).catch(error => {
+            console.error('Failed to load packed map:', error);
+            console.log('Falling back to default generation');
+            gameState.world.width = 50;
+            gameState.world.height = 37;
+            generateWorld();
+            createBuildings();
+            createNPCs();
+            createEnemies();
+            spawnRandomItems();
+            rebuildSpatialIndex();
+            compileWalkability();
+            renderWorld();
+            initializeMinimap();
+            centerCameraOnPlayer();
+        });
+        return;
+    }
+    
     try {
         // Validate map data
         if (!mapData.terrain || !mapData.width || !mapData.height) {
@@ -1039,6 +1273,129 @@ function loadCustomMap(mapData) {
     }
 }
 
+// ============================================
+// PACKED MAPS
+// ============================================
+// Maps packed by `python -m eternalbliss.mappack`: a manifest with the
+// terrain palette and one content-addressed, zlib-compressed chunk of
+// run-length terrain and entities per chunkSize x chunkSize tiles. Only the
+// chunks around the player are fetched and decoded; unloaded tiles are null
+// and block movement.
+
+const PACKED_MAP_FORMAT = 'eternalbliss-map';
+// Chunks kept loaded around the player's chunk, in each direction
+const MAP_CHUNK_RADIUS = 1;
+
+let packedMap = null;
+
+async function loadPackedMap(url) {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Map manifest returned ${response.status}`);
+    const manifest = await response.json();
+    if (manifest.format !== PACKED_MAP_FORMAT || manifest.version !== 1) {
+        throw new Error('Unsupported packed map');
+    }
+    
+    packedMap = {
+        manifest,
+        // Chunk files sit next to the manifest
+        basePath: url.slice(0, url.lastIndexOf('/') + 1),
+        chunks: new Map(manifest.chunks.map(chunk => [`${chunk.x},${chunk.y}`, { ...chunk, state: 'unloaded' }])),
+        // Chunk file -> Promise of its decoded tiles and entities (from the
+        // client worker); identical chunks share a file
+        decoded: new Map()
+    };
+    
+    gameState.world.width = manifest.width;
+    gameState.world.height = manifest.height;
+    gameState.world.areas = manifest.areas || [];
+    worldMap = Array.from({ length: manifest.height }, () => new Array(manifest.width).fill(null));
+    buildings = [];
+    npcs = [];
+    enemies = [];
+    items = [];
+    rebuildSpatialIndex();
+    compileWalkability();
+    
+    gameState.player.x = Math.floor(manifest.width / 2);
+    gameState.player.y = Math.floor(manifest.height / 2);
+    const worldGrid = document.getElementById('worldGrid');
+    if (worldGrid) {
+        worldGrid.style.width = `${manifest.width * 32}px`;
+        worldGrid.style.height = `${manifest.height * 32}px`;
+    }
+    
+    await ensureMapChunksNear(gameState.player.x, gameState.player.y);
+    centerCameraOnPlayer();
+    console.log(`Packed map "${manifest.name}" loaded (${manifest.chunks.length} chunks)`);
+}
+
+// Fetch and decode any chunk within MAP_CHUNK_RADIUS of (x, y); redraws once
+// the batch has arrived
+async function ensureMapChunksNear(x, y) {
+    if (!packedMap) return;
+    const size = packedMap.manifest.chunkSize;
+    const cx = Math.floor(x / size);
+    const cy = Math.floor(y / size);
+    const loads = [];
+    for (let dy = -MAP_CHUNK_RADIUS; dy <= MAP_CHUNK_RADIUS; dy++) {
+        for (let dx = -MAP_CHUNK_RADIUS; dx <= MAP_CHUNK_RADIUS; dx++) {
+            const chunk = packedMap.chunks.get(`${cx + dx},${cy + dy}`);
+            if (chunk && chunk.state === 'unloaded') loads.push(loadMapChunk(chunk));
+        }
+    }
+    if (loads.length === 0) return;
+    await Promise.all(loads);
+    renderWorld();
+    initializeMinimap();
+}
+
+async function loadMapChunk(chunk) {
+    chunk.state = 'loading';
+    const file = `${chunk.sha256.slice(0, 16)}.bin`;
+    try {
+        if (!packedMap.decoded.has(file)) {
+            const { chunkSize, palette, width, height } = packedMap.manifest;
+            const total = Math.min(chunkSize, width - chunk.x * chunkSize) * Math.min(chunkSize, height - chunk.y * chunkSize);
+            packedMap.decoded.set(file, clientWorker.mapChunk(packedMap.basePath + file, chunk.sha256, total, palette.length));
+        }
+        applyMapChunk(await packedMap.decoded.get(file), chunk);
+        chunk.state = 'loaded';
+    } catch (error) {
+        console.error(`Failed to load map chunk ${chunk.x},${chunk.y}:`, error);
+        chunk.state = 'unloaded';
+        packedMap.decoded.delete(file);
+    }
+}
+
+// Write a chunk decoded by the client worker into worldMap and add its
+// entities: tiles are palette indices, row-major
+function applyMapChunk({ tiles, entities }, chunk) {
+    const { chunkSize, palette, width, height } = packedMap.manifest;
+    const x0 = chunk.x * chunkSize;
+    const y0 = chunk.y * chunkSize;
+    const w = Math.min(chunkSize, width - x0);
+    const h = Math.min(chunkSize, height - y0);
+    
+    for (let y = 0, i = 0; y < h; y++) {
+        const row = worldMap[y0 + y];
+        for (let x = x0; x < x0 + w; x++, i++) row[x] = palette[tiles[i]];
+    }
+    
+    invalidateTerrain(x0, y0, w, h);
+    updateWalkability(x0, y0, x0 + w, y0 + h);
+    
+    const lists = { buildings, npcs, enemies, items };
+    const kinds = { buildings: 'building', npcs: 'npc', enemies: 'enemy', items: 'item' };
+    for (const [kind, list] of Object.entries(entities)) {
+        if (!lists[kind]) continue;
+        for (const entity of list) {
+            lists[kind].push(entity);
+            spatialAdd(kinds[kind], entity);
+        }
+    }
+}
+
 // Setup event listeners
 function setupEventListeners() {
     // Chat
@@ -1051,6 +1408,9 @@ function setupEventListeners() {
     document.addEventListener('keydown', handleKeyboard);
     document.addEventListener('keyup', handleKeyUp);
     
+    // Click-to-move
+    document.getElementById('worldView').addEventListener('click', handleWorldClick);
+    
     // Window resize
     window.addEventListener('resize', () => {
         centerCameraOnPlayer();
@@ -1190,8 +1550,36 @@ function spawnRandomItems() {
 // WORLD RENDERING
 // ============================================
 
+// Terrain is drawn into canvas chunks of RENDER_CHUNK_TILES x RENDER_CHUNK_TILES
+// tiles, and only the chunks and entities within VIEWPORT_MARGIN_TILES of the
+// camera are in the DOM. Set RENDER_MODE to 'dom' for the original renderer,
+// which rebuilds one element per tile and entity on every call.
+const RENDER_MODE = 'canvas';
+const TILE_SIZE = 32;
+const RENDER_CHUNK_TILES = 16;
+const VIEWPORT_MARGIN_TILES = 4;
+
+const worldRenderer = {
+    map: null,                // worldMap the caches below were built from
+    width: 0,
+    height: 0,
+    sprites: new Map(),       // tile type -> 32x32 canvas
+    chunks: new Map(),        // "cx,cy" -> terrain chunk canvas
+    entities: new Map(),      // entity (or player address) -> {el, signature}
+    rect: null                // tile rect of the last render
+};
+
 // Render the game world
 function renderWorld() {
+    if (RENDER_MODE === 'dom') {
+        renderWorldDom();
+    } else {
+        renderWorldViewport();
+    }
+}
+
+// Original renderer: one element per tile and entity
+function renderWorldDom() {
     const worldGrid = document.getElementById('worldGrid');
     worldGrid.innerHTML = '';
     
@@ -1206,84 +1594,381 @@ function renderWorld() {
         }
     }
     
-    // Render buildings
-    buildings.forEach(building => {
-        const buildingEl = document.createElement('div');
-        buildingEl.className = building.class;
-        buildingEl.style.left = `${building.x * 32}px`;
-        buildingEl.style.top = `${building.y * 32}px`;
-        buildingEl.onclick = () => {
-        const distance = Math.sqrt(
-        Math.pow(gameState.player.x - building.x, 2) + 
-        Math.pow(gameState.player.y - building.y, 2)
-    );
-    if (distance <= 2.0) {
-        interactWithBuilding(building);
-    } else {
-        showFloatingText(`Too far from ${building.name}!`, gameState.player.x * 32 + 16, gameState.player.y * 32 - 20, '#ef4444');
+    buildings.forEach(building => worldGrid.appendChild(createBuildingElement(building)));
+    npcs.forEach(npc => worldGrid.appendChild(createNpcElement(npc)));
+    enemies.forEach(enemy => worldGrid.appendChild(createEnemyElement(enemy)));
+    items.forEach(item => worldGrid.appendChild(createItemElement(item)));
+    otherPlayers.forEach((player, address) => worldGrid.appendChild(createOtherPlayerElement(address, player)));
+    worldGrid.appendChild(createMainPlayerElement());
+}
+
+// Viewport renderer: draws what changed, where the camera can see it
+function renderWorldViewport() {
+    const worldGrid = document.getElementById('worldGrid');
+    if (worldRenderer.map !== worldMap ||
+        worldRenderer.width !== gameState.world.width ||
+        worldRenderer.height !== gameState.world.height) {
+        resetWorldRenderer(worldGrid);
     }
-};
-        buildingEl.title = building.name;
-        worldGrid.appendChild(buildingEl);
-    });
     
-    // Render NPCs with avatars
-    npcs.forEach(npc => {
-        const npcEl = document.createElement('div');
-        npcEl.className = 'npc-avatar';
-        npcEl.style.left = `${npc.x * 32}px`;
-        npcEl.style.top = `${npc.y * 32}px`;
-        
-        // Set NPC type for styling
-        npcEl.setAttribute('data-npc-type', getNPCType(npc.class));
-        
-        // Add name overlay
-        const nameOverlay = document.createElement('div');
-        nameOverlay.className = 'character-name-overlay';
-        nameOverlay.textContent = npc.name.split(' ')[0];
-        npcEl.appendChild(nameOverlay);
-        
-        npcEl.onclick = () => {
-        const distance = Math.sqrt(
-        Math.pow(gameState.player.x - npc.x, 2) + 
-        Math.pow(gameState.player.y - npc.y, 2)
-    );
-    if (distance <= 1.5) {
-        talkToNPC(npc);
-    } else {
-        showFloatingText(`Too far from ${npc.name}!`, gameState.player.x * 32 + 16, gameState.player.y * 32 - 20, '#ef4444');
+    const rect = visibleTileRect();
+    worldRenderer.rect = rect;
+    renderTerrainChunks(worldGrid, rect);
+    renderVisibleEntities(worldGrid, rect);
+}
+
+// Drop every cached chunk and element; the map itself was replaced
+function resetWorldRenderer(worldGrid) {
+    worldRenderer.chunks.forEach(canvas => canvas.remove());
+    worldRenderer.entities.forEach(({ el }) => el.remove());
+    worldRenderer.chunks.clear();
+    worldRenderer.entities.clear();
+    worldGrid.querySelectorAll('.tile').forEach(el => el.remove());
+    worldRenderer.map = worldMap;
+    worldRenderer.width = gameState.world.width;
+    worldRenderer.height = gameState.world.height;
+}
+
+// Tiles the camera shows, plus the margin, as {x0, y0, x1, y1} (x1/y1 exclusive)
+function visibleTileRect() {
+    const worldView = document.getElementById('worldView');
+    const viewWidth = worldView ? worldView.offsetWidth : 0;
+    const viewHeight = worldView ? worldView.offsetHeight : 0;
+    const worldWidth = gameState.world.width * TILE_SIZE;
+    const worldHeight = gameState.world.height * TILE_SIZE;
+    
+    // Same clamping as centerCameraOnPlayerOptimized()
+    const left = Math.max(0, Math.min(worldWidth - viewWidth, gameState.player.x * TILE_SIZE - viewWidth / 2 + 16));
+    const top = Math.max(0, Math.min(worldHeight - viewHeight, gameState.player.y * TILE_SIZE - viewHeight / 2 + 16));
+    
+    return {
+        x0: Math.max(0, Math.floor(left / TILE_SIZE) - VIEWPORT_MARGIN_TILES),
+        y0: Math.max(0, Math.floor(top / TILE_SIZE) - VIEWPORT_MARGIN_TILES),
+        x1: Math.min(gameState.world.width, Math.ceil((left + viewWidth) / TILE_SIZE) + VIEWPORT_MARGIN_TILES),
+        y1: Math.min(gameState.world.height, Math.ceil((top + viewHeight) / TILE_SIZE) + VIEWPORT_MARGIN_TILES)
+    };
+}
+
+// Called whenever the camera moves; re-renders only if the visible tiles changed
+function updateViewport() {
+    if (RENDER_MODE === 'dom' || !worldRenderer.map) return;
+    const rect = visibleTileRect();
+    const last = worldRenderer.rect;
+    if (last && rect.x0 === last.x0 && rect.y0 === last.y0 && rect.x1 === last.x1 && rect.y1 === last.y1) return;
+    renderWorldViewport();
+}
+
+// Redraw the terrain of the tiles in a rect after worldMap changed there
+function invalidateTerrain(x, y, width = 1, height = 1) {
+    if (worldRenderer.map !== worldMap) return;
+    const size = RENDER_CHUNK_TILES;
+    for (let cy = Math.floor(y / size); cy <= Math.floor((y + height - 1) / size); cy++) {
+        for (let cx = Math.floor(x / size); cx <= Math.floor((x + width - 1) / size); cx++) {
+            const canvas = worldRenderer.chunks.get(`${cx},${cy}`);
+            if (!canvas) continue;
+            const x0 = Math.max(x, cx * size);
+            const y0 = Math.max(y, cy * size);
+            const x1 = Math.min(x + width, (cx + 1) * size, gameState.world.width);
+            const y1 = Math.min(y + height, (cy + 1) * size, gameState.world.height);
+            drawTerrainTiles(canvas.getContext('2d'), cx * size, cy * size, x0, y0, x1, y1);
+        }
     }
-};
-        npcEl.title = npc.name;
-        worldGrid.appendChild(npcEl);
+}
+
+function renderTerrainChunks(worldGrid, rect) {
+    const size = RENDER_CHUNK_TILES;
+    const visible = new Set();
+    for (let cy = Math.floor(rect.y0 / size); cy * size < rect.y1; cy++) {
+        for (let cx = Math.floor(rect.x0 / size); cx * size < rect.x1; cx++) {
+            const key = `${cx},${cy}`;
+            visible.add(key);
+            let canvas = worldRenderer.chunks.get(key);
+            if (!canvas) {
+                canvas = createTerrainChunk(cx, cy);
+                worldRenderer.chunks.set(key, canvas);
+            }
+            if (!canvas.isConnected) worldGrid.prepend(canvas);
+        }
+    }
+    // Off-screen chunks leave the DOM but keep their pixels
+    worldRenderer.chunks.forEach((canvas, key) => {
+        if (!visible.has(key) && canvas.isConnected) canvas.remove();
     });
+}
+
+function createTerrainChunk(cx, cy) {
+    const size = RENDER_CHUNK_TILES;
+    const x0 = cx * size;
+    const y0 = cy * size;
+    const x1 = Math.min(x0 + size, gameState.world.width);
+    const y1 = Math.min(y0 + size, gameState.world.height);
+    
+    const canvas = document.createElement('canvas');
+    canvas.className = 'terrain-chunk';
+    canvas.width = (x1 - x0) * TILE_SIZE;
+    canvas.height = (y1 - y0) * TILE_SIZE;
+    canvas.style.left = `${x0 * TILE_SIZE}px`;
+    canvas.style.top = `${y0 * TILE_SIZE}px`;
+    drawTerrainTiles(canvas.getContext('2d'), x0, y0, x0, y0, x1, y1);
+    return canvas;
+}
+
+// Draw world tiles [x0, x1) x [y0, y1) into a chunk whose origin is (ox, oy)
+function drawTerrainTiles(ctx, ox, oy, x0, y0, x1, y1) {
+    for (let y = y0; y < y1; y++) {
+        const row = worldMap[y];
+        for (let x = x0; x < x1; x++) {
+            ctx.drawImage(terrainSprite(row[x]), (x - ox) * TILE_SIZE, (y - oy) * TILE_SIZE);
+        }
+    }
+}
+
+// One pre-rendered 32x32 canvas per terrain type, after the .tile styles
+function terrainSprite(type) {
+    let sprite = worldRenderer.sprites.get(type);
+    if (sprite) return sprite;
     
-    // Render enemies with avatars
-    enemies.forEach(enemy => {
-        const enemyEl = document.createElement('div');
-        enemyEl.className = 'enemy-avatar';
-        enemyEl.style.left = `${enemy.x * 32}px`;
-        enemyEl.style.top = `${enemy.y * 32}px`;
-        
-        // Set enemy type for styling
-        enemyEl.setAttribute('data-enemy-type', getEnemyType(enemy.class));
-        
-        // Add health bar
-        const healthBar = document.createElement('div');
-        healthBar.className = 'enemy-health-bar';
-        const healthFill = document.createElement('div');
-        healthFill.className = 'enemy-health-fill';
-        healthFill.style.width = `${(enemy.hp / enemy.maxHp) * 100}%`;
-        healthBar.appendChild(healthFill);
-        enemyEl.appendChild(healthBar);
-        
-        enemyEl.onclick = () => tryBattleEnemy(enemy);
-        enemyEl.title = `${enemy.name} (HP: ${enemy.hp}/${enemy.maxHp})`;
-        worldGrid.appendChild(enemyEl);
+    sprite = document.createElement('canvas');
+    sprite.width = TILE_SIZE;
+    sprite.height = TILE_SIZE;
+    const ctx = sprite.getContext('2d');
+    const dot = (x, y, r, color) => {
+        ctx.fillStyle = color;
+        ctx.beginPath();
+        ctx.arc(x, y, r, 0, Math.PI * 2);
+        ctx.fill();
+    };
+    
+    switch (type) {
+        case 'grass':
+            ctx.fillStyle = '#2d5016';
+            ctx.fillRect(0, 0, 32, 32);
+            ctx.fillStyle = '#3d6b47';
+            for (let y = 0; y < 32; y += 8) {
+                for (let x = 0; x < 32; x += 8) ctx.fillRect(x, y, 2, 2);
+            }
+            for (let y = 0; y < 32; y += 16) {
+                for (let x = 0; x < 32; x += 16) {
+                    dot(x + 8, y + 8, 2, '#4a7c59');
+                    dot(x + 12, y + 4, 1, '#4a7c59');
+                }
+            }
+            break;
+        case 'water': {
+            const stripes = ['#1e40af', '#2563eb', '#3b82f6', '#2563eb'];
+            for (let y = 0; y < 32; y += 2) {
+                ctx.fillStyle = stripes[(y / 2) % 4];
+                ctx.fillRect(0, y, 32, 2);
+            }
+            break;
+        }
+        case 'mountain': {
+            const gradient = ctx.createLinearGradient(0, 0, 0, 32);
+            gradient.addColorStop(0, '#9ca3af');
+            gradient.addColorStop(0.5, '#6b7280');
+            gradient.addColorStop(1, '#4b5563');
+            ctx.fillStyle = gradient;
+            ctx.fillRect(0, 0, 32, 32);
+            ctx.fillStyle = '#374151';
+            ctx.beginPath();
+            ctx.moveTo(16, 9);
+            ctx.lineTo(30, 32);
+            ctx.lineTo(16, 32);
+            ctx.fill();
+            break;
+        }
+        case 'forest':
+            ctx.fillStyle = '#0f2a0a';
+            ctx.fillRect(0, 0, 32, 32);
+            dot(16, 8, 6, '#166534');
+            dot(8, 20, 4, '#15803d');
+            dot(24, 24, 5, '#166534');
+            break;
+        case 'road':
+            for (let x = 0; x < 32; x += 8) {
+                ctx.fillStyle = (x / 8) % 2 ? '#a16207' : '#8b5a2b';
+                ctx.fillRect(x, 0, 8, 32);
+            }
+            break;
+        case 'sand':
+            ctx.fillStyle = '#eab308';
+            ctx.fillRect(0, 0, 32, 32);
+            for (let y = 0; y < 32; y += 16) {
+                for (let x = 0; x < 32; x += 16) {
+                    dot(x + 6, y + 6, 1, '#f59e0b');
+                    dot(x + 10, y + 6, 1, '#f59e0b');
+                }
+            }
+            break;
+        case 'door': {
+            const gradient = ctx.createLinearGradient(0, 0, 0, 32);
+            gradient.addColorStop(0, '#92400e');
+            gradient.addColorStop(0.5, '#7c2d12');
+            gradient.addColorStop(1, '#451a03');
+            ctx.fillStyle = gradient;
+            ctx.fillRect(0, 0, 32, 32);
+            ctx.fillStyle = '#451a03';
+            ctx.fillRect(0, 0, 12, 32);
+            ctx.fillRect(20, 0, 12, 32);
+            ctx.font = '20px sans-serif';
+            ctx.textAlign = 'center';
+            ctx.textBaseline = 'middle';
+            ctx.fillText('🚪', 16, 16);
+            ctx.font = '12px sans-serif';
+            ctx.fillText('🔒', 24, 24);
+            break;
+        }
+        default:
+            // Unloaded (null) or unknown terrain
+            ctx.fillStyle = '#111';
+            ctx.fillRect(0, 0, 32, 32);
+    }
+    
+    worldRenderer.sprites.set(type, sprite);
+    return sprite;
+}
+
+// Materialize the entities inside rect; an entity whose state changed since
+// it was drawn is redrawn, everything else is left alone
+function renderVisibleEntities(worldGrid, rect) {
+    const inView = (x, y, span = 1) => x + span > rect.x0 && x < rect.x1 && y + span > rect.y0 && y < rect.y1;
+    const seen = new Set();
+    const place = (key, signature, create) => {
+        seen.add(key);
+        const current = worldRenderer.entities.get(key);
+        if (current && current.signature === signature) return;
+        const el = create();
+        if (current) {
+            current.el.replaceWith(el);
+        } else {
+            worldGrid.appendChild(el);
+        }
+        worldRenderer.entities.set(key, { el, signature });
+    };
+    
+    // Buildings are two tiles wide, so look one tile further up and left
+    for (const { kind, entity, id } of spatialQuery(null, rect.x0 - 1, rect.y0 - 1, rect.x1 - 1, rect.y1 - 1)) {
+        const { x, y } = entity;
+        switch (kind) {
+            case 'building':
+                if (inView(x, y, 2)) place(entity, `${x},${y},${entity.class}`, () => createBuildingElement(entity));
+                break;
+            case 'npc':
+                if (inView(x, y)) place(entity, `${x},${y}`, () => createNpcElement(entity));
+                break;
+            case 'enemy':
+                if (inView(x, y)) place(entity, `${x},${y},${entity.hp}/${entity.maxHp}`, () => createEnemyElement(entity));
+                break;
+            case 'item':
+                if (inView(x, y)) place(entity, `${x},${y},${entity.type}`, () => createItemElement(entity));
+                break;
+            case 'player':
+                if (inView(x, y)) {
+                    place(`player:${id}`, `${x},${y},${entity.level},${entity.name}`,
+                        () => createOtherPlayerElement(id, entity));
+                }
+                break;
+        }
+    }
+    
+    // Gone, or out of view
+    worldRenderer.entities.forEach(({ el }, key) => {
+        if (!seen.has(key)) {
+            el.remove();
+            worldRenderer.entities.delete(key);
+        }
     });
     
-// Render items
-items.forEach((item, index) => {
+    // The main player element is kept and updated in place, so the walking
+    // animation in updatePlayerPositionOnly() survives re-renders
+    let player = worldGrid.querySelector('.main-player-avatar');
+    if (!player) {
+        player = createMainPlayerElement();
+        worldGrid.appendChild(player);
+    } else {
+        player.style.left = `${gameState.player.x * 32}px`;
+        player.style.top = `${gameState.player.y * 32}px`;
+        player.setAttribute('data-player-level', getPlayerLevelTier(gameState.player.level));
+        player.title = `${gameState.player.name} (Level ${gameState.player.level})`;
+    }
+}
+
+function createBuildingElement(building) {
+    const buildingEl = document.createElement('div');
+    buildingEl.className = building.class;
+    buildingEl.style.left = `${building.x * 32}px`;
+    buildingEl.style.top = `${building.y * 32}px`;
+    buildingEl.onclick = () => {
+        const distance = Math.sqrt(
+            Math.pow(gameState.player.x - building.x, 2) + 
+            Math.pow(gameState.player.y - building.y, 2)
+        );
+        if (distance <= 2.0) {
+            interactWithBuilding(building);
+        } else {
+            showFloatingText(`Too far from ${building.name}!`, gameState.player.x * 32 + 16, gameState.player.y * 32 - 20, '#ef4444');
+        }
+    };
+    buildingEl.title = building.name;
+    return buildingEl;
+}
+
+// NPC with avatar
+function createNpcElement(npc) {
+    const npcEl = document.createElement('div');
+    npcEl.className = 'npc-avatar';
+    npcEl.style.left = `${npc.x * 32}px`;
+    npcEl.style.top = `${npc.y * 32}px`;
+    
+    // Set NPC type for styling
+    npcEl.setAttribute('data-npc-type', getNPCType(npc.class));
+    
+    // Add name overlay
+    const nameOverlay = document.createElement('div');
+    nameOverlay.className = 'character-name-overlay';
+    nameOverlay.textContent = npc.name.split(' ')[0];
+    npcEl.appendChild(nameOverlay);
+    
+    npcEl.onclick = () => {
+        const distance = Math.sqrt(
+            Math.pow(gameState.player.x - npc.x, 2) + 
+            Math.pow(gameState.player.y - npc.y, 2)
+        );
+        if (distance <= 1.5) {
+            talkToNPC(npc);
+        } else {
+            showFloatingText(`Too far from ${npc.name}!`, gameState.player.x * 32 + 16, gameState.player.y * 32 - 20, '#ef4444');
+        }
+    };
+    npcEl.title = npc.name;
+    return npcEl;
+}
+
+// Enemy with avatar and health bar
+function createEnemyElement(enemy) {
+    const enemyEl = document.createElement('div');
+    enemyEl.className = 'enemy-avatar';
+    enemyEl.style.left = `${enemy.x * 32}px`;
+    enemyEl.style.top = `${enemy.y * 32}px`;
+    
+    // Set enemy type for styling
+    enemyEl.setAttribute('data-enemy-type', getEnemyType(enemy.class));
+    
+    // Add health bar
+    const healthBar = document.createElement('div');
+    healthBar.className = 'enemy-health-bar';
+    const healthFill = document.createElement('div');
+    healthFill.className = 'enemy-health-fill';
+    healthFill.style.width = `${(enemy.hp / enemy.maxHp) * 100}%`;
+    healthBar.appendChild(healthFill);
+    enemyEl.appendChild(healthBar);
+    
+    enemyEl.onclick = () => tryBattleEnemy(enemy);
+    enemyEl.title = `${enemy.name} (HP: ${enemy.hp}/${enemy.maxHp})`;
+    return enemyEl;
+}
+
+function createItemElement(item) {
     const itemEl = document.createElement('div');
     itemEl.className = 'item-drop';
     itemEl.style.left = `${item.x * 32 + 4}px`;
@@ -1304,32 +1989,32 @@ items.forEach((item, index) => {
     itemEl.style.display = 'flex';
     itemEl.style.alignItems = 'center';
     itemEl.style.justifyContent = 'center';
+    return itemEl;
+}
+
+// Other player with enhanced avatar
+function createOtherPlayerElement(address, player) {
+    const otherPlayerEl = document.createElement('div');
+    otherPlayerEl.className = 'other-player-avatar';
+    otherPlayerEl.style.left = `${player.x * 32}px`;
+    otherPlayerEl.style.top = `${player.y * 32}px`;
     
-    worldGrid.appendChild(itemEl);
-});
+    // Set avatar based on level
+    otherPlayerEl.setAttribute('data-player-level', getPlayerLevelTier(player.level));
     
-    // Render other players with enhanced avatars
-    otherPlayers.forEach((player, address) => {
-        const otherPlayerEl = document.createElement('div');
-        otherPlayerEl.className = 'other-player-avatar';
-        otherPlayerEl.style.left = `${player.x * 32}px`;
-        otherPlayerEl.style.top = `${player.y * 32}px`;
-        
-        // Set avatar based on level
-        otherPlayerEl.setAttribute('data-player-level', getPlayerLevelTier(player.level));
-        
-        // Add player info overlay
-        const playerInfo = document.createElement('div');
-        playerInfo.className = 'character-name-overlay player-name';
-        playerInfo.textContent = `${player.name} (${player.level})`;
-        otherPlayerEl.appendChild(playerInfo);
-        
-        otherPlayerEl.title = `${player.name} (Level ${player.level})`;
-        otherPlayerEl.onclick = () => interactWithPlayer(address, player);
-        worldGrid.appendChild(otherPlayerEl);
-    });
+    // Add player info overlay
+    const playerInfo = document.createElement('div');
+    playerInfo.className = 'character-name-overlay player-name';
+    playerInfo.textContent = `${player.name} (${player.level})`;
+    otherPlayerEl.appendChild(playerInfo);
     
-    // Render main player with enhanced avatar
+    otherPlayerEl.title = `${player.name} (Level ${player.level})`;
+    otherPlayerEl.onclick = () => interactWithPlayer(address, player);
+    return otherPlayerEl;
+}
+
+// Main player with enhanced avatar
+function createMainPlayerElement() {
     const player = document.createElement('div');
     player.className = 'main-player-avatar';
     player.style.left = `${gameState.player.x * 32}px`;
@@ -1343,7 +2028,509 @@ items.forEach((item, index) => {
     player.appendChild(yourName);
     
     player.title = `${gameState.player.name} (Level ${gameState.player.level})`;
-    worldGrid.appendChild(player);
+    return player;
+}
+
+// ============================================
+// SPATIAL INDEX
+// ============================================
+// Buildings, NPCs, enemies, items, other players and map areas bucketed by
+// SPATIAL_CELL_TILES x SPATIAL_CELL_TILES tiles, so tile lookups and radius
+// queries only look at the few buckets around a point. Every change to the
+// entity lists goes through spatialAdd()/spatialRemove(); a wholesale
+// replacement (map load) calls rebuildSpatialIndex().
+
+const SPATIAL_CELL_TILES = 4;
+
+const spatialIndex = {
+    cells: new Map(),         // bucket key -> [entry]
+    entries: new Map()        // entity (or player address) -> entry
+};
+
+function spatialCellKey(cx, cy) {
+    return cx * 65536 + cy;
+}
+
+function rebuildSpatialIndex() {
+    spatialIndex.cells.clear();
+    spatialIndex.entries.clear();
+    buildings.forEach(building => spatialAdd('building', building));
+    npcs.forEach(npc => spatialAdd('npc', npc));
+    enemies.forEach(enemy => spatialAdd('enemy', enemy));
+    items.forEach(item => spatialAdd('item', item));
+    otherPlayers.forEach((player, address) => spatialAdd('player', player, address));
+    (gameState.world.areas || []).forEach((area, order) => spatialAddArea(area, order));
+}
+
+// Index an entity at its tile; re-adding an id moves it
+function spatialAdd(kind, entity, id = entity) {
+    if (entity.x === undefined || entity.y === undefined) return;
+    spatialRemove(id);
+    const x = Math.floor(entity.x);
+    const y = Math.floor(entity.y);
+    const key = spatialCellKey(Math.floor(x / SPATIAL_CELL_TILES), Math.floor(y / SPATIAL_CELL_TILES));
+    const entry = { kind, entity, id, x, y, keys: [key] };
+    spatialBucket(key).push(entry);
+    spatialIndex.entries.set(id, entry);
+}
+
+// Areas are rectangles; they go into every bucket they overlap
+function spatialAddArea(area, order) {
+    const entry = { kind: 'area', entity: area, id: area, order, keys: [] };
+    const size = SPATIAL_CELL_TILES;
+    for (let cy = Math.floor(area.y / size); cy * size < area.y + area.height; cy++) {
+        for (let cx = Math.floor(area.x / size); cx * size < area.x + area.width; cx++) {
+            const key = spatialCellKey(cx, cy);
+            spatialBucket(key).push(entry);
+            entry.keys.push(key);
+        }
+    }
+    spatialIndex.entries.set(area, entry);
+}
+
+function spatialRemove(id) {
+    const entry = spatialIndex.entries.get(id);
+    if (!entry) return;
+    spatialIndex.entries.delete(id);
+    for (const key of entry.keys) {
+        const bucket = spatialIndex.cells.get(key);
+        bucket.splice(bucket.indexOf(entry), 1);
+        if (bucket.length === 0) spatialIndex.cells.delete(key);
+    }
+}
+
+function spatialBucket(key) {
+    let bucket = spatialIndex.cells.get(key);
+    if (!bucket) {
+        bucket = [];
+        spatialIndex.cells.set(key, bucket);
+    }
+    return bucket;
+}
+
+// Entries of a kind (or of every kind, if kind is null) on tiles
+// [x0, x1] x [y0, y1]
+function spatialQuery(kind, x0, y0, x1, y1) {
+    const size = SPATIAL_CELL_TILES;
+    const found = [];
+    for (let cy = Math.floor(y0 / size); cy <= Math.floor(y1 / size); cy++) {
+        for (let cx = Math.floor(x0 / size); cx <= Math.floor(x1 / size); cx++) {
+            const bucket = spatialIndex.cells.get(spatialCellKey(cx, cy));
+            if (!bucket) continue;
+            for (const entry of bucket) {
+                if ((kind === null ? entry.kind !== 'area' : entry.kind === kind) &&
+                    entry.x >= x0 && entry.x <= x1 && entry.y >= y0 && entry.y <= y1) {
+                    found.push(entry);
+                }
+            }
+        }
+    }
+    return found;
+}
+
+// Entities of a kind standing on tile (x, y)
+function entitiesAt(kind, x, y) {
+    return spatialQuery(kind, x, y, x, y).map(entry => entry.entity);
+}
+
+// Closest entry of a kind within range of (x, y), or null
+function spatialNearest(kind, x, y, range) {
+    let best = null;
+    let bestDistance = range * range;
+    const reach = Math.ceil(range);
+    for (const entry of spatialQuery(kind, Math.floor(x) - reach, Math.floor(y) - reach, Math.floor(x) + reach, Math.floor(y) + reach)) {
+        const distance = (entry.entity.x - x) ** 2 + (entry.entity.y - y) ** 2;
+        if (distance <= bestDistance) {
+            best = entry;
+            bestDistance = distance;
+        }
+    }
+    return best;
+}
+
+// First area (in map order) containing (x, y), or null
+function areaAt(x, y) {
+    const size = SPATIAL_CELL_TILES;
+    const bucket = spatialIndex.cells.get(spatialCellKey(Math.floor(x / size), Math.floor(y / size)));
+    let found = null;
+    if (!bucket) return null;
+    for (const entry of bucket) {
+        const area = entry.entity;
+        if (entry.kind === 'area' && (!found || entry.order < found.order) &&
+            x >= area.x && x < area.x + area.width && y >= area.y && y < area.y + area.height) {
+            found = entry;
+        }
+    }
+    return found && found.entity;
+}
+
+function setOtherPlayer(address, player) {
+    otherPlayers.set(address, player);
+    spatialAdd('player', player, address);
+}
+
+function clearOtherPlayers() {
+    otherPlayers.forEach((player, address) => spatialRemove(address));
+    otherPlayers.clear();
+}
+
+// Remove players last seen before minRound; the number removed
+function pruneOtherPlayers(minRound) {
+    let removed = 0;
+    for (const [address, player] of otherPlayers) {
+        if (player.round === undefined || player.round < minRound) {
+            spatialRemove(address);
+            otherPlayers.delete(address);
+            removed++;
+        }
+    }
+    return removed;
+}
+
+// ============================================
+// WALKABILITY & PATHFINDING
+// ============================================
+// The map is compiled into a bitmap of walkable tiles, with locked doors as a
+// separate overlay. Click-to-move plans a route with A* over the bitmap;
+// routes are cached, and travel between two map areas goes through a cached
+// route between the areas' anchor tiles. Each search records the doors and
+// unloaded tiles that stopped it, so when one opens only the routes it
+// blocked are dropped.
+
+const BLOCKING_TERRAIN = new Set(['water', 'mountain']);
+const WALK_STEP_MS = 120;
+const ROUTE_CACHE_SIZE = 64;
+// Travel at least this far (in tiles) between two areas uses the area route
+const AREA_ROUTE_MIN_TILES = 32;
+
+const walkability = {
+    width: 0,
+    height: 0,
+    walkable: new Uint8Array(0),   // 1 bit per tile
+    doors: new Uint8Array(0),      // 1 bit per tile: locked door
+    // Connected-component label per tile (0: blocked), rebuilt lazily after
+    // tiles change, so unreachable targets are rejected without a search
+    components: new Int32Array(0),
+    componentsDirty: true,
+    // A* scratch space, reused between searches
+    g: new Int32Array(0),
+    parent: new Int32Array(0),
+    visit: new Uint32Array(0),     // search number that last reached a tile
+    closed: new Uint32Array(0),    // search number that last expanded a tile
+    search: 0
+};
+
+// "start>goal" -> {path, tiles, blockers}; Map order doubles as LRU order
+const routeCache = new Map();
+
+let walkRoute = null;
+let walkTimer = null;
+
+function compileWalkability() {
+    const width = gameState.world.width;
+    const height = gameState.world.height;
+    const bytes = (width * height + 7) >> 3;
+    const size = width * height;
+    Object.assign(walkability, {
+        width,
+        height,
+        walkable: new Uint8Array(bytes),
+        doors: new Uint8Array(bytes),
+        g: new Int32Array(size),
+        parent: new Int32Array(size),
+        visit: new Uint32Array(size),
+        closed: new Uint32Array(size),
+        search: 0,
+        components: new Int32Array(size),
+        componentsDirty: true
+    });
+    routeCache.clear();
+    compileTiles(0, 0, width, height, null);
+}
+
+// Recompile tiles [x0, x1) x [y0, y1) after worldMap changed there
+function updateWalkability(x0, y0, x1, y1) {
+    const changed = new Set();
+    compileTiles(x0, y0, x1, y1, changed);
+    if (changed.size) {
+        walkability.componentsDirty = true;
+        invalidateRoutes(changed);
+    }
+}
+
+function compileTiles(x0, y0, x1, y1, changed) {
+    const { width, walkable, doors } = walkability;
+    for (let y = y0; y < y1; y++) {
+        const row = worldMap[y];
+        for (let x = x0; x < x1; x++) {
+            const index = y * width + x;
+            const tile = row ? row[x] : null;
+            const open = tile != null && tile !== 'door' && !BLOCKING_TERRAIN.has(tile);
+            const byte = index >> 3;
+            const bit = 1 << (index & 7);
+            if (changed && ((walkable[byte] & bit) !== 0) !== open) changed.add(index);
+            walkable[byte] = open ? walkable[byte] | bit : walkable[byte] & ~bit;
+            doors[byte] = tile === 'door' ? doors[byte] | bit : doors[byte] & ~bit;
+        }
+    }
+}
+
+function isWalkable(x, y) {
+    if (x < 0 || y < 0 || x >= walkability.width || y >= walkability.height) return false;
+    const index = y * walkability.width + x;
+    return (walkability.walkable[index >> 3] & (1 << (index & 7))) !== 0;
+}
+
+function isLockedDoor(x, y) {
+    if (x < 0 || y < 0 || x >= walkability.width || y >= walkability.height) return false;
+    const index = y * walkability.width + x;
+    return (walkability.doors[index >> 3] & (1 << (index & 7))) !== 0;
+}
+
+// Drop cached routes that a change to these tiles affects: routes through a
+// tile that closed, and searches that a now-open tile had blocked
+function invalidateRoutes(changed) {
+    routeCache.forEach((route, key) => {
+        for (const index of changed) {
+            if (route.blockers.has(index) || route.tiles.has(index)) {
+                routeCache.delete(key);
+                return;
+            }
+        }
+    });
+}
+
+function labelComponents() {
+    const { width, height, components } = walkability;
+    const stack = new Int32Array(width * height);
+    components.fill(0);
+    let label = 0;
+    for (let seed = 0; seed < width * height; seed++) {
+        if (components[seed] || !isWalkable(seed % width, Math.floor(seed / width))) continue;
+        label++;
+        components[seed] = label;
+        let top = 0;
+        stack[top++] = seed;
+        while (top) {
+            const index = stack[--top];
+            const x = index % width;
+            const y = (index - x) / width;
+            if (x + 1 < width && !components[index + 1] && isWalkable(x + 1, y)) { components[index + 1] = label; stack[top++] = index + 1; }
+            if (x > 0 && !components[index - 1] && isWalkable(x - 1, y)) { components[index - 1] = label; stack[top++] = index - 1; }
+            if (y + 1 < height && !components[index + width] && isWalkable(x, y + 1)) { components[index + width] = label; stack[top++] = index + width; }
+            if (y > 0 && !components[index - width] && isWalkable(x, y - 1)) { components[index - width] = label; stack[top++] = index - width; }
+        }
+    }
+    walkability.componentsDirty = false;
+}
+
+// Whether a search from start can reach goal (a locked door counts as
+// reachable from any of its neighbours)
+function connected(start, goal) {
+    if (walkability.componentsDirty) labelComponents();
+    const { width, height, components } = walkability;
+    const label = components[start];
+    if (!label) return false;
+    if (components[goal]) return components[goal] === label;
+    const x = goal % width;
+    const y = (goal - x) / width;
+    if (!isLockedDoor(x, y)) return false;
+    return (x + 1 < width && components[goal + 1] === label) ||
+        (x > 0 && components[goal - 1] === label) ||
+        (y + 1 < height && components[goal + width] === label) ||
+        (y > 0 && components[goal - width] === label);
+}
+
+// Tile indices from start to goal (excluding start), or null if there is no
+// route. A locked door may be the goal but is never walked through.
+function findPath(start, goal) {
+    if (!connected(start, goal)) return null;
+    
+    const key = `${start}>${goal}`;
+    let route = routeCache.get(key);
+    if (route) {
+        routeCache.delete(key);
+    } else {
+        route = searchPath(start, goal);
+        if (routeCache.size >= ROUTE_CACHE_SIZE) {
+            routeCache.delete(routeCache.keys().next().value);
+        }
+    }
+    routeCache.set(key, route);
+    return route.path;
+}
+
+// A* over the walkability bitmap, 4-connected, Manhattan heuristic
+function searchPath(start, goal) {
+    const { width, height, g, parent, visit, closed } = walkability;
+    const search = ++walkability.search;
+    const goalX = goal % width;
+    const goalY = (goal - goalX) / width;
+    const blockers = new Set();
+    // Heap entries pack f and the tile index into one number
+    const SHIFT = 2 ** 26;
+    const heap = [];
+    
+    const push = (index, f) => {
+        let i = heap.length;
+        const entry = f * SHIFT + index;
+        heap.push(entry);
+        while (i > 0) {
+            const up = (i - 1) >> 1;
+            if (heap[up] <= entry) break;
+            heap[i] = heap[up];
+            i = up;
+        }
+        heap[i] = entry;
+    };
+    const pop = () => {
+        const top = heap[0];
+        const last = heap.pop();
+        if (heap.length) {
+            let i = 0;
+            for (;;) {
+                let child = 2 * i + 1;
+                if (child >= heap.length) break;
+                if (child + 1 < heap.length && heap[child + 1] < heap[child]) child++;
+                if (heap[child] >= last) break;
+                heap[i] = heap[child];
+                i = child;
+            }
+            heap[i] = last;
+        }
+        return top % SHIFT;
+    };
+    
+    visit[start] = search;
+    g[start] = 0;
+    parent[start] = -1;
+    push(start, Math.abs(start % width - goalX) + Math.abs(Math.floor(start / width) - goalY));
+    
+    while (heap.length) {
+        const current = pop();
+        if (closed[current] === search) continue;
+        closed[current] = search;
+        if (current === goal) break;
+        
+        const x = current % width;
+        const y = (current - x) / width;
+        for (let d = 0; d < 4; d++) {
+            const nx = d === 0 ? x + 1 : d === 1 ? x - 1 : x;
+            const ny = d === 2 ? y + 1 : d === 3 ? y - 1 : y;
+            if (nx < 0 || ny < 0 || nx >= width || ny >= height) continue;
+            const next = ny * width + nx;
+            if (!isWalkable(nx, ny) && !(next === goal && isLockedDoor(nx, ny))) {
+                // Doors and unloaded tiles can open later; remember them
+                if (isLockedDoor(nx, ny) || worldMap[ny][nx] === null) blockers.add(next);
+                continue;
+            }
+            const cost = g[current] + 1;
+            if (visit[next] === search && g[next] <= cost) continue;
+            visit[next] = search;
+            g[next] = cost;
+            parent[next] = current;
+            push(next, cost + Math.abs(nx - goalX) + Math.abs(ny - goalY));
+        }
+    }
+    
+    if (closed[goal] !== search) {
+        return { path: null, tiles: new Set(), blockers };
+    }
+    const path = [];
+    for (let index = goal; index !== start; index = parent[index]) path.push(index);
+    path.reverse();
+    return { path, tiles: new Set(path), blockers };
+}
+
+// A walkable tile in the area, as close to its centre as possible
+function areaAnchor(area) {
+    const cx = Math.floor(area.x + area.width / 2);
+    const cy = Math.floor(area.y + area.height / 2);
+    const reach = Math.max(area.width, area.height);
+    for (let r = 0; r <= reach; r++) {
+        for (let y = cy - r; y <= cy + r; y++) {
+            for (let x = cx - r; x <= cx + r; x++) {
+                if (Math.max(Math.abs(x - cx), Math.abs(y - cy)) !== r) continue;
+                if (x >= area.x && x < area.x + area.width && y >= area.y && y < area.y + area.height && isWalkable(x, y)) {
+                    return y * walkability.width + x;
+                }
+            }
+        }
+    }
+    return -1;
+}
+
+// Route from the player to (x, y), via the cached area-to-area route when
+// travelling between two distant areas
+function planRoute(x, y) {
+    const width = walkability.width;
+    const start = gameState.player.y * width + gameState.player.x;
+    const goal = y * width + x;
+    const from = areaAt(gameState.player.x, gameState.player.y);
+    const to = areaAt(x, y);
+    
+    if (from && to && from !== to &&
+        Math.abs(x - gameState.player.x) + Math.abs(y - gameState.player.y) >= AREA_ROUTE_MIN_TILES) {
+        const a = areaAnchor(from);
+        const b = areaAnchor(to);
+        if (a !== -1 && b !== -1) {
+            const legs = [
+                a === start ? [] : findPath(start, a),
+                findPath(a, b),
+                b === goal ? [] : findPath(b, goal)
+            ];
+            if (legs.every(Boolean)) return [].concat(...legs);
+        }
+    }
+    return findPath(start, goal);
+}
+
+// Walk to a tile one step per WALK_STEP_MS; stops when blocked or on input
+function walkTo(x, y) {
+    stopWalking();
+    if (x === gameState.player.x && y === gameState.player.y) return;
+    
+    const path = planRoute(x, y);
+    if (!path) {
+        showFloatingText('No path!', gameState.player.x * 32 + 16, gameState.player.y * 32 - 20, '#ef4444');
+        return;
+    }
+    
+    walkRoute = { path, step: 0 };
+    walkTimer = setInterval(() => {
+        const width = walkability.width;
+        const next = walkRoute.path[walkRoute.step];
+        const dx = next % width - gameState.player.x;
+        const dy = Math.floor(next / width) - gameState.player.y;
+        if (gameState.inBattle || Math.abs(dx) + Math.abs(dy) !== 1) {
+            stopWalking();
+            return;
+        }
+        movePlayer(dx, dy);
+        if (gameState.player.x !== next % width || gameState.player.y !== Math.floor(next / width) ||
+            ++walkRoute.step === walkRoute.path.length) {
+            stopWalking();
+        }
+    }, WALK_STEP_MS);
+}
+
+function stopWalking() {
+    if (walkTimer) clearInterval(walkTimer);
+    walkTimer = null;
+    walkRoute = null;
+}
+
+// Click on the map: walk to that tile
+function handleWorldClick(event) {
+    const worldGrid = document.getElementById('worldGrid');
+    if (event.target !== worldGrid && !event.target.classList.contains('tile')) return;
+    if (gameState.inBattle) return;
+    
+    const rect = worldGrid.getBoundingClientRect();
+    const x = Math.floor((event.clientX - rect.left) / 32);
+    const y = Math.floor((event.clientY - rect.top) / 32);
+    if (x < 0 || y < 0 || x >= gameState.world.width || y >= gameState.world.height) return;
+    walkTo(x, y);
 }
 
 // ============================================
@@ -1390,6 +2577,9 @@ function movePlayer(dx, dy) {
         // Check for items
         checkItemCollectionOptimized();
         
+        // Bring in packed map chunks as the player nears them
+        if (packedMap) ensureMapChunksNear(newX, newY);
+        
     } else {
         showFloatingText('Path Blocked!', gameState.player.x * 32 + 16, gameState.player.y * 32, '#ef4444');
     }
@@ -1434,6 +2624,9 @@ function centerCameraOnPlayerOptimized() {
     
     // Update minimap immediately (remove the modulo condition)
     updateMinimapOptimized();
+    
+    // Bring tiles and entities that scrolled into view into the DOM
+    updateViewport();
 }
 
 // Center camera on player (full function)
@@ -1451,17 +2644,16 @@ function canMoveTo(x, y) {
         return false;
     }
     
-    const tileType = worldMap[tileY][tileX];
-    if (tileType === 'water' || tileType === 'mountain') {
-        return false;
-    }
-
-    // Check for locked doors
-    if (tileType === 'door') {
+    // Water, mountains and unloaded packed-map tiles are not walkable
+    if (!isWalkable(tileX, tileY)) {
+        if (!isLockedDoor(tileX, tileY)) return false;
+        
+        // Locked door
         if (gameState.inventory.keys > 0) {
             gameState.inventory.keys--;
             worldMap[tileY][tileX] = 'road'; // Change door to road after unlocking
-            renderWorld();
+            updateWalkability(tileX, tileY, tileX + 1, tileY + 1);
+            invalidateTerrain(tileX, tileY);
             updateUI();
             showFloatingText('Door Unlocked!', 
                 x * 32 + 16, 
@@ -1482,9 +2674,9 @@ function canMoveTo(x, y) {
     
     
     // Check if an enemy is blocking this tile
-    const blockingEnemy = enemies.find(enemy => 
-        Math.floor(enemy.x) === tileX && Math.floor(enemy.y) === tileY
-    );
+    const nearbyEnemies = spatialQuery('enemy', tileX - 1, tileY - 1, tileX + 1, tileY + 1);
+    const blocking = nearbyEnemies.find(entry => entry.x === tileX && entry.y === tileY);
+    const blockingEnemy = blocking && blocking.entity;
     
     if (blockingEnemy) {
         // Automatically start battle if trying to move into enemy tile
@@ -1500,13 +2692,7 @@ function canMoveTo(x, y) {
     }
     
     // OPTIONAL: Check adjacent tiles for enemies (prevents diagonal passing)
-    const adjacentEnemies = enemies.filter(enemy => {
-        const enemyX = Math.floor(enemy.x);
-        const enemyY = Math.floor(enemy.y);
-        const distX = Math.abs(enemyX - tileX);
-        const distY = Math.abs(enemyY - tileY);
-        return distX <= 1 && distY <= 1 && (distX + distY) > 0;
-    });
+    const adjacentEnemies = nearbyEnemies.filter(entry => entry.x !== tileX || entry.y !== tileY);
 
     if (adjacentEnemies.length > 0 && !gameState.inBattle) {
         showFloatingText('Enemy nearby - approach carefully!', 
@@ -1525,16 +2711,9 @@ function checkLocationQuick() {
     let locationName = "Wilderness";
     
     // First check custom areas from imported maps
-    if (gameState.world.areas && gameState.world.areas.length > 0) {
-        for (const area of gameState.world.areas) {
-            if (gameState.player.x >= area.x && 
-                gameState.player.x < area.x + area.width &&
-                gameState.player.y >= area.y && 
-                gameState.player.y < area.y + area.height) {
-                locationName = area.name;
-                break;
-            }
-        }
+    const area = areaAt(gameState.player.x, gameState.player.y);
+    if (area) {
+        locationName = area.name;
     }
     
     // Fallback to hardcoded settlements if no custom area found
@@ -1580,16 +2759,10 @@ function checkLocation() {
 
 // Optimized item collection check
 function checkItemCollectionOptimized() {
-    for (let i = items.length - 1; i >= 0; i--) {
-        const item = items[i];
-        const distance = Math.sqrt(
-            Math.pow(gameState.player.x - item.x, 2) + 
-            Math.pow(gameState.player.y - item.y, 2)
-        );
-        if (distance < 0.8) { // Increased pickup range slightly
-            collectItem(i);
-            break;
-        }
+    // Increased pickup range slightly
+    const nearest = spatialNearest('item', gameState.player.x, gameState.player.y, 0.8);
+    if (nearest) {
+        collectItem(items.indexOf(nearest.entity));
     }
 }
 
@@ -1625,6 +2798,7 @@ function collectItem(index) {
     createParticleEffect(item.x * 32 + 16, item.y * 32, '#fbbf24');
     
     items.splice(index, 1);
+    spatialRemove(item);
     updateUI();
     renderWorld();
 }
@@ -1778,53 +2952,25 @@ function updateMinimap() {
 
 // Main interaction function
 function interact() {
-    let interacted = false;
     const INTERACTION_RANGE = 1.5;
     
-    // Check for other players
-    otherPlayers.forEach((player, address) => {
-        if (interacted) return;
-        const distance = Math.sqrt(Math.pow(gameState.player.x - player.x, 2) + Math.pow(gameState.player.y - player.y, 2));
-        if (distance <= INTERACTION_RANGE) {
-            interactWithPlayer(address, player);
-            interacted = true;
-        }
-    });
-    if (interacted) return;
-    
-    // Check for NPCs
-    npcs.forEach(npc => {
-        if (interacted) return;
-        const distance = Math.sqrt(Math.pow(gameState.player.x - npc.x, 2) + Math.pow(gameState.player.y - npc.y, 2));
-        if (distance <= INTERACTION_RANGE) {
-            talkToNPC(npc);
-            interacted = true;
-        }
-    });
-    if (interacted) return;
-    
-    // Check for buildings
-    buildings.forEach(building => {
-        if (interacted) return;
-        const distance = Math.sqrt(Math.pow(gameState.player.x - building.x, 2) + Math.pow(gameState.player.y - building.y, 2));
-        if (distance <= INTERACTION_RANGE + 0.5) {
-            interactWithBuilding(building);
-            interacted = true;
-        }
-    });
-    if (interacted) return;
-    
-    // Check for enemies
-    enemies.forEach(enemy => {
-        if (interacted) return;
-        const distance = Math.sqrt(Math.pow(gameState.player.x - enemy.x, 2) + Math.pow(gameState.player.y - enemy.y, 2));
-        if (distance <= INTERACTION_RANGE) {
-            startBattle(enemy);
-            interacted = true;
-        }
-    });
-    
-    if (!interacted) {
+    const { x, y } = gameState.player;
+    
+    // Other players first, then NPCs, buildings and enemies; nearest of each
+    const player = spatialNearest('player', x, y, INTERACTION_RANGE);
+    const npc = !player && spatialNearest('npc', x, y, INTERACTION_RANGE);
+    const building = !player && !npc && spatialNearest('building', x, y, INTERACTION_RANGE + 0.5);
+    const enemy = !player && !npc && !building && spatialNearest('enemy', x, y, INTERACTION_RANGE);
+    
+    if (player) {
+        interactWithPlayer(player.id, player.entity);
+    } else if (npc) {
+        talkToNPC(npc.entity);
+    } else if (building) {
+        interactWithBuilding(building.entity);
+    } else if (enemy) {
+        startBattle(enemy.entity);
+    } else {
         showFloatingText('Nothing nearby', gameState.player.x * 32 + 16, gameState.player.y * 32 - 20, '#94a3b8');
     }
 }
@@ -1858,6 +3004,7 @@ function challengePlayer(targetAddress) {
 
 // Trade with player (placeholder)
 function tradeWithPlayer(targetAddress) {
+    noteSyncActivity();
     showFloatingText('P2P trading coming soon!', gameState.player.x * 32 + 16, gameState.player.y * 32 - 40, '#fbbf24');
     closeModal();
 }
@@ -2180,13 +3327,19 @@ function enemyDefeated() {
     addBattleLog(`🎉 Victory! ${enemy.name} defeated!`, 'log-heal');
     addBattleLog(`💰 Gained ${enemy.goldReward} gold and ${enemy.xpReward} XP!`, 'log-heal');
     
-    enemies = enemies.filter(e => e.x !== enemy.x || e.y !== enemy.y);
+    enemies = enemies.filter(e => {
+        if (e.x !== enemy.x || e.y !== enemy.y) return true;
+        spatialRemove(e);
+        return false;
+    });
     
     checkLevelUp();
     
     if (Math.random() < 0.4) {
         const dropValue = Math.floor(Math.random() * 30) + 15;
-        items.push({x: enemy.x, y: enemy.y, type: 'gold', value: dropValue});
+        const drop = {x: enemy.x, y: enemy.y, type: 'gold', value: dropValue};
+        items.push(drop);
+        spatialAdd('item', drop);
         addBattleLog(`✨ Enemy dropped treasure!`, 'log-heal');
     }
     
@@ -2393,6 +3546,7 @@ function handleKeyboard(event) {
     // Handle movement keys
     if (['w', 's', 'a', 'd', 'arrowup', 'arrowdown', 'arrowleft', 'arrowright'].includes(key)) {
         event.preventDefault();
+        stopWalking();
         
         if (!keyStates[key] && !moveInterval) {
             keyStates[key] = true;
@@ -2576,6 +3730,7 @@ window.addPotions = (health = 5, mana = 5) => {
 };
 
 window.clearEnemies = () => {
+    enemies.forEach(spatialRemove);
     enemies = [];
     renderWorld();
     showFloatingText('All enemies cleared!', 
@@ -2598,6 +3753,7 @@ window.spawnEnemy = (x, y) => {
         goldReward: 15
     };
     enemies.push(newEnemy);
+    spatialAdd('enemy', newEnemy);
     renderWorld();
     showFloatingText('Enemy spawned!', 
         gameState.player.x * 32 + 16, 
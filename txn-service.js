@@ -0,0 +1,361 @@
+// EternalBliss - Shared transaction service
+// One per algod client. Suggested params are fetched once and advanced
+// locally as rounds go by, and a single watcher follows new blocks while
+// anything is pending: each block's txid list resolves every pending
+// transaction confirmed in it. Senders get a promise per transaction
+// instead of running their own status/pending/statusAfterBlock loop.
+// `node txn-service.js` runs a chatty session against a mock algod and
+// counts the RPC calls, next to the per-transaction polling it replaces.
+
+class TxnService {
+    // Rounds a transaction may stay unconfirmed before its promise rejects
+    static WAIT_ROUNDS = 4;
+    // Refetch suggested params (fee, genesis) at least this often
+    static PARAMS_REFRESH_ROUNDS = 100;
+    // With no watcher running, the last round seen is trusted this long
+    static ROUND_MS = 3300;
+    // First wait before the watcher retries a failed request; it doubles
+    // up to ROUND_MS
+    static RETRY_MS = 250;
+    // While algod is unreachable, a wait rejects this many rounds' time
+    // after its own rounds would have passed
+    static DEADLINE_SLACK_ROUNDS = 2;
+
+    constructor(algodClient) {
+        this.algod = algodClient;
+        this.round = 0;               // last committed round seen
+        this.roundSeenAt = 0;
+        this.base = null;             // {params, round}: the last fetched params
+        this.fetching = null;         // in-flight getTransactionParams
+        this.pending = new Map();     // txId -> entry (see wait())
+        // Txids of the last few blocks checked, for a send whose response
+        // arrives after the watcher has already passed its block
+        this.recent = new Map();      // round -> Set of txIds
+        this.watching = false;
+        // algod serves /v2/blocks/{round}/txids; without it, each pending
+        // txid is looked up once per round instead
+        this.blockTxids = typeof algodClient.getBlockTxids === 'function';
+    }
+
+    observeRound(round) {
+        if (round >= this.round) {
+            this.round = round;
+            this.roundSeenAt = Date.now();
+        }
+    }
+
+    // Suggested params for the current round
+    async params() {
+        const stale = !this.base ||
+            Date.now() - this.roundSeenAt > TxnService.ROUND_MS ||
+            this.round - this.base.round >= TxnService.PARAMS_REFRESH_ROUNDS;
+        if (stale) {
+            if (!this.fetching) {
+                this.fetching = this.algod.getTransactionParams().do().then(params => {
+                    this.base = { params, round: params.firstRound };
+                    this.observeRound(params.firstRound);
+                }).finally(() => {
+                    this.fetching = null;
+                });
+            }
+            await this.fetching;
+        }
+        // Slide the validity window up to the latest round without a request
+        const { params, round } = this.base;
+        const shift = this.round - round;
+        return { ...params, firstRound: params.firstRound + shift, lastRound: params.lastRound + shift };
+    }
+
+    async send(signed) {
+        const { txId } = await this.algod.sendRawTransaction(signed).do();
+        return txId;
+    }
+
+    // Promise of a transaction's confirmation: {txId, 'confirmed-round'}, or
+    // the full pending-transaction info with details: true. Rejects after
+    // `rounds` rounds, or after timeoutMs if given. While algod cannot be
+    // reached, it rejects once the rounds' time plus DEADLINE_SLACK_ROUNDS
+    // has passed.
+    wait(txId, { rounds = TxnService.WAIT_ROUNDS, timeoutMs = 0, details = false } = {}) {
+        const existing = this.pending.get(txId);
+        if (existing) {
+            existing.details = existing.details || details;
+            return existing.promise;
+        }
+
+        const deadline = Date.now() + (timeoutMs || (rounds + TxnService.DEADLINE_SLACK_ROUNDS) * TxnService.ROUND_MS);
+        const entry = { txId, rounds, details, lastRound: null, deadline, timer: null };
+        entry.promise = new Promise((resolve, reject) => {
+            entry.resolve = resolve;
+            entry.reject = reject;
+        });
+        for (const [round, txIds] of this.recent) {
+            if (txIds.has(txId)) {
+                this.pending.set(txId, entry);
+                this.confirm(entry, round);
+                return entry.promise;
+            }
+        }
+        if (timeoutMs) {
+            entry.timer = setTimeout(() => this.settle(entry, new Error('Transaction timeout')), timeoutMs);
+        }
+        this.pending.set(txId, entry);
+        this.watch().catch(error => console.error('TxnService: watcher failed', error));
+        return entry.promise;
+    }
+
+    // Send and wait for confirmation
+    async submit(signed, options) {
+        return this.wait(await this.send(signed), options);
+    }
+
+    settle(entry, error, result) {
+        if (this.pending.get(entry.txId) !== entry) return;
+        this.pending.delete(entry.txId);
+        if (entry.timer) clearTimeout(entry.timer);
+        if (error) {
+            entry.reject(error);
+        } else {
+            entry.resolve(result);
+        }
+    }
+
+    // Follow blocks while anything is pending; one loop for all senders.
+    // A failed request is retried for the same round: only the round
+    // passing an entry's lastRound, a pool error, or the entry's deadline
+    // passing while algod is unreachable rejects an entry.
+    async watch() {
+        if (this.watching) return;
+        this.watching = true;
+        let delay = TxnService.RETRY_MS;
+        let next = null;
+        try {
+            while (this.pending.size) {
+                try {
+                    if (next === null) {
+                        if (Date.now() - this.roundSeenAt > TxnService.ROUND_MS) {
+                            this.observeRound((await this.algod.status().do())['last-round']);
+                        }
+                        // Anything sent after round r was seen can only land after r
+                        next = this.round + 1;
+                    }
+                    for (const entry of this.pending.values()) {
+                        if (entry.lastRound === null) entry.lastRound = next - 1 + entry.rounds;
+                    }
+                    const status = await this.algod.statusAfterBlock(next - 1).do();
+                    this.observeRound(status['last-round']);
+                    for (; next <= this.round && this.pending.size; next++) {
+                        await this.checkRound(next);
+                    }
+                    delay = TxnService.RETRY_MS;
+                } catch (error) {
+                    if (!TxnService.isTransportError(error)) throw error;
+                    const now = Date.now();
+                    for (const entry of [...this.pending.values()]) {
+                        if (now >= entry.deadline) {
+                            this.settle(entry, new Error(`Transaction timeout: algod unreachable (${error.message})`));
+                        }
+                    }
+                    if (!this.pending.size) break;
+                    console.warn(`TxnService: round ${next}: ${error.message}; retrying in ${delay} ms`);
+                    await new Promise(resolve => setTimeout(resolve, delay));
+                    delay = Math.min(delay * 2, TxnService.ROUND_MS);
+                }
+            }
+        } catch (error) {
+            // A bug, not algod: reject the waits with it rather than hang them
+            for (const entry of [...this.pending.values()]) this.settle(entry, error);
+            throw error;
+        } finally {
+            this.watching = false;
+        }
+    }
+
+    // algod answered with an HTTP error (algosdk sets status/response), or
+    // the request got no answer at all (fetch rejects with a TypeError)
+    static isTransportError(error) {
+        if (!error) return false;
+        if (error.status !== undefined || error.response) return true;
+        return error.name === 'TypeError' && /fetch|network|load failed/i.test(error.message);
+    }
+
+    async checkRound(round) {
+        if (this.blockTxids) {
+            const { blockTxids } = await this.algod.getBlockTxids(round).do();
+            this.recent.set(round, new Set(blockTxids));
+            for (const seen of this.recent.keys()) {
+                if (seen <= round - TxnService.WAIT_ROUNDS) this.recent.delete(seen);
+            }
+            await Promise.all((blockTxids || []).map(txId => {
+                const entry = this.pending.get(txId);
+                return entry && this.confirm(entry, round);
+            }));
+        } else {
+            await Promise.all([...this.pending.values()].map(async entry => {
+                const info = await this.algod.pendingTransactionInformation(entry.txId).do();
+                if (info['confirmed-round'] > 0) {
+                    this.settle(entry, null, { ...info, txId: entry.txId });
+                } else if (info['pool-error']) {
+                    this.settle(entry, new Error(info['pool-error']));
+                }
+            }));
+        }
+        const expired = [...this.pending.values()].filter(entry => entry.lastRound !== null && round >= entry.lastRound);
+        // One last lookup each: a send answered later than the blocks kept
+        // in recent may have confirmed unseen
+        await Promise.all(expired.map(async entry => {
+            let info = {};
+            try {
+                info = await this.algod.pendingTransactionInformation(entry.txId).do();
+            } catch (error) {
+                // Unknown: time out as if unconfirmed
+            }
+            if (info['confirmed-round'] > 0) {
+                this.settle(entry, null, entry.details ? { ...info, txId: entry.txId } : { txId: entry.txId, 'confirmed-round': info['confirmed-round'] });
+            } else if (info['pool-error']) {
+                this.settle(entry, new Error(info['pool-error']));
+            } else {
+                this.settle(entry, new Error('Transaction timeout'));
+            }
+        }));
+    }
+
+    async confirm(entry, round) {
+        if (!entry.details) {
+            this.settle(entry, null, { txId: entry.txId, 'confirmed-round': round });
+            return;
+        }
+        const info = await this.algod.pendingTransactionInformation(entry.txId).do();
+        this.settle(entry, null, { ...info, txId: entry.txId });
+    }
+
+    // A chatty session (position updates every few steps, chat, saves)
+    // against a mock algod; RPC calls with the service and with a polling
+    // loop per transaction
+    static async benchmark({ rounds = 20, roundMs = 40, positions = 60, chats = 10, saves = 4 } = {}) {
+        const session = async (algod, sendAndWait, sendOnly) => {
+            const jobs = [];
+            const ticks = positions + chats + saves;
+            const span = rounds * roundMs * 0.75;
+            for (let i = 0; i < ticks; i++) {
+                const waitFor = i % Math.ceil(ticks / (chats + saves)) === 0;
+                jobs.push(new Promise(resolve => setTimeout(resolve, (i / ticks) * span))
+                    .then(() => (waitFor ? sendAndWait() : sendOnly())));
+            }
+            await Promise.all(jobs);
+            algod.stop();
+            return algod.calls;
+        };
+
+        const legacy = new MockAlgod(roundMs);
+        const legacyCalls = await session(legacy, async () => {
+            const params = await legacy.getTransactionParams().do();
+            const { txId } = await legacy.sendRawTransaction(params).do();
+            const startRound = (await legacy.status().do())['last-round'];
+            for (let round = startRound; round < startRound + TxnService.WAIT_ROUNDS; round++) {
+                const info = await legacy.pendingTransactionInformation(txId).do();
+                if (info['confirmed-round'] > 0) return;
+                await legacy.statusAfterBlock(round + 1).do();
+            }
+        }, async () => {
+            await legacy.sendRawTransaction(await legacy.getTransactionParams().do()).do();
+        });
+
+        const shared = new MockAlgod(roundMs);
+        const service = new TxnService(shared);
+        const sharedCalls = await session(shared, async () => {
+            await service.submit(await service.params());
+        }, async () => {
+            await service.send(await service.params());
+        });
+
+        const total = calls => Object.values(calls).reduce((a, b) => a + b, 0);
+        return { rounds, legacy: legacyCalls, legacyTotal: total(legacyCalls), shared: sharedCalls, sharedTotal: total(sharedCalls) };
+    }
+}
+
+// In-memory algod for the benchmark: a block every roundMs with whatever
+// was sent since the last one
+class MockAlgod {
+    constructor(roundMs) {
+        this.round = 1000;
+        this.pool = [];
+        this.blocks = new Map();
+        this.confirmed = new Map();
+        this.waiters = [];
+        this.calls = {};
+        this.sent = 0;
+        this.timer = setInterval(() => {
+            this.round++;
+            this.blocks.set(this.round, this.pool);
+            this.pool.forEach(txId => this.confirmed.set(txId, this.round));
+            this.pool = [];
+            this.waiters = this.waiters.filter(({ round, resolve }) => {
+                if (this.round <= round) return true;
+                resolve();
+                return false;
+            });
+        }, roundMs);
+    }
+
+    stop() {
+        clearInterval(this.timer);
+    }
+
+    request(name, fn) {
+        return {
+            do: async () => {
+                this.calls[name] = (this.calls[name] || 0) + 1;
+                return fn();
+            }
+        };
+    }
+
+    status() {
+        return this.request('status', () => ({ 'last-round': this.round }));
+    }
+
+    statusAfterBlock(round) {
+        return this.request('statusAfterBlock', async () => {
+            if (this.round <= round) await new Promise(resolve => this.waiters.push({ round, resolve }));
+            return { 'last-round': this.round };
+        });
+    }
+
+    getTransactionParams() {
+        return this.request('getTransactionParams', () => ({
+            fee: 0, flatFee: false, minFee: 1000, firstRound: this.round, lastRound: this.round + 1000,
+            genesisID: 'mock-v1', genesisHash: 'bW9jaw==',
+        }));
+    }
+
+    sendRawTransaction() {
+        return this.request('sendRawTransaction', () => {
+            const txId = `TX${++this.sent}`;
+            this.pool.push(txId);
+            return { txId };
+        });
+    }
+
+    pendingTransactionInformation(txId) {
+        return this.request('pendingTransactionInformation', () => ({ 'confirmed-round': this.confirmed.get(txId) || 0 }));
+    }
+
+    getBlockTxids(round) {
+        return this.request('getBlockTxids', () => ({ blockTxids: this.blocks.get(round) || [] }));
+    }
+}
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = TxnService;
+    if (require.main === module) {
+        TxnService.benchmark().then(r => {
+            const perRound = n => (n / r.rounds).toFixed(1);
+            console.log(`${r.rounds} rounds`);
+            console.log(`  per-transaction polling: ${r.legacyTotal} calls (${perRound(r.legacyTotal)}/round)`, r.legacy);
+            console.log(`  shared service:          ${r.sharedTotal} calls (${perRound(r.sharedTotal)}/round)`, r.shared);
+        });
+    }
+} else {
+    window.TxnService = TxnService;
+}